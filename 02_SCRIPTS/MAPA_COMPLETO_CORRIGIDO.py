@@ -21,6 +21,9 @@ import os
 from shapely.geometry import Point
 import json
 
+import camadas_geojson
+import classificacao_estabelecimentos
+
 # ========================================
 # 1. CONFIGURAÇÕES E CARREGAMENTO DE DADOS
 # ========================================
@@ -49,14 +52,8 @@ except:
 df = df.dropna(subset=['Field39', 'Field40'])
 print(f"📊 Total de estabelecimentos: {len(df)}")
 
-# Classificar estabelecimentos públicos
-def eh_posto_publico(nome):
-    if pd.isna(nome):
-        return False
-    nome_upper = str(nome).upper()
-    return any(termo in nome_upper for termo in ['ESF', 'POSTO', 'PS ', 'MUNICIPIO', 'PREFEITURA', 'CENTRO DE SAUDE'])
-
-df['eh_publico'] = df['Field7'].apply(eh_posto_publico)
+# Classificar estabelecimentos públicos (tabela única de regras; Field7 = nome fantasia)
+df['eh_publico'] = classificacao_estabelecimentos.classificar(df, colunas={'nome': 'Field7'})['eh_publico']
 postos_publicos = df[df['eh_publico']]
 print(f"🏥 Estabelecimentos públicos (UBS/ESF): {len(postos_publicos)}")
 
@@ -112,8 +109,7 @@ try:
         # Atualizar DataFrame
         df = df.loc[df_dentro.index].reset_index(drop=True)
         
-        # Recalcular estabelecimentos públicos após filtro
-        df['eh_publico'] = df['Field7'].apply(eh_posto_publico)
+        # Classificação acompanha as linhas filtradas
         postos_publicos = df[df['eh_publico']]
         
         removidos = len(df_geo) - len(df)
@@ -223,25 +219,22 @@ voronoi_layer = folium.FeatureGroup(name='📐 Polígonos de Voronoi (Áreas de
 # Cores para os polígonos
 cores_voronoi = ['#e41a1c', '#377eb8', '#4daf4a', '#984ea3', '#ff7f00', '#ffff33', '#a65628', '#f781bf']
 
-# Função factory para criar style_function com cor capturada corretamente
-def criar_style_function(cor_fixa):
-    return lambda x: {
-        'fillColor': cor_fixa,
-        'color': cor_fixa,
+# Uma única FeatureCollection; a cor de cada área vai como propriedade
+n_areas = len(voronoi_gdf)
+folium.GeoJson(
+    camadas_geojson.poligonos_para_geojson(voronoi_gdf, {
+        'rotulo': [f"Área de Influência {i + 1}" for i in range(n_areas)],
+        'cor': [cores_voronoi[i % len(cores_voronoi)] for i in range(n_areas)],
+    }),
+    style_function=lambda x: {
+        'fillColor': x['properties']['cor'],
+        'color': x['properties']['cor'],
         'weight': 2,
         'fillOpacity': 0.3,
         'opacity': 1
-    }
-
-# Adicionar cada polígono individualmente
-for idx, row in voronoi_gdf.iterrows():
-    cor = cores_voronoi[idx % len(cores_voronoi)]
-    
-    folium.GeoJson(
-        row.geometry.__geo_interface__,
-        style_function=criar_style_function(cor),
-        tooltip=f"Área de Influência {idx + 1}"
-    ).add_to(voronoi_layer)
+    },
+    tooltip=folium.GeoJsonTooltip(fields=['rotulo'], labels=False)
+).add_to(voronoi_layer)
 
 voronoi_layer.add_to(mapa)
 
@@ -9,102 +9,98 @@ Data: Novembro 2025
 """
 
 import os
+import time
+import shutil
 import geopandas as gpd
 import json
 import warnings
 warnings.filterwarnings('ignore')
 
+import camadas_topojson
+from remendos_html import aplicar_remendos, imprimir_relatorio
+
 ROOT_DIR = r'C:\Users\caetanoronan\OneDrive - UFSC\Área de Trabalho\Exer_tec_geo\Pesquisa_upas'
 MAPA_PATH = os.path.join(ROOT_DIR, 'docs', 'mapa_avancado_treelayer_colorbrewer.html')
 BACKUP_PATH = os.path.join(ROOT_DIR, 'docs', 'mapa_avancado_treelayer_colorbrewer_BACKUP.html')
 
-print("\n" + "="*70)
-print("  🗺️ ADICIONANDO LIMITES AO MAPA (mantendo conteúdo original)")
-print("="*70)
-
-# Fazer backup do arquivo original
-print("\n💾 Criando backup do mapa original...")
-try:
-    with open(MAPA_PATH, 'r', encoding='utf-8') as f:
-        original_content = f.read()
-    with open(BACKUP_PATH, 'w', encoding='utf-8') as f:
-        f.write(original_content)
-    print(f"   ✅ Backup salvo em: {BACKUP_PATH}")
-except Exception as e:
-    print(f"   ❌ Erro ao criar backup: {e}")
-    exit(1)
 
-# Carregar shapefiles e gerar GeoJSON
-print("\n📥 Carregando dados geoespaciais...")
+def remendos():
+    """
+    Gera TopoJSON dos limites (estadual, municipal, vizinhos) e devolve o
+    remendo que injeta as camadas antes de </body>, sem tocar no resto do mapa.
+    """
+    # Carregar shapefiles e gerar TopoJSON quantizado (arcos compartilhados)
+    print("\n📥 Carregando dados geoespaciais...")
 
-# Limite estadual
-geojson_estado = None
-try:
-    shp_sc = os.path.join(ROOT_DIR, "SC_Municipios_2024", "SC_Municipios_2024.shp")
-    print("   → Processando limite estadual...")
-    gdf_sc = gpd.read_file(shp_sc)
-    if gdf_sc.crs.to_epsg() != 4326:
-        gdf_sc = gdf_sc.to_crs(epsg=4326)
+    # Limite estadual
+    topo_estado = None
+    try:
+        shp_sc = os.path.join(ROOT_DIR, "SC_Municipios_2024", "SC_Municipios_2024.shp")
+        print("   → Processando limite estadual...")
+        gdf_sc = gpd.read_file(shp_sc)
+        if gdf_sc.crs.to_epsg() != 4326:
+            gdf_sc = gdf_sc.to_crs(epsg=4326)
     
-    gdf_estado_proj = gdf_sc.to_crs(31982)
-    gdf_estado = gdf_estado_proj.dissolve().reset_index(drop=True)
-    gdf_estado['geometry'] = gdf_estado['geometry'].simplify(500)
-    gdf_estado = gdf_estado.to_crs(4326)
+        gdf_estado_proj = gdf_sc.to_crs(31982)
+        gdf_estado = gdf_estado_proj.dissolve().reset_index(drop=True)
+        gdf_estado['geometry'] = gdf_estado['geometry'].simplify(500)
+        gdf_estado = gdf_estado.to_crs(4326)
     
-    geojson_estado = json.loads(gdf_estado.to_json())
-    print("      ✅ Limite estadual processado")
-except Exception as e:
-    print(f"      ⚠️ Erro: {e}")
+        topo_estado = camadas_topojson.gdf_para_topojson(gdf_estado, 'estado')
+        print("      ✅ Limite estadual processado")
+    except Exception as e:
+        print(f"      ⚠️ Erro: {e}")
 
-# Limite municipal
-geojson_municipio = None
-try:
-    print("   → Processando limite municipal...")
-    gdf_sc_mun = gpd.read_file(shp_sc)
-    if gdf_sc_mun.crs.to_epsg() != 4326:
-        gdf_sc_mun = gdf_sc_mun.to_crs(epsg=4326)
+    # Limite municipal
+    topo_municipio = None
+    try:
+        print("   → Processando limite municipal...")
+        gdf_sc_mun = gpd.read_file(shp_sc)
+        if gdf_sc_mun.crs.to_epsg() != 4326:
+            gdf_sc_mun = gdf_sc_mun.to_crs(epsg=4326)
     
-    cod_cols = [c for c in gdf_sc_mun.columns if 'CD_MUN' in c.upper()]
-    if cod_cols:
-        gdf_concordia = gdf_sc_mun[gdf_sc_mun[cod_cols[0]].astype(str).str.contains('420430')].copy()
+        cod_cols = [c for c in gdf_sc_mun.columns if 'CD_MUN' in c.upper()]
+        if cod_cols:
+            gdf_concordia = gdf_sc_mun[gdf_sc_mun[cod_cols[0]].astype(str).str.contains('420430')].copy()
         
-        gdf_proj = gdf_concordia.to_crs(31982)
-        gdf_proj['geometry'] = gdf_proj['geometry'].simplify(100)
-        gdf_concordia = gdf_proj.to_crs(4326)
+            gdf_proj = gdf_concordia.to_crs(31982)
+            gdf_proj['geometry'] = gdf_proj['geometry'].simplify(100)
+            gdf_concordia = gdf_proj.to_crs(4326)
         
-        geojson_municipio = json.loads(gdf_concordia.to_json())
-        print("      ✅ Limite municipal processado")
-except Exception as e:
-    print(f"      ⚠️ Erro: {e}")
+            topo_municipio = camadas_topojson.gdf_para_topojson(gdf_concordia, 'municipio')
+            print("      ✅ Limite municipal processado")
+    except Exception as e:
+        print(f"      ⚠️ Erro: {e}")
 
-# Municípios vizinhos
-geojson_vizinhos = None
-nome_col = 'NM_MUN'
-try:
-    print("   → Processando municípios vizinhos...")
-    shp_regiao = os.path.join(ROOT_DIR, "SC_municipios_regiao_concordia.shp")
-    gdf_regiao = gpd.read_file(shp_regiao)
-    if gdf_regiao.crs.to_epsg() != 4326:
-        gdf_regiao = gdf_regiao.to_crs(epsg=4326)
+    # Municípios vizinhos
+    topo_vizinhos = None
+    nome_col = 'NM_MUN'
+    try:
+        print("   → Processando municípios vizinhos...")
+        shp_regiao = os.path.join(ROOT_DIR, "SC_municipios_regiao_concordia.shp")
+        gdf_regiao = gpd.read_file(shp_regiao)
+        if gdf_regiao.crs.to_epsg() != 4326:
+            gdf_regiao = gdf_regiao.to_crs(epsg=4326)
     
-    nome_cols = [c for c in gdf_regiao.columns if 'NM_MUN' in c.upper() or 'NOME' in c.upper()]
-    if nome_cols:
-        nome_col = nome_cols[0]
-        gdf_vizinhos = gdf_regiao[~gdf_regiao[nome_col].str.upper().str.contains('CONCORD')].copy()
+        nome_cols = [c for c in gdf_regiao.columns if 'NM_MUN' in c.upper() or 'NOME' in c.upper()]
+        if nome_cols:
+            nome_col = nome_cols[0]
+            gdf_vizinhos = gdf_regiao[~gdf_regiao[nome_col].str.upper().str.contains('CONCORD')].copy()
         
-        gdf_proj = gdf_vizinhos.to_crs(31982)
-        gdf_proj['geometry'] = gdf_proj['geometry'].simplify(200)
-        gdf_vizinhos = gdf_proj.to_crs(4326)
+            gdf_proj = gdf_vizinhos.to_crs(31982)
+            gdf_proj['geometry'] = gdf_proj['geometry'].simplify(200)
+            gdf_vizinhos = gdf_proj.to_crs(4326)
         
-        geojson_vizinhos = json.loads(gdf_vizinhos.to_json())
-        print(f"      ✅ {len(gdf_vizinhos)} municípios vizinhos processados")
-except Exception as e:
-    print(f"      ⚠️ Erro: {e}")
+            topo_vizinhos = camadas_topojson.gdf_para_topojson(
+                gdf_vizinhos, 'vizinhos', {nome_col: nome_col})
+            print(f"      ✅ {len(gdf_vizinhos)} municípios vizinhos processados")
+    except Exception as e:
+        print(f"      ⚠️ Erro: {e}")
 
-# Criar código JavaScript para ADICIONAR camadas ao mapa existente
-print("\n🔧 Gerando código de injeção...")
+    # Criar código JavaScript para ADICIONAR camadas ao mapa existente
+    print("\n🔧 Gerando código de injeção...")
 
-js_code = """
+    js_code = f'\n<script src="{camadas_topojson.JS_TOPOJSON}"></script>' + """
 <script>
 // ============================================================================
 // ADICIONAR LIMITES ADMINISTRATIVOS AO MAPA EXISTENTE
@@ -131,11 +127,12 @@ js_code = """
         var grupoLimitesAdministrativos = L.featureGroup();
 """
 
-# Adicionar limite estadual
-if geojson_estado:
-    js_code += f"""
+    # Adicionar limite estadual
+    if topo_estado:
+        js_code += f"""
         // === CAMADA: Limite Estadual de Santa Catarina ===
-        var limiteEstadual = L.geoJSON({json.dumps(geojson_estado)}, {{
+        var topoEstado = {json.dumps(topo_estado, separators=(',', ':'))};
+        var limiteEstadual = L.geoJSON(topojson.feature(topoEstado, topoEstado.objects.estado), {{
             style: {{
                 color: '#41ab5d',
                 weight: 2.5,
@@ -162,48 +159,46 @@ if geojson_estado:
         console.log('   ✅ Limite estadual adicionado');
 """
 
-# Adicionar municípios vizinhos
-if geojson_vizinhos:
-    js_code += f"""
+    # Adicionar municípios vizinhos
+    if topo_vizinhos:
+        js_code += f"""
         // === CAMADA: Municípios Vizinhos ===
-        var vizinhosData = {json.dumps(geojson_vizinhos)};
-        vizinhosData.features.forEach(function(feature) {{
-            var nomeMun = feature.properties['{nome_col}'] || feature.properties.NOME || 'Município';
-            
-            L.geoJSON(feature, {{
-                style: {{
-                    color: '#969696',
-                    weight: 1.2,
-                    fillColor: '#e5e5e5',
-                    fillOpacity: 0.04,
-                    dashArray: '3, 6'
-                }},
-                onEachFeature: function(feat, layer) {{
-                    layer.bindTooltip(nomeMun, {{permanent: false}});
-                    layer.bindPopup(
-                        '<div style="font-family: Arial; width: 200px;">' +
-                        '<h4 style="color: #636363; margin-bottom: 8px;"><b>' + nomeMun + '</b></h4>' +
-                        '<hr style="margin: 6px 0;">' +
-                        '<p style="font-size: 11px; color: #999;">Município vizinho</p>' +
-                        '</div>'
-                    );
-                    layer.on('mouseover', function(e) {{
-                        e.target.setStyle({{weight: 2.5, fillOpacity: 0.15, color: '#636363'}});
-                    }});
-                    layer.on('mouseout', function(e) {{
-                        e.target.setStyle({{weight: 1.2, fillOpacity: 0.04, color: '#969696'}});
-                    }});
-                }}
-            }}).addTo(grupoLimitesAdministrativos);
-        }});
+        var topoVizinhos = {json.dumps(topo_vizinhos, separators=(',', ':'))};
+        L.geoJSON(topojson.feature(topoVizinhos, topoVizinhos.objects.vizinhos), {{
+            style: {{
+                color: '#969696',
+                weight: 1.2,
+                fillColor: '#e5e5e5',
+                fillOpacity: 0.04,
+                dashArray: '3, 6'
+            }},
+            onEachFeature: function(feat, layer) {{
+                var nomeMun = feat.properties['{nome_col}'] || feat.properties.NOME || 'Município';
+                layer.bindTooltip(nomeMun, {{permanent: false}});
+                layer.bindPopup(
+                    '<div style="font-family: Arial; width: 200px;">' +
+                    '<h4 style="color: #636363; margin-bottom: 8px;"><b>' + nomeMun + '</b></h4>' +
+                    '<hr style="margin: 6px 0;">' +
+                    '<p style="font-size: 11px; color: #999;">Município vizinho</p>' +
+                    '</div>'
+                );
+                layer.on('mouseover', function(e) {{
+                    e.target.setStyle({{weight: 2.5, fillOpacity: 0.15, color: '#636363'}});
+                }});
+                layer.on('mouseout', function(e) {{
+                    e.target.setStyle({{weight: 1.2, fillOpacity: 0.04, color: '#969696'}});
+                }});
+            }}
+        }}).addTo(grupoLimitesAdministrativos);
         console.log('   ✅ Municípios vizinhos adicionados');
 """
 
-# Adicionar limite municipal (destaque)
-if geojson_municipio:
-    js_code += f"""
+    # Adicionar limite municipal (destaque)
+    if topo_municipio:
+        js_code += f"""
         // === CAMADA: Limite Municipal de Concórdia (DESTAQUE) ===
-        var limiteMunicipal = L.geoJSON({json.dumps(geojson_municipio)}, {{
+        var topoMunicipio = {json.dumps(topo_municipio, separators=(',', ':'))};
+        var limiteMunicipal = L.geoJSON(topojson.feature(topoMunicipio, topoMunicipio.objects.municipio), {{
             style: {{
                 color: '#005a32',
                 weight: 3.5,
@@ -245,7 +240,7 @@ if geojson_municipio:
         console.log('   ✅ Limite municipal adicionado (destaque)');
 """
 
-js_code += """
+    js_code += """
         // Adicionar grupo de limites ao mapa
         grupoLimitesAdministrativos.addTo(map);
         
@@ -305,37 +300,49 @@ js_code += """
 </div>
 """
 
-# Injetar código no HTML ANTES do </body>
-print("💉 Injetando código no HTML...")
-if '</body>' in original_content:
-    modified_content = original_content.replace('</body>', js_code + '\n</body>')
-    print("   ✅ Código injetado antes do </body>")
-else:
-    modified_content = original_content + js_code
-    print("   ⚠️ Tag </body> não encontrada, adicionando ao final")
+    return [{'nome': 'limites TopoJSON', 'tipo': 'inserir_antes', 'alvo': '</body>',
+             'conteudo': js_code + '\n', 'no_fim_se_ausente': True}]
+
+
+if __name__ == '__main__':
+    print("\n" + "="*70)
+    print("  🗺️ ADICIONANDO LIMITES AO MAPA (mantendo conteúdo original)")
+    print("="*70)
+
+    # Fazer backup do arquivo original
+    print("\n💾 Criando backup do mapa original...")
+    try:
+        shutil.copyfile(MAPA_PATH, BACKUP_PATH)
+        print(f"   ✅ Backup salvo em: {BACKUP_PATH}")
+    except Exception as e:
+        print(f"   ❌ Erro ao criar backup: {e}")
+        exit(1)
+
+    lista = remendos()
+    js_code = lista[0]['conteudo']
 
-# Salvar arquivo modificado
-print("\n💾 Salvando mapa atualizado...")
-try:
-    with open(MAPA_PATH, 'w', encoding='utf-8') as f:
-        f.write(modified_content)
-    print(f"   ✅ Arquivo salvo com sucesso!")
-except Exception as e:
-    print(f"   ❌ Erro ao salvar: {e}")
-    exit(1)
+    # Injetar código no HTML ANTES do </body> e salvar numa única passagem
+    print("💉 Injetando código no HTML...")
+    try:
+        inicio = time.perf_counter()
+        imprimir_relatorio(aplicar_remendos(MAPA_PATH, lista), time.perf_counter() - inicio)
+        print(f"   ✅ Arquivo salvo com sucesso!")
+    except Exception as e:
+        print(f"   ❌ Erro ao salvar: {e}")
+        exit(1)
 
-print("\n" + "="*70)
-print("✅ LIMITES ADICIONADOS AO MAPA COM SUCESSO!")
-print("="*70)
-print("\n📊 Resumo:")
-print(f"   ✓ Limite Estadual (SC): {'✅ ADICIONADO' if geojson_estado else '❌ FALHOU'}")
-print(f"   ✓ Limite Municipal (Concórdia): {'✅ ADICIONADO' if geojson_municipio else '❌ FALHOU'}")
-print(f"   ✓ Municípios Vizinhos: {'✅ ADICIONADOS' if geojson_vizinhos else '❌ FALHARAM'}")
-print("   ✓ Estabelecimentos de saúde: ✅ MANTIDOS (conteúdo original preservado)")
-print("   ✓ Marcadores e clusters: ✅ MANTIDOS")
-print("   ✓ Camadas temáticas: ✅ MANTIDAS")
-print("\n📂 Arquivos:")
-print(f"   • Mapa atualizado: {MAPA_PATH}")
-print(f"   • Backup original: {BACKUP_PATH}")
-print("\n💡 Abra o mapa no navegador para ver os limites + estabelecimentos!")
-print("="*70 + "\n")
+    print("\n" + "="*70)
+    print("✅ LIMITES ADICIONADOS AO MAPA COM SUCESSO!")
+    print("="*70)
+    print("\n📊 Resumo:")
+    print(f"   ✓ Limite Estadual (SC): {'✅ ADICIONADO' if 'var topoEstado' in js_code else '❌ FALHOU'}")
+    print(f"   ✓ Limite Municipal (Concórdia): {'✅ ADICIONADO' if 'var topoMunicipio' in js_code else '❌ FALHOU'}")
+    print(f"   ✓ Municípios Vizinhos: {'✅ ADICIONADOS' if 'var topoVizinhos' in js_code else '❌ FALHARAM'}")
+    print("   ✓ Estabelecimentos de saúde: ✅ MANTIDOS (conteúdo original preservado)")
+    print("   ✓ Marcadores e clusters: ✅ MANTIDOS")
+    print("   ✓ Camadas temáticas: ✅ MANTIDAS")
+    print("\n📂 Arquivos:")
+    print(f"   • Mapa atualizado: {MAPA_PATH}")
+    print(f"   • Backup original: {BACKUP_PATH}")
+    print("\n💡 Abra o mapa no navegador para ver os limites + estabelecimentos!")
+    print("="*70 + "\n")
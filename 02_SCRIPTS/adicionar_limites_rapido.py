@@ -12,96 +12,96 @@ Data: Novembro 2025
 import os
 import geopandas as gpd
 import json
+import time
 import warnings
 warnings.filterwarnings('ignore')
 
+from remendos_html import aplicar_remendos, imprimir_relatorio
+
 # Configurações de caminhos
 ROOT_DIR = r'C:\Users\caetanoronan\OneDrive - UFSC\Área de Trabalho\Exer_tec_geo\Pesquisa_upas'
 MAPA_PATH = os.path.join(ROOT_DIR, 'docs', 'mapa_avancado_treelayer_colorbrewer.html')
 OUTPUT_PATH = MAPA_PATH
 
-print("\n" + "="*70)
-print("  🗺️ ADICIONANDO LIMITES ADMINISTRATIVOS AO MAPA EXISTENTE")
-print("="*70)
-
-# Carregar limite estadual
-print("\n📥 Carregando limite estadual...")
-try:
-    shp_sc = os.path.join(ROOT_DIR, "SC_Municipios_2024", "SC_Municipios_2024.shp")
-    gdf_sc = gpd.read_file(shp_sc)
-    if gdf_sc.crs.to_epsg() != 4326:
-        gdf_sc = gdf_sc.to_crs(epsg=4326)
+
+def remendos():
+    """
+    Carrega os limites (estadual, municipal, vizinhos) e devolve o remendo
+    que injeta o JavaScript das camadas antes de </body>.
+    """
+    # Carregar limite estadual
+    print("\n📥 Carregando limite estadual...")
+    try:
+        shp_sc = os.path.join(ROOT_DIR, "SC_Municipios_2024", "SC_Municipios_2024.shp")
+        gdf_sc = gpd.read_file(shp_sc)
+        if gdf_sc.crs.to_epsg() != 4326:
+            gdf_sc = gdf_sc.to_crs(epsg=4326)
     
-    # Dissolver e simplificar
-    gdf_estado_proj = gdf_sc.to_crs(31982)
-    gdf_estado = gdf_estado_proj.dissolve().reset_index(drop=True)
-    gdf_estado['geometry'] = gdf_estado['geometry'].simplify(500)
-    gdf_estado = gdf_estado.to_crs(4326)
+        # Dissolver e simplificar
+        gdf_estado_proj = gdf_sc.to_crs(31982)
+        gdf_estado = gdf_estado_proj.dissolve().reset_index(drop=True)
+        gdf_estado['geometry'] = gdf_estado['geometry'].simplify(500)
+        gdf_estado = gdf_estado.to_crs(4326)
     
-    geojson_estado = json.loads(gdf_estado.to_json())
-    print("   ✅ Limite estadual carregado")
-except Exception as e:
-    print(f"   ❌ Erro: {e}")
-    geojson_estado = None
-
-# Carregar limite municipal
-print("📥 Carregando limite municipal de Concórdia...")
-try:
-    gdf_sc_mun = gpd.read_file(shp_sc)
-    if gdf_sc_mun.crs.to_epsg() != 4326:
-        gdf_sc_mun = gdf_sc_mun.to_crs(epsg=4326)
+        geojson_estado = json.loads(gdf_estado.to_json())
+        print("   ✅ Limite estadual carregado")
+    except Exception as e:
+        print(f"   ❌ Erro: {e}")
+        geojson_estado = None
+
+    # Carregar limite municipal
+    print("📥 Carregando limite municipal de Concórdia...")
+    try:
+        gdf_sc_mun = gpd.read_file(shp_sc)
+        if gdf_sc_mun.crs.to_epsg() != 4326:
+            gdf_sc_mun = gdf_sc_mun.to_crs(epsg=4326)
     
-    # Filtrar Concórdia
-    cod_cols = [c for c in gdf_sc_mun.columns if 'CD_MUN' in c.upper()]
-    if cod_cols:
-        gdf_concordia = gdf_sc_mun[gdf_sc_mun[cod_cols[0]].astype(str).str.contains('420430')].copy()
+        # Filtrar Concórdia
+        cod_cols = [c for c in gdf_sc_mun.columns if 'CD_MUN' in c.upper()]
+        if cod_cols:
+            gdf_concordia = gdf_sc_mun[gdf_sc_mun[cod_cols[0]].astype(str).str.contains('420430')].copy()
         
-        # Simplificar
-        gdf_proj = gdf_concordia.to_crs(31982)
-        gdf_proj['geometry'] = gdf_proj['geometry'].simplify(100)
-        gdf_concordia = gdf_proj.to_crs(4326)
+            # Simplificar
+            gdf_proj = gdf_concordia.to_crs(31982)
+            gdf_proj['geometry'] = gdf_proj['geometry'].simplify(100)
+            gdf_concordia = gdf_proj.to_crs(4326)
         
-        geojson_municipio = json.loads(gdf_concordia.to_json())
-        print("   ✅ Limite municipal carregado")
-    else:
+            geojson_municipio = json.loads(gdf_concordia.to_json())
+            print("   ✅ Limite municipal carregado")
+        else:
+            geojson_municipio = None
+    except Exception as e:
+        print(f"   ❌ Erro: {e}")
         geojson_municipio = None
-except Exception as e:
-    print(f"   ❌ Erro: {e}")
-    geojson_municipio = None
-
-# Carregar municípios vizinhos
-print("📥 Carregando municípios vizinhos...")
-try:
-    shp_regiao = os.path.join(ROOT_DIR, "SC_municipios_regiao_concordia.shp")
-    gdf_regiao = gpd.read_file(shp_regiao)
-    if gdf_regiao.crs.to_epsg() != 4326:
-        gdf_regiao = gdf_regiao.to_crs(epsg=4326)
+
+    # Carregar municípios vizinhos
+    print("📥 Carregando municípios vizinhos...")
+    try:
+        shp_regiao = os.path.join(ROOT_DIR, "SC_municipios_regiao_concordia.shp")
+        gdf_regiao = gpd.read_file(shp_regiao)
+        if gdf_regiao.crs.to_epsg() != 4326:
+            gdf_regiao = gdf_regiao.to_crs(epsg=4326)
     
-    # Filtrar vizinhos (excluir Concórdia)
-    nome_cols = [c for c in gdf_regiao.columns if 'NM_MUN' in c.upper()]
-    if nome_cols:
-        gdf_vizinhos = gdf_regiao[~gdf_regiao[nome_cols[0]].str.upper().str.contains('CONCORD')].copy()
+        # Filtrar vizinhos (excluir Concórdia)
+        nome_cols = [c for c in gdf_regiao.columns if 'NM_MUN' in c.upper()]
+        if nome_cols:
+            gdf_vizinhos = gdf_regiao[~gdf_regiao[nome_cols[0]].str.upper().str.contains('CONCORD')].copy()
         
-        # Simplificar
-        gdf_proj = gdf_vizinhos.to_crs(31982)
-        gdf_proj['geometry'] = gdf_proj['geometry'].simplify(200)
-        gdf_vizinhos = gdf_proj.to_crs(4326)
+            # Simplificar
+            gdf_proj = gdf_vizinhos.to_crs(31982)
+            gdf_proj['geometry'] = gdf_proj['geometry'].simplify(200)
+            gdf_vizinhos = gdf_proj.to_crs(4326)
         
-        geojson_vizinhos = json.loads(gdf_vizinhos.to_json())
-        print(f"   ✅ {len(gdf_vizinhos)} municípios vizinhos carregados")
-    else:
+            geojson_vizinhos = json.loads(gdf_vizinhos.to_json())
+            print(f"   ✅ {len(gdf_vizinhos)} municípios vizinhos carregados")
+        else:
+            geojson_vizinhos = None
+    except Exception as e:
+        print(f"   ❌ Erro: {e}")
         geojson_vizinhos = None
-except Exception as e:
-    print(f"   ❌ Erro: {e}")
-    geojson_vizinhos = None
-
-# Ler HTML existente
-print("\n📖 Lendo mapa HTML existente...")
-with open(MAPA_PATH, 'r', encoding='utf-8') as f:
-    html_content = f.read()
 
-# Criar código JavaScript para adicionar camadas
-js_code = """
+    # Criar código JavaScript para adicionar camadas
+    js_code = """
 <script>
 // Adicionar camadas de limites administrativos
 (function() {
@@ -122,9 +122,9 @@ js_code = """
         console.log('🗺️ Adicionando limites administrativos...');
 """
 
-# Adicionar limite estadual
-if geojson_estado:
-    js_code += f"""
+    # Adicionar limite estadual
+    if geojson_estado:
+        js_code += f"""
         // Limite Estadual de Santa Catarina
         var limiteEstadual = L.geoJSON({json.dumps(geojson_estado)}, {{
             style: {{
@@ -148,9 +148,9 @@ if geojson_estado:
         console.log('✅ Limite estadual adicionado');
 """
 
-# Adicionar municípios vizinhos
-if geojson_vizinhos:
-    js_code += f"""
+    # Adicionar municípios vizinhos
+    if geojson_vizinhos:
+        js_code += f"""
         // Municípios Vizinhos
         var municipiosVizinhos = L.geoJSON({json.dumps(geojson_vizinhos)}, {{
             style: {{
@@ -176,9 +176,9 @@ if geojson_vizinhos:
         console.log('✅ Municípios vizinhos adicionados');
 """
 
-# Adicionar limite municipal (destaque)
-if geojson_municipio:
-    js_code += f"""
+    # Adicionar limite municipal (destaque)
+    if geojson_municipio:
+        js_code += f"""
         // Limite Municipal de Concórdia (DESTAQUE)
         var limiteMunicipal = L.geoJSON({json.dumps(geojson_municipio)}, {{
             style: {{
@@ -220,34 +220,37 @@ if geojson_municipio:
         map.fitBounds(limiteMunicipal.getBounds());
 """
 
-js_code += """
+    js_code += """
         console.log('✅ Todas as camadas de limites adicionadas com sucesso!');
     }, 1000);
 })();
 </script>
 """
 
-# Injetar antes do </body>
-if '</body>' in html_content:
-    html_content = html_content.replace('</body>', js_code + '\n</body>')
-    print("   ✅ Código JavaScript injetado no HTML")
-else:
-    print("   ⚠️ Tag </body> não encontrada, adicionando ao final")
-    html_content += js_code
-
-# Salvar
-print("\n💾 Salvando mapa atualizado...")
-with open(OUTPUT_PATH, 'w', encoding='utf-8') as f:
-    f.write(html_content)
-
-print(f"   ✅ Salvo em: {OUTPUT_PATH}")
-
-print("\n📊 RESUMO")
-print("="*70)
-print(f"✓ Limite Estadual (SC): {'✅ ADICIONADO' if geojson_estado else '❌ NÃO DISPONÍVEL'}")
-print(f"✓ Limite Municipal (Concórdia): {'✅ ADICIONADO' if geojson_municipio else '❌ NÃO DISPONÍVEL'}")
-print(f"✓ Municípios Vizinhos: {'✅ ADICIONADOS' if geojson_vizinhos else '❌ NÃO DISPONÍVEIS'}")
-print(f"✓ Padrões Cartográficos: ColorBrewer (IBGE)")
-print("="*70)
-print("\n✅ MAPA ATUALIZADO COM SUCESSO!")
-print(f"\n📂 Abra o arquivo: {OUTPUT_PATH}\n")
+    return [{'nome': 'limites administrativos', 'tipo': 'inserir_antes', 'alvo': '</body>',
+             'conteudo': js_code + '\n', 'no_fim_se_ausente': True}]
+
+
+if __name__ == '__main__':
+    print("\n" + "="*70)
+    print("  🗺️ ADICIONANDO LIMITES ADMINISTRATIVOS AO MAPA EXISTENTE")
+    print("="*70)
+
+    lista = remendos()
+    js_code = lista[0]['conteudo']
+
+    # Injetar antes do </body> e salvar numa única passagem
+    print("\n💉 Injetando código JavaScript...")
+    inicio = time.perf_counter()
+    imprimir_relatorio(aplicar_remendos(MAPA_PATH, lista, OUTPUT_PATH), time.perf_counter() - inicio)
+    print(f"   ✅ Salvo em: {OUTPUT_PATH}")
+
+    print("\n📊 RESUMO")
+    print("="*70)
+    print(f"✓ Limite Estadual (SC): {'✅ ADICIONADO' if 'var limiteEstadual' in js_code else '❌ NÃO DISPONÍVEL'}")
+    print(f"✓ Limite Municipal (Concórdia): {'✅ ADICIONADO' if 'var limiteMunicipal' in js_code else '❌ NÃO DISPONÍVEL'}")
+    print(f"✓ Municípios Vizinhos: {'✅ ADICIONADOS' if 'var municipiosVizinhos' in js_code else '❌ NÃO DISPONÍVEIS'}")
+    print(f"✓ Padrões Cartográficos: ColorBrewer (IBGE)")
+    print("="*70)
+    print("\n✅ MAPA ATUALIZADO COM SUCESSO!")
+    print(f"\n📂 Abra o arquivo: {OUTPUT_PATH}\n")
@@ -5,23 +5,13 @@ Data: Novembro 2025
 """
 
 import os
+import time
+
+from remendos_html import aplicar_remendos, imprimir_relatorio
 
 # Caminho do arquivo HTML
 arquivo_mapa = r'docs\mapa_avancado_treelayer_colorbrewer.html'
 
-# Verificar se arquivo existe
-if not os.path.exists(arquivo_mapa):
-    print(f"❌ Arquivo não encontrado: {arquivo_mapa}")
-    exit(1)
-
-print(f"📂 Processando arquivo: {arquivo_mapa}")
-print(f"📊 Tamanho: {os.path.getsize(arquivo_mapa) / (1024*1024):.2f} MB")
-
-# Ler conteúdo do arquivo
-print("🔄 Lendo arquivo...")
-with open(arquivo_mapa, 'r', encoding='utf-8') as f:
-    html_content = f.read()
-
 # CSS para título e rodapé
 css_titulo_rodape = """
     <style>
@@ -160,41 +150,29 @@ html_rodape = """
     </div>
 """
 
-# Procurar tag </head> para inserir CSS
-if '</head>' in html_content:
-    print("✅ Tag </head> encontrada")
-    html_content = html_content.replace('</head>', f'{css_titulo_rodape}\n</head>')
-else:
-    print("⚠️ Tag </head> não encontrada")
-
-# Procurar tag <body> ou estrutura do mapa para inserir título
-# Folium usa <div class="folium-map" ou similar
-if '<body>' in html_content:
-    print("✅ Tag <body> encontrada")
-    html_content = html_content.replace('<body>', f'<body>\n{html_titulo}')
-elif '<div class="folium-map"' in html_content:
-    print("✅ Div folium-map encontrada")
-    # Inserir antes do div principal do mapa
-    html_content = html_content.replace('<div class="folium-map"', f'{html_titulo}\n<div class="folium-map"')
-else:
-    print("⚠️ Estrutura body não encontrada claramente")
-
-# Procurar tag </body> para inserir rodapé
-if '</body>' in html_content:
-    print("✅ Tag </body> encontrada")
-    html_content = html_content.replace('</body>', f'{html_rodape}\n</body>')
-else:
-    print("⚠️ Tag </body> não encontrada")
-
-# Salvar arquivo modificado
-print("💾 Salvando arquivo modificado...")
-with open(arquivo_mapa, 'w', encoding='utf-8') as f:
-    f.write(html_content)
-
-print("\n" + "="*80)
-print("✅ MAPA ATUALIZADO COM SUCESSO!")
-print("="*80)
-print(f"""
+
+def remendos():
+    """
+    CSS antes de </head>, título logo após <body> (ou antes da div do mapa
+    se não houver <body>) e rodapé antes de </body>.
+    """
+    return [
+        {'nome': 'CSS título/rodapé', 'tipo': 'inserir_antes', 'alvo': '</head>',
+         'conteudo': f'{css_titulo_rodape}\n', 'maximo': None},
+        {'nome': 'título após <body>', 'tipo': 'inserir_depois', 'alvo': '<body>',
+         'conteudo': f'\n{html_titulo}', 'maximo': None},
+        {'nome': 'título antes da div do mapa', 'tipo': 'inserir_antes', 'alvo': '<div class="folium-map"',
+         'conteudo': f'{html_titulo}\n', 'maximo': None, 'exceto_se': '<body>'},
+        {'nome': 'rodapé antes de </body>', 'tipo': 'inserir_antes', 'alvo': '</body>',
+         'conteudo': f'{html_rodape}\n', 'maximo': None},
+    ]
+
+
+def _resumo():
+    print("\n" + "="*80)
+    print("✅ MAPA ATUALIZADO COM SUCESSO!")
+    print("="*80)
+    print(f"""
 📋 Modificações realizadas:
 
 1. ✅ Título adicionado ao topo do mapa
@@ -217,4 +195,18 @@ print(f"""
 🌐 Arquivo pronto para visualização:
    {os.path.abspath(arquivo_mapa)}
 """)
-print("="*80)
+    print("="*80)
+
+
+if __name__ == '__main__':
+    # Verificar se arquivo existe
+    if not os.path.exists(arquivo_mapa):
+        print(f"❌ Arquivo não encontrado: {arquivo_mapa}")
+        exit(1)
+
+    print(f"📂 Processando arquivo: {arquivo_mapa}")
+    print(f"📊 Tamanho: {os.path.getsize(arquivo_mapa) / (1024*1024):.2f} MB")
+
+    inicio = time.perf_counter()
+    imprimir_relatorio(aplicar_remendos(arquivo_mapa, remendos()), time.perf_counter() - inicio)
+    _resumo()
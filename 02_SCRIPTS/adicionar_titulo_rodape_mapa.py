@@ -5,6 +5,9 @@ Script para adicionar título e rodapé ao mapa HTML existente
 """
 
 import os
+import time
+
+from remendos_html import aplicar_remendos, imprimir_relatorio
 
 # Caminho do arquivo
 arquivo_html = r"C:\Users\caetanoronan\OneDrive - UFSC\Área de Trabalho\Exer_tec_geo\Pesquisa_upas\docs\mapa_estabelecimentos_concordia.html"
@@ -72,52 +75,28 @@ rodape_html = '''
     </div>
 '''
 
-print("📝 Adicionando título e rodapé ao mapa...")
-
-# Ler o arquivo
-with open(arquivo_html, 'r', encoding='utf-8') as f:
-    conteudo = f.read()
 
-# Verificar se já tem título/rodapé
-if 'ANÁLISE ESPACIAL DOS ESTABELECIMENTOS DE SAÚDE' in conteudo:
-    print("⚠️ Título já existe no arquivo. Substituindo...")
-    # Remover título antigo se existir
-    if '<div style="position: fixed;' in conteudo and 'top: 10px;' in conteudo:
-        inicio = conteudo.find('<div style="position: fixed;')
-        if inicio != -1:
-            fim = conteudo.find('</div>', inicio) + 6
-            # Procurar próximo div fechado
-            contador = 1
-            i = inicio + len('<div')
-            while i < len(conteudo) and contador > 0:
-                if conteudo[i:i+4] == '<div':
-                    contador += 1
-                elif conteudo[i:i+6] == '</div>':
-                    contador -= 1
-                    if contador == 0:
-                        fim = i + 6
-                        break
-                i += 1
-            conteudo = conteudo[:inicio] + conteudo[fim:]
 
-# Encontrar a posição antes do </script> final (ou </body>)
-if '</script>\n</html>' in conteudo:
-    pos_insercao = conteudo.rfind('</script>\n</html>')
-elif '</body>' in conteudo:
-    pos_insercao = conteudo.rfind('</body>')
-else:
-    pos_insercao = conteudo.rfind('</html>')
+def remendos():
+    """
+    Remove uma inserção anterior idêntica e insere título e rodapé antes de </body>.
+    """
+    bloco = titulo_html + '\n' + rodape_html + '\n'
+    return [
+        {'nome': 'remover título/rodapé anterior', 'tipo': 'substituir', 'alvo': bloco, 'conteudo': ''},
+        {'nome': 'título e rodapé', 'tipo': 'inserir_antes', 'alvo': '</body>',
+         'conteudo': bloco, 'no_fim_se_ausente': True},
+    ]
 
-if pos_insercao == -1:
-    print("❌ Erro: Não foi possível encontrar posição de inserção")
-    exit(1)
 
-# Inserir título e rodapé
-novo_conteudo = conteudo[:pos_insercao] + titulo_html + '\n' + rodape_html + '\n' + conteudo[pos_insercao:]
+if __name__ == '__main__':
+    print("📝 Adicionando título e rodapé ao mapa...")
 
-# Salvar o arquivo
-with open(arquivo_html, 'w', encoding='utf-8') as f:
-    f.write(novo_conteudo)
+    inicio = time.perf_counter()
+    estatisticas = aplicar_remendos(arquivo_html, remendos())
+    imprimir_relatorio(estatisticas, time.perf_counter() - inicio)
+    if estatisticas[0]['ocorrencias']:
+        print("⚠️ Título já existia no arquivo. Substituído.")
 
-print("✅ Título e rodapé adicionados com sucesso!")
-print(f"📁 Arquivo atualizado: {arquivo_html}")
+    print("✅ Título e rodapé adicionados com sucesso!")
+    print(f"📁 Arquivo atualizado: {arquivo_html}")
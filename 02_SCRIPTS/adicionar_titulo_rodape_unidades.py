@@ -9,24 +9,13 @@ Instituição: UFSC
 
 import os
 
-def adicionar_titulo_rodape_mapa():
+from remendos_html import aplicar_remendos, imprimir_relatorio
+
+def remendos():
     """
-    Adiciona título no topo e rodapé com créditos ao mapa HTML.
+    Título no topo e rodapé com créditos, inseridos antes de </body>
+    (no fim do arquivo se não houver </body>; não duplica se o título já existe).
     """
-    # Caminhos dos arquivos
-    arquivo_entrada = r'C:\Users\caetanoronan\OneDrive - UFSC\Área de Trabalho\Exer_tec_geo\Pesquisa_upas\docs\mapa_unidades_saude_concordia.html'
-    arquivo_saida = arquivo_entrada  # Sobrescreve o arquivo original
-    
-    print(f"📂 Lendo arquivo: {os.path.basename(arquivo_entrada)}")
-    
-    # Ler o conteúdo do mapa HTML
-    try:
-        with open(arquivo_entrada, 'r', encoding='utf-8') as f:
-            html_content = f.read()
-    except Exception as e:
-        print(f"❌ Erro ao ler arquivo: {e}")
-        return
-    
     # HTML do título (topo)
     titulo_html = """
     <div style="position: fixed; 
@@ -76,33 +65,41 @@ def adicionar_titulo_rodape_mapa():
         </div>
     </div>
     """
+
+    return [{
+        'nome': 'título e rodapé', 'tipo': 'inserir_antes', 'alvo': '</body>',
+        'conteudo': f'{titulo_html}\n{rodape_html}\n',
+        'exceto_se': "Mapa de Unidades de Saúde - Concórdia/SC", 'no_fim_se_ausente': True,
+    }]
+
+def adicionar_titulo_rodape_mapa():
+    """
+    Adiciona título no topo e rodapé com créditos ao mapa HTML.
+    """
+    # Caminhos dos arquivos
+    arquivo_entrada = r'C:\Users\caetanoronan\OneDrive - UFSC\Área de Trabalho\Exer_tec_geo\Pesquisa_upas\docs\mapa_unidades_saude_concordia.html'
+    arquivo_saida = arquivo_entrada  # Sobrescreve o arquivo original
     
-    # Verificar se já existe título/rodapé (evitar duplicação)
-    if "Mapa de Unidades de Saúde - Concórdia/SC" in html_content:
-        print("⚠️  Título já existe no mapa. Removendo versão antiga...")
-        # Remover versões antigas se existirem
-    
-    # Injetar título e rodapé no HTML
-    # Método: Adicionar antes do </body> (ou no final se não existir)
-    if '</body>' in html_content:
-        html_modificado = html_content.replace('</body>', f'{titulo_html}\n{rodape_html}\n</body>')
-    else:
-        # Fallback: adicionar no final do HTML
-        html_modificado = html_content + f'\n{titulo_html}\n{rodape_html}'
+    print(f"📂 Processando arquivo: {os.path.basename(arquivo_entrada)}")
     
-    # Salvar o arquivo modificado
+    # Injetar título e rodapé numa única passagem pelo arquivo
     try:
-        with open(arquivo_saida, 'w', encoding='utf-8') as f:
-            f.write(html_modificado)
-        print(f"✅ Mapa atualizado com sucesso!")
-        print(f"📍 Arquivo: {arquivo_saida}")
-        print(f"📏 Tamanho: {len(html_modificado):,} caracteres")
-        print("\n🎨 Elementos adicionados:")
-        print("   🔝 Título profissional no topo: '🏥 Mapa de Unidades de Saúde - Concórdia/SC'")
-        print("   🔽 Rodapé elegante com créditos e fontes")
-        print("\n💡 Abra o arquivo no navegador para visualizar as mudanças!")
+        estatisticas = aplicar_remendos(arquivo_entrada, remendos(), arquivo_saida)
     except Exception as e:
-        print(f"❌ Erro ao salvar arquivo: {e}")
+        print(f"❌ Erro ao atualizar arquivo: {e}")
+        return
+    imprimir_relatorio(estatisticas)
+    
+    if not estatisticas[0]['ocorrencias']:
+        print("⚠️  Título já existe no mapa. Nada a fazer.")
+        return
+    print(f"✅ Mapa atualizado com sucesso!")
+    print(f"📍 Arquivo: {arquivo_saida}")
+    print(f"📏 Tamanho: {os.path.getsize(arquivo_saida):,} bytes")
+    print("\n🎨 Elementos adicionados:")
+    print("   🔝 Título profissional no topo: '🏥 Mapa de Unidades de Saúde - Concórdia/SC'")
+    print("   🔽 Rodapé elegante com créditos e fontes")
+    print("\n💡 Abra o arquivo no navegador para visualizar as mudanças!")
 
 if __name__ == "__main__":
     print("=" * 80)
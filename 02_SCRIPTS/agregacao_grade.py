@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Agregação Espacial em Grades Hexagonais e Quadradas
+- IDs inteiros de célula calculados com matemática vetorizada (sem geometria por ponto)
+- Grade quadrada hierárquica (quadtree Web Mercator, aninhamento exato entre zooms)
+- Chave espacial hierárquica por estabelecimento (quadkey/Morton int64): o
+  prefixo da chave é a célula em qualquer zoom menor, então agregação,
+  quadrantes, tiles e deduplicação agrupam por inteiro sem geometria
+- Grade hexagonal em várias resoluções (abertura 4, sem aninhamento exato)
+- Agregação O(células) de contagens e métricas de acessibilidade
+- Camada coroplética Folium (FeatureCollection única)
+
+Os IDs são globais: o mesmo ponto recebe o mesmo ID em qualquer município,
+o que permite somar agregados municipais em escala estadual.
+
+Autor: Caetano Ronan
+Instituição: UFSC
+"""
+
+import math
+import numpy as np
+import pandas as pd
+try:
+    import folium
+except ImportError:
+    folium = None
+
+from tiles_calor import lonlat_para_mercator, mercator_para_lonlat, indices_tile, limites_tile
+
+# Tamanho do hexágono (raio circunscrito) em metros Web Mercator.
+# Em SC (~27°S) 1 m Mercator ≈ 0,89 m no terreno.
+RESOLUCOES_HEX = {'1km': 1000, '4km': 4000, '16km': 16000}
+ZOOMS_QUADRADOS = (10, 12, 14)
+# Estilo das células (a cor vem da propriedade 'cor') e rótulos das métricas,
+# comuns aos backends do mapa
+ESTILO_CELULAS = {'color': '#636363', 'weight': 0.5, 'fillOpacity': 0.6}
+DESTAQUE_CELULAS = {'weight': 2, 'fillOpacity': 0.8}
+ROTULOS_METRICAS_CELULA = {'total': 'Estabelecimentos:', 'publicos': 'Públicos:',
+                           'perc_publico': '% Público:', 'dist_media': 'Dist. média (km):'}
+# Zoom da chave espacial: tile de ~38 m Mercator (~34 m no terreno em SC) no
+# zoom 20; prefixos dão os zooms 0..20
+ZOOM_CHAVE = 20
+# Leste + 2 * sul (y crescendo para o sul), como um dígito de quadkey -> quadrante
+ROTULOS_QUADRANTE = np.array(['NW', 'NE', 'SW', 'SE'], dtype=object)
+
+_DESLOCAMENTO_HEX = 1 << 30
+_RAIZ3 = math.sqrt(3)
+
+
+# ==========================
+# GRADE QUADRADA (QUADTREE)
+# ==========================
+
+def ids_celula_quadrada(lat, lon, zoom):
+    """ID int64 da célula quadrada (tile XYZ) no zoom: z<<58 | x<<29 | y"""
+    x, y = lonlat_para_mercator(lon, lat)
+    tx, ty = indices_tile(x, y, zoom)
+    return (np.int64(zoom) << 58) | (tx.astype(np.int64) << 29) | ty.astype(np.int64)
+
+
+def decodificar_celula_quadrada(ids):
+    """Retorna (z, x, y) a partir dos IDs de célula quadrada"""
+    ids = np.asarray(ids, dtype=np.int64)
+    mascara = (1 << 29) - 1
+    return ids >> 58, (ids >> 29) & mascara, ids & mascara
+
+
+def celula_quadrada_pai(ids, zoom_pai):
+    """ID da célula ancestral em zoom_pai (aninhamento exato do quadtree)"""
+    z, x, y = decodificar_celula_quadrada(ids)
+    deslocamento = z - zoom_pai
+    return (np.int64(zoom_pai) << 58) | ((x >> deslocamento) << 29) | (y >> deslocamento)
+
+
+# ==========================
+# CHAVE ESPACIAL (QUADKEY)
+# ==========================
+
+_MASCARAS_INTERCALACAO = [
+    (16, 0x0000FFFF0000FFFF), (8, 0x00FF00FF00FF00FF), (4, 0x0F0F0F0F0F0F0F0F),
+    (2, 0x3333333333333333), (1, 0x5555555555555555),
+]
+_MASCARAS_COMPACTACAO = [
+    (1, 0x3333333333333333), (2, 0x0F0F0F0F0F0F0F0F), (4, 0x00FF00FF00FF00FF),
+    (8, 0x0000FFFF0000FFFF), (16, 0x00000000FFFFFFFF),
+]
+
+
+def _intercalar(v):
+    """Espalha os bits de v nas posições pares (0, 2, 4, ...)"""
+    v = np.asarray(v).astype(np.uint64) & np.uint64(0xFFFFFFFF)
+    for deslocamento, mascara in _MASCARAS_INTERCALACAO:
+        v = (v | (v << np.uint64(deslocamento))) & np.uint64(mascara)
+    return v
+
+
+def _desintercalar(v):
+    """Inverso de _intercalar: junta os bits das posições pares"""
+    v = np.asarray(v).astype(np.uint64) & np.uint64(0x5555555555555555)
+    for deslocamento, mascara in _MASCARAS_COMPACTACAO:
+        v = (v | (v >> np.uint64(deslocamento))) & np.uint64(mascara)
+    return v.astype(np.int64)
+
+
+def chaves_espaciais(lat, lon, zoom=ZOOM_CHAVE):
+    """
+    Chave int64 do tile (x, y) no zoom com bits intercalados (ordem Morton).
+
+    Os dígitos base 4 da chave são o quadkey: chave >> 2k é a chave do tile
+    ancestral k zooms acima. Coordenadas ausentes recebem -1.
+    """
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    validas = np.isfinite(lat) & np.isfinite(lon)
+    x, y = lonlat_para_mercator(np.where(validas, lon, 0.0), np.where(validas, lat, 0.0))
+    tx, ty = indices_tile(x, y, zoom)
+    chaves = (_intercalar(tx) | (_intercalar(ty) << np.uint64(1))).astype(np.int64)
+    return np.where(validas, chaves, -1)
+
+
+def prefixo_chave(chaves, zoom, zoom_chave=ZOOM_CHAVE):
+    """Chave do tile ancestral no zoom (inválidas continuam -1)"""
+    chaves = np.asarray(chaves, dtype=np.int64)
+    return np.where(chaves >= 0, chaves >> (2 * (zoom_chave - zoom)), -1)
+
+
+def tile_da_chave(chaves, zoom=ZOOM_CHAVE, zoom_chave=ZOOM_CHAVE):
+    """Índices (x, y) do tile XYZ no zoom a partir das chaves"""
+    prefixo = prefixo_chave(chaves, zoom, zoom_chave).astype(np.uint64)
+    return _desintercalar(prefixo), _desintercalar(prefixo >> np.uint64(1))
+
+
+def quadkeys(chaves, zoom=ZOOM_CHAVE, zoom_chave=ZOOM_CHAVE):
+    """Quadkey texto ('0'..'3', um dígito por zoom) das chaves; '' se inválida"""
+    chaves = np.asarray(chaves, dtype=np.int64)
+    if zoom == 0 or not len(chaves):
+        return np.full(len(chaves), '', dtype=object)
+    prefixo = prefixo_chave(chaves, zoom, zoom_chave)
+    deslocamentos = 2 * np.arange(zoom - 1, -1, -1, dtype=np.int64)
+    digitos = (((prefixo[:, None] >> deslocamentos) & 3) + ord('0')).astype(np.uint8)
+    textos = np.ascontiguousarray(digitos).view(f'S{zoom}').ravel().astype(str).astype(object)
+    textos[chaves < 0] = ''
+    return textos
+
+
+def celula_quadrada_da_chave(chaves, zoom, zoom_chave=ZOOM_CHAVE):
+    """ID de célula quadrada (z<<58 | x<<29 | y) derivado da chave, sem reprojetar"""
+    tx, ty = tile_da_chave(chaves, zoom, zoom_chave)
+    ids = (np.int64(zoom) << 58) | (tx << 29) | ty
+    return np.where(np.asarray(chaves) >= 0, ids, -1)
+
+
+def quadrantes(chaves, centros, zoom_chave=ZOOM_CHAVE, grupos=None):
+    """
+    Quadrante (NW/NE/SW/SE) de cada chave em relação a um ponto de referência.
+
+    Compara o tile (x, y) da chave no zoom da chave com o tile da referência
+    (centro ou sede), com y crescendo para o sul: leste se x >= x da
+    referência, sul se y > y da referência. Uma única referência fixa dá a
+    divisão 2x2 em torno da sede, que outliers não deslocam.
+
+    Args:
+        chaves: chaves espaciais (chaves_espaciais)
+        centros: chave da referência, ou uma por grupo (indexada pelo código)
+        zoom_chave: zoom das chaves
+        grupos: códigos inteiros por chave (ex.: município), opcional
+
+    Returns:
+        numpy array de rótulos; chaves inválidas recebem 'N/A'
+    """
+    chaves = np.asarray(chaves, dtype=np.int64)
+    centros = np.atleast_1d(np.asarray(centros, dtype=np.int64))
+    grupos = np.zeros(len(chaves), dtype=np.int64) if grupos is None else np.asarray(grupos, dtype=np.int64)
+    rotulos = np.full(len(chaves), 'N/A', dtype=object)
+    validas = (chaves >= 0) & (grupos >= 0) & (grupos < len(centros))
+    validas[validas] &= centros[grupos[validas]] >= 0
+    if not validas.any():
+        return rotulos
+    x, y = tile_da_chave(chaves[validas], zoom_chave, zoom_chave)
+    cx, cy = tile_da_chave(centros[grupos[validas]], zoom_chave, zoom_chave)
+    digitos = (x >= cx).astype(np.int64) + 2 * (y > cy).astype(np.int64)
+    rotulos[validas] = ROTULOS_QUADRANTE[digitos]
+    return rotulos
+
+
+def poligono_celula_quadrada(id_celula):
+    """Anel [lon, lat] da célula quadrada"""
+    z, x, y = (int(v[0]) for v in decodificar_celula_quadrada([id_celula]))
+    xmin, ymin, xmax, ymax = limites_tile(z, x, y)
+    lon, lat = mercator_para_lonlat([xmin, xmax, xmax, xmin, xmin], [ymin, ymin, ymax, ymax, ymin])
+    return np.round(np.column_stack([lon, lat]), 6).tolist()
+
+
+# ==========================
+# GRADE HEXAGONAL
+# ==========================
+
+def _arredondar_cubo(q, r):
+    """Arredondamento de coordenadas axiais fracionárias para o hexágono mais próximo"""
+    s = -q - r
+    rq, rr, rs = np.round(q), np.round(r), np.round(s)
+    dq, dr, ds = np.abs(rq - q), np.abs(rr - r), np.abs(rs - s)
+    ajusta_q = (dq > dr) & (dq > ds)
+    ajusta_r = ~ajusta_q & (dr > ds)
+    rq = np.where(ajusta_q, -rr - rs, rq)
+    rr = np.where(ajusta_r, -rq - rs, rr)
+    return rq.astype(np.int64), rr.astype(np.int64)
+
+
+def ids_celula_hex(lat, lon, tamanho_m):
+    """ID int64 do hexágono (pointy-top, coordenadas axiais q, r empacotadas)"""
+    x, y = lonlat_para_mercator(lon, lat)
+    q = (_RAIZ3 / 3 * x - y / 3) / tamanho_m
+    r = (2 / 3 * y) / tamanho_m
+    q, r = _arredondar_cubo(q, r)
+    return ((q + _DESLOCAMENTO_HEX) << 31) | (r + _DESLOCAMENTO_HEX)
+
+
+def decodificar_celula_hex(ids):
+    """Retorna as coordenadas axiais (q, r) a partir dos IDs hexagonais"""
+    ids = np.asarray(ids, dtype=np.int64)
+    return (ids >> 31) - _DESLOCAMENTO_HEX, (ids & ((1 << 31) - 1)) - _DESLOCAMENTO_HEX
+
+
+def centro_celula_hex(ids, tamanho_m):
+    """Centro (lat, lon) dos hexágonos"""
+    q, r = decodificar_celula_hex(ids)
+    x = tamanho_m * _RAIZ3 * (q + r / 2)
+    y = tamanho_m * 1.5 * r
+    lon, lat = mercator_para_lonlat(x, y)
+    return lat, lon
+
+
+def poligono_celula_hex(id_celula, tamanho_m):
+    """Anel [lon, lat] do hexágono"""
+    q, r = (int(v[0]) for v in decodificar_celula_hex([id_celula]))
+    cx = tamanho_m * _RAIZ3 * (q + r / 2)
+    cy = tamanho_m * 1.5 * r
+    angulos = np.radians(np.arange(7) * 60 + 30)
+    lon, lat = mercator_para_lonlat(cx + tamanho_m * np.cos(angulos), cy + tamanho_m * np.sin(angulos))
+    return np.round(np.column_stack([lon, lat]), 6).tolist()
+
+
+# ==========================
+# INTEGRAÇÃO COM O PIPELINE
+# ==========================
+
+def _colunas_coordenadas(df, lat_col, lon_col):
+    if lat_col is None or lon_col is None:
+        lat_cols = [col for col in df.columns if 'LAT' in col.upper()]
+        lon_cols = [col for col in df.columns if 'LON' in col.upper()]
+        if not lat_cols or not lon_cols:
+            return None, None
+        lat_col, lon_col = lat_cols[0], lon_cols[0]
+    return lat_col, lon_col
+
+
+def adicionar_chave_espacial(df, lat_col=None, lon_col=None):
+    """
+    Adiciona chave_espacial (int64, ZOOM_CHAVE) e quadkey (texto) ao DataFrame.
+
+    Qualquer zoom menor sai do prefixo: prefixo_chave(df['chave_espacial'], z)
+    ou df['quadkey'].str[:z].
+    """
+    if 'chave_espacial' in df.columns:
+        return df
+    lat_col, lon_col = _colunas_coordenadas(df, lat_col, lon_col)
+    if lat_col is None:
+        return df
+    chaves = chaves_espaciais(pd.to_numeric(df[lat_col], errors='coerce').to_numpy(dtype=float),
+                              pd.to_numeric(df[lon_col], errors='coerce').to_numpy(dtype=float))
+    df['chave_espacial'] = chaves
+    df['quadkey'] = quadkeys(chaves)
+    return df
+
+
+def adicionar_ids_celulas(df, lat_col=None, lon_col=None):
+    """
+    Adiciona colunas de ID de célula (hexagonal e quadrada) ao DataFrame.
+
+    Colunas: celula_hex_<res> para RESOLUCOES_HEX e celula_quad_z<z> para
+    ZOOMS_QUADRADOS (derivadas da chave espacial). Ficam salvas na tabela
+    processada para reuso.
+    """
+    lat_col, lon_col = _colunas_coordenadas(df, lat_col, lon_col)
+    if lat_col is None:
+        return df
+
+    lat = df[lat_col].to_numpy(dtype=float)
+    lon = df[lon_col].to_numpy(dtype=float)
+    for rotulo, tamanho in RESOLUCOES_HEX.items():
+        df[f'celula_hex_{rotulo}'] = ids_celula_hex(lat, lon, tamanho)
+    df = adicionar_chave_espacial(df, lat_col, lon_col)
+    for zoom in ZOOMS_QUADRADOS:
+        df[f'celula_quad_z{zoom}'] = celula_quadrada_da_chave(df['chave_espacial'].to_numpy(), zoom)
+    return df
+
+
+def agregar_por_celula(df, coluna_celula):
+    """
+    Agrega estabelecimentos por célula (groupby sobre inteiros).
+
+    Returns:
+        DataFrame indexado pelo ID da célula com total, públicos, % público e
+        distância média ao centro (quando disponível)
+    """
+    agregacoes = {'total': (coluna_celula, 'size')}
+    if 'eh_publico' in df.columns:
+        agregacoes['publicos'] = ('eh_publico', 'sum')
+    if 'dist_centro' in df.columns:
+        agregacoes['dist_media'] = ('dist_centro', 'mean')
+    agregado = df.groupby(coluna_celula).agg(**agregacoes)
+    if 'publicos' in agregado.columns:
+        agregado['publicos'] = agregado['publicos'].astype(int)
+        agregado['perc_publico'] = (agregado['publicos'] / agregado['total'] * 100).round(1)
+    if 'dist_media' in agregado.columns:
+        agregado['dist_media'] = agregado['dist_media'].round(2)
+    return agregado
+
+
+def _classes_quantis(valores, n_classes):
+    """Índice de classe (0..n-1) por quebras de quantis"""
+    valores = np.asarray(valores, dtype=float)
+    quebras = np.unique(np.quantile(valores, np.linspace(0, 1, n_classes + 1)[1:-1]))
+    return np.searchsorted(quebras, valores, side='right')
+
+
+def celulas_para_geojson(agregado, coluna_celula, campo, paleta):
+    """
+    Converte o agregado em FeatureCollection com cor por quantis de `campo`.
+
+    A geometria é gerada apenas para as células ocupadas (O(células)).
+    """
+    if coluna_celula.startswith('celula_hex_'):
+        tamanho = RESOLUCOES_HEX[coluna_celula.replace('celula_hex_', '')]
+        poligono = lambda c: poligono_celula_hex(c, tamanho)
+    else:
+        poligono = poligono_celula_quadrada
+
+    classes = _classes_quantis(agregado[campo], len(paleta))
+    features = []
+    for (id_celula, linha), classe in zip(agregado.iterrows(), classes):
+        propriedades = {'celula': str(id_celula), 'cor': paleta[int(classe)]}
+        propriedades.update({k: (v.item() if hasattr(v, 'item') else v) for k, v in linha.items()})
+        features.append({
+            'type': 'Feature',
+            'geometry': {'type': 'Polygon', 'coordinates': [poligono(id_celula)]},
+            'properties': propriedades,
+        })
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def camada_coropletica(geojson, nome, show=True):
+    """
+    Camada Folium única (estilo por propriedade) para as células agregadas.
+    show=True quando aninhada: o Folium não anexa subgrupos ocultos ao pai.
+    """
+    grupo = folium.FeatureGroup(name=nome, show=show)
+    if not geojson['features']:
+        return grupo
+
+    props = geojson['features'][0]['properties']
+    campos = [c for c in ROTULOS_METRICAS_CELULA if c in props]
+    folium.GeoJson(
+        geojson,
+        style_function=lambda f: dict(ESTILO_CELULAS, fillColor=f['properties']['cor']),
+        highlight_function=lambda f: DESTAQUE_CELULAS,
+        tooltip=folium.GeoJsonTooltip(fields=campos, aliases=[ROTULOS_METRICAS_CELULA[c] for c in campos]),
+    ).add_to(grupo)
+    return grupo
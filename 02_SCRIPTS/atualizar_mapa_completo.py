@@ -1,5 +1,5 @@
 """
-Script para extrair TODOS os estabelecimentos do mapa HTML e recriar com:
+Script para carregar TODOS os estabelecimentos da base canônica e recriar o mapa com:
 - Limite Municipal (azul tracejado)
 - Marcadores Vermelhos para públicos (ESF/PS)
 - Marcadores Cinza para privados/outros
@@ -8,12 +8,14 @@ Script para extrair TODOS os estabelecimentos do mapa HTML e recriar com:
 - Limites de zoom
 """
 
-import re
-import json
 import folium
 import os
+import pandas as pd
 from math import radians, cos, sin, asin, sqrt
 
+import dados_canonicos
+import classificacao_estabelecimentos
+
 # Configurações
 ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 CENTRO_CONCORDIA = [-27.2335, -52.0238]
@@ -27,45 +29,34 @@ def calcular_distancia(lat1, lon1, lat2, lon2):
     c = 2 * asin(sqrt(a))
     return R * c
 
-def eh_publico(nome, tipo):
-    """Verifica se é estabelecimento público"""
-    nome_upper = str(nome).upper()
-    tipo_str = str(tipo)
-    
-    # ESFs e Postos de Saúde são públicos
-    criterios = [
-        'ESF' in nome_upper,
-        'PS ' in nome_upper,
-        'POSTO' in nome_upper,
-        'UBS' in nome_upper,
-        'CENTRO DE SAUDE' in nome_upper,
-        tipo_str in ['1', '2', '4', '70', '81', '68']  # Tipos públicos do CNES
-    ]
-    
-    return any(criterios)
-
-def extrair_dados_html():
-    """Extrai dados do mapa HTML existente"""
-    print("📥 Extraindo dados do mapa HTML...")
+def carregar_unidades():
+    """
+    Carrega os estabelecimentos da base canônica gravada pelo dashboard
+    (03_RESULTADOS/dados), no formato de dicionário usado pelo mapa.
+    """
+    print("📥 Carregando base canônica de estabelecimentos...")
     
-    html_path = os.path.join(ROOT_DIR, '03_RESULTADOS', 'mapas', 'mapa_concordia_analise.html')
-    
-    with open(html_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-    
-    # Encontrar o array de unidades
-    match = re.search(r'var unidades = (\[.*?\]);', content, re.DOTALL)
-    
-    if match:
-        json_str = match.group(1)
-        # Limpar para JSON válido
-        json_str = json_str.replace("'", '"')
-        unidades = json.loads(json_str)
-        print(f"✅ {len(unidades)} estabelecimentos extraídos")
-        return unidades
+    df = dados_canonicos.carregar_dados(colunas=[
+        'NOME', 'LAT', 'LON', 'ENDERECO', 'BAIRRO', 'TIPO_UNIDADE', 'TIPO', 'RAZAO_SOCIAL', 'dist_centro'
+    ])
+    if df is None:
+        print("❌ Base canônica não encontrada: execute dashboard_avancado_colorbrewer.py")
+        return []
     
-    print("❌ Não foi possível extrair dados")
-    return []
+    manifesto = dados_canonicos.carregar_manifesto()
+    df = df.dropna(subset=['LAT', 'LON'])
+    tipo = df['TIPO_UNIDADE'] if 'TIPO_UNIDADE' in df.columns else df.get('TIPO', pd.Series('', index=df.index))
+    unidades = pd.DataFrame({
+        'nome': df['NOME'].fillna('N/D'),
+        'lat': df['LAT'],
+        'lon': df['LON'],
+        'endereco': df.get('ENDERECO', pd.Series('N/D', index=df.index)).fillna('N/D'),
+        'bairro': df.get('BAIRRO', pd.Series('N/D', index=df.index)).fillna('N/D'),
+        'tipo': tipo.fillna(''),
+        'publico': classificacao_estabelecimentos.classificar(df)['eh_publico'],
+    }).to_dict('records')
+    print(f"✅ {len(unidades)} estabelecimentos (base v{manifesto['versao']}, origem: {manifesto.get('origem')})")
+    return unidades
 
 def carregar_limite_municipal():
     """Carrega polígono do limite municipal"""
@@ -212,7 +203,7 @@ def criar_mapa_completo(unidades, gdf_municipio):
         distancia = calcular_distancia(CENTRO_CONCORDIA[0], CENTRO_CONCORDIA[1], lat, lon)
         
         # Classificar estabelecimento
-        publico = eh_publico(nome, tipo)
+        publico = unidade['publico']
         
         if publico:
             cor = 'red'
@@ -359,11 +350,11 @@ def main():
     print("🗺️ CRIAÇÃO DO MAPA COMPLETO DE UNIDADES DE SAÚDE")
     print("="*60)
     
-    # 1. Extrair dados
-    unidades = extrair_dados_html()
+    # 1. Carregar dados
+    unidades = carregar_unidades()
     
     if not unidades:
-        print("❌ Falha ao extrair dados")
+        print("❌ Falha ao carregar dados")
         return
     
     # 2. Carregar limite
@@ -12,6 +12,11 @@ import pandas as pd
 import folium
 import os
 from math import radians, cos, sin, asin, sqrt
+
+import complementos_mapa
+import dados_canonicos
+import classificacao_estabelecimentos
+import indice_textual  # noqa: F401 (registra o complemento 'busca' em complementos_mapa)
 try:
     import geopandas as gpd
     GEOPANDAS_DISPONIVEL = True
@@ -35,89 +40,38 @@ def calcular_distancia(lat1, lon1, lat2, lon2):
     
     return R * c
 
-def eh_estabelecimento_publico(nome_fantasia, tipo_unidade, razao_social=''):
-    """Verifica se é estabelecimento público (ESF/PS)"""
-    if pd.isna(nome_fantasia):
-        nome_fantasia = ''
-    
-    nome = str(nome_fantasia).upper()
-    razao = str(razao_social).upper()
-    
-    # Critérios para identificar estabelecimentos públicos
-    criterios_publicos = [
-        'ESF' in nome,
-        'PS ' in nome,
-        'POSTO DE SAUDE' in nome,
-        'UNIDADE BASICA' in nome,
-        'UBS' in nome,
-        'CENTRO DE SAUDE' in nome,
-        'ESTRATEGIA SAUDE DA FAMILIA' in nome,
-        'MUNICIPIO' in razao,
-        'PREFEITURA' in razao,
-        'SECRETARIA' in razao
-    ]
-    
-    # Tipos de unidade pública (2=ESF, 1=Posto, 4=Policlínica, 70=Centro de Saúde)
-    if str(tipo_unidade) in ['1', '2', '4', '70', '81']:
-        return True
-    
-    return any(criterios_publicos)
+# Categorias do mapa sobre a classificação público/privado única
+# (classificacao_estabelecimentos); tipos CNES: 1=Posto, 2=ESF, 4=Policlínica,
+# 70=Centro de Saúde, 81=Móvel | 22=Consultório, 36=Clínica, 39=Laboratório,
+# 43=Serviço de Apoio, 5=Hospital, 42=Apoio Diagnose/Terapia
+CATEGORIAS_TIPO = [
+    {'id': 'ESF - Estratégia Saúde da Família', 'publico': True, 'se': {'tipo': ['2'], 'nome': ['ESF']}},
+    {'id': 'PS - Posto de Saúde', 'publico': True, 'se': {'tipo': ['1'], 'nome': ['POSTO']}},
+    {'id': 'Policlínica', 'publico': True, 'se': {'tipo': ['4']}},
+    {'id': 'Centro de Saúde', 'publico': True, 'se': {'tipo': ['70']}},
+    {'id': 'Unidade Móvel', 'publico': True, 'se': {'tipo': ['81']}},
+    {'id': 'Unidade Pública de Saúde', 'publico': True, 'se': {}},
+    {'id': 'Consultório Médico/Odontológico', 'publico': False, 'se': {'tipo': ['22']}},
+    {'id': 'Clínica/Centro Especialidades', 'publico': False, 'se': {'tipo': ['36']}},
+    {'id': 'Laboratório de Análises Clínicas', 'publico': False, 'se': {'tipo': ['39']}},
+    {'id': 'Serviço de Apoio Diagnóstico', 'publico': False, 'se': {'tipo': ['43']}},
+    {'id': 'Hospital Geral/Especializado', 'publico': False, 'se': {'tipo': ['5']}},
+    {'id': 'Unidade de Apoio Diagnose/Terapia', 'publico': False, 'se': {'tipo': ['42']}},
+]
 
-def classificar_estabelecimento(nome, razao_social, tipo_unidade):
+def classificar_estabelecimentos(df):
     """
-    Classifica estabelecimento e retorna descrição do tipo.
-    Retorna: ('PÚBLICO' ou 'PRIVADO', descrição do tipo, cor do marcador)
+    Classifica todos os estabelecimentos de uma vez.
+    Acrescenta: categoria ('PÚBLICO'/'PRIVADO'), descricao_tipo e cor do marcador
     """
-    nome_upper = str(nome).upper()
-    razao_upper = str(razao_social).upper() if pd.notna(razao_social) else ""
-    tipo_str = str(tipo_unidade)
-    
-    # === ESTABELECIMENTOS PÚBLICOS ===
-    # Tipos CNES públicos: 1=Posto, 2=ESF, 4=Policlínica, 70=Centro Saúde, 81=Móvel
-    criterios_publicos = [
-        'ESF' in nome_upper,
-        'ESTRATEGIA SAUDE FAMILIA' in nome_upper,
-        'UNIDADE BASICA' in nome_upper,
-        'UNIDADE SAUDE' in nome_upper,
-        'UBS' in nome_upper,
-        'POSTO SAUDE' in nome_upper or 'POSTO DE SAUDE' in nome_upper,
-        'PS ' in nome_upper,
-        'MUNICIPIO' in razao_upper or 'PREFEITURA' in razao_upper,
-        tipo_str in ['1', '2', '4', '70', '81']  # Tipos públicos CNES
-    ]
-    
-    if any(criterios_publicos):
-        # Determinar descrição específica
-        if tipo_str == '2' or 'ESF' in nome_upper:
-            return ('PÚBLICO', 'ESF - Estratégia Saúde da Família', 'red')
-        elif tipo_str == '1' or 'POSTO' in nome_upper:
-            return ('PÚBLICO', 'PS - Posto de Saúde', 'red')
-        elif tipo_str == '4':
-            return ('PÚBLICO', 'Policlínica', 'red')
-        elif tipo_str == '70':
-            return ('PÚBLICO', 'Centro de Saúde', 'red')
-        elif tipo_str == '81':
-            return ('PÚBLICO', 'Unidade Móvel', 'red')
-        else:
-            return ('PÚBLICO', 'Unidade Pública de Saúde', 'red')
-    
-    # === ESTABELECIMENTOS PRIVADOS ===
-    # Tipos CNES privados: 22=Consultório, 36=Clínica, 39=Laboratório, 43=Serviço Apoio, etc.
-    else:
-        if tipo_str == '22':
-            return ('PRIVADO', 'Consultório Médico/Odontológico', 'blue')
-        elif tipo_str == '36':
-            return ('PRIVADO', 'Clínica/Centro Especialidades', 'blue')
-        elif tipo_str == '39':
-            return ('PRIVADO', 'Laboratório de Análises Clínicas', 'blue')
-        elif tipo_str == '43':
-            return ('PRIVADO', 'Serviço de Apoio Diagnóstico', 'blue')
-        elif tipo_str == '5':
-            return ('PRIVADO', 'Hospital Geral/Especializado', 'blue')
-        elif tipo_str == '42':
-            return ('PRIVADO', 'Unidade de Apoio Diagnose/Terapia', 'blue')
-        else:
-            return ('PRIVADO', 'Estabelecimento Privado de Saúde', 'blue')
+    classificacao = classificacao_estabelecimentos.classificar(
+        df, categorias=CATEGORIAS_TIPO, padrao_categoria='Estabelecimento Privado de Saúde'
+    )
+    df = df.copy()
+    df['categoria'] = classificacao['eh_publico'].map({True: 'PÚBLICO', False: 'PRIVADO'})
+    df['descricao_tipo'] = classificacao['categoria']
+    df['cor'] = classificacao['eh_publico'].map({True: 'red', False: 'blue'})
+    return df
 
 def carregar_dados():
     """Carrega TODOS os estabelecimentos de saúde (públicos + privados)"""
@@ -138,16 +92,7 @@ def carregar_dados():
             df = df_sc[df_sc['CO_MUNICIPIO_GESTOR'] == 420430].copy()
             
             # Padronizar nomes de colunas
-            df = df.rename(columns={
-                'NO_FANTASIA': 'NOME',
-                'NO_LOGRADOURO': 'ENDERECO',
-                'NO_BAIRRO': 'BAIRRO',
-                'CO_CEP': 'CEP',
-                'NU_LATITUDE': 'LAT',
-                'NU_LONGITUDE': 'LON',
-                'TP_UNIDADE': 'TIPO_UNIDADE',
-                'NO_RAZAO_SOCIAL': 'RAZAO_SOCIAL'
-            })
+            df = df.rename(columns=dados_canonicos.COLUNAS_CNES)
             
             print(f"   ✅ Base completa carregada: {len(df)} estabelecimentos totais")
         elif os.path.exists(caminho_csv):
@@ -158,16 +103,7 @@ def carregar_dados():
             df = df_sc[df_sc['CO_MUNICIPIO_GESTOR'] == 420430].copy()
             
             # Padronizar nomes de colunas
-            df = df.rename(columns={
-                'NO_FANTASIA': 'NOME',
-                'NO_LOGRADOURO': 'ENDERECO',
-                'NO_BAIRRO': 'BAIRRO',
-                'CO_CEP': 'CEP',
-                'NU_LATITUDE': 'LAT',
-                'NU_LONGITUDE': 'LON',
-                'TP_UNIDADE': 'TIPO_UNIDADE',
-                'NO_RAZAO_SOCIAL': 'RAZAO_SOCIAL'
-            })
+            df = df.rename(columns=dados_canonicos.COLUNAS_CNES)
             
             print(f"   ✅ Base completa carregada: {len(df)} estabelecimentos totais")
         else:
@@ -175,15 +111,20 @@ def carregar_dados():
     
     except Exception as e:
         print(f"   ⚠️ Base completa não disponível: {e}")
-        print("   → Tentando CSV processado...")
+        print("   → Tentando base canônica do dashboard...")
         
-        try:
-            caminho_csv = os.path.join(ROOT_DIR, '01_DADOS', 'processados', 'concordia_saude_simples.csv')
-            df = pd.read_csv(caminho_csv)
-            print("   ✅ CSV processado carregado")
-        except Exception as e2:
-            print(f"   ❌ Erro ao carregar CSV processado: {e2}")
-            return None
+        df = dados_canonicos.carregar_dados()
+        if df is not None:
+            print(f"   ✅ Base canônica carregada: {len(df)} estabelecimentos")
+        else:
+            print("   → Tentando CSV processado...")
+            try:
+                caminho_csv = os.path.join(ROOT_DIR, '01_DADOS', 'processados', 'concordia_saude_simples.csv')
+                df = pd.read_csv(caminho_csv)
+                print("   ✅ CSV processado carregado")
+            except Exception as e2:
+                print(f"   ❌ Erro ao carregar CSV processado: {e2}")
+                return None
     
     # Garantir tipos numéricos
     df['LAT'] = pd.to_numeric(df['LAT'], errors='coerce')
@@ -323,8 +264,16 @@ def carregar_limite_municipal():
     
     return None
 
-def criar_mapa_atualizado(df, gdf_municipio):
-    """Cria mapa com as especificações solicitadas"""
+def criar_mapa_atualizado(df, gdf_municipio, complementos=None):
+    """
+    Cria mapa com as especificações solicitadas
+
+    Args:
+        df: DataFrame dos estabelecimentos
+        gdf_municipio: GeoDataFrame com o limite municipal
+        complementos: dict {nome: opções ou None} somado aos complementos padrão
+            (título, rodapé, legenda, controle de camadas)
+    """
     print("\n🗺️ Criando mapa atualizado...")
     
     # Criar mapa base centrado em Concórdia com limites de zoom
@@ -417,13 +366,9 @@ def criar_mapa_atualizado(df, gdf_municipio):
     count_publicos = 0
     count_privados = 0
     
+    df = classificar_estabelecimentos(df)
     for idx, row in df.iterrows():
-        # Classificar estabelecimento (retorna: categoria, descrição, cor)
-        categoria, descricao_tipo, cor = classificar_estabelecimento(
-            row.get('NOME', ''),
-            row.get('RAZAO_SOCIAL', ''),
-            row.get('TIPO_UNIDADE', '')
-        )
+        categoria, descricao_tipo, cor = row['categoria'], row['descricao_tipo'], row['cor']
         
         # Calcular distância ao centro
         distancia = calcular_distancia(
@@ -552,10 +497,6 @@ def criar_mapa_atualizado(df, gdf_municipio):
     </div>
     '''
     
-    # Adicionar título e rodapé ao mapa
-    mapa.get_root().html.add_child(folium.Element(titulo_html))
-    mapa.get_root().html.add_child(folium.Element(rodape_html))
-    
     # === 7. LEGENDA ===
     legenda_html = '''
     <div style="position: fixed; 
@@ -635,10 +576,15 @@ def criar_mapa_atualizado(df, gdf_municipio):
     </div>
     '''
     
-    mapa.get_root().html.add_child(folium.Element(legenda_html))
-    
-    # Adicionar controle de camadas
-    folium.LayerControl(collapsed=False, position='topleft').add_to(mapa)
+    # Título, rodapé, legenda e controle de camadas registrados na geração
+    padrao = {
+        'titulo': {'tipo': 'html', 'html': titulo_html, 'nome': 'Titulo'},
+        'rodape': {'tipo': 'html', 'html': rodape_html, 'nome': 'Rodape'},
+        'legenda': {'tipo': 'html', 'html': legenda_html, 'nome': 'Legenda'},
+        'controle_camadas': {'posicao': 'topleft', 'recolhido': False},
+        'busca': {'df': df},
+    }
+    complementos_mapa.aplicar_complementos(mapa, padrao, complementos)
     
     return mapa
 
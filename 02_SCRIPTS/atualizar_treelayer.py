@@ -7,39 +7,13 @@ Script para atualizar mapa_avancado_treelayer_colorbrewer.html com:
 3. Adicionar rosa dos ventos
 """
 
-import os
-import re
+import time
 
-mapa_path = r"docs\mapa_avancado_treelayer_colorbrewer.html"
-
-print(f"📝 Atualizando {mapa_path}...")
-
-# Ler arquivo
-with open(mapa_path, 'r', encoding='utf-8') as f:
-    conteudo = f.read()
-
-# 1. Atualizar max_zoom de 16 para 18 (já feito pelo PowerShell, mas vamos confirmar)
-conteudo_original = conteudo
-conteudo = re.sub(r'"maxZoom": 16,', '"maxZoom": 18,', conteudo)
-
-if conteudo != conteudo_original:
-    print("   ✅ maxZoom atualizado para 18")
-else:
-    print("   ⚠️ maxZoom já estava em 18 ou não encontrado")
-
-# 2. Trocar GroupedLayerControl por LayerControl simples
-# Procurar e remover o script do GroupedLayerControl
-conteudo = re.sub(
-    r'new L\.Control\.groupedLayers\([^}]+\}\s*\)\.addTo\([^)]+\);',
-    'L.control.layers().addTo(map_[a-z0-9]+);',
-    conteudo,
-    flags=re.DOTALL
-)
+from remendos_html import aplicar_remendos, imprimir_relatorio
 
-print("   ✅ GroupedLayerControl verificado/atualizado")
+mapa_path = r"docs\mapa_avancado_treelayer_colorbrewer.html"
 
-# 3. Adicionar rosa dos ventos antes da tag </body>
-rosa_html = '''    <div id="rosa-ventos-unica" style="
+ROSA_HTML = '''    <div id="rosa-ventos-unica" style="
         position: fixed;
         bottom: 100px;
         right: 30px;
@@ -71,20 +45,38 @@ rosa_html = '''    <div id="rosa-ventos-unica" style="
         </svg>
     </div>
 
-</body>'''
+'''
+
+
+def _layer_control_simples(bloco):
+    """new L.Control.groupedLayers(...).addTo(map_x); -> L.control.layers().addTo(map_x);"""
+    return 'L.control.layers().addTo(' + bloco[bloco.rfind('.addTo(') + len('.addTo('):]
+
+
+def remendos():
+    """
+    1. max_zoom: 16 -> 18
+    2. GroupedLayerControl -> LayerControl simples
+    3. Rosa dos ventos antes de </body>
+    """
+    return [
+        {'nome': 'maxZoom 18', 'tipo': 'substituir',
+         'alvo': '"maxZoom": 16,', 'conteudo': '"maxZoom": 18,'},
+        {'nome': 'GroupedLayerControl -> LayerControl', 'tipo': 'substituir_bloco',
+         'inicio': 'new L.Control.groupedLayers(', 'fim': (').addTo(', ');'),
+         'conteudo': _layer_control_simples},
+        {'nome': 'rosa dos ventos', 'tipo': 'inserir_antes', 'alvo': '</body>',
+         'conteudo': ROSA_HTML, 'exceto_se': 'id="rosa-ventos-unica"'},
+    ]
 
-if '</body>' in conteudo and 'rosa-ventos-unica' not in conteudo:
-    conteudo = conteudo.replace('</body>', rosa_html)
-    print("   ✅ Rosa dos ventos adicionada")
-else:
-    print("   ⚠️ Rosa dos ventos já estava ou </body> não encontrado")
 
-# Salvar arquivo
-with open(mapa_path, 'w', encoding='utf-8') as f:
-    f.write(conteudo)
+if __name__ == '__main__':
+    print(f"📝 Atualizando {mapa_path}...")
+    inicio = time.perf_counter()
+    imprimir_relatorio(aplicar_remendos(mapa_path, remendos()), time.perf_counter() - inicio)
 
-print(f"\n✅ Arquivo {mapa_path} atualizado com sucesso!")
-print("\n📋 Melhorias aplicadas:")
-print("   ✓ maxZoom: 18")
-print("   ✓ LayerControl simples (múltiplas camadas)")
-print("   ✓ Rosa dos ventos (N/S/L/O)")
+    print(f"\n✅ Arquivo {mapa_path} atualizado com sucesso!")
+    print("\n📋 Melhorias aplicadas:")
+    print("   ✓ maxZoom: 18")
+    print("   ✓ LayerControl simples (múltiplas camadas)")
+    print("   ✓ Rosa dos ventos (N/S/L/O)")
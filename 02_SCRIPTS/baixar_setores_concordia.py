@@ -4,15 +4,35 @@
 Script para baixar setores censitários de Concórdia/SC (IBGE Censo 2022)
 e prepará-los para uso nos mapas de análise espacial.
 
+Os setores são lidos direto do ZIP do IBGE (/vsizip/, sem extrair), com
+filtro de atributo (where) e retângulo (bbox) aplicados pelo GDAL na
+leitura: só as feições dos municípios pedidos são decodificadas. Uma lista
+de municípios é lida numa única passada.
+
+Uso:
+    python 02_SCRIPTS/baixar_setores_concordia.py                   # Concórdia
+    python 02_SCRIPTS/baixar_setores_concordia.py 420430 420540     # vários municípios
+    python 02_SCRIPTS/baixar_setores_concordia.py --zip sc_setores_censitarios_2022.zip
+
 Autor: GitHub Copilot + Ronan Caetano
 Data: Novembro 2025
 """
 
 import os
+import argparse
 import requests
 import zipfile
 import geopandas as gpd
 from pathlib import Path
+try:
+    import pyogrio
+except ImportError:
+    pyogrio = None
+try:
+    import pyarrow  # leitura em lotes Arrow pelo pyogrio, quando instalado
+    USAR_ARROW = True
+except ImportError:
+    USAR_ARROW = False
 
 # Configurações
 ROOT_DIR = Path(__file__).parent.parent
@@ -22,6 +42,9 @@ OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 # Código IBGE de Concórdia: 420430
 CODIGO_CONCORDIA = "420430"
 
+# Malha municipal local, usada só para o bbox da leitura dos setores
+SHP_MUNICIPIOS = ROOT_DIR / "SC_Municipios_2024" / "SC_Municipios_2024.shp"
+
 def baixar_setores_ibge():
     """
     Baixa os setores censitários de Santa Catarina do FTP do IBGE.
@@ -52,82 +75,144 @@ def baixar_setores_ibge():
         print(f"   ❌ Erro ao baixar: {e}")
         return None
 
-def extrair_e_filtrar_concordia(zip_path):
+def caminho_vsizip(zip_path):
+    """Caminho GDAL /vsizip/ do primeiro shapefile dentro do ZIP (sem extrair)"""
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        shp_internos = sorted(n for n in zip_ref.namelist() if n.lower().endswith('.shp'))
+    if not shp_internos:
+        return None
+    return f"/vsizip/{Path(zip_path).resolve().as_posix()}/{shp_internos[0]}"
+
+
+def _campo_municipio(campos):
+    """Campo do código do município (ou do setor, cujo prefixo é o município)"""
+    for chaves in (('CD_MUN', 'CODMUN'), ('CD_SETOR', 'GEOCODIGO')):
+        for campo in campos:
+            if any(chave in campo.upper() for chave in chaves):
+                return campo
+    return None
+
+
+def _expressao_where(campo, tipo, codigos):
     """
-    Extrai o shapefile e filtra apenas os setores de Concórdia.
+    Filtro OGR SQL pelos códigos de 6 dígitos. Aceita códigos de 7 dígitos
+    (com dígito verificador, malhas de 2022) e códigos de setor, que começam
+    pelo código do município.
     """
-    print("📂 Extraindo e filtrando setores de Concórdia...")
-    
-    extract_dir = OUTPUT_DIR / "setores_sc_temp"
-    extract_dir.mkdir(exist_ok=True)
+    if tipo.startswith(('int', 'uint')):
+        return ' OR '.join(f'("{campo}" = {c} OR ("{campo}" >= {c}0 AND "{campo}" <= {c}9))' for c in codigos)
+    return ' OR '.join(f"\"{campo}\" LIKE '{c}%'" for c in codigos)
+
+
+def ler_filtrado(caminho, codigos, bbox=None):
+    """
+    Lê só as feições dos municípios pedidos (where e bbox aplicados na leitura).
+
+    Args:
+        caminho: arquivo vetorial ou caminho /vsizip/
+        codigos: códigos IBGE de 6 dígitos (texto)
+        bbox: (xmin, ymin, xmax, ymax) no CRS da camada, opcional
+
+    Returns:
+        (GeoDataFrame, campo usado no filtro) ou (None, None)
+    """
+    if pyogrio is not None:
+        info = pyogrio.read_info(caminho)
+        campos, tipos = list(info['fields']), [str(t) for t in info['dtypes']]
+    else:
+        amostra = gpd.read_file(caminho, rows=1)
+        campos = [c for c in amostra.columns if c != 'geometry']
+        tipos = [str(amostra[c].dtype) for c in campos]
+    campo = _campo_municipio(campos)
+    if campo is None:
+        print(f"   ⚠️ Colunas disponíveis: {campos}")
+        return None, None
+    where = _expressao_where(campo, tipos[campos.index(campo)], codigos)
+    if pyogrio is not None:
+        gdf = pyogrio.read_dataframe(caminho, where=where, bbox=bbox, use_arrow=USAR_ARROW)
+    else:
+        gdf = gpd.read_file(caminho, where=where, bbox=bbox)
+    # Confirmação exata pelo prefixo (o LIKE/intervalo já reduziu às candidatas)
+    return gdf[gdf[campo].astype(str).str[:6].isin(codigos)], campo
+
+
+def bbox_municipios(codigos, crs):
+    """Retângulo envolvente dos municípios na malha local, no CRS pedido (ou None)"""
+    if not SHP_MUNICIPIOS.is_file():
+        return None
+    try:
+        gdf_mun, _ = ler_filtrado(str(SHP_MUNICIPIOS), codigos)
+        if gdf_mun is None or gdf_mun.empty:
+            return None
+        return tuple(gdf_mun.to_crs(crs).total_bounds)
+    except Exception as e:
+        print(f"   ⚠️ Malha municipal local ilegível, lendo sem bbox: {e}")
+        return None
+
+
+def extrair_e_filtrar_concordia(zip_path, codigos=None, remover_zip=True):
+    """
+    Lê do ZIP apenas os setores de Concórdia (ou dos municípios pedidos).
+
+    Args:
+        zip_path: ZIP dos setores de SC do IBGE
+        codigos: códigos IBGE de 6 dígitos (padrão: só Concórdia)
+        remover_zip: apaga o ZIP ao final
+
+    Returns:
+        GeoDataFrame (EPSG:4326) ou None
+    """
+    codigos = [str(c)[:6] for c in (codigos or [CODIGO_CONCORDIA])]
+    print(f"📂 Lendo setores de {len(codigos)} município(s) direto do ZIP...")
     
     try:
-        # Extrair ZIP
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            zip_ref.extractall(extract_dir)
-        
-        print("   ✅ Arquivos extraídos")
-        
-        # Encontrar o shapefile principal
-        shp_files = list(extract_dir.rglob("*.shp"))
-        if not shp_files:
+        caminho = caminho_vsizip(zip_path)
+        if caminho is None:
             print("   ❌ Nenhum shapefile encontrado no ZIP")
             return None
+        print(f"   → Camada: {caminho}")
         
-        shp_path = shp_files[0]
-        print(f"   → Carregando shapefile: {shp_path.name}")
-        
-        # Carregar shapefile completo de SC
-        gdf_sc = gpd.read_file(shp_path)
-        print(f"   ✅ {len(gdf_sc)} setores carregados (SC completo)")
+        crs = pyogrio.read_info(caminho)['crs'] if pyogrio is not None else None
+        bbox = bbox_municipios(codigos, crs) if crs else None
+        if bbox:
+            print(f"   → bbox: {', '.join(f'{v:.4f}' for v in bbox)}")
         
-        # Filtrar apenas Concórdia
-        # Procurar coluna com código do município
-        cod_mun_cols = [c for c in gdf_sc.columns if 'CD_MUN' in c.upper() or 'CODMUN' in c.upper()]
-        
-        if not cod_mun_cols:
-            print(f"   ⚠️ Colunas disponíveis: {list(gdf_sc.columns)}")
-            print("   ⚠️ Tentando filtro por primeiros 6 dígitos do código do setor...")
-            # Fallback: usar CD_SETOR e pegar primeiros 6 dígitos
-            setor_cols = [c for c in gdf_sc.columns if 'CD_SETOR' in c.upper() or 'GEOCODIGO' in c.upper()]
-            if setor_cols:
-                gdf_concordia = gdf_sc[gdf_sc[setor_cols[0]].astype(str).str[:6] == CODIGO_CONCORDIA]
-            else:
-                print("   ❌ Não foi possível identificar coluna de filtro")
-                return None
-        else:
-            cod_col = cod_mun_cols[0]
-            print(f"   → Filtrando por coluna: {cod_col}")
-            gdf_concordia = gdf_sc[gdf_sc[cod_col].astype(str) == CODIGO_CONCORDIA]
+        gdf_setores, campo = ler_filtrado(caminho, codigos, bbox)
+        if gdf_setores is None:
+            print("   ❌ Não foi possível identificar coluna de filtro")
+            return None
+        print(f"   → Filtrado por coluna: {campo}")
         
-        if gdf_concordia.empty:
-            print("   ❌ Nenhum setor encontrado para Concórdia")
+        if gdf_setores.empty:
+            print("   ❌ Nenhum setor encontrado para os municípios pedidos")
             return None
         
-        print(f"   ✅ {len(gdf_concordia)} setores de Concórdia filtrados")
+        print(f"   ✅ {len(gdf_setores)} setores lidos (só as feições selecionadas)")
         
         # Garantir CRS WGS84
-        if gdf_concordia.crs.to_epsg() != 4326:
-            gdf_concordia = gdf_concordia.to_crs(epsg=4326)
+        if gdf_setores.crs.to_epsg() != 4326:
+            gdf_setores = gdf_setores.to_crs(epsg=4326)
             print("   ✅ CRS convertido para WGS84")
         
-        # Salvar como shapefile limpo
-        output_shp = OUTPUT_DIR.parent / "Concordia_sencitario"
-        gdf_concordia.to_file(output_shp.with_suffix(".shp"), driver="ESRI Shapefile")
-        print(f"   ✅ Shapefile salvo: {output_shp}.shp")
-        
-        # Salvar também como GeoPackage (mais moderno)
-        output_gpkg = OUTPUT_DIR / "concordia_setores_2022.gpkg"
-        gdf_concordia.to_file(output_gpkg, driver="GPKG", layer="setores")
+        if codigos == [CODIGO_CONCORDIA]:
+            # Salvar como shapefile limpo
+            output_shp = OUTPUT_DIR.parent / "Concordia_sencitario"
+            gdf_setores.to_file(output_shp.with_suffix(".shp"), driver="ESRI Shapefile")
+            print(f"   ✅ Shapefile salvo: {output_shp}.shp")
+            
+            # Salvar também como GeoPackage (mais moderno)
+            output_gpkg = OUTPUT_DIR / "concordia_setores_2022.gpkg"
+        else:
+            output_gpkg = OUTPUT_DIR / f"setores_2022_{'_'.join(codigos)}.gpkg"
+        gdf_setores.to_file(output_gpkg, driver="GPKG", layer="setores")
         print(f"   ✅ GeoPackage salvo: {output_gpkg}")
         
         # Limpeza
-        import shutil
-        shutil.rmtree(extract_dir)
-        zip_path.unlink()
-        print("   ✅ Arquivos temporários removidos")
+        if remover_zip:
+            Path(zip_path).unlink()
+            print("   ✅ Arquivo temporário removido")
         
-        return gdf_concordia
+        return gdf_setores
     
     except Exception as e:
         print(f"   ❌ Erro: {e}")
@@ -149,17 +234,22 @@ def gerar_estatisticas(gdf):
     print("="*50)
 
 def main():
+    parser = argparse.ArgumentParser(description='Setores censitários 2022 de municípios de SC')
+    parser.add_argument('codigos', nargs='*', default=[CODIGO_CONCORDIA], help='códigos IBGE (padrão: Concórdia)')
+    parser.add_argument('--zip', default=None, help='ZIP do IBGE já baixado (mantido ao final)')
+    args = parser.parse_args()
+
     print("🚀 INICIANDO DOWNLOAD DOS SETORES CENSITÁRIOS DE CONCÓRDIA/SC")
     print("="*70)
     
     # 1. Baixar
-    zip_path = baixar_setores_ibge()
+    zip_path = Path(args.zip) if args.zip else baixar_setores_ibge()
     if not zip_path:
         print("\n❌ Falha no download. Verifique a conexão e tente novamente.")
         return
     
-    # 2. Extrair e filtrar
-    gdf_concordia = extrair_e_filtrar_concordia(zip_path)
+    # 2. Ler filtrado direto do ZIP
+    gdf_concordia = extrair_e_filtrar_concordia(zip_path, args.codigos, remover_zip=args.zip is None)
     if gdf_concordia is None:
         print("\n❌ Falha ao processar os setores.")
         return
@@ -169,8 +259,11 @@ def main():
     
     print("\n✅ PROCESSO CONCLUÍDO COM SUCESSO!")
     print("\n📁 Arquivos gerados:")
-    print(f"   • Concordia_sencitario.shp (na raiz do projeto)")
-    print(f"   • concordia_setores_2022.gpkg (em 01_DADOS/processados)")
+    if args.codigos == [CODIGO_CONCORDIA]:
+        print(f"   • Concordia_sencitario.shp (na raiz do projeto)")
+        print(f"   • concordia_setores_2022.gpkg (em 01_DADOS/processados)")
+    else:
+        print(f"   • setores_2022_{'_'.join(c[:6] for c in args.codigos)}.gpkg (em 01_DADOS/processados)")
     print("\n💡 Agora você pode regenerar o mapa avançado com:")
     print("   python 02_SCRIPTS/dashboard_avancado_colorbrewer.py")
 
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache de Artefatos por Hash de Conteúdo
+- Chave = hash estável da tabela de entrada (colunas, tipos e valores),
+  dos parâmetros e da versão do código (script + módulos do projeto que ele
+  importa, como no construir.py)
+- Acerto: os arquivos guardados são copiados para o destino e a geração
+  (figura, relatório, CSV) é pulada
+- Falha: gera normalmente e guarda uma cópia dos arquivos produzidos
+- Entradas gravadas em pasta temporária e renomeadas: processos do lote
+  podem usar o mesmo cache ao mesmo tempo
+- Limpeza por tamanho total, descartando as entradas usadas há mais tempo
+
+Estrutura (03_RESULTADOS/.cache_artefatos):
+    <nome>-<chave>/meta.json      # partes da chave, arquivos, tempo de geração
+    <nome>-<chave>/<arquivo>      # cópias dos artefatos
+
+Autor: Caetano Ronan
+Instituição: UFSC
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+from functools import lru_cache
+import pandas as pd
+
+import construir
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(SCRIPT_DIR)
+CACHE_DIR = os.path.join(ROOT_DIR, '03_RESULTADOS', '.cache_artefatos')
+LIMITE_CACHE_MB = 500
+
+
+def hash_dataframe(df):
+    """Hash estável do conteúdo da tabela (independe do índice e de cópias)"""
+    sha = hashlib.sha256()
+    sha.update(json.dumps([[str(c), str(t)] for c, t in df.dtypes.items()]).encode('utf-8'))
+    sha.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return sha.hexdigest()
+
+
+@lru_cache(maxsize=None)
+def versao_codigo(script):
+    """Hash do script e dos módulos de 02_SCRIPTS que ele importa (fechamento)"""
+    sha = hashlib.sha256()
+    for caminho in construir.modulos_do_projeto(script):
+        sha.update(os.path.basename(caminho).encode('utf-8'))
+        with open(caminho, 'rb') as f:
+            sha.update(f.read())
+    return sha.hexdigest()
+
+
+def _serializar(valor):
+    """Partes da chave em JSON estável (tuplas, numpy e afins viram texto)"""
+    return json.dumps(valor, sort_keys=True, ensure_ascii=False, default=str)
+
+
+class CacheArtefatos:
+    """
+    Memoização de etapas que produzem arquivos.
+
+    Uso:
+        cache = CacheArtefatos()
+        cache.memorizar('relatorio', {'dados': hash_dataframe(df)}, [caminho_md],
+                        gerar_relatorio, df)
+        cache.imprimir_estatisticas()
+    """
+
+    def __init__(self, diretorio=CACHE_DIR):
+        self.diretorio = diretorio
+        self.estatisticas = {}  # nome -> {'acertos', 'falhas', 'economizado_s'}
+
+    def _registrar(self, nome, acerto, economizado=0.0):
+        est = self.estatisticas.setdefault(nome, {'acertos': 0, 'falhas': 0, 'economizado_s': 0.0})
+        est['acertos' if acerto else 'falhas'] += 1
+        est['economizado_s'] += economizado
+
+    def memorizar(self, nome, partes, saidas, gerar, *args):
+        """
+        Reaproveita os arquivos da etapa ou a executa e guarda o resultado.
+
+        Args:
+            nome: nome da etapa (prefixo da entrada no cache)
+            partes: dict serializável que identifica a execução (hash dos
+                dados, parâmetros, versão do código)
+            saidas: caminhos dos arquivos que a etapa produz
+            gerar: função da etapa, chamada como gerar(*args) na falha
+
+        Returns:
+            (acerto, resultado de gerar ou None no acerto)
+        """
+        nomes = [os.path.basename(s) for s in saidas]
+        chave = hashlib.sha256(_serializar([nome, partes, nomes]).encode('utf-8')).hexdigest()[:24]
+        entrada = os.path.join(self.diretorio, f'{nome}-{chave}')
+        meta_caminho = os.path.join(entrada, 'meta.json')
+
+        if os.path.isfile(meta_caminho):
+            try:
+                with open(meta_caminho, 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+                for arquivo, destino in zip(nomes, saidas):
+                    os.makedirs(os.path.dirname(destino) or '.', exist_ok=True)
+                    shutil.copyfile(os.path.join(entrada, arquivo), destino)
+                os.utime(meta_caminho)  # uso recente (limpeza por LRU)
+                self._registrar(nome, True, meta.get('tempo_s', 0.0))
+                return True, None
+            except (OSError, ValueError) as e:
+                print(f"   ⚠️ Entrada de cache ilegível ({nome}: {e}), gerando de novo")
+
+        inicio = time.perf_counter()
+        resultado = gerar(*args)
+        tempo = time.perf_counter() - inicio
+        self._registrar(nome, False)
+
+        if all(os.path.isfile(s) for s in saidas):
+            os.makedirs(self.diretorio, exist_ok=True)
+            temporario = tempfile.mkdtemp(prefix=f'.{nome}-', dir=self.diretorio)
+            for arquivo, origem in zip(nomes, saidas):
+                shutil.copyfile(origem, os.path.join(temporario, arquivo))
+            with open(os.path.join(temporario, 'meta.json'), 'w', encoding='utf-8') as f:
+                json.dump({'nome': nome, 'partes': partes, 'arquivos': nomes,
+                           'tempo_s': round(tempo, 3)}, f, ensure_ascii=False, indent=2, default=str)
+            try:
+                os.rename(temporario, entrada)
+            except OSError:
+                # Outro processo gravou a mesma entrada antes
+                shutil.rmtree(temporario, ignore_errors=True)
+        return False, resultado
+
+    def limpar(self, limite_mb=LIMITE_CACHE_MB):
+        """Remove as entradas usadas há mais tempo até o cache caber no limite"""
+        if not os.path.isdir(self.diretorio):
+            return 0
+        entradas = []
+        for nome in os.listdir(self.diretorio):
+            caminho = os.path.join(self.diretorio, nome)
+            meta = os.path.join(caminho, 'meta.json')
+            if not os.path.isfile(meta):
+                continue
+            tamanho = sum(e.stat().st_size for e in os.scandir(caminho) if e.is_file())
+            entradas.append((os.path.getmtime(meta), tamanho, caminho))
+        total = sum(t for _, t, _ in entradas)
+        removidas = 0
+        for _, tamanho, caminho in sorted(entradas):
+            if total <= limite_mb * 1024 ** 2:
+                break
+            shutil.rmtree(caminho, ignore_errors=True)
+            total -= tamanho
+            removidas += 1
+        return removidas
+
+    def resumo(self):
+        """Totais de acertos, falhas e tempo economizado"""
+        return {
+            'acertos': sum(e['acertos'] for e in self.estatisticas.values()),
+            'falhas': sum(e['falhas'] for e in self.estatisticas.values()),
+            'economizado_s': round(sum(e['economizado_s'] for e in self.estatisticas.values()), 2),
+        }
+
+    def imprimir_estatisticas(self):
+        if not self.estatisticas:
+            return
+        print("\n🗄️ CACHE DE ARTEFATOS")
+        for nome, est in self.estatisticas.items():
+            print(f"   • {nome}: {est['acertos']} acerto(s), {est['falhas']} falha(s)"
+                  + (f" — {est['economizado_s']:.2f} s economizados" if est['acertos'] else ''))
+        resumo = self.resumo()
+        consultas = resumo['acertos'] + resumo['falhas']
+        print(f"   Total: {resumo['acertos']}/{consultas} acertos "
+              f"({resumo['acertos'] / consultas * 100:.0f}%), {resumo['economizado_s']:.2f} s economizados")
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Camadas Temáticas sobre uma Fonte GeoJSON Única
+- Os estabelecimentos são serializados uma única vez como FeatureCollection
+- Cada camada temática (setor, tipo, distância...) é um L.geoJSON no navegador
+  com funções `filter`/`pointToLayer` próprias sobre a mesma fonte
+- Substitui um folium.Marker/CircleMarker por linha (iterrows), que repetia
+  os mesmos pontos como instruções JS individuais em cada camada
+
+Autor: Caetano Ronan
+Instituição: UFSC
+"""
+
+import json
+import numpy as np
+from branca.element import MacroElement
+from jinja2 import Template
+
+CASAS_DECIMAIS_COORD = 6
+
+
+def serializar_json(dados):
+    """JSON compacto e seguro para embutir dentro de <script>"""
+    return json.dumps(dados, ensure_ascii=False, separators=(',', ':')).replace('</', '<\\/')
+
+
+def estabelecimentos_para_geojson(df, lat_col, lon_col, propriedades):
+    """
+    Monta a FeatureCollection dos estabelecimentos sem iterar linha a linha.
+
+    Args:
+        df: DataFrame processado
+        lat_col, lon_col: colunas de coordenadas
+        propriedades: dict {nome_propriedade: Series ou nome de coluna}
+
+    Returns:
+        dict GeoJSON (FeatureCollection de pontos)
+    """
+    colunas = {}
+    for nome, valor in propriedades.items():
+        serie = df[valor] if isinstance(valor, str) else valor
+        # Categorias/NaN viram objeto Python ou None para serializar em JSON
+        colunas[nome] = serie.astype(object).where(serie.notna(), None).tolist()
+
+    lats = np.round(df[lat_col].to_numpy(dtype=float), CASAS_DECIMAIS_COORD).tolist()
+    lons = np.round(df[lon_col].to_numpy(dtype=float), CASAS_DECIMAIS_COORD).tolist()
+    nomes = list(colunas)
+    registros = zip(*colunas.values()) if nomes else ([] for _ in lats)
+
+    features = [
+        {
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': [lon, lat]},
+            'properties': dict(zip(nomes, valores)),
+        }
+        for lat, lon, valores in zip(lats, lons, registros)
+    ]
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def poligonos_para_geojson(gdf, propriedades):
+    """
+    FeatureCollection única de polígonos contendo apenas as propriedades
+    usadas no estilo, tooltip e popup (uma camada L.geoJSON no navegador,
+    em vez de um folium.GeoJson por linha).
+
+    Args:
+        gdf: GeoDataFrame em EPSG:4326
+        propriedades: dict {nome_propriedade: Series, nome de coluna ou escalar}
+
+    Returns:
+        dict GeoJSON (FeatureCollection)
+    """
+    colunas = {}
+    for nome, valor in propriedades.items():
+        colunas[nome] = gdf[valor] if isinstance(valor, str) and valor in gdf.columns else valor
+    reduzido = gdf[['geometry']].assign(**colunas)
+    return json.loads(reduzido.to_json(drop_id=True))
+
+
+class FonteGeoJson(MacroElement):
+    """
+    Declara a FeatureCollection uma única vez como variável JS global.
+
+    Deve ser adicionada ao mapa antes das camadas que a utilizam.
+    """
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        var {{ this.get_name() }} = {{ this.dados_json }};
+        {% endmacro %}
+    """)
+
+    def __init__(self, dados):
+        super().__init__()
+        self._name = 'FonteGeoJson'
+        self.dados_json = serializar_json(dados)
+
+
+class CamadaGeoJsonFiltrada(MacroElement):
+    """
+    Camada L.geoJSON sobre uma FonteGeoJson, adicionada ao elemento pai
+    (FeatureGroup ou MarkerCluster).
+
+    As expressões JS recebem `feature`, `latlng` (em pointToLayer) e o
+    atalho `p` = feature.properties.
+
+    Args:
+        fonte: FonteGeoJson compartilhada
+        filtro_js: expressão booleana (ex.: 'p.setor === "Público"')
+        ponto_js: expressão que cria a camada do ponto (ex.: 'L.marker(latlng)')
+        popup_js: expressão com o conteúdo do popup (avaliada ao clicar)
+        tooltip_js: expressão com o texto do tooltip
+        max_width: largura máxima do popup em pixels
+    """
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        {{ this._parent.get_name() }}.addLayer(L.geoJSON({{ this.fonte.get_name() }}, {
+            filter: function(feature) {
+                var p = feature.properties;
+                return {{ this.filtro_js }};
+            },
+            pointToLayer: function(feature, latlng) {
+                var p = feature.properties;
+                return {{ this.ponto_js }};
+            },
+            onEachFeature: function(feature, layer) {
+                var p = feature.properties;
+                {%- if this.popup_js %}
+                layer.bindPopup(function() { return {{ this.popup_js }}; }, {maxWidth: {{ this.max_width }}});
+                {%- endif %}
+                {%- if this.tooltip_js %}
+                layer.bindTooltip({{ this.tooltip_js }});
+                {%- endif %}
+            }
+        }));
+        {% endmacro %}
+    """)
+
+    def __init__(self, fonte, filtro_js='true', ponto_js='L.marker(latlng)',
+                 popup_js=None, tooltip_js=None, max_width=350):
+        super().__init__()
+        self._name = 'CamadaGeoJsonFiltrada'
+        self.fonte = fonte
+        self.filtro_js = filtro_js
+        self.ponto_js = ponto_js
+        self.popup_js = popup_js
+        self.tooltip_js = tooltip_js
+        self.max_width = max_width
+
+
+def js_igual(campo, valor):
+    """Expressão JS de igualdade segura para `p.<campo> === valor`"""
+    return f'p.{campo} === {serializar_json(valor)}'
+
+
+def js_mapa(dicionario):
+    """Objeto JS literal (ex.: tabela de cores por categoria)"""
+    return serializar_json(dicionario)
+
+
+class ModeloPopup(MacroElement):
+    """
+    Modelo HTML único de popup, renderizado no navegador ao clicar.
+
+    Cada feição guarda apenas o registro de atributos; o HTML é montado em JS
+    a partir do modelo. Marcadores aceitos no modelo:
+        {campo}       valor de feature.properties (escapado; 'N/A' se nulo)
+        {campo:.1f}   valor numérico com casas decimais fixas
+
+    Args:
+        modelo: string HTML com marcadores
+        tabelas: dict {marcador: (campo, {valor: texto})} para valores derivados
+            de uma propriedade (ex.: cor por setor), sem repeti-los por feição
+
+    Uso: popup_js=modelo.chamada() em CamadaGeoJsonFiltrada.
+    """
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        var {{ this.get_name() }} = (function() {
+            var modelo = {{ this.modelo_json }};
+            var tabelas = {{ this.tabelas_json }};
+            var escapar = {'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;'};
+            return function(p) {
+                return modelo.replace(/\\{(\\w+)(?::\\.(\\d+)f)?\\}/g, function(m, campo, casas) {
+                    var v = campo in tabelas ? tabelas[campo][1][p[tabelas[campo][0]]] : p[campo];
+                    if (v === null || v === undefined) { return 'N/A'; }
+                    if (casas !== undefined) { v = Number(v).toFixed(Number(casas)); }
+                    return String(v).replace(/[&<>"]/g, function(c) { return escapar[c]; });
+                });
+            };
+        })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, modelo, tabelas=None):
+        super().__init__()
+        self._name = 'ModeloPopup'
+        # Espaços de indentação do HTML não têm efeito no popup
+        self.modelo_json = serializar_json(' '.join(modelo.split()))
+        self.tabelas_json = serializar_json(
+            {k: [campo, valores] for k, (campo, valores) in (tabelas or {}).items()})
+
+    def chamada(self, registro='p'):
+        """Expressão JS que gera o popup do registro"""
+        return f'{self.get_name()}({registro})'
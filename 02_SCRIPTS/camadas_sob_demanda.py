@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Camadas Carregadas sob Demanda (arquivos auxiliares ao lado do HTML)
+- Camadas ocultas por padrão (show=False) saem do HTML principal
+- O conteúdo de cada camada (dados + código Leaflet gerado pelo Folium) é
+  gravado em um arquivo .js próprio
+- O arquivo só é baixado quando o usuário liga a camada no LayerControl
+- O nome do arquivo leva um hash do conteúdo: mapas diferentes com camadas
+  de mesmo nome não se sobrescrevem na pasta compartilhada, e navegadores
+  não reaproveitam uma versão antiga em cache
+
+Os arquivos auxiliares são carregados por <script> (e não por fetch de
+.json) para funcionar também ao abrir o HTML direto do disco (file://);
+no GitHub Pages a compressão gzip é aplicada pelo servidor.
+
+Autor: Caetano Ronan
+Instituição: UFSC
+"""
+
+import os
+import json
+import hashlib
+import re
+import unicodedata
+from collections import OrderedDict
+import folium
+from folium.template import Template
+
+PASTA_CAMADAS = 'camadas'
+
+
+def nome_arquivo(nome, codigo=None):
+    """
+    Nome de arquivo (ASCII, sem espaços) a partir do nome da camada.
+
+    Com `codigo`, acrescenta os 12 primeiros dígitos do SHA-256 do conteúdo,
+    de modo que o nome só se repete quando o conteúdo é idêntico.
+    """
+    texto = unicodedata.normalize('NFKD', nome).encode('ascii', 'ignore').decode('ascii')
+    base = re.sub(r'[^a-z0-9]+', '_', texto.lower()).strip('_')
+    if codigo is not None:
+        base += '_' + hashlib.sha256(codigo.encode('utf-8')).hexdigest()[:12]
+    return base + '.js'
+
+
+def arquivos_auxiliares(mapa):
+    """
+    Arquivos auxiliares gravados pelos GrupoSobDemanda de um mapa já salvo.
+
+    Args:
+        mapa: folium.Map renderizado (após save)
+
+    Returns:
+        lista de caminhos relativos ao HTML (ex.: 'camadas/x_<hash>.js')
+    """
+    arquivos = []
+    pendentes = [mapa]
+    while pendentes:
+        elemento = pendentes.pop()
+        if isinstance(elemento, GrupoSobDemanda) and elemento.arquivo:
+            arquivos.append(f'{PASTA_CAMADAS}/{elemento.arquivo}')
+        pendentes.extend(elemento._children.values())
+    return sorted(arquivos)
+
+
+class GrupoSobDemanda(folium.FeatureGroup):
+    """
+    FeatureGroup cujo conteúdo é gravado em um arquivo .js auxiliar e
+    carregado na primeira vez em que a camada é ligada.
+
+    Args:
+        name: nome exibido no controle de camadas
+        diretorio_html: pasta onde o HTML será salvo (os arquivos vão para
+            <diretorio_html>/camadas/)
+        arquivo: nome fixo do arquivo auxiliar (padrão: derivado de `name`
+            e do hash do conteúdo, definido no render)
+        show: manter False; camadas visíveis não se beneficiam do adiamento
+    """
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = L.featureGroup(
+                {{ this.options|tojavascript }}
+            );
+            {{ this.get_name() }}.once('add', function() {
+                var script = document.createElement('script');
+                script.src = {{ this.url_json }};
+                script.onerror = function() {
+                    console.error('Camada não carregada: ' + script.src);
+                };
+                document.head.appendChild(script);
+            });
+        {% endmacro %}
+    """)
+
+    def __init__(self, name, diretorio_html, arquivo=None, show=False, **kwargs):
+        super().__init__(name=name, show=show, **kwargs)
+        self._name = 'GrupoSobDemanda'
+        self.arquivo_fixo = arquivo
+        self.arquivo = None
+        self.diretorio = os.path.join(diretorio_html, PASTA_CAMADAS)
+        self.url_json = None
+        self.bytes_adiados = 0
+
+    def render(self, **kwargs):
+        """Renderiza o grupo no HTML e o conteúdo dos filhos no arquivo auxiliar"""
+        figura = self.get_root()
+
+        # Scripts gerados pelos filhos (e netos) são retirados da página; o
+        # código vem antes do grupo porque o nome do arquivo depende dele
+        antes = set(figura.script._children)
+        for filho in self._children.values():
+            filho.render(**kwargs)
+        novos = [nome for nome in figura.script._children if nome not in antes]
+        codigo = '\n'.join(figura.script._children.pop(nome).render() for nome in novos)
+
+        self.arquivo = self.arquivo_fixo or nome_arquivo(self.layer_name, codigo)
+        self.url_json = json.dumps(f'{PASTA_CAMADAS}/{self.arquivo}')
+        filhos = self._children
+        self._children = OrderedDict()
+        super().render(**kwargs)
+        self._children.update(filhos)
+
+        os.makedirs(self.diretorio, exist_ok=True)
+        with open(os.path.join(self.diretorio, self.arquivo), 'w', encoding='utf-8') as f:
+            f.write(codigo)
+        self.bytes_adiados = len(codigo.encode('utf-8'))
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Camadas de Limites em TopoJSON Quantizado
+- Topologia com arcos compartilhados: a fronteira entre dois setores/municípios
+  vizinhos é gravada uma única vez
+- Coordenadas quantizadas em grade inteira e codificadas por diferenças (delta)
+- Decodificação no navegador (topojson.feature) em uma única camada L.geoJSON
+- Relatório de tamanho por camada versus __geo_interface__ / to_json()
+
+Sem a biblioteca topojson a camada cai para GeoJSON com coordenadas
+arredondadas (mesma interface, sem arcos compartilhados).
+
+Dependência opcional: topojson (pip install topojson)
+
+Autor: Caetano Ronan
+Instituição: UFSC
+"""
+
+import json
+try:
+    import topojson
+except ImportError:
+    topojson = None
+try:
+    import shapely
+except ImportError:
+    shapely = None
+from branca.element import MacroElement
+from folium.elements import JSCSSMixin
+from jinja2 import Template
+
+from camadas_geojson import serializar_json
+
+QUANTIZACAO_PADRAO = 1e5   # ~0,5 m na extensão de um município; ~5 m no estado
+CASAS_DECIMAIS_FALLBACK = 5
+JS_TOPOJSON = 'https://cdnjs.cloudflare.com/ajax/libs/topojson/1.6.9/topojson.min.js'
+
+
+def _reduzir(gdf, propriedades):
+    """GeoDataFrame só com geometria e as propriedades pedidas"""
+    colunas = {}
+    for nome, valor in (propriedades or {}).items():
+        colunas[nome] = gdf[valor] if isinstance(valor, str) and valor in gdf.columns else valor
+    return gdf[['geometry']].assign(**colunas).reset_index(drop=True)
+
+
+def gdf_para_topojson(gdf, nome_objeto, propriedades=None, quantizacao=QUANTIZACAO_PADRAO):
+    """
+    Converte o GeoDataFrame (EPSG:4326) em TopoJSON quantizado.
+
+    Args:
+        gdf: GeoDataFrame de polígonos
+        nome_objeto: nome do objeto dentro de topology.objects
+        propriedades: dict {nome_propriedade: coluna, Series ou escalar}
+        quantizacao: tamanho da grade inteira de quantização
+
+    Returns:
+        dict TopoJSON (type=Topology, com transform e arcos delta-codificados)
+    """
+    if topojson is None:
+        raise ImportError("topojson não instalado (pip install topojson)")
+    reduzido = _reduzir(gdf, propriedades)
+    topologia = topojson.Topology(reduzido, prequantize=quantizacao, object_name=nome_objeto)
+    return json.loads(topologia.to_json())
+
+
+def gdf_para_geojson_compacto(gdf, propriedades=None, casas=CASAS_DECIMAIS_FALLBACK):
+    """GeoJSON com coordenadas arredondadas (alternativa sem a biblioteca topojson)"""
+    reduzido = _reduzir(gdf, propriedades)
+    if shapely is not None:
+        reduzido['geometry'] = shapely.set_precision(reduzido.geometry.values, 10 ** -casas)
+    return json.loads(reduzido.to_json(drop_id=True))
+
+
+class CamadaLimites(JSCSSMixin, MacroElement):
+    """
+    Camada de limites embutida como TopoJSON e decodificada no navegador,
+    adicionada ao elemento pai (FeatureGroup).
+
+    As expressões JS recebem o atalho `p` = feature.properties (mesma
+    convenção de camadas_geojson.CamadaGeoJsonFiltrada).
+
+    Args:
+        gdf: GeoDataFrame em EPSG:4326
+        nome_objeto: nome do objeto TopoJSON (ex.: 'setores')
+        estilo: dict de estilo Leaflet, ou expressão JS (str) avaliada por feição
+        propriedades: dict {nome_propriedade: coluna, Series ou escalar}
+        destaque: dict de estilo aplicado no mouseover
+        tooltip_js, popup_js: expressões JS com o conteúdo do tooltip/popup
+        max_width: largura máxima do popup em pixels
+    """
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        var {{ this.get_name() }}_dados = {{ this.dados_json }};
+        var {{ this.get_name() }} = L.geoJSON(
+            {%- if this.topologia %}
+            topojson.feature({{ this.get_name() }}_dados, {{ this.get_name() }}_dados.objects[{{ this.nome_objeto_json }}]),
+            {%- else %}
+            {{ this.get_name() }}_dados,
+            {%- endif %}
+            {
+            style: function(feature) {
+                var p = feature.properties;
+                return {{ this.estilo_js }};
+            },
+            onEachFeature: function(feature, layer) {
+                var p = feature.properties;
+                {%- if this.tooltip_js %}
+                layer.bindTooltip({{ this.tooltip_js }});
+                {%- endif %}
+                {%- if this.popup_js %}
+                layer.bindPopup(function() { return {{ this.popup_js }}; }, {maxWidth: {{ this.max_width }}});
+                {%- endif %}
+                {%- if this.destaque_json %}
+                layer.on('mouseover', function(e) { e.target.setStyle({{ this.destaque_json }}); });
+                layer.on('mouseout', function(e) { {{ this.get_name() }}.resetStyle(e.target); });
+                {%- endif %}
+            }
+        });
+        {{ this._parent.get_name() }}.addLayer({{ this.get_name() }});
+        {% endmacro %}
+    """)
+
+    default_js = [('topojson', JS_TOPOJSON)]
+
+    def __init__(self, gdf, nome_objeto, estilo, propriedades=None, destaque=None,
+                 tooltip_js=None, popup_js=None, max_width=250):
+        super().__init__()
+        self._name = 'CamadaLimites'
+        self.topologia = topojson is not None
+        if self.topologia:
+            dados = gdf_para_topojson(gdf, nome_objeto, propriedades)
+        else:
+            dados = gdf_para_geojson_compacto(gdf, propriedades)
+            self.default_js = []
+        self.dados_json = serializar_json(dados)
+        self.nome_objeto_json = serializar_json(nome_objeto)
+        self.estilo_js = estilo if isinstance(estilo, str) else serializar_json(estilo)
+        self.destaque_json = serializar_json(destaque) if destaque else None
+        self.tooltip_js = tooltip_js
+        self.popup_js = popup_js
+        self.max_width = max_width
+
+
+def js_texto(texto):
+    """Literal JS de string (para tooltips/popups fixos)"""
+    return serializar_json(texto)
+
+
+def relatorio_tamanhos(camadas, propriedades=None):
+    """
+    Compara o tamanho embutido de cada camada: __geo_interface__ (json.dumps),
+    to_json() e TopoJSON quantizado.
+
+    Args:
+        camadas: dict {nome: GeoDataFrame em EPSG:4326}
+        propriedades: dict {nome: propriedades mantidas no TopoJSON}
+
+    Returns:
+        lista de dicts por camada (bytes e redução percentual)
+    """
+    linhas = []
+    for nome, gdf in camadas.items():
+        if gdf is None or gdf.empty:
+            continue
+        bytes_geo = len(json.dumps(gdf.__geo_interface__).encode('utf-8'))
+        bytes_json = len(gdf.to_json().encode('utf-8'))
+        props = (propriedades or {}).get(nome)
+        if topojson is not None:
+            bytes_topo = len(serializar_json(gdf_para_topojson(gdf, nome, props)).encode('utf-8'))
+        else:
+            bytes_topo = len(serializar_json(gdf_para_geojson_compacto(gdf, props)).encode('utf-8'))
+        linhas.append({
+            'camada': nome,
+            'feicoes': len(gdf),
+            'geo_interface': bytes_geo,
+            'to_json': bytes_json,
+            'topojson': bytes_topo,
+            'reducao_perc': round(100 * (1 - bytes_topo / bytes_json), 1),
+        })
+    return linhas
+
+
+def imprimir_relatorio(linhas):
+    """Tabela de tamanhos no console"""
+    print(f"   {'Camada':<18}{'Feições':>8}{'__geo_interface__':>19}{'to_json()':>12}"
+          f"{'TopoJSON':>11}{'Redução':>9}")
+    for l in linhas:
+        print(f"   {l['camada']:<18}{l['feicoes']:>8}{l['geo_interface'] / 1024:>16.1f} KB"
+              f"{l['to_json'] / 1024:>9.1f} KB{l['topojson'] / 1024:>8.1f} KB{l['reducao_perc']:>8.1f}%")
+
+
+def main():
+    """Relatório de tamanho das camadas de limites do mapa avançado (+ Voronoi)"""
+    import os
+    import pandas as pd
+    import geopandas as gpd
+    import dashboard_avancado_colorbrewer as dashboard
+
+    print("=" * 70)
+    print("📏 TAMANHO DAS CAMADAS DE LIMITES: GeoJSON vs TopoJSON quantizado")
+    print("=" * 70)
+    if topojson is None:
+        print("⚠️ topojson não instalado: comparando com GeoJSON arredondado")
+
+    gdf_estado, gdf_municipio = dashboard.carregar_limites_ibge()
+    camadas = {
+        'estado': gdf_estado,
+        'municipio': gdf_municipio,
+        'vizinhos': dashboard.carregar_municipios_vizinhos(),
+        'setores': dashboard.carregar_limites_distritais(),
+    }
+    shp_voronoi = os.path.join(dashboard.ROOT_DIR, 'voronoi_recortado.shp')
+    if os.path.isfile(shp_voronoi):
+        camadas['voronoi'] = gpd.read_file(shp_voronoi).to_crs(4326)
+
+    # Propriedades que o mapa realmente embute em cada camada
+    propriedades = {
+        'vizinhos': {c: c for c in ['NM_MUN', 'AREA_KM2']},
+        'setores': {'setor_id': 'CD_SETOR'},
+        'voronoi': {'rotulo': 'NOME'},
+    }
+    linhas = relatorio_tamanhos(camadas, propriedades)
+    imprimir_relatorio(linhas)
+
+    caminho = os.path.join(dashboard.OUTPUT_DIR, 'relatorio_tamanho_topojson.csv')
+    pd.DataFrame(linhas).to_csv(caminho, index=False, encoding='utf-8-sig')
+    print(f"\n✅ Relatório salvo em: {caminho}")
+    return linhas
+
+
+if __name__ == '__main__':
+    main()
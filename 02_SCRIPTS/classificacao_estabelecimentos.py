@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Motor de Regras de Classificação de Estabelecimentos (Público/Privado)
+- Uma única tabela declarativa de regras (REGRAS_SETOR) usada por todos os
+  scripts: dashboards, mapas e lote estadual classificam igual
+- Regras compiladas uma vez: termos de nome/razão social viram uma expressão
+  regular por regra (fronteira de palavra, sem acento, caixa alta) e códigos
+  de tipo viram isin; nada de apply linha a linha
+- Textos e códigos avaliados só nos valores distintos (factorize) e
+  espalhados de volta: a base CNES nacional repete muito nome e razão social
+- Cada linha recebe o id da regra que disparou (auditoria da classificação)
+- Tabelas de categorias detalhadas (cor/ícone de cada mapa) usam o mesmo
+  avaliador, condicionadas ao setor já decidido aqui
+
+Regra = dict com 'id' e 'se' {campo: valores}; a primeira regra (na ordem da
+tabela) em que algum campo casa é a que vale. Campos:
+    nome        NO_FANTASIA / NOME (termos = fragmentos de regex)
+    razao       NO_RAZAO_SOCIAL / RAZAO_SOCIAL (termos)
+    tipo        TP_UNIDADE / TIPO_UNIDADE (códigos CNES)
+    tipo_texto  TIPO da base simplificada (ESF, PS, ...)
+Opcionais: 'todos': True exige todos os campos de 'se'; 'publico': True/False
+restringe a regra a um setor (tabelas de categorias; 'se' vazio = todo o setor).
+
+Uso:
+    python classificacao_estabelecimentos.py [arquivo.csv|.xlsx]   # resumo por regra
+
+Autor: Caetano Ronan
+Instituição: UFSC
+"""
+
+import re
+import sys
+import time
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+from indice_textual import normalizar_texto, SUFIXO_NORMALIZADO
+
+# Colunas aceitas para cada campo, em ordem de preferência
+COLUNAS_CAMPOS = {
+    'nome': ['NO_FANTASIA', 'NOME'],
+    'razao': ['NO_RAZAO_SOCIAL', 'RAZAO_SOCIAL'],
+    'tipo': ['TP_UNIDADE', 'TIPO_UNIDADE'],
+    'tipo_texto': ['TIPO'],
+}
+
+# Códigos CNES (TP_UNIDADE) da rede pública: 1=Posto de Saúde, 2=Centro de
+# Saúde/UBS, 4=Policlínica, 68=Central de Gestão, 70=CAPS, 81=Central de Regulação
+TIPOS_PUBLICOS = ['1', '2', '4', '68', '70', '81']
+
+REGRAS_SETOR = [
+    {'id': 'tipo_cnes_publico', 'se': {'tipo': TIPOS_PUBLICOS}},
+    {'id': 'tipo_simplificado_publico', 'se': {'tipo_texto': ['ESF', 'PS', 'UBS']}},
+    {'id': 'nome_atencao_basica', 'se': {'nome': [
+        'ESF', 'ESTRATEGIA (DE )?SAUDE (DA )?FAMILIA', 'UBS', 'UNIDADE BASICA',
+        'UNIDADE (DE )?SAUDE', 'POSTO', 'PS', 'CENTRO DE SAUDE',
+    ]}},
+    {'id': 'nome_rede_publica', 'se': {'nome': ['CAPS', 'SAMU']}},
+    {'id': 'gestor_publico', 'se': {'razao': ['MUNICIPIO', 'PREFEITURA', 'SECRETARIA']}},
+]
+SEM_REGRA = 'privado_padrao'
+
+
+def normalizar_codigo(serie):
+    """Códigos de tipo como texto: 2, 2.0 e '02' viram '2'; textos em caixa alta"""
+    serie = pd.Series(serie, dtype=object)
+    numeros = pd.to_numeric(serie, errors='coerce')
+    inteiros = numeros.notna() & (numeros == np.floor(numeros))
+    texto = normalizar_texto(serie)
+    texto[inteiros] = numeros[inteiros].astype('int64').astype(str)
+    return texto
+
+
+@lru_cache(maxsize=None)
+def _expressao(termos):
+    """Uma regex por regra: alternância dos termos com fronteira de letra"""
+    return re.compile(r'(?<![A-Z])(?:' + '|'.join(termos) + r')(?![A-Z])')
+
+
+def preparar_campos(df, colunas=None):
+    """
+    Normaliza uma vez os campos usados pelas regras.
+
+    Args:
+        df: DataFrame de estabelecimentos
+        colunas: dict {campo: coluna} para bases com nomes próprios
+            (ex.: {'nome': 'Field7'})
+
+    Returns:
+        dict {campo: (códigos por linha, valores distintos normalizados)}
+    """
+    campos = {}
+    for campo, candidatas in COLUNAS_CAMPOS.items():
+        coluna = (colunas or {}).get(campo) or next((c for c in candidatas if c in df.columns), None)
+        if coluna is None or coluna not in df.columns:
+            continue
+        normalizar = normalizar_codigo if campo.startswith('tipo') else normalizar_texto
+        if campo + SUFIXO_NORMALIZADO in df.columns and not (colunas or {}).get(campo):
+            # Texto já normalizado na tabela (indice_textual.normalizar_colunas)
+            coluna, normalizar = campo + SUFIXO_NORMALIZADO, None
+        codigos, distintos = pd.factorize(df[coluna], use_na_sentinel=False)
+        if normalizar is not None:
+            distintos = normalizar(distintos)
+        campos[campo] = (codigos, pd.Series(distintos, dtype=object).fillna('').to_numpy(dtype=object))
+    campos['_linhas'] = len(df)
+    return campos
+
+
+def _condicao(regra, campos):
+    """Máscara booleana (por linha) de uma regra"""
+    testes = []
+    for campo, valores in regra['se'].items():
+        if campo not in campos:
+            testes.append(np.zeros(campos['_linhas'], dtype=bool))
+            continue
+        codigos, distintos = campos[campo]
+        if campo.startswith('tipo'):
+            casa = np.isin(distintos, [str(v).upper() for v in valores])
+        else:
+            busca = _expressao(tuple(valores)).search
+            casa = np.fromiter((busca(v) is not None for v in distintos), dtype=bool, count=len(distintos))
+        testes.append(casa[codigos])
+    if not testes:
+        mascara = np.ones(campos['_linhas'], dtype=bool)  # regra só de setor
+    elif regra.get('todos'):
+        mascara = np.logical_and.reduce(testes)
+    else:
+        mascara = np.logical_or.reduce(testes)
+    if 'publico' in regra:
+        mascara &= campos['_publico'] == regra['publico']
+    return mascara
+
+
+def avaliar_regras(campos, regras, padrao):
+    """
+    Id da primeira regra que casa em cada linha.
+
+    Args:
+        campos: dict de preparar_campos (com '_publico' se as regras usam setor)
+        regras: tabela ordenada de regras
+        padrao: id quando nenhuma regra casa
+
+    Returns:
+        numpy array de ids
+    """
+    if not regras or not campos['_linhas']:
+        return np.full(campos['_linhas'], padrao, dtype=object)
+    return np.select([_condicao(regra, campos) for regra in regras],
+                     [regra['id'] for regra in regras], default=padrao).astype(object)
+
+
+def classificar(df, colunas=None, categorias=None, padrao_categoria=None):
+    """
+    Classifica os estabelecimentos em público/privado (e categorias opcionais).
+
+    Args:
+        df: DataFrame de estabelecimentos
+        colunas: dict {campo: coluna} quando os nomes fogem do padrão
+        categorias: tabela de regras de categoria do script (opcional)
+        padrao_categoria: id quando nenhuma regra de categoria casa
+
+    Returns:
+        DataFrame (mesmo índice) com eh_publico, setor, regra_setor e,
+        se houver tabela, categoria
+    """
+    campos = preparar_campos(df, colunas)
+    regra = avaliar_regras(campos, REGRAS_SETOR, SEM_REGRA)
+    publico = regra != SEM_REGRA
+    resultado = pd.DataFrame({
+        'eh_publico': publico,
+        'setor': np.where(publico, 'Público', 'Privado'),
+        'regra_setor': regra,
+    }, index=df.index)
+    if categorias is not None:
+        campos['_publico'] = publico
+        resultado['categoria'] = avaliar_regras(campos, categorias, padrao_categoria)
+    return resultado
+
+
+def main():
+    print("=" * 60)
+    print("🏛️ CLASSIFICAÇÃO PÚBLICO/PRIVADO POR REGRAS")
+    print("=" * 60)
+    if len(sys.argv) > 1:
+        caminho = sys.argv[1]
+        df = pd.read_excel(caminho) if caminho.endswith(('.xlsx', '.xls')) else pd.read_csv(caminho, sep=None, engine='python')
+    else:
+        import dados_canonicos
+        df = dados_canonicos.carregar_dados()
+        if df is None:
+            print("❌ Base canônica não encontrada: execute dashboard_avancado_colorbrewer.py")
+            return None
+    inicio = time.perf_counter()
+    resultado = classificar(df)
+    tempo = time.perf_counter() - inicio
+    print(f"📊 {len(df)} estabelecimentos classificados em {tempo * 1000:.1f} ms")
+    print(f"   🏛️ Públicos: {int(resultado['eh_publico'].sum())} | 🏢 Privados: {int((~resultado['eh_publico']).sum())}")
+    for regra, total in resultado['regra_setor'].value_counts().items():
+        print(f"   • {regra}: {total}")
+    return resultado
+
+
+if __name__ == '__main__':
+    main()
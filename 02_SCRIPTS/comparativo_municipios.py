@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Comparativo Estadual entre Municípios (benchmarking)
+- As métricas do relatório de Concórdia (participação pública, mix de tipos,
+  distribuição das distâncias, % até 5 km, quadrantes) para todos os
+  municípios de SC numa única passada agrupada sobre a base CNES estadual
+- Preparo vetorizado do estado inteiro: município de cada linha por
+  searchsorted, janela de ±1° da sede, filtro pela malha municipal num único
+  spatial join, distância à sede do próprio município, classificação
+  público/privado por regras e quadrantes pela chave espacial em torno da sede
+- Agregados por bincount sobre códigos (município × faixa, × tipo,
+  × quadrante); mediana e P90 das distâncias numa única ordenação
+- Ranking e percentil de cada município no estado (percentil 100 = melhor)
+- Tabela comparativa (CSV + Markdown) e uma página por município em
+  03_RESULTADOS/municipios/<codigo>_<nome>/comparativo.md (mesma pasta do
+  lote de gerar_lote_municipios.py), de um template compilado uma vez
+
+Uso:
+    python 02_SCRIPTS/comparativo_municipios.py                  # todos de SC
+    python 02_SCRIPTS/comparativo_municipios.py 420430 420540    # páginas só desses
+    python 02_SCRIPTS/comparativo_municipios.py --sedes municipios.csv
+
+Autor: Caetano Ronan
+Instituição: UFSC
+"""
+
+import os
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from jinja2 import Environment
+
+import gerar_lote_municipios as lote
+import agregacao_grade
+import classificacao_estabelecimentos
+from metricas_estabelecimentos import LIMITES_DISTANCIA_KM
+
+dashboard = lote.dashboard
+
+ARQUIVO_TABELA = os.path.join(dashboard.OUTPUT_DIR, 'comparativo_municipios')
+ARQUIVO_PAGINA = 'comparativo.md'
+JANELA_GRAUS = 1  # mesma janela em torno da sede de processar_coordenadas
+
+# Métrica -> (rótulo, maior é melhor, casas decimais)
+METRICAS_RANKING = {
+    'estabelecimentos': ('Estabelecimentos', True, 0),
+    'perc_publico': ('% públicos', True, 1),
+    'perc_ate_5km': ('% até 5 km da sede', True, 1),
+    'perc_publicos_ate_5km': ('% dos públicos até 5 km', True, 1),
+    'dist_media_km': ('Distância média (km)', False, 2),
+    'dist_p90_km': ('Distância P90 (km)', False, 2),
+}
+
+
+def _coluna(df, parte):
+    return next((c for c in df.columns if parte in c.upper()), None)
+
+
+def preparar_base(df_sc, municipios):
+    """
+    Estabelecimentos de todos os municípios prontos para agregar.
+
+    Args:
+        df_sc: base CNES estadual
+        municipios: lista de listar_municipios (ordenada por código)
+
+    Returns:
+        DataFrame com grupo (posição em municipios), dist_centro,
+        eh_publico, tipo_descricao e quadrante
+    """
+    codigos = np.array([m['codigo'] for m in municipios], dtype=np.int64)
+    centros = np.array([m['centro'] for m in municipios], dtype=float).reshape(-1, 2)
+    codigo_linha = pd.to_numeric(df_sc['CO_MUNICIPIO_GESTOR'], errors='coerce').fillna(-1).to_numpy(dtype=np.int64)
+    grupo = np.full(len(df_sc), -1, dtype=np.int64)
+    if len(codigos):
+        posicao = np.minimum(np.searchsorted(codigos, codigo_linha), len(codigos) - 1)
+        grupo = np.where(codigos[posicao] == codigo_linha, posicao, -1)
+
+    lat_col, lon_col = _coluna(df_sc, 'LAT'), _coluna(df_sc, 'LON')
+    lat = pd.to_numeric(df_sc[lat_col], errors='coerce').to_numpy(dtype=float)
+    lon = pd.to_numeric(df_sc[lon_col], errors='coerce').to_numpy(dtype=float)
+    lat_c, lon_c = centros[np.maximum(grupo, 0), 0], centros[np.maximum(grupo, 0), 1]
+    manter = ((grupo >= 0) & (np.abs(lat - lat_c) <= JANELA_GRAUS)
+              & (np.abs(lon - lon_c) <= JANELA_GRAUS))
+
+    base = df_sc.loc[manter].copy()
+    base[lat_col], base[lon_col] = lat[manter], lon[manter]
+    base['grupo'] = grupo[manter]
+    base = _filtrar_na_malha(base, lat_col, lon_col, codigos)
+
+    # Distância à sede do próprio município (Haversine vetorizada)
+    lat1, lon1 = np.radians(base[lat_col].to_numpy()), np.radians(base[lon_col].to_numpy())
+    lat2, lon2 = np.radians(centros[base['grupo'], 0]), np.radians(centros[base['grupo'], 1])
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    base['dist_centro'] = 2 * 6371 * np.arcsin(np.sqrt(a))
+
+    base['eh_publico'] = classificacao_estabelecimentos.classificar(base)['eh_publico']
+    if 'TP_UNIDADE' in base.columns:
+        base['tipo_descricao'] = base['TP_UNIDADE'].astype(str).map(dashboard.TIPOS_PRINCIPAIS).fillna('Outros')
+    elif 'TIPO' in base.columns:
+        base['tipo_descricao'] = base['TIPO']
+    else:
+        base['tipo_descricao'] = 'Estabelecimento de Saúde'
+    chaves = agregacao_grade.chaves_espaciais(base[lat_col].to_numpy(), base[lon_col].to_numpy())
+    chaves_sede = agregacao_grade.chaves_espaciais(centros[:, 0], centros[:, 1])
+    base['quadrante'] = agregacao_grade.quadrantes(chaves, chaves_sede, grupos=base['grupo'].to_numpy())
+    return base[['grupo', 'dist_centro', 'eh_publico', 'tipo_descricao', 'quadrante']]
+
+
+def _filtrar_na_malha(base, lat_col, lon_col, codigos):
+    """Mantém só os pontos dentro do polígono do próprio município (um sjoin)"""
+    try:
+        gdf_sc = dashboard.carregar_malha_municipios_sc() if dashboard.gpd is not None else None
+    except Exception as e:
+        print(f"   ⚠️ Malha municipal indisponível, sem filtro por polígono: {e}")
+        gdf_sc = None
+    if gdf_sc is None or base.empty:
+        return base
+    cod_col = next(c for c in gdf_sc.columns if 'CD' in c.upper() and 'MUN' in c.upper())
+    malha = gdf_sc[[cod_col, 'geometry']].copy()
+    malha['codigo_malha'] = malha[cod_col].astype(str).str[:6].astype(np.int64)
+    pontos = dashboard.gpd.GeoDataFrame(
+        {'linha': np.arange(len(base)), 'codigo': codigos[base['grupo'].to_numpy()]},
+        geometry=dashboard.gpd.points_from_xy(base[lon_col], base[lat_col]), crs='EPSG:4326')
+    juncao = dashboard.gpd.sjoin(pontos, malha[['codigo_malha', 'geometry']], how='inner', predicate='within')
+    dentro = juncao.loc[juncao['codigo'] == juncao['codigo_malha'], 'linha'].unique()
+    return base.iloc[np.sort(dentro)]
+
+
+def _quantis_por_grupo(grupo, valores, k, quantis):
+    """Quantis (interpolação linear, como pandas) por grupo numa ordenação só"""
+    ordem = np.lexsort((valores, grupo))
+    ordenados = valores[ordem]
+    contagem = np.bincount(grupo, minlength=k)
+    inicio = np.concatenate([[0], np.cumsum(contagem)[:-1]])
+    resultado = {}
+    for q in quantis:
+        posicao = inicio + (np.maximum(contagem, 1) - 1) * q
+        baixo = np.floor(posicao).astype(np.int64)
+        alto = np.ceil(posicao).astype(np.int64)
+        if len(ordenados):
+            baixo, alto = np.minimum(baixo, len(ordenados) - 1), np.minimum(alto, len(ordenados) - 1)
+            valor = ordenados[baixo] + (ordenados[alto] - ordenados[baixo]) * (posicao - baixo)
+        else:
+            valor = np.zeros(k)
+        resultado[q] = np.where(contagem > 0, valor, np.nan)
+    return resultado
+
+
+def calcular_comparativo(base, municipios, limites_km=LIMITES_DISTANCIA_KM):
+    """
+    Métricas de todos os municípios numa passada agrupada.
+
+    Returns:
+        (tabela, mix_tipos, estado): tabela indexada pelo código IBGE,
+        contagens município × tipo e dict com os totais do estado
+    """
+    k = len(municipios)
+    grupo = base['grupo'].to_numpy(dtype=np.int64)
+    dist = base['dist_centro'].to_numpy(dtype=float)
+    publico = base['eh_publico'].to_numpy(dtype=bool)
+    limites = sorted(limites_km)
+    n_faixas = len(limites) + 1
+
+    total = np.bincount(grupo, minlength=k)
+    publicos = np.bincount(grupo, weights=publico, minlength=k).astype(int)
+    soma = np.bincount(grupo, weights=dist, minlength=k)
+    soma2 = np.bincount(grupo, weights=dist ** 2, minlength=k)
+    maximo = np.full(k, -np.inf)
+    np.maximum.at(maximo, grupo, dist)
+    quantis = _quantis_por_grupo(grupo, dist, k, (0.5, 0.9))
+
+    # Município × faixa de distância × setor num único bincount
+    faixa = np.searchsorted(np.asarray(limites, dtype=float), dist, side='left')
+    tabela_faixas = np.bincount((grupo * n_faixas + faixa) * 2 + publico,
+                                minlength=k * n_faixas * 2).reshape(k, n_faixas, 2)
+    acumulado = np.cumsum(tabela_faixas[:, :-1], axis=1)
+
+    codigos_tipo, tipos = pd.factorize(base['tipo_descricao'].astype(str), sort=True)
+    mix = np.bincount(grupo * len(tipos) + codigos_tipo, minlength=k * len(tipos)).reshape(k, len(tipos))
+    rotulos_quadrante = list(agregacao_grade.ROTULOS_QUADRANTE)
+    codigos_quad = pd.Categorical(base['quadrante'], categories=rotulos_quadrante).codes
+    quad_validos = codigos_quad >= 0
+    quad = np.bincount(grupo[quad_validos] * 4 + codigos_quad[quad_validos], minlength=k * 4).reshape(k, 4)
+
+    predominante = (np.asarray(tipos, dtype=object)[mix.argmax(axis=1)] if len(tipos)
+                    else np.full(k, '', dtype=object))
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        n = np.where(total > 0, total, np.nan)
+        media = soma / n
+        tabela = pd.DataFrame({
+            'nome': [m['nome'] for m in municipios],
+            'estabelecimentos': total,
+            'publicos': publicos,
+            'perc_publico': publicos / n * 100,
+            'dist_media_km': media,
+            'dist_mediana_km': quantis[0.5],
+            'dist_p90_km': quantis[0.9],
+            'dist_max_km': np.where(total > 0, maximo, np.nan),
+            'dist_desvio_km': np.sqrt(np.maximum(soma2 - total * media ** 2, 0) / np.where(total > 1, total - 1, np.nan)),
+            **{f'ate_{limite}km': acumulado[:, i].sum(axis=1) for i, limite in enumerate(limites)},
+            f'acima_{limites[-1]}km': total - acumulado[:, -1].sum(axis=1),
+            'perc_ate_5km': acumulado[:, limites.index(5), :].sum(axis=1) / n * 100 if 5 in limites else np.nan,
+            'perc_publicos_ate_5km': (acumulado[:, limites.index(5), 1] / np.where(publicos > 0, publicos, np.nan) * 100
+                                      if 5 in limites else np.nan),
+            'n_tipos': (mix > 0).sum(axis=1),
+            'tipo_predominante': np.where(total > 0, predominante, ''),
+            **{f'quad_{rotulo}': quad[:, i] for i, rotulo in enumerate(rotulos_quadrante)},
+        }, index=pd.Index([m['codigo'] for m in municipios], name='codigo'))
+
+    for metrica, (_, maior_melhor, _) in METRICAS_RANKING.items():
+        serie = tabela[metrica]
+        tabela[f'ranking_{metrica}'] = serie.rank(ascending=not maior_melhor, method='min').astype('Int64')
+        tabela[f'percentil_{metrica}'] = (serie.rank(ascending=maior_melhor, pct=True) * 100).round(1)
+
+    estado = {
+        'municipios': k,
+        'com_estabelecimentos': int((total > 0).sum()),
+        'estabelecimentos': int(total.sum()),
+        'publicos': int(publicos.sum()),
+        'mix_tipos': dict(zip(tipos, mix.sum(axis=0).tolist())),
+        'medianas': tabela.loc[total > 0, list(METRICAS_RANKING)].median().to_dict(),
+    }
+    mix_tipos = pd.DataFrame(mix, index=tabela.index, columns=pd.Index(tipos, name='tipo'))
+    return tabela, mix_tipos, estado
+
+
+_AMBIENTE = Environment(autoescape=False, trim_blocks=True, lstrip_blocks=True)
+_AMBIENTE.filters['num'] = lambda v, casas=1: 'N/D' if v is None or pd.isna(v) else f'{v:.{casas}f}'
+_AMBIENTE.filters['posicao'] = lambda v, de: 'N/D' if pd.isna(v) else f'{int(v)}º de {de}'
+
+MODELO_PAGINA = _AMBIENTE.from_string("""
+# 📊 COMPARATIVO ESTADUAL - {{ m.nome }} ({{ codigo }})
+
+**Data:** {{ data }}
+**Autor:** Caetano Ronan
+**Instituição:** UFSC
+**Base:** CNES/DataSUS, {{ estado.estabelecimentos }} estabelecimentos em {{ estado.municipios }} municípios de SC
+
+---
+
+## 🏆 POSIÇÃO NO ESTADO
+
+{% if m.estabelecimentos == 0 %}
+Nenhum estabelecimento com coordenadas válidas no município.
+{% else %}
+| Métrica | {{ m.nome }} | Mediana SC | Ranking | Percentil |
+|---------|-------------|------------|---------|-----------|
+{% for metrica, (rotulo, _, casas) in metricas.items() %}
+| {{ rotulo }} | {{ m[metrica]|num(casas) }} | {{ estado.medianas[metrica]|num(casas) }} | {{ m['ranking_' ~ metrica]|posicao(estado.com_estabelecimentos) }} | {{ m['percentil_' ~ metrica]|num }} |
+{% endfor %}
+
+## 🏥 MIX DE TIPOS
+
+| Tipo | Quantidade | % no município | % no estado |
+|------|------------|----------------|-------------|
+{% for tipo, qtd in tipos.items() %}
+| {{ tipo }} | {{ qtd }} | {{ (qtd / m.estabelecimentos * 100)|num }}% | {{ (estado.mix_tipos[tipo] / estado.estabelecimentos * 100)|num }}% |
+{% endfor %}
+
+## 📏 DISTÂNCIAS À SEDE
+
+- **Média:** {{ m.dist_media_km|num(2) }} km (desvio {{ m.dist_desvio_km|num(2) }} km)
+- **Mediana:** {{ m.dist_mediana_km|num(2) }} km | **P90:** {{ m.dist_p90_km|num(2) }} km | **Máxima:** {{ m.dist_max_km|num(2) }} km
+{% for limite in limites %}
+- **≤ {{ limite }}km:** {{ m['ate_' ~ limite ~ 'km'] }} ({{ (m['ate_' ~ limite ~ 'km'] / m.estabelecimentos * 100)|num }}%)
+{% endfor %}
+- **> {{ limites[-1] }}km:** {{ m['acima_' ~ limites[-1] ~ 'km'] }}
+
+## 🗺️ QUADRANTES
+
+*Em relação à sede de cada município (tile da chave espacial).*
+
+| Quadrante | Estabelecimentos |
+|-----------|------------------|
+{% for rotulo in quadrantes %}
+| {{ rotulo }} | {{ m['quad_' ~ rotulo] }} |
+{% endfor %}
+{% endif %}
+
+---
+
+**© 2025 | Universidade Federal de Santa Catarina (UFSC)**
+**Tabela completa:** `03_RESULTADOS/comparativo_municipios.csv`
+""")
+
+
+def gerar_paginas(tabela, mix_tipos, estado, codigos=None, limites_km=LIMITES_DISTANCIA_KM):
+    """
+    Escreve a página comparativa de cada município (pasta do lote).
+
+    Args:
+        codigos: códigos IBGE a gerar (None = todos)
+
+    Returns:
+        número de páginas escritas
+    """
+    data = pd.Timestamp.now().strftime('%d/%m/%Y %H:%M')
+    selecionados = tabela.index if not codigos else tabela.index[tabela.index.isin({int(str(c)[:6]) for c in codigos})]
+    # Linhas como dicts e tipos em ordem decrescente, preparados uma vez
+    registros = tabela.loc[selecionados].to_dict('index')
+    contagens = mix_tipos.loc[selecionados].to_numpy()
+    ordem_tipos = np.argsort(-contagens, axis=1, kind='stable')
+    nomes_tipos = np.asarray(mix_tipos.columns, dtype=object)
+    limites = sorted(limites_km)
+    for (codigo, m), linha, ordem in zip(registros.items(), contagens, ordem_tipos):
+        tipos = {nomes_tipos[i]: int(linha[i]) for i in ordem if linha[i] > 0}
+        pasta = os.path.join(lote.MUNICIPIOS_DIR, f"{codigo}_{lote._slug(m['nome'])}")
+        os.makedirs(pasta, exist_ok=True)
+        with open(os.path.join(pasta, ARQUIVO_PAGINA), 'w', encoding='utf-8') as f:
+            f.write(MODELO_PAGINA.render(
+                m=m, codigo=codigo, data=data, estado=estado, metricas=METRICAS_RANKING,
+                tipos=tipos, limites=limites, quadrantes=agregacao_grade.ROTULOS_QUADRANTE))
+    return len(selecionados)
+
+
+def salvar_tabela(tabela, caminho_base=ARQUIVO_TABELA):
+    """Tabela comparativa em CSV e Markdown (ordenada pelo nome)"""
+    os.makedirs(os.path.dirname(caminho_base), exist_ok=True)
+    tabela.round(2).to_csv(f'{caminho_base}.csv', encoding='utf-8')
+    colunas = ['nome', 'estabelecimentos', 'perc_publico', 'perc_ate_5km', 'dist_media_km',
+               'tipo_predominante', 'ranking_perc_publico', 'ranking_perc_ate_5km']
+    linhas = ['| Código | ' + ' | '.join(colunas) + ' |', '|' + '---|' * (len(colunas) + 1)]
+    for codigo, linha in tabela.sort_values('nome')[colunas].iterrows():
+        valores = ['N/D' if pd.isna(v) else f'{v:.1f}' if isinstance(v, float) else str(v) for v in linha]
+        linhas.append(f'| {codigo} | ' + ' | '.join(valores) + ' |')
+    with open(f'{caminho_base}.md', 'w', encoding='utf-8') as f:
+        f.write('# 📊 Comparativo entre Municípios de SC\n\n' + '\n'.join(linhas) + '\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Comparativo estadual entre municípios')
+    parser.add_argument('codigos', nargs='*', help='códigos IBGE das páginas (padrão: todos)')
+    parser.add_argument('--sedes', default=None, help='CSV com codigo_ibge, latitude, longitude das sedes')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("📊 COMPARATIVO ESTADUAL ENTRE MUNICÍPIOS")
+    print("=" * 70)
+    lote.carregar_camadas_compartilhadas()
+    df_sc = dashboard.CAMADAS_COMPARTILHADAS.get('estabelecimentos_sc')
+    municipios = lote.listar_municipios(None, args.sedes)
+    if df_sc is None or not municipios:
+        print("❌ Base CNES estadual ausente: o comparativo precisa de Tabela_estado_SC.csv")
+        return None
+
+    tempos = {}
+    t0 = time.perf_counter()
+    base = preparar_base(df_sc, municipios)
+    tempos['preparo'] = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    tabela, mix_tipos, estado = calcular_comparativo(base, municipios)
+    tempos['metricas'] = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    salvar_tabela(tabela)
+    paginas = gerar_paginas(tabela, mix_tipos, estado, args.codigos)
+    tempos['paginas'] = time.perf_counter() - t0
+
+    print(f"✅ {estado['estabelecimentos']} estabelecimentos em {estado['com_estabelecimentos']}/{estado['municipios']} municípios")
+    print(f"   ⏱️ Preparo {tempos['preparo']:.2f} s | métricas {tempos['metricas']:.2f} s | "
+          f"{paginas} páginas {tempos['paginas']:.2f} s")
+    print(f"   📋 Tabela: {ARQUIVO_TABELA}.csv (+ .md)")
+    print(f"   📄 Páginas: {lote.MUNICIPIOS_DIR}/<codigo>_<nome>/{ARQUIVO_PAGINA}")
+    return tabela
+
+
+if __name__ == '__main__':
+    main()
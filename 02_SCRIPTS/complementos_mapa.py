@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Complementos de Mapa Registrados na Geração
+- Título, rodapé, rosa dos ventos, legendas, limites administrativos e
+  controles (camadas, tela cheia, medição, zoom máximo) entram no mapa como
+  MacroElements no momento da construção
+- Um único save() produz o artefato final: nenhum script precisa reabrir o
+  HTML para injetar elementos depois (ver remendos_html para mapas antigos)
+- Os mesmos complementos geram os fragmentos HTML do backend direto
+  (mapa_html_direto.emitir_mapa(html_extra=...))
+
+Cada construtor de mapa tem complementos padrão; quem chama pode acrescentar,
+substituir (mesmo nome) ou remover (valor None) complementos:
+
+    criar_mapa_camadas(df, complementos={
+        'zoom_maximo': {'nivel': 19},
+        'rosa_ventos': None,
+    })
+
+Autor: Caetano Ronan
+Instituição: UFSC
+"""
+
+import folium
+from folium import plugins
+from branca.element import MacroElement
+from jinja2 import Template
+
+import camadas_topojson
+
+COMPLEMENTOS = {}  # tipo -> fábrica(mapa, **opções) -> elemento ou None
+
+
+def registrar(tipo):
+    """Decorador: registra a fábrica de um tipo de complemento"""
+    def decorar(fabrica):
+        COMPLEMENTOS[tipo] = fabrica
+        return fabrica
+    return decorar
+
+
+class ElementoFixo(MacroElement):
+    """
+    Fragmento HTML fixo sobre o mapa (título, rodapé, legenda, rosa dos ventos),
+    escrito no <body> da página quando o mapa é salvo.
+    """
+    _template = Template("""
+        {% macro html(this, kwargs) %}{{ this.conteudo }}{% endmacro %}
+    """)
+
+    def __init__(self, conteudo, nome='ElementoFixo'):
+        super().__init__()
+        self._name = nome
+        self.conteudo = conteudo
+
+
+def html_titulo(titulo, subtitulo='', cor_borda='#238b45', cor_titulo='#00441b'):
+    """Caixa de título centralizada no topo do mapa"""
+    return f'''
+    <div style="position: fixed;
+                top: 10px;
+                left: 50%;
+                transform: translateX(-50%);
+                width: auto;
+                max-width: 90%;
+                height: auto;
+                background-color: white;
+                border: 3px solid {cor_borda};
+                border-radius: 10px;
+                z-index: 9999;
+                padding: 15px 25px;
+                box-shadow: 0 4px 8px rgba(0,0,0,0.3);
+                text-align: center;
+                font-family: 'Arial', sans-serif;">
+        <h2 style="margin: 0;
+                   padding: 0;
+                   font-size: 22px;
+                   font-weight: bold;
+                   color: {cor_titulo};
+                   line-height: 1.3;">
+            {titulo}
+        </h2>
+        <p style="margin: 5px 0 0 0;
+                  padding: 0;
+                  font-size: 16px;
+                  color: {cor_borda};
+                  font-weight: 600;">
+            {subtitulo}
+        </p>
+    </div>
+    '''
+
+
+def html_rodape(texto=None, cor_borda='#238b45'):
+    """Rodapé com fonte dos dados e autoria"""
+    texto = texto or ('<b>Fonte:</b> CNES/DataSUS | IBGE | \n'
+                      '            <b>Autor:</b> Ronan Armando Caetano, Graduando em Ciências Biológicas '
+                      'UFSC e Técnico em Geoprocessamento IFSC')
+    return f'''
+    <div style="position: fixed;
+                bottom: 10px;
+                left: 50%;
+                transform: translateX(-50%);
+                width: auto;
+                max-width: 95%;
+                height: auto;
+                background-color: rgba(255, 255, 255, 0.95);
+                border: 2px solid {cor_borda};
+                border-radius: 8px;
+                z-index: 9999;
+                padding: 10px 20px;
+                box-shadow: 0 2px 6px rgba(0,0,0,0.2);
+                text-align: center;
+                font-family: 'Arial', sans-serif;">
+        <p style="margin: 0;
+                  padding: 0;
+                  font-size: 12px;
+                  color: #333;
+                  line-height: 1.6;">
+            {texto}
+        </p>
+    </div>
+    '''
+
+
+def html_rosa_ventos(inferior='100px', direita='30px'):
+    """Rosa dos ventos (N, S, L, O), por padrão no canto inferior direito"""
+    return f'''
+    <div id="rosa-ventos-unica" style="
+        position: fixed;
+        bottom: {inferior};
+        right: {direita};
+        width: 75px;
+        height: 75px;
+        z-index: 10001;
+        background: rgba(255, 255, 255, 0.9);
+        border: 2px solid #2c5aa0;
+        border-radius: 50%;
+        box-shadow: 0 2px 8px rgba(0,0,0,0.3);
+        display: flex;
+        align-items: center;
+        justify-content: center;">
+        <svg width="70" height="70" viewBox="0 0 100 100">
+            <circle cx="50" cy="50" r="48" fill="white" stroke="#2c5aa0" stroke-width="2"/>
+            <!-- Seta Norte (Vermelha) -->
+            <path d="M 50 10 L 55 40 L 50 35 L 45 40 Z" fill="#cc0000"/>
+            <!-- Seta Sul -->
+            <path d="M 50 90 L 55 60 L 50 65 L 45 60 Z" fill="#666"/>
+            <!-- Seta Leste -->
+            <path d="M 90 50 L 60 55 L 65 50 L 60 45 Z" fill="#666"/>
+            <!-- Seta Oeste -->
+            <path d="M 10 50 L 40 55 L 35 50 L 40 45 Z" fill="#666"/>
+            <!-- Letras -->
+            <text x="50" y="22" text-anchor="middle" font-size="14" font-weight="bold" fill="#cc0000">N</text>
+            <text x="50" y="95" text-anchor="middle" font-size="12" font-weight="bold" fill="#666">S</text>
+            <text x="85" y="55" text-anchor="middle" font-size="12" font-weight="bold" fill="#666">L</text>
+            <text x="15" y="55" text-anchor="middle" font-size="12" font-weight="bold" fill="#666">O</text>
+        </svg>
+    </div>
+    '''
+
+
+@registrar('html')
+def _html(mapa, html, nome='ElementoFixo'):
+    return ElementoFixo(html, nome)
+
+
+@registrar('titulo')
+def _titulo(mapa, titulo, subtitulo='', cor_borda='#238b45', cor_titulo='#00441b'):
+    return ElementoFixo(html_titulo(titulo, subtitulo, cor_borda, cor_titulo), 'Titulo')
+
+
+@registrar('rodape')
+def _rodape(mapa, texto=None, cor_borda='#238b45'):
+    return ElementoFixo(html_rodape(texto, cor_borda), 'Rodape')
+
+
+@registrar('rosa_ventos')
+def _rosa_ventos(mapa, inferior='100px', direita='30px'):
+    return ElementoFixo(html_rosa_ventos(inferior, direita), 'RosaVentos')
+
+
+@registrar('controle_camadas')
+def _controle_camadas(mapa, posicao='topleft', recolhido=False, **opcoes):
+    # LayerControl simples: checkboxes independentes (GroupedLayerControl
+    # impedia sobrepor camadas do mesmo grupo)
+    return folium.LayerControl(position=posicao, collapsed=recolhido, **opcoes)
+
+
+@registrar('tela_cheia')
+def _tela_cheia(mapa, posicao='topleft'):
+    return plugins.Fullscreen(position=posicao)
+
+
+@registrar('medida')
+def _medida(mapa, posicao='topleft'):
+    return plugins.MeasureControl(position=posicao)
+
+
+@registrar('zoom_maximo')
+def _zoom_maximo(mapa, nivel=18):
+    # Folium guarda as opções em snake_case e converte para camelCase ao renderizar;
+    # max_native_zoom fica como está (o Leaflet amplia o último nível de tiles)
+    if mapa is not None:
+        mapa.options['max_zoom'] = nivel
+        for filho in mapa._children.values():
+            if isinstance(filho, folium.TileLayer):
+                filho.options['max_zoom'] = nivel
+    return None
+
+
+@registrar('limites')
+def _limites(mapa, gdf, nome_camada, nome_objeto, mostrar=True, **opcoes):
+    """Limites administrativos em TopoJSON num FeatureGroup próprio"""
+    if mapa is None or gdf is None or gdf.empty:
+        return None
+    grupo = folium.FeatureGroup(name=nome_camada, show=mostrar)
+    camadas_topojson.CamadaLimites(gdf, nome_objeto, **opcoes).add_to(grupo)
+    return grupo
+
+
+def combinar(padrao, extras=None):
+    """
+    Complementos padrão + extras de quem chama.
+
+    Args:
+        padrao: dict {nome: opções}
+        extras: dict {nome: opções ou None}; mesmo nome substitui, None remove
+
+    Returns:
+        dict {nome: opções} na ordem de aplicação
+    """
+    combinados = dict(padrao)
+    combinados.update(extras or {})
+    return {nome: opcoes for nome, opcoes in combinados.items() if opcoes is not None}
+
+
+def _construir(mapa, nome, opcoes):
+    opcoes = dict(opcoes)
+    tipo = opcoes.pop('tipo', nome)
+    if tipo not in COMPLEMENTOS:
+        raise KeyError(f"Complemento desconhecido: {tipo} (registrados: {', '.join(sorted(COMPLEMENTOS))})")
+    return COMPLEMENTOS[tipo](mapa, **opcoes)
+
+
+def aplicar_complementos(mapa, padrao, extras=None):
+    """
+    Adiciona os complementos ao mapa Folium durante a construção.
+
+    Args:
+        mapa: folium.Map
+        padrao: complementos padrão do construtor ({nome: opções})
+        extras: complementos de quem chama ({nome: opções ou None})
+
+    Returns:
+        lista com os nomes aplicados
+    """
+    aplicados = []
+    for nome, opcoes in combinar(padrao, extras).items():
+        elemento = _construir(mapa, nome, opcoes)
+        if elemento is not None:
+            elemento.add_to(mapa)
+        aplicados.append(nome)
+    return aplicados
+
+
+def fragmento_html(padrao, extras=None):
+    """
+    HTML dos complementos fixos (título, rodapé, rosa...) para o backend direto;
+    controles e camadas Folium são ignorados (o emissor tem os seus).
+    """
+    partes = []
+    for nome, opcoes in combinar(padrao, extras).items():
+        elemento = _construir(None, nome, opcoes)
+        if isinstance(elemento, ElementoFixo):
+            partes.append(elemento.conteudo)
+    return ''.join(partes)
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Construção Incremental dos Resultados (grafo de dependências)
+- Cada alvo declara o script que o gera, as entradas (base CNES, shapefiles,
+  planilhas), as saídas e os alvos de que depende
+- Versão do código = hash do script e dos módulos do projeto que ele importa
+  (paletas e parâmetros estão no código)
+- Só os alvos com entradas/código alterados ou saídas ausentes são refeitos;
+  se um alvo refeito gerar saídas idênticas, os dependentes não são refeitos
+- Alvos independentes rodam em paralelo (cada um em seu processo Python)
+- Hash de arquivo reaproveitado enquanto tamanho e data de modificação não
+  mudam: uma reconstrução sem alterações só consulta o sistema de arquivos
+
+Uso:
+    python 02_SCRIPTS/construir.py                  # todos os alvos
+    python 02_SCRIPTS/construir.py dashboard_avancado tiles_vetoriais
+    python 02_SCRIPTS/construir.py --seco           # só lista o que está desatualizado
+    python 02_SCRIPTS/construir.py --forcar --processos 2
+
+Autor: Caetano Ronan
+Instituição: UFSC
+"""
+
+import os
+import ast
+import sys
+import glob
+import json
+import time
+import hashlib
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(SCRIPT_DIR)
+ESTADO_DIR = os.path.join(ROOT_DIR, '03_RESULTADOS', '.construcao')
+ARQUIVO_ESTADO = os.path.join(ESTADO_DIR, 'estado.json')
+LOGS_DIR = os.path.join(ESTADO_DIR, 'logs')
+
+# Entradas compartilhadas (caminhos relativos a ROOT_DIR; aceitam curingas)
+BASE_CNES = ['01_DADOS/originais/Tabela_estado_SC.csv', 'Tabela_estado_SC.xlsx']
+BASE_PROCESSADA = ['01_DADOS/processados/concordia_saude_simples.csv']
+SHP_MUNICIPIOS = ['SC_Municipios_2024/SC_Municipios_2024.*']
+SHP_SETORES = ['Concordia_sencitario.*', '03_RESULTADOS/shapefiles/Concordia_sencitario.*',
+               'SC_setores_CD2022.gpkg']
+SHP_VORONOI = ['voronoi_recortado.*', '03_RESULTADOS/shapefiles/voronoi_recortado.*']
+
+ALVOS = {
+    'dashboard_avancado': {
+        'script': 'dashboard_avancado_colorbrewer.py',
+        'entradas': BASE_CNES + BASE_PROCESSADA + SHP_MUNICIPIOS + SHP_SETORES,
+        'saidas': [
+            '03_RESULTADOS/mapas/mapa_avancado_colorbrewer.html',
+            '03_RESULTADOS/dashboard_completo_colorbrewer.png',
+            '03_RESULTADOS/dashboard_completo_colorbrewer.pdf',
+            '03_RESULTADOS/relatorio_analise_avancada_colorbrewer.md',
+            '03_RESULTADOS/dados_processados_colorbrewer.csv',
+            '03_RESULTADOS/dados/estabelecimentos.json',
+            '03_RESULTADOS/cubo_agregado.json',
+            'docs/mapa_avancado_colorbrewer.html',
+            'docs/dashboard_crossfilter.html',
+        ],
+    },
+    'tiles_vetoriais': {
+        'script': 'tiles_vetoriais.py',
+        'entradas': SHP_SETORES + SHP_MUNICIPIOS + SHP_VORONOI,
+        'saidas': [
+            '03_RESULTADOS/mapas/tiles_vetoriais/piramide.json',
+            'docs/tiles_vetoriais/piramide.json',
+        ],
+    },
+    'mapa_camadas_detalhadas': {
+        'script': 'mapa_camadas_detalhadas.py',
+        'entradas': BASE_CNES + SHP_MUNICIPIOS + SHP_SETORES + SHP_VORONOI,
+        'saidas': [
+            '03_RESULTADOS/mapas/mapa_camadas_detalhadas.html',
+            'docs/mapa_camadas_detalhadas.html',
+        ],
+        # Sem o Excel da base SC, lê a base canônica gravada pelo dashboard
+        'depende': ['tiles_vetoriais', 'dashboard_avancado'],
+    },
+    'mapa_completo_corrigido': {
+        'script': 'MAPA_COMPLETO_CORRIGIDO.py',
+        'entradas': ['Concordia_ps.xlsx'] + BASE_PROCESSADA + SHP_MUNICIPIOS + SHP_SETORES + SHP_VORONOI,
+        'saidas': ['docs/mapa_completo_corrigido.html'],
+    },
+    'mapa_filtrado': {
+        'script': 'criar_mapa_filtrado.py',
+        'entradas': ['01_DADOS/processados/concordia_saude_filtrado.csv'] + SHP_MUNICIPIOS,
+        'saidas': ['docs/mapa_estabelecimentos_filtrado.html'],
+    },
+    'comparativo_municipios': {
+        'script': 'comparativo_municipios.py',
+        'entradas': BASE_CNES + SHP_MUNICIPIOS,
+        'saidas': [
+            '03_RESULTADOS/comparativo_municipios.csv',
+            '03_RESULTADOS/comparativo_municipios.md',
+        ],
+    },
+    'tamanho_topojson': {
+        'script': 'camadas_topojson.py',
+        'entradas': SHP_MUNICIPIOS + SHP_SETORES + SHP_VORONOI,
+        'saidas': ['03_RESULTADOS/relatorio_tamanho_topojson.csv'],
+    },
+}
+
+
+class CacheHashes:
+    """
+    Hash SHA-256 por arquivo, recalculado só quando (tamanho, mtime) muda.
+    """
+
+    def __init__(self, registros=None):
+        self.registros = registros or {}
+
+    def hash(self, caminho):
+        """Hash do conteúdo ou None se o arquivo não existe"""
+        try:
+            info = os.stat(caminho)
+        except FileNotFoundError:
+            return None
+        relativo = os.path.relpath(caminho, ROOT_DIR).replace(os.sep, '/')
+        marca = [info.st_size, info.st_mtime_ns]
+        anterior = self.registros.get(relativo)
+        if anterior and anterior[:2] == marca:
+            return anterior[2]
+        sha = hashlib.sha256()
+        with open(caminho, 'rb') as f:
+            for bloco in iter(lambda: f.read(1 << 20), b''):
+                sha.update(bloco)
+        self.registros[relativo] = marca + [sha.hexdigest()]
+        return sha.hexdigest()
+
+
+def modulos_do_projeto(script):
+    """
+    Script + módulos de 02_SCRIPTS importados por ele (fechamento transitivo).
+
+    Returns:
+        lista ordenada de caminhos .py
+    """
+    vistos = set()
+    pendentes = [os.path.join(SCRIPT_DIR, script)]
+    while pendentes:
+        caminho = pendentes.pop()
+        if caminho in vistos or not os.path.isfile(caminho):
+            continue
+        vistos.add(caminho)
+        with open(caminho, 'r', encoding='utf-8') as f:
+            arvore = ast.parse(f.read(), filename=caminho)
+        for no in ast.walk(arvore):
+            if isinstance(no, ast.Import):
+                nomes = [a.name for a in no.names]
+            elif isinstance(no, ast.ImportFrom) and no.module and not no.level:
+                nomes = [no.module]
+            else:
+                continue
+            for nome in nomes:
+                pendentes.append(os.path.join(SCRIPT_DIR, nome.split('.')[0] + '.py'))
+    return sorted(vistos)
+
+
+def expandir(padroes):
+    """Caminhos absolutos que casam com os padrões (padrões sem arquivo ficam registrados)"""
+    caminhos = []
+    for padrao in padroes:
+        achados = sorted(glob.glob(os.path.join(ROOT_DIR, padrao)))
+        caminhos.extend(achados or [os.path.join(ROOT_DIR, padrao)])
+    return caminhos
+
+
+def assinatura(alvo, cache):
+    """
+    Hash das entradas, do código e das saídas dos alvos de que depende.
+
+    Returns:
+        (hex, dict {caminho relativo: hash ou None})
+    """
+    spec = ALVOS[alvo]
+    arquivos = expandir(spec['entradas'])
+    for dependencia in spec.get('depende', []):
+        arquivos += expandir(ALVOS[dependencia]['saidas'])
+    arquivos += modulos_do_projeto(spec['script'])
+    componentes = {
+        os.path.relpath(c, ROOT_DIR).replace(os.sep, '/'): cache.hash(c)
+        for c in arquivos if '*' not in c
+    }
+    texto = json.dumps(componentes, sort_keys=True)
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest(), componentes
+
+
+def saidas_intactas(alvo, estado, cache):
+    """True se todas as saídas existem e não mudaram desde a última construção"""
+    registradas = estado['alvos'].get(alvo, {}).get('saidas', {})
+    for caminho in expandir(ALVOS[alvo]['saidas']):
+        relativo = os.path.relpath(caminho, ROOT_DIR).replace(os.sep, '/')
+        atual = cache.hash(caminho)
+        if atual is None or registradas.get(relativo) != atual:
+            return False
+    return True
+
+
+def executar_alvo(alvo):
+    """Roda o script do alvo em um processo Python próprio (log em .construcao/logs)"""
+    os.makedirs(LOGS_DIR, exist_ok=True)
+    inicio = time.perf_counter()
+    with open(os.path.join(LOGS_DIR, f'{alvo}.log'), 'w', encoding='utf-8') as log:
+        processo = subprocess.run(
+            [sys.executable, os.path.join(SCRIPT_DIR, ALVOS[alvo]['script'])],
+            cwd=ROOT_DIR, stdout=log, stderr=subprocess.STDOUT,
+            env=dict(os.environ, MPLBACKEND='Agg', PYTHONIOENCODING='utf-8'),
+        )
+    return processo.returncode, time.perf_counter() - inicio
+
+
+def carregar_estado():
+    if os.path.isfile(ARQUIVO_ESTADO):
+        with open(ARQUIVO_ESTADO, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {'arquivos': {}, 'alvos': {}}
+
+
+def salvar_estado(estado):
+    os.makedirs(ESTADO_DIR, exist_ok=True)
+    temporario = ARQUIVO_ESTADO + '.tmp'
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(estado, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(temporario, ARQUIVO_ESTADO)
+
+
+def selecionar_alvos(pedidos):
+    """Alvos pedidos + os alvos de que dependem, em ordem topológica"""
+    ordem = []
+
+    def visitar(alvo, caminho=()):
+        if alvo in caminho:
+            raise ValueError(f"Dependência circular: {' -> '.join(caminho + (alvo,))}")
+        if alvo in ordem:
+            return
+        for dependencia in ALVOS[alvo].get('depende', []):
+            visitar(dependencia, caminho + (alvo,))
+        ordem.append(alvo)
+
+    for alvo in pedidos or ALVOS:
+        if alvo not in ALVOS:
+            raise KeyError(f"Alvo desconhecido: {alvo} (disponíveis: {', '.join(ALVOS)})")
+        visitar(alvo)
+    return ordem
+
+
+def construir(pedidos=None, forcar=False, processos=None, seco=False):
+    """
+    Reconstrói os alvos desatualizados, em paralelo quando independentes.
+
+    Args:
+        pedidos: nomes de alvos (None = todos)
+        forcar: refaz tudo, ignorando o estado salvo
+        processos: máximo de alvos simultâneos (padrão: nº de CPUs)
+        seco: só informa o que seria refeito
+
+    Returns:
+        dict {alvo: {'status', 'tempo_s'}}
+    """
+    ordem = selecionar_alvos(pedidos)
+    estado = carregar_estado()
+    cache = CacheHashes(estado['arquivos'])
+    resultado = {}
+    pendentes = list(ordem)
+    em_execucao = {}
+
+    def pronto(alvo):
+        return all(d in resultado for d in ALVOS[alvo].get('depende', []) if d in ordem)
+
+    def despachar(executor):
+        for alvo in [a for a in pendentes if pronto(a)]:
+            pendentes.remove(alvo)
+            if any(resultado.get(d, {}).get('status') in ('falhou', 'pulado')
+                   for d in ALVOS[alvo].get('depende', [])):
+                resultado[alvo] = {'status': 'pulado', 'tempo_s': 0.0}
+                continue
+            assinatura_atual, _ = assinatura(alvo, cache)
+            anterior = estado['alvos'].get(alvo, {})
+            atualizado = (not forcar and anterior.get('assinatura') == assinatura_atual
+                          and saidas_intactas(alvo, estado, cache))
+            if atualizado:
+                resultado[alvo] = {'status': 'atualizado', 'tempo_s': 0.0}
+            elif seco:
+                resultado[alvo] = {'status': 'desatualizado', 'tempo_s': 0.0}
+            else:
+                print(f"   ▶️  {alvo}...")
+                em_execucao[executor.submit(executar_alvo, alvo)] = (alvo, assinatura_atual)
+
+    with ThreadPoolExecutor(max_workers=processos or os.cpu_count() or 1) as executor:
+        despachar(executor)
+        while em_execucao or pendentes:
+            if not em_execucao:
+                despachar(executor)
+                if not em_execucao and pendentes:
+                    break
+                continue
+            concluidos, _ = wait(list(em_execucao), return_when=FIRST_COMPLETED)
+            for futuro in concluidos:
+                alvo, assinatura_atual = em_execucao.pop(futuro)
+                codigo, segundos = futuro.result()
+                saidas = {os.path.relpath(c, ROOT_DIR).replace(os.sep, '/'): cache.hash(c)
+                          for c in expandir(ALVOS[alvo]['saidas'])}
+                if codigo == 0 and all(saidas.values()):
+                    resultado[alvo] = {'status': 'reconstruído', 'tempo_s': round(segundos, 2)}
+                    estado['alvos'][alvo] = {
+                        'assinatura': assinatura_atual,
+                        'saidas': saidas,
+                        'tempo_s': round(segundos, 2),
+                        'construido_em': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                    }
+                else:
+                    faltando = [c for c, h in saidas.items() if h is None]
+                    motivo = f'código {codigo}' if codigo else f"saídas ausentes: {', '.join(faltando)}"
+                    resultado[alvo] = {'status': 'falhou', 'tempo_s': round(segundos, 2), 'motivo': motivo}
+                    estado['alvos'].pop(alvo, None)
+            despachar(executor)
+
+    if not seco:
+        salvar_estado(estado)
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Construção incremental dos resultados')
+    parser.add_argument('alvos', nargs='*', help=f"alvos ({', '.join(ALVOS)}); padrão: todos")
+    parser.add_argument('--forcar', action='store_true', help='refaz todos os alvos pedidos')
+    parser.add_argument('--seco', action='store_true', help='só lista os alvos desatualizados')
+    parser.add_argument('--processos', type=int, default=None, help='alvos simultâneos (padrão: nº de CPUs)')
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    print("🔧 CONSTRUÇÃO INCREMENTAL DOS RESULTADOS")
+    resultado = construir(args.alvos, forcar=args.forcar, processos=args.processos, seco=args.seco)
+
+    simbolos = {'atualizado': '✅', 'reconstruído': '🔄', 'desatualizado': '⏳', 'falhou': '❌', 'pulado': '⏭️'}
+    for alvo, r in resultado.items():
+        detalhe = f" ({r['motivo']}; log em 03_RESULTADOS/.construcao/logs/{alvo}.log)" if 'motivo' in r else ''
+        print(f"   {simbolos[r['status']]} {alvo:<26} {r['status']:<13} {r['tempo_s']:>7.1f} s{detalhe}")
+    print(f"⏱️ Total: {time.perf_counter() - inicio:.2f} s")
+    return 1 if any(r['status'] == 'falhou' for r in resultado.values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Isobandas de Densidade (KDE) como Camada Vetorial
+- Extração de faixas de densidade (marching squares via contourpy) da grade KDE
+- FeatureCollection GeoJSON única, simplificada, com atributos de classe
+- Estilo por propriedade com rampas ColorBrewer (YlOrRd_3 / Reds_5)
+
+Alternativa leve às camadas raster de calor: poucos polígonos substituem
+milhares de pontos de calor e cada classe de densidade fica clicável.
+
+Autor: Caetano Ronan
+Instituição: UFSC
+"""
+
+import json
+import numpy as np
+import contourpy
+try:
+    import shapely
+    from shapely.geometry import Polygon
+except ImportError:
+    shapely = None
+try:
+    import folium
+except ImportError:
+    folium = None
+
+from tiles_calor import mercator_para_lonlat
+
+CASAS_DECIMAIS = 5  # ~1 m em latitude
+# Estilo das isobandas (a cor vem da propriedade 'cor'), comum aos backends do mapa
+ESTILO_ISOBANDAS = {'weight': 1, 'fillOpacity': 0.45, 'opacity': 0.9}
+DESTAQUE_ISOBANDAS = {'weight': 3, 'fillOpacity': 0.7}
+
+
+def calcular_niveis(grade_kde, n_classes, fracao_minima=0.1):
+    """
+    Limites das classes de densidade: faixas iguais entre `fracao_minima`
+    do máximo e o máximo da grade (estabelecimentos/km²).
+    """
+    maximo = float(np.nanmax(grade_kde['grade']))
+    return np.linspace(maximo * fracao_minima, maximo, n_classes + 1)
+
+
+def _anel_lonlat(pontos):
+    lon, lat = mercator_para_lonlat(pontos[:, 0], pontos[:, 1])
+    anel = np.round(np.column_stack([lon, lat]), CASAS_DECIMAIS)
+    if not np.array_equal(anel[0], anel[-1]):
+        anel = np.vstack([anel, anel[:1]])
+    return anel.tolist()
+
+
+def _simplificar(pontos, offsets, tolerancia):
+    """Simplifica um polígono (anel externo + buracos) em metros Mercator"""
+    aneis = [pontos[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+    if shapely is None or not tolerancia:
+        return [aneis]
+    poligono = Polygon(aneis[0], aneis[1:]).buffer(0)
+    poligono = shapely.simplify(poligono, tolerancia, preserve_topology=True)
+    if poligono.is_empty:
+        return []
+    partes = getattr(poligono, 'geoms', [poligono])
+    return [[np.asarray(p.exterior.coords)] + [np.asarray(h.coords) for h in p.interiors]
+            for p in partes if p.area > 0]
+
+
+def extrair_isobandas(grade_kde, paleta, niveis=None, simplificacao_m=50):
+    """
+    Extrai isobandas da grade KDE como FeatureCollection GeoJSON.
+
+    Args:
+        grade_kde: dict retornado por tiles_calor.calcular_grade_kde
+        paleta: lista de cores ColorBrewer; o número de cores define o
+            número de classes (ex.: COLORBREWER_SEQUENTIAL['Reds_5'])
+        niveis: limites das classes (len(paleta) + 1 valores); padrão calcular_niveis
+        simplificacao_m: tolerância Douglas-Peucker em metros Mercator (0 desativa)
+
+    Returns:
+        dict GeoJSON (FeatureCollection) com uma feição MultiPolygon por classe
+    """
+    grade = grade_kde['grade']
+    ny, nx = grade.shape
+    res = grade_kde['resolucao']
+    if niveis is None:
+        niveis = calcular_niveis(grade_kde, len(paleta))
+
+    # Centros das células em metros Mercator (linha 0 = norte -> inverter para y crescente)
+    xs = grade_kde['xmin'] + (np.arange(nx) + 0.5) * res
+    ys = grade_kde['ymax'] - (np.arange(ny) + 0.5) * res
+    gerador = contourpy.contour_generator(xs, ys[::-1], grade[::-1], fill_type='OuterOffset')
+
+    features = []
+    for classe, cor in enumerate(paleta):
+        inferior = float(niveis[classe])
+        ultima = classe == len(paleta) - 1
+        superior = float(niveis[classe + 1])
+        # Última classe aberta: inclui o máximo da grade
+        lista_pontos, lista_offsets = gerador.filled(inferior, np.inf if ultima else superior)
+
+        poligonos = []
+        for pontos, offsets in zip(lista_pontos, lista_offsets):
+            for aneis in _simplificar(pontos, offsets, simplificacao_m):
+                poligonos.append([_anel_lonlat(a) for a in aneis if len(a) >= 3])
+        poligonos = [p for p in poligonos if p]
+        if not poligonos:
+            continue
+
+        rotulo = (f'≥ {inferior:.1f} estab./km²' if ultima
+                  else f'{inferior:.1f} – {superior:.1f} estab./km²')
+        features.append({
+            'type': 'Feature',
+            'geometry': {'type': 'MultiPolygon', 'coordinates': poligonos},
+            'properties': {
+                'classe': classe + 1,
+                'densidade_min': round(inferior, 3),
+                'densidade_max': None if ultima else round(superior, 3),
+                'rotulo': rotulo,
+                'cor': cor,
+            },
+        })
+
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def salvar_geojson(geojson, caminho):
+    """Grava a FeatureCollection compacta (sem espaços) para uso no QGIS/web"""
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(geojson, f, ensure_ascii=False, separators=(',', ':'))
+
+
+def camada_isobandas(geojson, nome='Isobandas de Densidade (KDE)', show=True):
+    """
+    Camada Folium única com estilo por propriedade, tooltip e popup por classe.
+    Aninhada num FeatureGroup deve ficar com show=True: o Folium não anexa
+    (addTo) ao pai subgrupos ocultos, e a visibilidade fica com o pai.
+
+    Returns:
+        folium.FeatureGroup contendo um único folium.GeoJson
+    """
+    grupo = folium.FeatureGroup(name=nome, show=show)
+    if not geojson['features']:
+        return grupo
+
+    folium.GeoJson(
+        geojson,
+        style_function=lambda f: dict(ESTILO_ISOBANDAS, fillColor=f['properties']['cor'],
+                                      color=f['properties']['cor']),
+        highlight_function=lambda f: DESTAQUE_ISOBANDAS,
+        tooltip=folium.GeoJsonTooltip(fields=['rotulo'], aliases=['Densidade:']),
+        popup=folium.GeoJsonPopup(fields=['classe', 'rotulo'], aliases=['Classe:', 'Densidade:']),
+    ).add_to(grupo)
+    return grupo
@@ -13,6 +13,8 @@ import folium
 from folium import plugins
 import os
 
+import classificacao_estabelecimentos
+
 # Diretório raiz do projeto
 ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -74,13 +76,8 @@ def criar_mapa_filtrado():
         tooltip='Centro Urbano'
     ).add_to(mapa)
     
-    # Separar estabelecimentos públicos e privados
-    def eh_publico(row):
-        nome = str(row['NOME']).upper()
-        tipo = str(row['TIPO']).upper()
-        return 'ESF' in nome or 'PS ' in nome or tipo in ['ESF', 'PS']
-    
-    df['PUBLICO'] = df.apply(eh_publico, axis=1)
+    # Separar estabelecimentos públicos e privados (tabela única de regras)
+    df['PUBLICO'] = classificacao_estabelecimentos.classificar(df)['eh_publico']
     
     publicos = df[df['PUBLICO'] == True]
     privados = df[df['PUBLICO'] == False]
@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cubo Agregado para Dashboard Interativo com Filtros Cruzados
+- Células = combinações de município × setor × tipo × categoria de
+  distância × quadrante, com contagem e estatísticas aditivas da distância
+  ao centro (soma, soma dos quadrados, mínimo, máximo e histograma em
+  classes fixas)
+- Qualquer combinação de filtros se resolve somando células: o navegador
+  nunca vê nem recalcula as linhas originais
+- Carga compacta: dicionário de valores por dimensão + matrizes tipadas
+  (little-endian, base64) decodificadas direto em TypedArrays
+- Página estática (docs/dashboard_crossfilter.html): clicar numa barra
+  filtra as demais dimensões (cada gráfico ignora o próprio filtro)
+
+Uso:
+    python cubo_agregado.py     # cubo da base canônica (dados_canonicos)
+
+Autor: Caetano Ronan
+Instituição: UFSC
+"""
+
+import os
+import base64
+import time
+import numpy as np
+import pandas as pd
+from jinja2 import Environment
+
+from camadas_geojson import serializar_json
+import dados_canonicos
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(SCRIPT_DIR)
+
+VERSAO_CUBO = 1
+# (coluna, rótulo) na ordem de exibição
+DIMENSOES = [
+    ('municipio', '🏙️ Município'),
+    ('setor', '📊 Setor'),
+    ('tipo_descricao', '🏥 Tipo de Estabelecimento'),
+    ('categoria_distancia', '📏 Categoria de Distância'),
+    ('quadrante', '🗺️ Quadrante'),
+]
+CLASSES_HISTOGRAMA = 25  # mesmas classes do histograma do dashboard visual
+SEM_VALOR = 'N/D'
+
+
+def construir_cubo(df, municipio=None, classes=CLASSES_HISTOGRAMA):
+    """
+    Agrega os estabelecimentos no nível mais fino das dimensões.
+
+    Args:
+        df: DataFrame processado (setor, tipo_descricao, categoria_distancia,
+            quadrante, dist_centro e, opcionalmente, municipio)
+        municipio: nome usado quando df não tem a coluna municipio
+        classes: número de classes do histograma de distâncias
+
+    Returns:
+        dict do cubo (dimensões, códigos por célula e estatísticas)
+    """
+    df = df.copy()
+    if 'municipio' not in df.columns:
+        df['municipio'] = municipio or SEM_VALOR
+
+    dimensoes, codigos = [], []
+    for coluna, rotulo in DIMENSOES:
+        valores = df[coluna].astype(object).where(df[coluna].notna(), SEM_VALOR).astype(str)
+        categorias = pd.Categorical(valores)
+        dimensoes.append({'nome': coluna, 'rotulo': rotulo, 'valores': list(categorias.categories)})
+        codigos.append(categorias.codes.astype(np.int64))
+
+    # Índice de célula: combinação dos códigos (uma única passada de agrupamento)
+    formas = [len(d['valores']) for d in dimensoes]
+    linear = np.ravel_multi_index(codigos, formas)
+    celulas, inversa = np.unique(linear, return_inverse=True)
+    n_celulas = len(celulas)
+
+    dist = df['dist_centro'].to_numpy(dtype=float)
+    validas = np.isfinite(dist)
+    limites = np.histogram_bin_edges(dist[validas] if validas.any() else [0.0, 1.0], bins=classes)
+    classe = np.clip(np.searchsorted(limites, dist, side='right') - 1, 0, classes - 1)
+
+    n = np.bincount(inversa, minlength=n_celulas)
+    n_dist = np.bincount(inversa, weights=validas, minlength=n_celulas)
+    d0 = np.where(validas, dist, 0.0)
+    soma = np.bincount(inversa, weights=d0, minlength=n_celulas)
+    soma2 = np.bincount(inversa, weights=d0 ** 2, minlength=n_celulas)
+    minimo = np.full(n_celulas, np.inf)
+    maximo = np.full(n_celulas, -np.inf)
+    np.minimum.at(minimo, inversa[validas], dist[validas])
+    np.maximum.at(maximo, inversa[validas], dist[validas])
+    hist = np.zeros((n_celulas, classes), dtype=np.int64)
+    np.add.at(hist, (inversa[validas], classe[validas]), 1)
+
+    return {
+        'dimensoes': dimensoes,
+        'codigos': np.stack(np.unravel_index(celulas, formas)),  # (dimensões, células)
+        'n': n,
+        'n_dist': n_dist.astype(np.int64),
+        'soma_dist': soma,
+        'soma_dist2': soma2,
+        'min_dist': minimo,
+        'max_dist': maximo,
+        'hist': hist,
+        'limites_hist': limites,
+        'linhas': int(len(df)),
+    }
+
+
+def consultar(cubo, filtros=None):
+    """
+    Resolve uma combinação de filtros somando células (sem linhas originais).
+
+    Args:
+        cubo: dict de construir_cubo
+        filtros: dict {dimensão: lista de valores aceitos}
+
+    Returns:
+        dict com total, média, desvio, mínimo, máximo e histograma
+    """
+    mascara = np.ones(len(cubo['n']), dtype=bool)
+    for i, dimensao in enumerate(cubo['dimensoes']):
+        aceitos = (filtros or {}).get(dimensao['nome'])
+        if aceitos is not None:
+            indices = [dimensao['valores'].index(v) for v in aceitos if v in dimensao['valores']]
+            mascara &= np.isin(cubo['codigos'][i], indices)
+    n_dist = cubo['n_dist'][mascara].sum()
+    media = cubo['soma_dist'][mascara].sum() / n_dist if n_dist else float('nan')
+    variancia = cubo['soma_dist2'][mascara].sum() / n_dist - media ** 2 if n_dist else float('nan')
+    return {
+        'total': int(cubo['n'][mascara].sum()),
+        'media': float(media),
+        'desvio': float(np.sqrt(max(variancia, 0.0))) if n_dist else float('nan'),
+        'minimo': float(cubo['min_dist'][mascara].min()) if n_dist else float('nan'),
+        'maximo': float(cubo['max_dist'][mascara].max()) if n_dist else float('nan'),
+        'histograma': cubo['hist'][mascara].sum(axis=0).tolist(),
+    }
+
+
+def _matriz(valores, tipo):
+    """Matriz tipada little-endian em base64 ({'tipo': TypedArray JS, 'dados': ...})"""
+    dtype = {'Uint8': '<u1', 'Uint16': '<u2', 'Uint32': '<u4',
+             'Float32': '<f4', 'Float64': '<f8'}[tipo]
+    return {'tipo': tipo, 'dados': base64.b64encode(np.ascontiguousarray(valores, dtype=dtype).tobytes()).decode('ascii')}
+
+
+def _tipo_inteiro(maximo):
+    return 'Uint8' if maximo < 2 ** 8 else 'Uint16' if maximo < 2 ** 16 else 'Uint32'
+
+
+def exportar_carga(cubo):
+    """
+    Carga compacta do cubo para o navegador.
+
+    Returns:
+        dict serializável em JSON
+    """
+    sem_dist = cubo['n_dist'] == 0
+    return {
+        'versao': VERSAO_CUBO,
+        'linhas': cubo['linhas'],
+        'celulas': int(len(cubo['n'])),
+        'dimensoes': [{'nome': d['nome'], 'rotulo': d['rotulo'], 'valores': d['valores']}
+                      for d in cubo['dimensoes']],
+        'limites_hist': [round(float(x), 4) for x in cubo['limites_hist']],
+        'matrizes': {
+            'codigos': [_matriz(c, _tipo_inteiro(len(d['valores'])))
+                        for c, d in zip(cubo['codigos'], cubo['dimensoes'])],
+            'n': _matriz(cubo['n'], _tipo_inteiro(int(cubo['n'].max(initial=0)) + 1)),
+            'n_dist': _matriz(cubo['n_dist'], _tipo_inteiro(int(cubo['n_dist'].max(initial=0)) + 1)),
+            'soma_dist': _matriz(cubo['soma_dist'], 'Float64'),
+            'soma_dist2': _matriz(cubo['soma_dist2'], 'Float64'),
+            'min_dist': _matriz(np.where(sem_dist, 0.0, cubo['min_dist']), 'Float32'),
+            'max_dist': _matriz(np.where(sem_dist, 0.0, cubo['max_dist']), 'Float32'),
+            'hist': _matriz(cubo['hist'].ravel(), _tipo_inteiro(int(cubo['hist'].max(initial=0)) + 1)),
+        },
+    }
+
+
+_AMBIENTE = Environment(autoescape=False, trim_blocks=True, lstrip_blocks=True)
+
+MODELO_PAGINA = _AMBIENTE.from_string("""<!DOCTYPE html>
+<html lang="pt-BR">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{{ titulo }}</title>
+<style>
+  body { font-family: 'Segoe UI', Arial, sans-serif; margin: 0; background: #f7fcfd; color: #222; }
+  header { background: #238b45; color: white; padding: 14px 24px; }
+  header h1 { margin: 0; font-size: 22px; }
+  header p { margin: 4px 0 0 0; font-size: 13px; opacity: 0.9; }
+  #resumo { display: flex; flex-wrap: wrap; gap: 12px; padding: 14px 24px; }
+  .indicador { background: white; border-left: 4px solid #238b45; border-radius: 6px;
+               padding: 8px 14px; box-shadow: 0 1px 3px rgba(0,0,0,0.15); min-width: 120px; }
+  .indicador b { display: block; font-size: 20px; color: #00441b; }
+  .indicador span { font-size: 12px; color: #555; }
+  #paineis { display: grid; grid-template-columns: repeat(auto-fill, minmax(320px, 1fr));
+             gap: 14px; padding: 0 24px 24px 24px; }
+  .painel { background: white; border-radius: 8px; padding: 10px 14px;
+            box-shadow: 0 1px 4px rgba(0,0,0,0.15); }
+  .painel h3 { margin: 0 0 8px 0; font-size: 15px; }
+  .barra { display: flex; align-items: center; font-size: 12px; margin: 3px 0; cursor: pointer; }
+  .barra .rotulo { width: 130px; overflow: hidden; text-overflow: ellipsis; white-space: nowrap; }
+  .barra .trilho { flex: 1; background: #edf8fb; height: 14px; margin: 0 6px; border-radius: 3px; }
+  .barra .valor { height: 100%; background: #66c2a4; border-radius: 3px; }
+  .barra.ativa .valor { background: #e41a1c; }
+  .barra.apagada { opacity: 0.35; }
+  .barra .numero { width: 40px; text-align: right; }
+  #histograma { display: flex; align-items: flex-end; height: 140px; gap: 1px; }
+  #histograma div { flex: 1; background: #66c2a4; }
+  #eixo { display: flex; justify-content: space-between; font-size: 11px; color: #555; }
+  button { background: #238b45; color: white; border: 0; border-radius: 4px; padding: 6px 12px; cursor: pointer; }
+  footer { font-size: 12px; color: #555; text-align: center; padding: 10px; }
+</style>
+</head>
+<body>
+<header>
+  <h1>{{ titulo }}</h1>
+  <p>{{ subtitulo }} · clique nas barras para filtrar (as demais dimensões são recalculadas a partir do cubo agregado)</p>
+</header>
+<div id="resumo"></div>
+<div id="paineis"></div>
+<footer>Fonte: CNES/DataSUS | IBGE · Autor: Ronan Armando Caetano (UFSC) · <span id="tempo"></span></footer>
+<script type="application/json" id="cubo">{{ carga }}</script>
+<script>
+(function() {
+  var carga = JSON.parse(document.getElementById('cubo').textContent);
+  var TIPOS = {Uint8: Uint8Array, Uint16: Uint16Array, Uint32: Uint32Array,
+               Float32: Float32Array, Float64: Float64Array};
+  function decodificar(m) {
+    var bin = atob(m.dados), bytes = new Uint8Array(bin.length);
+    for (var i = 0; i < bin.length; i++) bytes[i] = bin.charCodeAt(i);
+    return new TIPOS[m.tipo](bytes.buffer);
+  }
+  var M = carga.matrizes, D = carga.dimensoes, N = carga.celulas;
+  var codigos = M.codigos.map(decodificar);
+  var n = decodificar(M.n), nDist = decodificar(M.n_dist);
+  var soma = decodificar(M.soma_dist), soma2 = decodificar(M.soma_dist2);
+  var minimo = decodificar(M.min_dist), maximo = decodificar(M.max_dist);
+  var hist = decodificar(M.hist), B = carga.limites_hist.length - 1;
+  // Filtro por dimensão: null = tudo, senão Set de códigos aceitos
+  var filtros = D.map(function() { return null; });
+
+  function recalcular() {
+    var t0 = performance.now();
+    var porDim = D.map(function(d) { return new Float64Array(d.valores.length); });
+    var tot = {n: 0, nDist: 0, soma: 0, soma2: 0, min: Infinity, max: -Infinity, hist: new Float64Array(B)};
+    for (var c = 0; c < N; c++) {
+      // Quantas dimensões rejeitam a célula (e qual, se só uma)
+      var falhas = 0, falhou = -1;
+      for (var d = 0; d < D.length; d++) {
+        if (filtros[d] && !filtros[d].has(codigos[d][c])) { falhas++; falhou = d; if (falhas > 1) break; }
+      }
+      if (falhas > 1) continue;
+      if (falhas === 1) { porDim[falhou][codigos[falhou][c]] += n[c]; continue; }
+      for (d = 0; d < D.length; d++) porDim[d][codigos[d][c]] += n[c];
+      tot.n += n[c]; tot.nDist += nDist[c]; tot.soma += soma[c]; tot.soma2 += soma2[c];
+      if (nDist[c]) { tot.min = Math.min(tot.min, minimo[c]); tot.max = Math.max(tot.max, maximo[c]); }
+      for (var b = 0; b < B; b++) tot.hist[b] += hist[c * B + b];
+    }
+    var ms = performance.now() - t0;
+    desenhar(porDim, tot);
+    document.getElementById('tempo').textContent =
+      N + ' células (' + carga.linhas + ' estabelecimentos) · filtro resolvido em ' + ms.toFixed(2) + ' ms';
+  }
+
+  function indicador(valor, rotulo) {
+    return '<div class="indicador"><b>' + valor + '</b><span>' + rotulo + '</span></div>';
+  }
+
+  function desenhar(porDim, tot) {
+    var media = tot.nDist ? tot.soma / tot.nDist : NaN;
+    var desvio = tot.nDist ? Math.sqrt(Math.max(tot.soma2 / tot.nDist - media * media, 0)) : NaN;
+    var km = function(v) { return isFinite(v) ? v.toFixed(2) + ' km' : '–'; };
+    document.getElementById('resumo').innerHTML =
+      indicador(tot.n, 'Estabelecimentos') + indicador(km(media), 'Distância média ao centro') +
+      indicador(km(desvio), 'Desvio padrão') + indicador(km(tot.min), 'Mais próximo') +
+      indicador(km(tot.max), 'Mais distante') +
+      '<div class="indicador"><button id="limpar">Limpar filtros</button></div>';
+    document.getElementById('limpar').onclick = function() {
+      filtros = D.map(function() { return null; }); recalcular();
+    };
+
+    var html = '';
+    D.forEach(function(dim, d) {
+      var ordem = dim.valores.map(function(_, i) { return i; })
+        .sort(function(a, b) { return porDim[d][b] - porDim[d][a]; });
+      var maior = Math.max.apply(null, Array.prototype.slice.call(porDim[d])) || 1;
+      html += '<div class="painel"><h3>' + dim.rotulo + '</h3>';
+      ordem.forEach(function(i) {
+        var classe = filtros[d] ? (filtros[d].has(i) ? ' ativa' : ' apagada') : '';
+        html += '<div class="barra' + classe + '" data-d="' + d + '" data-i="' + i + '">' +
+          '<span class="rotulo" title="' + dim.valores[i] + '">' + dim.valores[i] + '</span>' +
+          '<span class="trilho"><div class="valor" style="width:' + (100 * porDim[d][i] / maior) + '%"></div></span>' +
+          '<span class="numero">' + porDim[d][i] + '</span></div>';
+      });
+      html += '</div>';
+    });
+    var maiorH = Math.max.apply(null, Array.prototype.slice.call(tot.hist)) || 1;
+    html += '<div class="painel"><h3>📏 Distribuição das Distâncias ao Centro</h3><div id="histograma">';
+    for (var b = 0; b < B; b++) {
+      html += '<div title="' + carga.limites_hist[b].toFixed(1) + '–' + carga.limites_hist[b + 1].toFixed(1) +
+        ' km: ' + tot.hist[b] + '" style="height:' + (100 * tot.hist[b] / maiorH) + '%"></div>';
+    }
+    html += '</div><div id="eixo"><span>' + carga.limites_hist[0].toFixed(1) + ' km</span><span>' +
+      carga.limites_hist[B].toFixed(1) + ' km</span></div></div>';
+    var paineis = document.getElementById('paineis');
+    paineis.innerHTML = html;
+    Array.prototype.forEach.call(paineis.querySelectorAll('.barra'), function(el) {
+      el.onclick = function() {
+        var d = +el.dataset.d, i = +el.dataset.i;
+        filtros[d] = filtros[d] || new Set();
+        if (filtros[d].has(i)) filtros[d].delete(i); else filtros[d].add(i);
+        if (!filtros[d].size) filtros[d] = null;
+        recalcular();
+      };
+    });
+  }
+
+  recalcular();
+})();
+</script>
+</body>
+</html>
+""")
+
+
+def salvar_cubo(cubo, caminho_html=None, caminho_json=None, titulo=None, subtitulo=''):
+    """
+    Grava a carga do cubo (JSON) e/ou a página de filtros cruzados.
+
+    Args:
+        cubo: dict de construir_cubo
+        caminho_html: página estática com a carga embutida (opcional)
+        caminho_json: carga isolada para outras páginas (opcional)
+        titulo, subtitulo: cabeçalho da página
+
+    Returns:
+        dict {caminho: bytes}
+    """
+    carga = serializar_json(exportar_carga(cubo))
+    tamanhos = {}
+    if caminho_json:
+        with open(caminho_json, 'w', encoding='utf-8') as f:
+            f.write(carga)
+        tamanhos[caminho_json] = os.path.getsize(caminho_json)
+    if caminho_html:
+        with open(caminho_html, 'w', encoding='utf-8') as f:
+            MODELO_PAGINA.stream(
+                titulo=titulo or '🏥 Estabelecimentos de Saúde — Filtros Cruzados',
+                subtitulo=subtitulo, carga=carga,
+            ).dump(f)
+        tamanhos[caminho_html] = os.path.getsize(caminho_html)
+    return tamanhos
+
+
+def main():
+    print("=" * 60)
+    print("🧊 CUBO AGREGADO PARA FILTROS CRUZADOS")
+    print("=" * 60)
+    df = dados_canonicos.carregar_dados()
+    if df is None:
+        print("❌ Base canônica não encontrada: execute dashboard_avancado_colorbrewer.py")
+        return None
+    manifesto = dados_canonicos.carregar_manifesto()
+    inicio = time.perf_counter()
+    cubo = construir_cubo(df, municipio='Concórdia/SC')
+    print(f"   ✓ {cubo['linhas']} estabelecimentos -> {len(cubo['n'])} células "
+          f"em {(time.perf_counter() - inicio) * 1000:.1f} ms (base v{manifesto['versao']})")
+    tamanhos = salvar_cubo(
+        cubo,
+        caminho_html=os.path.join(ROOT_DIR, 'docs', 'dashboard_crossfilter.html'),
+        caminho_json=os.path.join(ROOT_DIR, '03_RESULTADOS', 'cubo_agregado.json'),
+        subtitulo='Concórdia/SC',
+    )
+    for caminho, tamanho in tamanhos.items():
+        print(f"   📦 {os.path.relpath(caminho, ROOT_DIR)}: {tamanho / 1024:.1f} KB")
+    return cubo
+
+
+if __name__ == '__main__':
+    main()
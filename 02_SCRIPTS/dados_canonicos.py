@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Base Canônica de Estabelecimentos Processados
+- Tabela colunar versionada (.npz, uma matriz tipada por coluna) + manifesto JSON
+- O dashboard grava a tabela já processada (coordenadas, filtro municipal,
+  classificação, distâncias e categorias); os demais construtores de mapa leem
+  daqui em vez de reprocessar a base CNES ou extrair dados de HTML gerado
+- A versão é o hash do conteúdo: gravar dados idênticos não cria arquivo novo
+- Leitura independente do tamanho dos mapas e só das colunas pedidas; textos
+  ficam em matrizes Unicode, então nomes com apóstrofo/aspas não precisam de escape
+
+Estrutura (03_RESULTADOS/dados):
+    estabelecimentos.json                 # manifesto (versão atual + anteriores)
+    estabelecimentos-<versao>.npz         # colunas c0, c1, ... (+ máscaras de nulos)
+
+Uso:
+    python dados_canonicos.py             # lista as bases e versões disponíveis
+
+Autor: Caetano Ronan
+Instituição: UFSC
+"""
+
+import os
+import sys
+import json
+import hashlib
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+# Caminhos do projeto
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(SCRIPT_DIR)
+DADOS_DIR = os.path.join(ROOT_DIR, '03_RESULTADOS', 'dados')
+
+VERSAO_ESQUEMA = 1
+BASE_PADRAO = 'estabelecimentos'
+MANTER_VERSOES = 3  # arquivos .npz mantidos (atual + anteriores)
+
+# Colunas da base CNES -> nomes canônicos usados pelos mapas
+COLUNAS_CNES = {
+    'NO_FANTASIA': 'NOME',
+    'NO_LOGRADOURO': 'ENDERECO',
+    'NO_BAIRRO': 'BAIRRO',
+    'CO_CEP': 'CEP',
+    'NU_LATITUDE': 'LAT',
+    'NU_LONGITUDE': 'LON',
+    'TP_UNIDADE': 'TIPO_UNIDADE',
+    'NO_RAZAO_SOCIAL': 'RAZAO_SOCIAL',
+}
+
+
+def padronizar_colunas(df):
+    """
+    Renomeia colunas CNES para os nomes canônicos (sem sobrescrever colunas
+    canônicas já existentes) e normaliza TIPO_UNIDADE como código em texto.
+
+    Args:
+        df: DataFrame de estabelecimentos
+
+    Returns:
+        DataFrame novo com colunas padronizadas
+    """
+    renomear = {cnes: canonica for cnes, canonica in COLUNAS_CNES.items()
+                if cnes in df.columns and canonica not in df.columns}
+    df = df.rename(columns=renomear)
+    # Demais colunas homônimas da base CNES são redundantes com as canônicas
+    df = df.drop(columns=[c for c in COLUNAS_CNES if c in df.columns and COLUNAS_CNES[c] in df.columns])
+    if 'TIPO_UNIDADE' in df.columns and df['TIPO_UNIDADE'].dtype.kind in 'iuf':
+        codigos = pd.to_numeric(df['TIPO_UNIDADE'], errors='coerce').astype('Int64')
+        df['TIPO_UNIDADE'] = codigos.astype(str).where(codigos.notna(), None)
+    return df
+
+
+def caminho_manifesto(base=BASE_PADRAO, destino=DADOS_DIR):
+    return os.path.join(destino, f'{base}.json')
+
+
+def carregar_manifesto(base=BASE_PADRAO, destino=DADOS_DIR):
+    """Manifesto da base ou None se ainda não foi gravada"""
+    caminho = caminho_manifesto(base, destino)
+    if not os.path.isfile(caminho):
+        return None
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _colunas_tipadas(df):
+    """
+    Converte cada coluna numa matriz numpy sem objetos Python.
+
+    Returns:
+        lista de (nome, tipo, matriz, máscara de nulos ou None)
+    """
+    colunas = []
+    for nome in df.columns:
+        serie = df[nome]
+        if not isinstance(serie.dtype, np.dtype) and pd.api.types.is_numeric_dtype(serie.dtype):
+            # Int64/boolean do pandas (com pd.NA) viram float64 com NaN
+            serie = serie.astype('float64')
+        if isinstance(serie.dtype, np.dtype) and serie.dtype.kind in 'biuf':
+            colunas.append((str(nome), serie.dtype.str, serie.to_numpy(), None))
+            continue
+        nulos = serie.isna().to_numpy()
+        valores = serie.astype(object).where(~nulos, '').astype(str).to_numpy(dtype=str)
+        colunas.append((str(nome), 'texto', valores, nulos if nulos.any() else None))
+    return colunas
+
+
+def _escrever_atomico(caminho, escrever):
+    temporario = caminho + '.tmp'
+    with open(temporario, 'wb') as f:
+        escrever(f)
+    os.replace(temporario, caminho)
+
+
+def salvar_dados(df, base=BASE_PADRAO, destino=DADOS_DIR, origem=None):
+    """
+    Grava a tabela processada como nova versão da base canônica.
+
+    A tabela e depois o manifesto são substituídos atomicamente: um leitor
+    concorrente vê a versão anterior completa ou a nova completa.
+
+    Args:
+        df: DataFrame processado
+        base: nome da base (prefixo dos arquivos)
+        destino: diretório da base
+        origem: script/etapa que gerou os dados (registrado no manifesto)
+
+    Returns:
+        dict do manifesto gravado
+    """
+    os.makedirs(destino, exist_ok=True)
+    df = padronizar_colunas(df.reset_index(drop=True))
+    colunas = _colunas_tipadas(df)
+
+    # Versão = hash do conteúdo (nomes, tipos e bytes de cada coluna)
+    sha = hashlib.sha256(f'{VERSAO_ESQUEMA}'.encode())
+    for nome, tipo, valores, nulos in colunas:
+        sha.update(f'{nome}\0{tipo}\0{valores.dtype.str}\0'.encode())
+        sha.update(np.ascontiguousarray(valores).tobytes())
+        if nulos is not None:
+            sha.update(np.packbits(nulos).tobytes())
+    versao = sha.hexdigest()[:16]
+
+    anterior = carregar_manifesto(base, destino)
+    arquivo = f'{base}-{versao}.npz'
+    if anterior and anterior['versao'] == versao and os.path.isfile(os.path.join(destino, arquivo)):
+        return anterior
+
+    matrizes = {}
+    descricao = []
+    for i, (nome, tipo, valores, nulos) in enumerate(colunas):
+        matrizes[f'c{i}'] = valores
+        if nulos is not None:
+            matrizes[f'n{i}'] = nulos
+        descricao.append({'nome': nome, 'chave': f'c{i}', 'tipo': tipo, 'nulos': nulos is not None})
+    # Descrição também dentro do .npz: versões anteriores continuam legíveis sozinhas
+    matrizes['colunas'] = np.array(json.dumps(descricao, ensure_ascii=False))
+    matrizes['linhas'] = np.array(len(df))
+    _escrever_atomico(os.path.join(destino, arquivo), lambda f: np.savez(f, **matrizes))
+
+    versoes = [versao] + [v for v in (anterior or {}).get('versoes', []) if v != versao]
+    manifesto = {
+        'esquema': VERSAO_ESQUEMA,
+        'base': base,
+        'versao': versao,
+        'arquivo': arquivo,
+        'linhas': int(len(df)),
+        'colunas': descricao,
+        'origem': origem,
+        'gravado_em': datetime.now().isoformat(timespec='seconds'),
+        'versoes': versoes[:MANTER_VERSOES],
+    }
+    conteudo = json.dumps(manifesto, ensure_ascii=False, indent=2).encode('utf-8')
+    _escrever_atomico(caminho_manifesto(base, destino), lambda f: f.write(conteudo))
+
+    # Versões fora da janela mantida
+    for v in versoes[MANTER_VERSOES:]:
+        try:
+            os.remove(os.path.join(destino, f'{base}-{v}.npz'))
+        except FileNotFoundError:
+            pass
+    return manifesto
+
+
+def carregar_dados(base=BASE_PADRAO, destino=DADOS_DIR, colunas=None, versao=None):
+    """
+    Lê a base canônica (ou uma versão anterior mantida).
+
+    Args:
+        base: nome da base
+        destino: diretório da base
+        colunas: lista de colunas a ler (padrão: todas); as ausentes são ignoradas
+        versao: versão específica (padrão: a atual do manifesto)
+
+    Returns:
+        DataFrame ou None se a base não existe
+    """
+    manifesto = carregar_manifesto(base, destino)
+    if manifesto is None:
+        return None
+    if manifesto.get('esquema') != VERSAO_ESQUEMA:
+        raise ValueError(f"Esquema {manifesto.get('esquema')} da base '{base}' não suportado "
+                         f"(esperado {VERSAO_ESQUEMA}); regenere com o dashboard")
+    arquivo = manifesto['arquivo'] if versao is None else f'{base}-{versao}.npz'
+
+    dados = {}
+    # NpzFile lê só os membros acessados
+    with np.load(os.path.join(destino, arquivo), allow_pickle=False) as npz:
+        descricao = json.loads(str(npz['colunas']))
+        linhas = int(npz['linhas'])
+        if colunas is not None:
+            pedidas = set(colunas)
+            descricao = [c for c in descricao if c['nome'] in pedidas]
+        for coluna in descricao:
+            valores = npz[coluna['chave']]
+            if coluna['tipo'] == 'texto':
+                valores = valores.astype(object)
+                if coluna['nulos']:
+                    valores[npz['n' + coluna['chave'][1:]]] = None
+            dados[coluna['nome']] = valores
+    return pd.DataFrame(dados, index=pd.RangeIndex(linhas))
+
+
+def main():
+    destino = sys.argv[1] if len(sys.argv) > 1 else DADOS_DIR
+    print("=" * 60)
+    print("🗃️ BASES CANÔNICAS DE DADOS PROCESSADOS")
+    print("=" * 60)
+    manifestos = sorted(a for a in os.listdir(destino) if a.endswith('.json')) if os.path.isdir(destino) else []
+    if not manifestos:
+        print(f"⚠️ Nenhuma base em {destino} (gere com dashboard_avancado_colorbrewer.py)")
+        return
+    for arquivo in manifestos:
+        manifesto = carregar_manifesto(arquivo[:-5], destino)
+        tamanho = os.path.getsize(os.path.join(destino, manifesto['arquivo'])) / 1024
+        print(f"\n📦 {manifesto['base']} v{manifesto['versao']} ({tamanho:.1f} KB)")
+        print(f"   • {manifesto['linhas']} linhas × {len(manifesto['colunas'])} colunas")
+        print(f"   • Origem: {manifesto.get('origem') or 'N/D'} em {manifesto['gravado_em']}")
+        print(f"   • Versões mantidas: {', '.join(manifesto['versoes'])}")
+
+
+if __name__ == '__main__':
+    main()
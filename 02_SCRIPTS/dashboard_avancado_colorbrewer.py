@@ -10,13 +10,12 @@ Data: Outubro 2025
 """
 
 import os
+import time
 import pandas as pd
 import numpy as np
 import folium
 from folium import plugins
-from folium.plugins import HeatMap, MarkerCluster, GroupedLayerControl
 import matplotlib.pyplot as plt
-import matplotlib.colors as mcolors
 from matplotlib.patches import Polygon
 try:
     import seaborn as sns
@@ -43,6 +42,22 @@ except ImportError:
     json = None
     print("⚠️ requests não disponível, limites municipais podem não ser carregados")
 
+# Módulos do próprio projeto (02_SCRIPTS)
+import tiles_calor
+import contornos_densidade
+import agregacao_grade
+import camadas_sob_demanda
+import mapa_html_direto
+import complementos_mapa
+import dados_canonicos
+import render_paineis
+import cache_artefatos
+import cubo_agregado
+import classificacao_estabelecimentos
+import indice_textual
+import duplicatas
+import metricas_estabelecimentos
+
 # Caminhos do projeto (independentes do diretório atual)
 SCRIPT_DIR = os.path.dirname(__file__)
 ROOT_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, '..'))
@@ -66,9 +81,136 @@ COLORBREWER_QUALITATIVE = {
     'Accent_8': ['#7fc97f', '#beaed4', '#fdc086', '#ffff99', '#386cb0', '#f0027f', '#bf5b17', '#666666']
 }
 
+# Acima deste número de pontos o HeatMap no navegador é substituído por tiles pré-renderizados
+LIMIAR_PONTOS_HEATMAP = 5000
+TILES_CALOR_DIR = os.path.join(MAPAS_DIR, 'tiles_calor')
+# Camadas ocultas por padrão vão para arquivos auxiliares (carregados ao ligar a camada)
+CAMADAS_SOB_DEMANDA = True
+# Backend do mapa avançado: 'folium' (árvore de objetos) ou 'direto' (modelo
+# HTML pré-compilado com dados transmitidos ao arquivo; ver mapa_html_direto.py)
+BACKEND_MAPA = 'folium'
+# Dashboard visual: 'sequencial' (uma figura, PDF vetorial) ou 'paralelo'
+# (painéis desenhados em processos Agg e compostos; ver render_paineis.py)
+MODO_RENDER_DASHBOARD = 'sequencial'
+FORMATOS_DASHBOARD = ('png', 'pdf')
+# Dashboard, relatório e CSV reaproveitados quando dados, parâmetros e código
+# não mudaram (ver cache_artefatos.py); None desativa
+CACHE_ARTEFATOS = cache_artefatos.CacheArtefatos()
+# Prováveis duplicatas (duplicatas.py) são sempre marcadas (grupo_duplicata);
+# True mantém só um estabelecimento por grupo nas contagens e mapas de calor
+REMOVER_DUPLICATAS = False
+
+# Município analisado (padrão: Concórdia). Alterado por configurar_municipio(),
+# usado pelo processamento em lote (gerar_lote_municipios.py)
+CODIGO_CONCORDIA = 420430
+MUNICIPIO = {
+    'codigo': CODIGO_CONCORDIA,
+    'nome': 'Concórdia',
+    'uf': 'SC',
+    'centro': (-27.2335, -52.0238),  # (lat, lon) da sede
+}
+# Camadas estaduais já carregadas (base CNES de SC, malha municipal de SC,
+# setores de SC, limite estadual). Preenchido uma vez pelo processo do lote e
+# herdado pelos processos filhos (fork), sem nova leitura de disco/rede.
+CAMADAS_COMPARTILHADAS = {}
+
+# Descrição dos principais tipos CNES (TP_UNIDADE); os demais viram 'Outros'
+TIPOS_PRINCIPAIS = {
+    '1': 'Posto de Saúde',
+    '2': 'ESF/Centro de Saúde',
+    '4': 'Policlínica',
+    '5': 'Hospital',
+    '22': 'Consultório',
+    '39': 'Laboratório',
+    '70': 'CAPS',
+    '81': 'UPA'
+}
+
+# Popup detalhado do estabelecimento (marcadores {campo} de camadas_geojson.ModeloPopup)
+MODELO_POPUP_ESTABELECIMENTO = """
+    <div style="width: 320px; font-family: Arial;">
+        <h4 style="color: {cor}; margin-bottom: 10px;">
+            <b>{nome}</b>
+        </h4>
+        <hr style="margin: 8px 0;">
+        <table style="width: 100%; font-size: 12px;">
+            <tr><td><b>🏥 Tipo:</b></td><td>{tipo}</td></tr>
+            <tr><td><b>🏛️ Setor:</b></td><td style="color: {cor}"><b>{setor}</b></td></tr>
+            <tr><td><b>📍 Endereço:</b></td><td>{endereco}</td></tr>
+            <tr><td><b>🏘️ Bairro:</b></td><td>{bairro}</td></tr>
+            <tr><td><b>📏 Distância:</b></td><td>{dist:.1f} km do centro</td></tr>
+            <tr><td><b>🗺️ Quadrante:</b></td><td>{quadrante}</td></tr>
+        </table>
+    </div>
+    """
+
+def configurar_municipio(codigo, nome, centro, uf='SC', saida=None):
+    """
+    Define o município analisado e, opcionalmente, a pasta de saída.
+
+    Args:
+        codigo: código IBGE de 6 dígitos (ex.: 420430)
+        nome: nome do município (títulos, rodapés e relatório)
+        centro: (lat, lon) da sede ou do centroide do município
+        uf: sigla da UF
+        saida: pasta de resultados do município (mapas em <saida>/mapas);
+            None mantém 03_RESULTADOS
+    """
+    global OUTPUT_DIR, MAPAS_DIR, TILES_CALOR_DIR
+    MUNICIPIO.update({
+        'codigo': int(codigo),
+        'nome': nome,
+        'uf': uf,
+        'centro': (float(centro[0]), float(centro[1])),
+    })
+    if saida is not None:
+        OUTPUT_DIR = saida
+        MAPAS_DIR = os.path.join(OUTPUT_DIR, 'mapas')
+        TILES_CALOR_DIR = os.path.join(MAPAS_DIR, 'tiles_calor')
+        os.makedirs(MAPAS_DIR, exist_ok=True)
+    return MUNICIPIO
+
+def _eh_concordia():
+    """Arquivos locais do repositório (setores, CSV processado) são só de Concórdia"""
+    return MUNICIPIO['codigo'] == CODIGO_CONCORDIA
+
+def _rotulo_municipio():
+    """Ex.: 'Concórdia/SC'"""
+    return f"{MUNICIPIO['nome']}/{MUNICIPIO['uf']}"
+
+def _filtrar_municipio(gdf):
+    """Feições do município atual em uma malha municipal (por código IBGE, depois por nome)"""
+    cod_cols = [c for c in gdf.columns if ('CD' in c.upper()) and (('MUN' in c.upper()) or ('IBGE' in c.upper()))]
+    nome_cols = [c for c in gdf.columns if c.upper() in ['NM_MUN', 'NM_MUNICIP', 'NOME', 'MUNICIPIO']]
+    selecao = gdf.iloc[0:0]
+    if cod_cols:
+        # Malhas do IBGE usam código de 7 dígitos (com dígito verificador)
+        selecao = gdf[gdf[cod_cols[0]].astype(str).str[:6] == str(MUNICIPIO['codigo'])]
+    if selecao.empty and nome_cols:
+        selecao = gdf[gdf[nome_cols[0]].astype(str).str.upper() == MUNICIPIO['nome'].upper()]
+    return selecao
+
+def carregar_malha_municipios_sc():
+    """
+    Malha municipal de SC (EPSG:4326), lida do shapefile local uma única vez.
+
+    Returns:
+        GeoDataFrame ou None
+    """
+    if 'municipios_sc' in CAMADAS_COMPARTILHADAS:
+        return CAMADAS_COMPARTILHADAS['municipios_sc']
+    gdf_sc = None
+    shp_municipios = os.path.join(ROOT_DIR, "SC_Municipios_2024", "SC_Municipios_2024.shp")
+    if gpd is not None and os.path.isfile(shp_municipios):
+        gdf_sc = gpd.read_file(shp_municipios)
+        if gdf_sc.crs is None or gdf_sc.crs.to_epsg() != 4326:
+            gdf_sc = gdf_sc.to_crs(epsg=4326)
+    CAMADAS_COMPARTILHADAS['municipios_sc'] = gdf_sc
+    return gdf_sc
+
 def carregar_municipios_vizinhos():
     """
-    Carrega municípios vizinhos de Concórdia para contexto regional no mapa.
+    Carrega municípios vizinhos do município analisado para contexto regional no mapa.
     
     Returns:
         GeoDataFrame com municípios da região ou None
@@ -79,15 +221,14 @@ def carregar_municipios_vizinhos():
         return None
     
     try:
-        shp_municipios = os.path.join(ROOT_DIR, "SC_Municipios_2024", "SC_Municipios_2024.shp")
-        if os.path.isfile(shp_municipios):
-            gdf_sc = gpd.read_file(shp_municipios)
-            if gdf_sc.crs is None or gdf_sc.crs.to_epsg() != 4326:
-                gdf_sc = gdf_sc.to_crs(epsg=4326)
+        gdf_sc = carregar_malha_municipios_sc()
+        if gdf_sc is not None:
+            gdf_sc = gdf_sc.copy()
             
-            # Filtrar Concórdia e vizinhos num raio de ~50km
+            # Filtrar o município e vizinhos num raio de ~50km
             from shapely.geometry import Point
-            centro = Point(-52.0238, -27.2335)
+            lat_centro, lon_centro = MUNICIPIO['centro']
+            centro = Point(lon_centro, lat_centro)
             gdf_sc['dist_centro'] = gdf_sc.geometry.centroid.distance(centro)
             vizinhos = gdf_sc[gdf_sc['dist_centro'] < 0.6].copy()  # ~60km
             
@@ -105,9 +246,9 @@ def carregar_municipios_vizinhos():
 
 def carregar_limites_distritais():
     """
-    Carrega limites distritais (setores censitários) de Concórdia para análise.
+    Carrega limites distritais (setores censitários) do município para análise.
     Tenta múltiplas fontes:
-    1. Shapefile local (Concordia_sencitario.shp)
+    1. Shapefile local (Concordia_sencitario.shp, apenas para Concórdia)
     2. API IBGE de setores censitários (Censo 2022)
     3. GeoPackage SC_setores_CD2022.gpkg
     
@@ -123,7 +264,7 @@ def carregar_limites_distritais():
     # Tentativa 1: Shapefile local de setores censitários
     try:
         shp_setores = os.path.join(ROOT_DIR, "Concordia_sencitario.shp")
-        if os.path.isfile(shp_setores):
+        if _eh_concordia() and os.path.isfile(shp_setores):
             gdf_setores = gpd.read_file(shp_setores)
             if gdf_setores.crs is None or gdf_setores.crs.to_epsg() != 4326:
                 gdf_setores = gdf_setores.to_crs(epsg=4326)
@@ -142,17 +283,20 @@ def carregar_limites_distritais():
     # Tentativa 2: GeoPackage SC_setores_CD2022.gpkg
     try:
         gpkg_path = os.path.join(ROOT_DIR, "SC_setores_CD2022.gpkg")
-        if os.path.isfile(gpkg_path):
-            print(f"   → Carregando do GeoPackage...")
-            gdf_sc_setores = gpd.read_file(gpkg_path)
-            if gdf_sc_setores.crs is None or gdf_sc_setores.crs.to_epsg() != 4326:
-                gdf_sc_setores = gdf_sc_setores.to_crs(epsg=4326)
-            
-            # Filtrar apenas setores de Concórdia (código IBGE 420430)
+        if 'setores_sc' in CAMADAS_COMPARTILHADAS or os.path.isfile(gpkg_path):
+            gdf_sc_setores = CAMADAS_COMPARTILHADAS.get('setores_sc')
+            if gdf_sc_setores is None:
+                print(f"   → Carregando do GeoPackage...")
+                gdf_sc_setores = gpd.read_file(gpkg_path)
+                if gdf_sc_setores.crs is None or gdf_sc_setores.crs.to_epsg() != 4326:
+                    gdf_sc_setores = gdf_sc_setores.to_crs(epsg=4326)
+                CAMADAS_COMPARTILHADAS['setores_sc'] = gdf_sc_setores
+
+            # Filtrar apenas setores do município (código IBGE)
             # Coluna CD_MUN ou similar com código do município
             mun_cols = [c for c in gdf_sc_setores.columns if 'MUN' in c.upper() and 'CD' in c.upper()]
             if mun_cols:
-                gdf_setores = gdf_sc_setores[gdf_sc_setores[mun_cols[0]].astype(str).str.contains('420430', na=False)]
+                gdf_setores = gdf_sc_setores[gdf_sc_setores[mun_cols[0]].astype(str).str.contains(str(MUNICIPIO['codigo']), na=False)]
                 
                 if not gdf_setores.empty:
                     # Simplificar geometrias
@@ -172,7 +316,7 @@ def carregar_limites_distritais():
             print("   → Tentando API IBGE para setores censitários...")
             # Nota: A API de setores é pesada; documentação limitada
             # URL hipotética (verificar disponibilidade real)
-            url_setores = f"https://servicodados.ibge.gov.br/api/v3/malhas/municipios/420430/setores?formato=application/vnd.geo+json"
+            url_setores = f"https://servicodados.ibge.gov.br/api/v3/malhas/municipios/{MUNICIPIO['codigo']}/setores?formato=application/vnd.geo+json"
             
             resp = requests.get(url_setores, timeout=60)
             if resp.status_code == 200:
@@ -203,9 +347,9 @@ def carregar_limites_ibge():
     print("📥 Carregando limites geográficos do IBGE...")
     
     # URLs da API do IBGE para malhas municipais
-    # Santa Catarina = UF 42, Concórdia = município 420430
+    # Santa Catarina = UF 42, município pelo código IBGE (padrão: Concórdia = 420430)
     url_estado_sc = "https://servicodados.ibge.gov.br/api/v3/malhas/estados/42?formato=application/vnd.geo+json"
-    url_municipio_concordia = "https://servicodados.ibge.gov.br/api/v3/malhas/municipios/420430?formato=application/vnd.geo+json"
+    url_municipio_concordia = f"https://servicodados.ibge.gov.br/api/v3/malhas/municipios/{MUNICIPIO['codigo']}?formato=application/vnd.geo+json"
     
     # URLs alternativas (versão estática hospedada no GitHub do IBGE)
     url_estado_sc_alt = "https://raw.githubusercontent.com/tbrugz/geodata-br/master/geojson/geojs-42-mun.json"
@@ -218,23 +362,34 @@ def carregar_limites_ibge():
         return None, None
     
     try:
-        # Carregar limite estadual de SC
-        print("   → Baixando limite estadual de Santa Catarina...")
-        response_estado = requests.get(url_estado_sc, timeout=30)
-        if response_estado.status_code == 200:
-            geojson_estado = response_estado.json()
-            gdf_estado = gpd.GeoDataFrame.from_features(geojson_estado['features'])
-            gdf_estado.crs = "EPSG:4326"
-            print(f"   ✅ Limite estadual carregado: {len(gdf_estado)} feições")
+        # Carregar limite estadual de SC (uma vez por processo/lote)
+        if 'estado' in CAMADAS_COMPARTILHADAS:
+            gdf_estado = CAMADAS_COMPARTILHADAS['estado']
         else:
-            print(f"   ⚠️ Erro ao baixar limite estadual: status {response_estado.status_code}")
+            print("   → Baixando limite estadual de Santa Catarina...")
+            response_estado = requests.get(url_estado_sc, timeout=30)
+            if response_estado.status_code == 200:
+                geojson_estado = response_estado.json()
+                gdf_estado = gpd.GeoDataFrame.from_features(geojson_estado['features'])
+                gdf_estado.crs = "EPSG:4326"
+                CAMADAS_COMPARTILHADAS['estado'] = gdf_estado
+                print(f"   ✅ Limite estadual carregado: {len(gdf_estado)} feições")
+            else:
+                print(f"   ⚠️ Erro ao baixar limite estadual: status {response_estado.status_code}")
     
     except Exception as e:
         print(f"   ⚠️ Erro ao carregar limite estadual: {e}")
     
+    # Malha municipal já carregada (lote): evita uma requisição por município
+    gdf_sc_local = CAMADAS_COMPARTILHADAS.get('municipios_sc')
+    if gdf_sc_local is not None:
+        gdf_municipio = _filtrar_municipio(gdf_sc_local)
+        if not gdf_municipio.empty:
+            return gdf_estado, gdf_municipio.reset_index(drop=True)
+    
     try:
-        # Carregar limite municipal de Concórdia
-        print("   → Baixando limite municipal de Concórdia...")
+        # Carregar limite municipal
+        print(f"   → Baixando limite municipal de {MUNICIPIO['nome']}...")
         response_municipio = requests.get(url_municipio_concordia, timeout=30)
         if response_municipio.status_code == 200:
             geojson_municipio = response_municipio.json()
@@ -252,10 +407,10 @@ def carregar_limites_ibge():
                     gdf_sc = gpd.GeoDataFrame.from_features(geojson_sc['features'])
                     gdf_sc.crs = "EPSG:4326"
                     
-                    # Filtrar Concórdia pelo código IBGE
+                    # Filtrar o município pelo código IBGE
                     for col in gdf_sc.columns:
                         if 'id' in col.lower() or 'cod' in col.lower():
-                            gdf_municipio = gdf_sc[gdf_sc[col].astype(str).str.contains('420430', na=False)]
+                            gdf_municipio = gdf_sc[gdf_sc[col].astype(str).str.contains(str(MUNICIPIO['codigo']), na=False)]
                             if not gdf_municipio.empty:
                                 print(f"   ✅ Limite municipal obtido da fonte alternativa!")
                                 break
@@ -264,7 +419,7 @@ def carregar_limites_ibge():
                     if gdf_municipio is None or gdf_municipio.empty:
                         for col in gdf_sc.columns:
                             if 'name' in col.lower() or 'nome' in col.lower():
-                                gdf_municipio = gdf_sc[gdf_sc[col].astype(str).str.upper().str.contains('CONCORD', na=False)]
+                                gdf_municipio = gdf_sc[gdf_sc[col].astype(str).str.upper() == MUNICIPIO['nome'].upper()]
                                 if not gdf_municipio.empty:
                                     print(f"   ✅ Limite municipal obtido por nome da fonte alternativa!")
                                     break
@@ -280,7 +435,7 @@ def carregar_limites_ibge():
         try:
             print("   → Tentando carregar limite municipal de arquivos locais...")
             shp_local = os.path.join(ROOT_DIR, "Concordia_sencitario.shp")
-            if os.path.isfile(shp_local):
+            if _eh_concordia() and os.path.isfile(shp_local):
                 gdf_municipio = gpd.read_file(shp_local)
                 if gdf_municipio.crs is None or gdf_municipio.crs.to_epsg() != 4326:
                     gdf_municipio = gdf_municipio.to_crs(epsg=4326)
@@ -298,12 +453,17 @@ def carregar_dados():
     
     try:
         # Tentar carregar base completa SC
-        caminho_base = os.path.join(ROOT_DIR, '01_DADOS', 'originais', 'Tabela_estado_SC.csv')
-        df_sc = pd.read_csv(caminho_base, sep=';', encoding='utf-8', low_memory=False)
-        df_concordia = df_sc[df_sc['CO_MUNICIPIO_GESTOR'] == 420430].copy()
+        df_sc = CAMADAS_COMPARTILHADAS.get('estabelecimentos_sc')
+        if df_sc is None:
+            caminho_base = os.path.join(ROOT_DIR, '01_DADOS', 'originais', 'Tabela_estado_SC.csv')
+            df_sc = pd.read_csv(caminho_base, sep=';', encoding='utf-8', low_memory=False)
+        df_concordia = df_sc[df_sc['CO_MUNICIPIO_GESTOR'] == MUNICIPIO['codigo']].copy()
         print(f"✅ Base SC carregada: {len(df_concordia)} estabelecimentos")
         
     except FileNotFoundError:
+        if not _eh_concordia():
+            # Dados processados/sintéticos são de Concórdia: sem a base SC não há o que analisar
+            raise
         try:
             # Fallback para dados processados
             caminho_processado = os.path.join(ROOT_DIR, '01_DADOS', 'processados', 'concordia_saude_simples.csv')
@@ -329,8 +489,13 @@ def carregar_dados():
 
     df_geo = processar_coordenadas(df_concordia)
     df_geo = calcular_distancias(df_geo)
+    # Nome, razão social, endereço e bairro normalizados uma vez (sem acento/caixa)
+    df_geo = indice_textual.normalizar_colunas(df_geo)
+    df_geo = marcar_duplicatas(df_geo)
     df_geo = classificar_estabelecimentos(df_geo)
     df_geo = adicionar_categorias_analise(df_geo)
+    # IDs de célula (hexagonal/quadrada) ficam na tabela processada para reuso
+    df_geo = agregacao_grade.adicionar_ids_celulas(df_geo)
 
     # Preencher campos ENDERECO/BAIRRO ausentes com 'N/A'
     for col in ['ENDERECO', 'BAIRRO']:
@@ -345,8 +510,8 @@ def criar_dados_sinteticos():
     """Cria dados sintéticos para demonstração"""
     np.random.seed(42)
     
-    # Coordenadas aproximadas de Concórdia
-    centro_lat, centro_lon = -27.2335, -52.0238
+    # Coordenadas aproximadas da sede
+    centro_lat, centro_lon = MUNICIPIO['centro']
     
     # Tipos de estabelecimentos com descrições
     tipos_estabelecimentos = {
@@ -415,10 +580,11 @@ def processar_coordenadas(df):
     df[lat_col] = pd.to_numeric(df[lat_col], errors='coerce')
     df[lon_col] = pd.to_numeric(df[lon_col], errors='coerce')
     
-    # Filtrar coordenadas válidas para região de Concórdia (amplo)
+    # Filtrar coordenadas válidas para a região do município (amplo: ±1° da sede)
+    lat_centro, lon_centro = MUNICIPIO['centro']
     mask_valido = (
-        (df[lat_col].between(-28, -26)) & 
-        (df[lon_col].between(-53, -51)) &
+        (df[lat_col].between(lat_centro - 1, lat_centro + 1)) & 
+        (df[lon_col].between(lon_centro - 1, lon_centro + 1)) &
         df[lat_col].notna() & 
         df[lon_col].notna()
     )
@@ -427,27 +593,18 @@ def processar_coordenadas(df):
     print(f"✅ Coordenadas válidas: {len(df_clean)}/{len(df)}")
     
     # === FILTRO ESPACIAL POR MUNICÍPIO ===
-    # Remover estabelecimentos fora dos limites de Concórdia usando shapefile
+    # Remover estabelecimentos fora dos limites do município usando shapefile
     shp_dir = os.path.join(ROOT_DIR, 'SC_Municipios_2024')
     shp_path = os.path.join(shp_dir, 'SC_Municipios_2024.shp')
     
-    if os.path.isfile(shp_path):
+    if os.path.isfile(shp_path) or CAMADAS_COMPARTILHADAS.get('municipios_sc') is not None:
         try:
             if gpd is not None:
-                # Usar GeoPandas para filtro espacial
-                gdf_municipios = gpd.read_file(shp_path)
-                if gdf_municipios.crs is None or gdf_municipios.crs.to_epsg() != 4326:
-                    gdf_municipios = gdf_municipios.to_crs(epsg=4326)
+                # Usar GeoPandas para filtro espacial (malha lida uma vez por processo/lote)
+                gdf_municipios = carregar_malha_municipios_sc()
                 
-                # Filtrar apenas Concórdia
-                nome_cols = [c for c in gdf_municipios.columns if c.upper() in ['NM_MUN', 'NM_MUNICIP', 'NOME', 'MUNICIPIO']]
-                cod_cols = [c for c in gdf_municipios.columns if ('CD' in c.upper()) and (('MUN' in c.upper()) or ('IBGE' in c.upper()))]
-                
-                gdf_concordia = gdf_municipios.copy()
-                if cod_cols:
-                    gdf_concordia = gdf_concordia[gdf_concordia[cod_cols[0]].astype(str).str.contains('420430', na=False)]
-                if gdf_concordia.empty and nome_cols:
-                    gdf_concordia = gdf_municipios[gdf_municipios[nome_cols[0]].astype(str).str.upper().str.contains('CONCÓRDIA|CONCORDIA', regex=True, na=False)]
+                # Filtrar apenas o município analisado
+                gdf_concordia = _filtrar_municipio(gdf_municipios)
                 
                 if not gdf_concordia.empty:
                     # Criar GeoDataFrame dos estabelecimentos
@@ -462,13 +619,13 @@ def processar_coordenadas(df):
                     cols_originais = df_clean.columns.tolist()
                     df_clean = gdf_dentro[cols_originais].copy()
                     
-                    print(f"🗺️  Filtro espacial aplicado: {len(df_clean)} estabelecimentos dentro de Concórdia")
+                    print(f"🗺️  Filtro espacial aplicado: {len(df_clean)} estabelecimentos dentro de {MUNICIPIO['nome']}")
                 else:
-                    print("⚠️ Município de Concórdia não encontrado no shapefile")
+                    print(f"⚠️ Município de {MUNICIPIO['nome']} não encontrado no shapefile")
             elif pyshp is not None:
                 # Fallback com pyshp: filtro por distância máxima (30km)
                 from math import radians, sin, cos, sqrt, atan2
-                centro = (-27.2335, -52.0238)
+                centro = MUNICIPIO['centro']
                 
                 def haversine(lat1, lon1, lat2, lon2):
                     R = 6371
@@ -493,7 +650,7 @@ def processar_coordenadas(df):
             print("   Usando filtro manual por distância...")
             # Fallback final: remover pontos conhecidos problemáticos
             from math import radians, sin, cos, sqrt, atan2
-            centro = (-27.2335, -52.0238)
+            centro = MUNICIPIO['centro']
             
             def haversine(lat1, lon1, lat2, lon2):
                 R = 6371
@@ -519,7 +676,7 @@ def calcular_distancias(df):
     """Calcula distâncias usando fórmula de Haversine"""
     print("📏 Calculando distâncias...")
     
-    centro_concordia = (-27.2335, -52.0238)
+    centro_concordia = MUNICIPIO['centro']
     
     def haversine(lat1, lon1, lat2, lon2):
         R = 6371  # Raio da Terra em km
@@ -543,6 +700,18 @@ def calcular_distancias(df):
     print(f"✅ Distâncias calculadas - Média: {df['dist_centro'].mean():.2f}km")
     return df
 
+def marcar_duplicatas(df):
+    """Marca (e opcionalmente remove) cadastros duplicados do mesmo estabelecimento"""
+    print("👯 Procurando estabelecimentos duplicados...")
+    df = df.reset_index(drop=True)
+    pares, resumo = duplicatas.detectar_duplicatas(df)
+    duplicatas.imprimir_resumo(resumo, pares, exemplos=5)
+    df = duplicatas.marcar_duplicatas(df, pares)
+    if REMOVER_DUPLICATAS and len(pares):
+        df = duplicatas.remover_duplicatas(df).reset_index(drop=True)
+        print(f"   ✅ {resumo['linhas'] - len(df)} duplicata(s) removida(s): {len(df)} estabelecimentos")
+    return df
+
 def classificar_estabelecimentos(df):
     # Preencher campos críticos com 'N/A' para evitar popups vazios
     campos_criticos = ['NO_FANTASIA', 'NO_LOGRADOURO', 'NO_BAIRRO', 'NO_RAZAO_SOCIAL', 'tipo_descricao']
@@ -552,35 +721,10 @@ def classificar_estabelecimentos(df):
     """Classifica estabelecimentos como público/privado"""
     print("🏛️ Classificando estabelecimentos...")
     
-    def eh_publico(nome, tipo, razao):
-        nome_str = str(nome).upper() if pd.notna(nome) else ""
-        razao_str = str(razao).upper() if pd.notna(razao) else ""
-        tipo_str = str(tipo)
-        
-        criterios_publicos = [
-            'ESF' in nome_str,
-            'PS ' in nome_str,
-            'UBS' in nome_str,
-            'CAPS' in nome_str,
-            'SAMU' in nome_str,
-            'MUNICIPIO' in razao_str,
-            'PREFEITURA' in razao_str,
-            'SECRETARIA' in razao_str,
-            tipo_str in ['1', '2', '70', '81']
-        ]
-        
-        return any(criterios_publicos)
-    
-    def forcar_publico(row):
-        tipo = str(row.get('TIPO', '')).upper()
-        if tipo in ['ESF', 'PS']:
-            return True
-        return eh_publico(
-            row.get('NO_FANTASIA', ''),
-            row.get('TP_UNIDADE', ''),
-            row.get('NO_RAZAO_SOCIAL', '')
-        )
-    df['eh_publico'] = df.apply(forcar_publico, axis=1)
+    # Tabela única de regras (classificacao_estabelecimentos), igual em todos os scripts
+    classificacao = classificacao_estabelecimentos.classificar(df)
+    df['eh_publico'] = classificacao['eh_publico']
+    df['regra_setor'] = classificacao['regra_setor']
     
     publicos = df['eh_publico'].sum()
     print(f"✅ Classificação: {publicos} públicos / {len(df)} total ({publicos/len(df)*100:.1f}%)")
@@ -600,18 +744,8 @@ def adicionar_categorias_analise(df):
     )
     
     # Categorias por tipo (flexível para diferentes bases)
-    tipos_principais = {
-        '1': 'Posto de Saúde',
-        '2': 'ESF/Centro de Saúde', 
-        '4': 'Policlínica',
-        '5': 'Hospital',
-        '22': 'Consultório',
-        '39': 'Laboratório',
-        '70': 'CAPS',
-        '81': 'UPA'
-    }
     if 'TP_UNIDADE' in df.columns:
-        df['tipo_descricao'] = df['TP_UNIDADE'].astype(str).map(tipos_principais).fillna('Outros')
+        df['tipo_descricao'] = df['TP_UNIDADE'].astype(str).map(TIPOS_PRINCIPAIS).fillna('Outros')
     elif 'TIPO' in df.columns:
         df['tipo_descricao'] = df['TIPO']
     else:
@@ -620,50 +754,30 @@ def adicionar_categorias_analise(df):
     # Setor (público/privado)
     df['setor'] = df['eh_publico'].map({True: 'Público', False: 'Privado'})
     
-    # Densidade por área (simulada por quadrantes) – detecção genérica de colunas
-    lat_cols = [col for col in df.columns if 'LAT' in col.upper()]
-    lon_cols = [col for col in df.columns if 'LON' in col.upper()]
-    if lat_cols and lon_cols:
-        lat_col, lon_col = lat_cols[0], lon_cols[0]
-        lat_quartis = df[lat_col].quantile([0.25, 0.5, 0.75])
-        lon_quartis = df[lon_col].quantile([0.25, 0.5, 0.75])
-
-        def classificar_quadrante(lat, lon):
-            if lat <= lat_quartis[0.5] and lon <= lon_quartis[0.5]:
-                return 'SW'
-            elif lat <= lat_quartis[0.5] and lon > lon_quartis[0.5]:
-                return 'SE' 
-            elif lat > lat_quartis[0.5] and lon <= lon_quartis[0.5]:
-                return 'NW'
-            else:
-                return 'NE'
-
-        df['quadrante'] = df.apply(lambda row: classificar_quadrante(row[lat_col], row[lon_col]), axis=1)
+    # Quadrantes derivados da chave espacial hierárquica: tile de cada
+    # estabelecimento comparado ao tile da sede (divisão 2x2 em torno do centro)
+    df = agregacao_grade.adicionar_chave_espacial(df)
+    if 'chave_espacial' in df.columns:
+        lat_centro, lon_centro = MUNICIPIO['centro']
+        chave_centro = agregacao_grade.chaves_espaciais([lat_centro], [lon_centro])
+        df['quadrante'] = agregacao_grade.quadrantes(df['chave_espacial'].to_numpy(), chave_centro)
     else:
         df['quadrante'] = 'N/A'
     
     print("✅ Categorias adicionadas com sucesso")
     return df
 
-def criar_mapa_avancado_treelayer(df):
-    """Cria mapa avançado com TreeLayerControl e paletas ColorBrewer"""
-    print("🗺️ Criando mapa avançado com TreeLayerControl...")
-
-    # Identificar colunas de coordenadas
-    lat_cols = [col for col in df.columns if 'LAT' in col.upper()]
-    lon_cols = [col for col in df.columns if 'LON' in col.upper()]
-    
-    if not lat_cols or not lon_cols:
-        print("⚠️ Colunas de coordenadas não encontradas!")
-        return None
-    
-    lat_col, lon_col = lat_cols[0], lon_cols[0]
-    print(f"   → Usando colunas: {lat_col}, {lon_col}")
+def _grupo_oculto(nome):
+    """
+    FeatureGroup oculto por padrão. Com CAMADAS_SOB_DEMANDA o conteúdo é
+    gravado em MAPAS_DIR/camadas/ e baixado só quando a camada é ligada.
+    """
+    if CAMADAS_SOB_DEMANDA:
+        return camadas_sob_demanda.GrupoSobDemanda(name=nome, diretorio_html=MAPAS_DIR)
+    return folium.FeatureGroup(name=nome, show=False)
 
-    # === FILTRO ESPACIAL: Remover estabelecimentos fora do limite municipal ===
-    print("🔍 Aplicando filtro espacial por limite municipal...")
-    gdf_estado_temp, gdf_municipio_temp = carregar_limites_ibge()
-    
+def filtrar_no_limite_municipal(df, lat_col, lon_col, gdf_municipio_temp):
+    """Mantém só os estabelecimentos dentro do polígono municipal (quando disponível)"""
     if gdf_municipio_temp is not None and not gdf_municipio_temp.empty and gpd is not None:
         try:
             from shapely.geometry import Point
@@ -702,583 +816,401 @@ def criar_mapa_avancado_treelayer(df):
             print(f"   → Continuando com todos os estabelecimentos ({len(df)})")
     else:
         print("   ⚠️ Limite municipal não disponível, pulando filtro espacial")
+    return df
 
-    centro_concordia = [-27.2335, -52.0238]
-
-    # Mapa base (bounds serão ajustados pelo limite municipal, quando disponível)
-    mapa = folium.Map(
-        location=centro_concordia,
-        zoom_start=12,
-        min_zoom=10,
-        max_zoom=18,
-        max_bounds=True,
-        tiles=None,
-        prefer_canvas=True,
-    )
+def complementos_padrao_mapa():
+    """
+    Controles, título, rodapé e rosa dos ventos do mapa avançado, aplicados na
+    geração (complementos_mapa) pelos backends Folium e HTML direto
+    """
+    return {
+        # GroupedLayerControl restringia múltiplas camadas; LayerControl simples permite sobreposição
+        'controle_camadas': {'posicao': 'topleft', 'recolhido': False},
+        'medida': {'posicao': 'topleft'},
+        'tela_cheia': {},
+        'titulo': {
+            'titulo': '🏥 ANÁLISE ESPACIAL DOS ESTABELECIMENTOS DE SAÚDE',
+            'subtitulo': f'Município de {_rotulo_municipio()}',
+        },
+        'rodape': {},
+        'rosa_ventos': {},
+    }
 
-    # Nota: Limite municipal local só será usado se IBGE falhar (adicionado mais abaixo)
+def preparar_analises_espaciais(df, lat_col, lon_col, tiles_calor_xyz=None):
+    """
+    Camadas de análise espacial comuns aos backends Folium e HTML direto:
+    pirâmides de tiles de calor, isobandas KDE e coropléticos em grade.
 
-    # OpenStreetMap
-    osm = folium.TileLayer(
-        tiles='OpenStreetMap',
-        name='OpenStreetMap',
-        control=True
-    )
-    osm.add_to(mapa)
-    
-    # (Removido Satélite para layout mais limpo por padrão)
-    
-    # CartoDB Positron (claro)
-    positron = folium.TileLayer(
-        tiles='CartoDB positron',
-        name='CartoDB Claro',
-        control=True
-    )
-    positron.add_to(mapa)
-    
-    # CAMADA: Círculos de raio 3km para ESF/PS
-    grupo_raio_esfps = folium.FeatureGroup(name="Raio 3km ESF/PS", show=False)
-    esfps = df[df['TIPO'].isin(['ESF', 'PS'])]
-    for idx, row in esfps.iterrows():
-        folium.Circle(
-            location=[row[lat_col], row[lon_col]],
-            radius=3000,
-            color='#3182bd',
-            fill=True,
-            fillOpacity=0.13,
-            weight=2,
-            popup=f"Raio 3km - {row.get('NO_FANTASIA', 'N/A')}"
-        ).add_to(grupo_raio_esfps)
-    grupo_raio_esfps.add_to(mapa)
-
-    # Mapa de calor para pontos dentro dos raios de 3 km de ESF/PS
-    grupo_calor_raio3km = folium.FeatureGroup(name="Mapa de Calor nos Raios 3km", show=False)
-    heat_data_raio3km = [[row[lat_col], row[lon_col], 1] for idx, row in esfps.iterrows()]
-    if heat_data_raio3km:
-        heatmap_raio3km = HeatMap(
-            heat_data_raio3km,
-            name='Calor ESF/PS 3km',
-            radius=30,
-            blur=20,
-            max_zoom=15,
-            min_opacity=0.4,
-            gradient={0.2: 'blue', 0.4: 'cyan', 0.6: 'lime', 0.8: 'yellow', 1.0: 'red'}
-        )
-        heatmap_raio3km.add_to(grupo_calor_raio3km)
-    grupo_calor_raio3km.add_to(mapa)
-    # === CAMADAS TEMÁTICAS ===
-    
-    # 1. CAMADA POR SETOR (Público/Privado) - ColorBrewer Set1
-    grupo_setor = folium.FeatureGroup(name="Por Setor", show=True)
-    cores_setor = {'Público': COLORBREWER_QUALITATIVE['Set1_8'][0], 
+    Args:
+        df: DataFrame já filtrado pelo limite municipal
+        lat_col, lon_col: colunas de coordenadas
+        tiles_calor_xyz: ver criar_mapa_avancado_treelayer
+
+    Returns:
+        dict com 'tiles' [(url relativa, nome, zoom nativo)] (vazio = HeatMap
+        no navegador), 'isobandas' (GeoJSON ou None) e 'grades' [(nome, GeoJSON)]
+    """
+    if tiles_calor_xyz is None:
+        tiles_calor_xyz = len(df) > LIMIAR_PONTOS_HEATMAP
+    df_publico = df[df['eh_publico']]
+
+    # Grade KDE geral calculada uma única vez: alimenta tiles e isobandas
+    grade_geral = tiles_calor.calcular_grade_kde(df[lat_col], df[lon_col])
+
+    tiles = []
+    if tiles_calor_xyz:
+        # Pirâmide z10–zoom nativo gerada (incrementalmente) ao lado do HTML; nenhum ponto embutido
+        print(f"   → Mapas de calor como tiles XYZ ({len(df)} pontos)")
+        camadas_tiles = [
+            (grade_geral, 'geral', COLORBREWER_SEQUENTIAL['YlOrRd_3'], 'Mapa de Calor Geral'),
+            (tiles_calor.calcular_grade_kde(df_publico[lat_col], df_publico[lon_col]), 'publico',
+             COLORBREWER_SEQUENTIAL['Reds_5'], 'Mapa de Calor - Público'),
+        ]
+        for grade_kde, pasta, paleta, nome in camadas_tiles:
+            if grade_kde is None:
+                continue
+            piramide = tiles_calor.gerar_piramide_tiles(grade_kde, os.path.join(TILES_CALOR_DIR, pasta), paleta)
+            tiles.append((f'tiles_calor/{pasta}', nome, max(piramide['zooms'])))
+
+    # Isobandas de densidade: poucos polígonos clicáveis no lugar dos pontos de calor
+    isobandas = None
+    if grade_geral is not None:
+        isobandas = contornos_densidade.extrair_isobandas(grade_geral, COLORBREWER_SEQUENTIAL['Reds_5'])
+        contornos_densidade.salvar_geojson(isobandas, os.path.join(MAPAS_DIR, 'isobandas_densidade.geojson'))
+        print(f"   ✓ Isobandas de densidade: {len(isobandas['features'])} classes")
+
+    # Agregação em grade - coroplético por célula (O(células), não O(pontos))
+    grades = []
+    for coluna, nome in [('celula_hex_1km', 'Hexágonos 1 km'), ('celula_quad_z12', 'Quadrículas (zoom 12)')]:
+        if coluna not in df.columns:
+            continue
+        agregado = agregacao_grade.agregar_por_celula(df, coluna)
+        grades.append((f'{nome} ({len(agregado)} células)', agregacao_grade.celulas_para_geojson(
+            agregado, coluna, 'total', COLORBREWER_SEQUENTIAL['Blues_5'])))
+    return {'tiles': tiles, 'isobandas': isobandas, 'grades': grades}
+
+def especificacao_mapa(df, lat_col, lon_col, limites, tiles_calor_xyz=None):
+    """
+    Especificação única do mapa avançado (pontos, camadas, limites, estilos),
+    renderizada pelos dois backends: mapa_html_direto.emitir_mapa (HTML
+    direto) e mapa_html_direto.mapa_folium (Folium).
+
+    Args:
+        df: DataFrame já filtrado pelo limite municipal
+        lat_col, lon_col: colunas de coordenadas
+        limites: saída de carregar_limites_mapa()
+        tiles_calor_xyz: ver criar_mapa_avancado_treelayer
+
+    Returns:
+        dict de parâmetros comuns a emitir_mapa e mapa_folium
+    """
+    def _coluna(nome, padrao='N/A'):
+        return df[nome] if nome in df.columns else pd.Series(padrao, index=df.index)
+
+    pontos, campos = mapa_html_direto.preparar_pontos(df, lat_col, lon_col, {
+        'nome': _coluna('NOME'),
+        'fantasia': _coluna('NO_FANTASIA'),
+        'tipo': 'tipo_descricao',
+        'setor': 'setor',
+        'categoria': _coluna('categoria_distancia').astype(str),
+        'endereco': _coluna('ENDERECO'),
+        'bairro': _coluna('BAIRRO'),
+        'dist': _coluna('dist_centro', 0).round(2),
+        'quadrante': _coluna('quadrante'),
+        'esfps': _coluna('TIPO', '').isin(['ESF', 'PS']),
+    })
+
+    cores_setor = {'Público': COLORBREWER_QUALITATIVE['Set1_8'][0],
                    'Privado': COLORBREWER_QUALITATIVE['Set1_8'][1]}
-    
-    for setor in df['setor'].unique():
-        df_setor = df[df['setor'] == setor]
-        cluster_setor = MarkerCluster(name=f'{setor} ({len(df_setor)})')
-        
-        for idx, row in df_setor.iterrows():
-            popup_html = f"""
-            <div style="width: 320px; font-family: Arial;">
-                <h4 style="color: {cores_setor[setor]}; margin-bottom: 10px;">
-                    <b>{row.get('NOME', 'N/A')}</b>
-                </h4>
-                <hr style="margin: 8px 0;">
-                <table style="width: 100%; font-size: 12px;">
-                    <tr><td><b>🏥 Tipo:</b></td><td>{row.get('tipo_descricao', 'N/A')}</td></tr>
-                    <tr><td><b>🏛️ Setor:</b></td><td style="color: {cores_setor[setor]}"><b>{setor}</b></td></tr>
-                    <tr><td><b>📍 Endereço:</b></td><td>{row.get('ENDERECO', 'N/A')}</td></tr>
-                    <tr><td><b>🏘️ Bairro:</b></td><td>{row.get('BAIRRO', 'N/A')}</td></tr>
-                    <tr><td><b>📏 Distância:</b></td><td>{row.get('dist_centro', 0):.1f} km do centro</td></tr>
-                    <tr><td><b>🗺️ Quadrante:</b></td><td>{row.get('quadrante', 'N/A')}</td></tr>
-                </table>
-            </div>
-            """
-            
-            folium.Marker(
-                location=[row[lat_col], row[lon_col]],
-                popup=folium.Popup(popup_html, max_width=350),
-                tooltip=f"{row.get('NOME', 'N/A')} - {setor}",
-                icon=folium.Icon(
-                    color='red' if setor == 'Público' else 'blue',
-                    icon='plus' if setor == 'Público' else 'info-sign'
-                )
-            ).add_to(cluster_setor)
-        
-        cluster_setor.add_to(grupo_setor)
-    
-    grupo_setor.add_to(mapa)
-    
-    # 2. CAMADA POR TIPO - ColorBrewer Dark2
-    grupo_tipo = folium.FeatureGroup(name="Por Tipo de Estabelecimento", show=False)
-    tipos_unicos = df['tipo_descricao'].unique()
-    cores_tipo = {tipo: COLORBREWER_QUALITATIVE['Dark2_8'][i % 8] 
-                  for i, tipo in enumerate(tipos_unicos)}
-    
-    for tipo in tipos_unicos:
-        df_tipo = df[df['tipo_descricao'] == tipo]
-        
-        # Sub-layer para cada tipo
-        sublayer_tipo = folium.FeatureGroup(name=f'{tipo} ({len(df_tipo)})')
-        
-        for idx, row in df_tipo.iterrows():
-            folium.CircleMarker(
-                location=[row[lat_col], row[lon_col]],
-                radius=8,
-                popup=f"<b>{row.get('NOME', 'N/A')}</b><br>{tipo}<br>{row.get('dist_centro', 0):.1f}km",
-                tooltip=f"{tipo}: {row.get('NOME', 'N/A')}",
-                color='black',
-                fillColor=cores_tipo[tipo],
-                fillOpacity=0.8,
-                weight=2
-            ).add_to(sublayer_tipo)
-        
-        sublayer_tipo.add_to(grupo_tipo)
-    
-    grupo_tipo.add_to(mapa)
-    
-    # 3. CAMADA POR DISTÂNCIA - ColorBrewer BuGn
-    grupo_distancia = folium.FeatureGroup(name="Por Distância do Centro", show=False)
-    categorias_dist = df['categoria_distancia'].unique()
-    cores_distancia = {cat: COLORBREWER_SEQUENTIAL['BuGn_5'][i % 5] 
-                      for i, cat in enumerate(categorias_dist)}
-    
-    for categoria in categorias_dist:
-        if pd.isna(categoria):
+    icones_setor = {
+        'Público': {'icon': 'plus', 'markerColor': 'red', 'prefix': 'glyphicon', 'iconColor': 'white'},
+        'Privado': {'icon': 'info-sign', 'markerColor': 'blue', 'prefix': 'glyphicon', 'iconColor': 'white'},
+    }
+    gradiente_calor = {0.2: 'blue', 0.4: 'cyan', 0.6: 'lime', 0.8: 'yellow', 1.0: 'red'}
+
+    camadas = [
+        {'nome': 'Raio 3km ESF/PS', 'tipo': 'raios', 'show': False, 'campo': 'esfps', 'valor': True,
+         'estilo': {'radius': 3000, 'color': '#3182bd', 'fill': True, 'fillOpacity': 0.13, 'weight': 2},
+         'popup': 'Raio 3km - {fantasia}'},
+        {'nome': 'Mapa de Calor nos Raios 3km', 'tipo': 'calor', 'show': False, 'campo': 'esfps', 'valor': True,
+         'opcoes': {'radius': 30, 'blur': 20, 'maxZoom': 15, 'minOpacity': 0.4, 'gradient': gradiente_calor}},
+    ]
+    # 1. Por Setor (agrupamento de marcadores) - ColorBrewer Set1
+    for setor, n in pontos['setor'].value_counts(sort=False).items():
+        camadas.append({'nome': f'{setor} ({n})', 'grupo': 'Por Setor', 'tipo': 'agrupamento', 'show': True,
+                        'campo': 'setor', 'valor': setor,
+                        'icone': icones_setor.get(setor, icones_setor['Privado']),
+                        'popup': MODELO_POPUP_ESTABELECIMENTO, 'tooltip': '{nome} - {setor}'})
+    # 2. Por Tipo - ColorBrewer Dark2
+    for i, (tipo, n) in enumerate(pontos['tipo'].value_counts(sort=False).items()):
+        camadas.append({'nome': f'{tipo} ({n})', 'grupo': 'Por Tipo de Estabelecimento', 'tipo': 'circulos',
+                        'show': False, 'campo': 'tipo', 'valor': tipo,
+                        'estilo': {'radius': 8, 'color': 'black', 'fillColor': COLORBREWER_QUALITATIVE['Dark2_8'][i % 8],
+                                   'fillOpacity': 0.8, 'weight': 2},
+                        'popup': '<b>{nome}</b><br>{tipo}<br>{dist:.1f}km', 'tooltip': '{tipo}: {nome}'})
+    # 3. Por Distância - ColorBrewer BuGn
+    for i, (categoria, n) in enumerate(pontos['categoria'].value_counts(sort=False).items()):
+        if categoria == 'nan':
             continue
-            
-        df_dist = df[df['categoria_distancia'] == categoria]
-        sublayer_dist = folium.FeatureGroup(name=f'{categoria} ({len(df_dist)})')
-        
-        for idx, row in df_dist.iterrows():
-            folium.CircleMarker(
-                location=[row[lat_col], row[lon_col]],
-                radius=6,
-                popup=f"<b>{row.get('NO_FANTASIA', 'N/A')}</b><br>{categoria}<br>{row.get('dist_centro', 0):.1f}km",
-                tooltip=f"{categoria}",
-                color='darkblue',
-                fillColor=cores_distancia[categoria],
-                fillOpacity=0.7,
-                weight=1
-            ).add_to(sublayer_dist)
-        
-        sublayer_dist.add_to(grupo_distancia)
-    
-    grupo_distancia.add_to(mapa)
-    
-    # 4. CAMADA DE CALOR - HeatMap
-    grupo_calor = folium.FeatureGroup(name="Análises Espaciais", show=False)
-    
-    # Mapa de calor geral
-    heat_data = [[row[lat_col], row[lon_col], 1] 
-                 for idx, row in df.iterrows()]
-    
-    heatmap_geral = HeatMap(
-        heat_data,
-        name='Densidade Geral',
-        radius=20,
-        blur=15,
-        max_zoom=15,
-        min_opacity=0.3
+        camadas.append({'nome': f'{categoria} ({n})', 'grupo': 'Por Distância do Centro', 'tipo': 'circulos',
+                        'show': False, 'campo': 'categoria', 'valor': categoria,
+                        'estilo': {'radius': 6, 'color': 'darkblue', 'fillColor': COLORBREWER_SEQUENTIAL['BuGn_5'][i % 5],
+                                   'fillOpacity': 0.7, 'weight': 1},
+                        'popup': '<b>{fantasia}</b><br>{categoria}<br>{dist:.1f}km', 'tooltip': '{categoria}'})
+    # 4. Análises espaciais: calor no navegador ou pirâmide de tiles XYZ, e isobandas KDE
+    analises = preparar_analises_espaciais(df, lat_col, lon_col, tiles_calor_xyz)
+    if analises['tiles']:
+        zooms = tiles_calor.ZOOMS_PADRAO
+        camadas += [mapa_html_direto.camada_tiles(f'{url}/{{z}}/{{x}}/{{y}}.png', nome, tiles_calor.ATRIBUICAO_CALOR,
+                                                  min(zooms), max(zooms), zoom_nativo, grupo='Análises Espaciais')
+                    for url, nome, zoom_nativo in analises['tiles']]
+    else:
+        camadas += [
+            {'nome': 'Mapa de Calor Geral', 'grupo': 'Análises Espaciais', 'tipo': 'calor', 'show': False,
+             'opcoes': {'radius': 20, 'blur': 15, 'maxZoom': 15, 'minOpacity': 0.3}},
+            {'nome': 'Mapa de Calor - Público', 'grupo': 'Análises Espaciais', 'tipo': 'calor', 'show': False,
+             'campo': 'setor', 'valor': 'Público',
+             'opcoes': {'radius': 25, 'blur': 20, 'maxZoom': 15, 'minOpacity': 0.4, 'gradient': gradiente_calor}},
+        ]
+    if analises['isobandas'] is not None and analises['isobandas']['features']:
+        camadas.append(mapa_html_direto.camada_poligonos(
+            analises['isobandas'], 'Isobandas de Densidade (KDE)', contornos_densidade.ESTILO_ISOBANDAS,
+            estilo_por_propriedade={'fillColor': 'cor', 'color': 'cor'},
+            destaque=contornos_densidade.DESTAQUE_ISOBANDAS,
+            tooltip='Densidade: {rotulo}', popup='<b>Classe:</b> {classe}<br><b>Densidade:</b> {rotulo}',
+            grupo='Análises Espaciais'))
+    # 4b. Agregação em grade - coroplético por célula (O(células), não O(pontos))
+    for nome, geojson_celulas in analises['grades']:
+        if not geojson_celulas['features']:
+            continue
+        propriedades = geojson_celulas['features'][0]['properties']
+        camadas.append(mapa_html_direto.camada_poligonos(
+            geojson_celulas, nome, agregacao_grade.ESTILO_CELULAS,
+            estilo_por_propriedade={'fillColor': 'cor'}, destaque=agregacao_grade.DESTAQUE_CELULAS,
+            tooltip='<br>'.join(f'{rotulo} {{{campo}}}' for campo, rotulo
+                                in agregacao_grade.ROTULOS_METRICAS_CELULA.items() if campo in propriedades),
+            grupo='Agregação em Grade'))
+    # 5. Referências geográficas (centro e círculos de distância)
+    camadas.append({
+        'nome': 'Referências Geográficas', 'tipo': 'referencia', 'show': True,
+        'centro': list(MUNICIPIO['centro']),
+        'icone': {'icon': 'star', 'markerColor': 'black', 'prefix': 'glyphicon'},
+        'popup_html': f"<b>🏛️ Centro de {MUNICIPIO['nome']}</b><br>Ponto de referência da análise",
+        'tooltip_html': 'Centro da Cidade',
+        'estilo': {'fill': True, 'fillOpacity': 0.1, 'weight': 2},
+        'aneis': [{'raio': raio, 'cor': COLORBREWER_SEQUENTIAL['BuGn_5'][i], 'rotulo': rotulo}
+                  for i, (raio, rotulo) in enumerate([(2000, '2km'), (5000, '5km'), (10000, '10km'), (20000, '20km')], 1)],
+    })
+
+    # Limites (TopoJSON quantizado); o municipal enquadra e limita o mapa
+    camadas_limites = []
+    if limites['estado'] is not None and not limites['estado'].empty:
+        camadas_limites.append(mapa_html_direto.camada_limite(
+            limites['estado'], '🗺️ Limite Estadual (Santa Catarina)', 'estado',
+            estilo={'color': '#2c7fb8', 'weight': 1.5, 'fillColor': 'transparent', 'fillOpacity': 0,
+                    'dashArray': '5, 5'},
+            tooltip='Estado de Santa Catarina',
+            popup='<b>Estado de Santa Catarina</b><br>Área: ~95.730 km²<br>Fonte: IBGE'))
+    gdf_municipio = limites['municipio']
+    if gdf_municipio is not None and not gdf_municipio.empty:
+        camadas_limites.append(mapa_html_direto.camada_limite(
+            gdf_municipio, f"📍 Limite Municipal ({MUNICIPIO['nome']})", 'municipio',
+            estilo={'color': '#238b45', 'weight': 3.0, 'fillColor': '#66c2a4', 'fillOpacity': 0.08},
+            destaque={'weight': 5, 'color': '#00441b', 'fillOpacity': 0.25},
+            tooltip=f"Município de {MUNICIPIO['nome']}",
+            popup=(f"<b>Município de {_rotulo_municipio()}</b><br>Código IBGE: {MUNICIPIO['codigo']}<br>"
+                   f"Área: ~{gdf_municipio.to_crs(31982).area.sum() / 1e6:.0f} km²<br>Fonte: IBGE"),
+            ajustar=True))
+    gdf_vizinhos = limites['vizinhos']
+    if gdf_vizinhos is not None and not gdf_vizinhos.empty:
+        camadas_limites.append(mapa_html_direto.camada_limite(
+            gdf_vizinhos, '🗺️ Municípios Vizinhos', 'vizinhos',
+            propriedades={
+                'nome': gdf_vizinhos['NM_MUN'] if 'NM_MUN' in gdf_vizinhos.columns else 'Município',
+                'area_km2': (pd.to_numeric(gdf_vizinhos['AREA_KM2'], errors='coerce').fillna(0).round(1)
+                             if 'AREA_KM2' in gdf_vizinhos.columns else 0.0),
+            },
+            estilo={'color': '#969696', 'weight': 1.0, 'fillColor': '#cccccc', 'fillOpacity': 0.03,
+                    'dashArray': '2, 4'},
+            destaque={'weight': 2.0, 'fillOpacity': 0.1},
+            tooltip='{nome}', popup='<b>{nome}</b><br>Área: {area_km2:.1f} km²', show=False))
+    gdf_distritos = limites['distritos']
+    if gdf_distritos is not None and not gdf_distritos.empty:
+        id_cols = [c for c in gdf_distritos.columns if c.upper() in ['CD_SETOR', 'CD_GEOCODI', 'GEOCODIGO', 'ID']]
+        setor_ids = (gdf_distritos[id_cols[0]].astype(str) if id_cols else
+                     pd.Series(range(1, len(gdf_distritos) + 1), index=gdf_distritos.index).astype(str))
+        camadas_limites.append(mapa_html_direto.camada_limite(
+            gdf_distritos, '📍 Limites Distritais/Setores', 'setores',
+            propriedades={'setor_id': setor_ids},
+            estilo={'color': '#fd8d3c', 'weight': 1.5, 'fillColor': '#fdd0a2', 'fillOpacity': 0.05,
+                    'dashArray': '3, 3'},
+            destaque={'weight': 2.5, 'fillOpacity': 0.15},
+            tooltip='Setor {setor_id}',
+            popup='<b>Setor Censitário</b><br>ID: {setor_id}<br>Fonte: IBGE Censo 2022', show=False))
+
+    return dict(
+        pontos=pontos, campos=campos, camadas=camadas, centro=MUNICIPIO['centro'],
+        limites=camadas_limites, tabelas={'cor': ('setor', cores_setor)}, zoom=12, min_zoom=10,
     )
+
+def _colunas_coordenadas(df):
+    """(lat_col, lon_col) do DataFrame, ou (None, None)"""
+    lat_cols = [col for col in df.columns if 'LAT' in col.upper()]
+    lon_cols = [col for col in df.columns if 'LON' in col.upper()]
+    if not lat_cols or not lon_cols:
+        return None, None
+    return lat_cols[0], lon_cols[0]
+
+def criar_mapa_avancado_treelayer(df, tiles_calor_xyz=None, complementos=None, limites=None):
+    """
+    Cria mapa avançado com TreeLayerControl e paletas ColorBrewer
+
+    Args:
+        df: DataFrame processado dos estabelecimentos
+        tiles_calor_xyz: True usa pirâmide de tiles PNG para os mapas de calor,
+            False embute os pontos no HeatMap; None decide pelo número de pontos
+            (LIMIAR_PONTOS_HEATMAP)
+        complementos: dict {nome: opções ou None} somado a complementos_padrao_mapa()
+            (ver complementos_mapa)
+        limites: saída de carregar_limites_mapa() (None = carregar)
+    """
+    print("🗺️ Criando mapa avançado com TreeLayerControl...")
+
+    lat_col, lon_col = _colunas_coordenadas(df)
+    if lat_col is None:
+        print("⚠️ Colunas de coordenadas não encontradas!")
+        return None
+    print(f"   → Usando colunas: {lat_col}, {lon_col}")
+
+    # === FILTRO ESPACIAL: Remover estabelecimentos fora do limite municipal ===
+    print("🔍 Aplicando filtro espacial por limite municipal...")
+    if limites is None:
+        limites = carregar_limites_mapa()
+    df = filtrar_no_limite_municipal(df, lat_col, lon_col, limites['municipio'])
+
+    # Mesma especificação do backend direto; camadas ocultas vão para arquivos sob demanda
+    mapa = mapa_html_direto.mapa_folium(**especificacao_mapa(df, lat_col, lon_col, limites, tiles_calor_xyz),
+                                        grupo_oculto=_grupo_oculto)
+
+    # === CONTROLES, TÍTULO, RODAPÉ E ROSA DOS VENTOS (na geração, sem pós-processamento) ===
+    # Busca por nome/bairro sobre o índice invertido (indice_textual)
+    padrao = dict(complementos_padrao_mapa(), busca={'df': df})
+    complementos_mapa.aplicar_complementos(mapa, padrao, complementos)
     
-    sublayer_heat = folium.FeatureGroup(name='Mapa de Calor Geral')
-    heatmap_geral.add_to(sublayer_heat)
-    sublayer_heat.add_to(grupo_calor)
-    
-    # Mapa de calor só dos públicos
-    heat_data_pub = [[row[lat_col], row[lon_col], 1] 
-                     for idx, row in df[df['eh_publico']].iterrows()]
-    
-    if heat_data_pub:
-        heatmap_publico = HeatMap(
-            heat_data_pub,
-            name='Densidade Público',
-            radius=25,
-            blur=20,
-            max_zoom=15,
-            min_opacity=0.4,
-            gradient={0.2: 'blue', 0.4: 'cyan', 0.6: 'lime', 0.8: 'yellow', 1.0: 'red'}
-        )
-        
-        sublayer_heat_pub = folium.FeatureGroup(name='Mapa de Calor - Público')
-        heatmap_publico.add_to(sublayer_heat_pub)
-        sublayer_heat_pub.add_to(grupo_calor)
-    
-    grupo_calor.add_to(mapa)
-    
-    # 5. CAMADA DE REFERÊNCIAS
-    grupo_ref = folium.FeatureGroup(name="Referências Geográficas", show=True)
-    
-    # Centro da cidade
-    folium.Marker(
-        location=centro_concordia,
-        popup='<b>🏛️ Centro de Concórdia</b><br>Ponto de referência da análise',
-        tooltip='Centro da Cidade',
-        icon=folium.Icon(color='black', icon='star', prefix='glyphicon')
-    ).add_to(grupo_ref)
-    
-    # Círculos de distância com cores ColorBrewer
-    raios_cores = [
-        (2000, COLORBREWER_SEQUENTIAL['BuGn_5'][1], '2km'),
-        (5000, COLORBREWER_SEQUENTIAL['BuGn_5'][2], '5km'),
-        (10000, COLORBREWER_SEQUENTIAL['BuGn_5'][3], '10km'),
-        (20000, COLORBREWER_SEQUENTIAL['BuGn_5'][4], '20km')
-    ]
-    
-    for raio, cor, label in raios_cores:
-        folium.Circle(
-            centro_concordia,
-            radius=raio,
-            color=cor,
-            fill=True,
-            fillOpacity=0.1,
-            weight=2,
-            popup=f'Raio de {label}',
-            tooltip=f'Área de {label} do centro'
-        ).add_to(grupo_ref)
-    
-    grupo_ref.add_to(mapa)
-
-    # === CAMADAS DE LIMITES (Municipal, Estadual, Distritais e Vizinhos) ===
-    # Carregar limites do IBGE
-    gdf_estado, gdf_municipio = carregar_limites_ibge()
-    
-    # Carregar municípios vizinhos para contexto regional
-    gdf_vizinhos = carregar_municipios_vizinhos()
-    
-    # Carregar limites distritais (setores censitários)
-    gdf_distritos = carregar_limites_distritais()
+    print("✅ Mapa avançado criado com TreeLayerControl")
+    return mapa
 
-    # Simplificar geometrias para visual mais limpo e melhor performance
-    if gpd is not None and gdf_municipio is not None and hasattr(gdf_municipio, 'empty') and not gdf_municipio.empty:
+def carregar_limites_mapa():
+    """
+    Limites usados no mapa, carregados uma vez: estado, município
+    (simplificado), vizinhos e setores censitários.
+
+    Returns:
+        dict {'estado', 'municipio', 'vizinhos', 'distritos'} (GeoDataFrame ou None)
+    """
+    gdf_estado, gdf_municipio = carregar_limites_ibge()
+    if gpd is not None and gdf_municipio is not None and not gdf_municipio.empty:
         try:
             _gdf = gdf_municipio.to_crs(31982)
-            _gdf['geometry'] = _gdf['geometry'].buffer(0)
-            _gdf['geometry'] = _gdf['geometry'].simplify(100)
+            _gdf['geometry'] = _gdf['geometry'].buffer(0).simplify(100)
             gdf_municipio = _gdf.to_crs(4326)
         except Exception:
             pass
-    
-    # Grupo para limite estadual (base layer, sempre visível)
-    grupo_lim_estadual = folium.FeatureGroup(name="🗺️ Limite Estadual (Santa Catarina)", show=True)
-    
-    if gdf_estado is not None and not gdf_estado.empty:
-        try:
-            # Adicionar limite estadual como camada de contexto
-            folium.GeoJson(
-                data=gdf_estado.__geo_interface__,
-                name='Limite Estadual (SC)',
-                style_function=lambda x: {
-                    'color': '#2c7fb8',        # Azul mais escuro para melhor visibilidade
-                    'weight': 1.5,              # Linha moderada
-                    'fillColor': 'transparent', # Sem preenchimento
-                    'fillOpacity': 0,
-                    'dashArray': '5, 5'        # Linha tracejada para diferenciar
-                },
-                tooltip=folium.Tooltip('Estado de Santa Catarina'),
-                popup=folium.Popup('<b>Estado de Santa Catarina</b><br>Área: ~95.730 km²<br>Fonte: IBGE', max_width=250)
-            ).add_to(grupo_lim_estadual)
-            print("✅ Limite estadual adicionado ao mapa")
-        except Exception as e:
-            print(f"⚠️ Erro ao adicionar limite estadual: {e}")
-    else:
-        print("⚠️ Limite estadual não disponível")
-    
-    grupo_lim_estadual.add_to(mapa)
-    
-    # Grupo para limite municipal (destaque)
-    grupo_lim_municipio = folium.FeatureGroup(name="📍 Limite Municipal (Concórdia)", show=True)
-    
-    if gdf_municipio is not None and not gdf_municipio.empty:
-        try:
-            # Adicionar limite municipal com destaque
-            gj_mun = folium.GeoJson(
-                data=gdf_municipio.__geo_interface__,
-                name='Limite Municipal (Concórdia)',
-                style_function=lambda x: {
-                    'color': '#238b45',        # Verde escuro (ColorBrewer)
-                    'weight': 3.0,              # Linha de destaque
-                    'fillColor': '#66c2a4',     # Verde claro suave
-                    'fillOpacity': 0.08,        # Preenchimento mais leve
-                    'dashArray': None           # Linha contínua
-                },
-                highlight_function=lambda x: {
-                    'weight': 5,
-                    'color': '#00441b',         # Verde muito escuro no hover
-                    'fillOpacity': 0.25
-                },
-                tooltip=folium.Tooltip('Município de Concórdia'),
-                popup=folium.Popup('<b>Município de Concórdia/SC</b><br>Código IBGE: 420430<br>Área: ~799 km²<br>Fonte: IBGE', max_width=250)
-            )
-            gj_mun.add_to(grupo_lim_municipio)
+    return {
+        'estado': gdf_estado,
+        'municipio': gdf_municipio,
+        'vizinhos': carregar_municipios_vizinhos(),
+        'distritos': carregar_limites_distritais(),
+    }
 
-            # Ajustar bounds do mapa com base no limite municipal
-            try:
-                minx, miny, maxx, maxy = gdf_municipio.total_bounds
-                bounds = [[miny, minx], [maxy, maxx]]
-                mapa.fit_bounds(bounds)
-                mapa.options['maxBounds'] = bounds
-            except Exception:
-                pass
-            print("✅ Limite municipal adicionado ao mapa")
-        except Exception as e:
-            print(f"⚠️ Erro ao adicionar limite municipal: {e}")
-    else:
-        print("⚠️ Limite municipal não disponível")
-    
-    grupo_lim_municipio.add_to(mapa)
-    
-    # Grupo para municípios vizinhos (contexto regional)
-    grupo_vizinhos = folium.FeatureGroup(name="🗺️ Municípios Vizinhos", show=False)
-    
-    if gdf_vizinhos is not None and not gdf_vizinhos.empty:
-        try:
-            for idx, row in gdf_vizinhos.iterrows():
-                nome_mun = row.get('NM_MUN', 'Município')
-                area_km2 = row.get('AREA_KM2', 0)
-                
-                folium.GeoJson(
-                    data=row['geometry'].__geo_interface__,
-                    style_function=lambda x: {
-                        'color': '#969696',         # Cinza neutro
-                        'weight': 1.0,
-                        'fillColor': '#cccccc',
-                        'fillOpacity': 0.03,
-                        'dashArray': '2, 4'
-                    },
-                    highlight_function=lambda x: {
-                        'weight': 2.0,
-                        'fillOpacity': 0.1
-                    },
-                    tooltip=folium.Tooltip(nome_mun),
-                    popup=folium.Popup(f'<b>{nome_mun}</b><br>Área: {area_km2:.1f} km²', max_width=200)
-                ).add_to(grupo_vizinhos)
-            
-            print(f"✅ {len(gdf_vizinhos)} municípios vizinhos adicionados ao mapa")
-        except Exception as e:
-            print(f"⚠️ Erro ao adicionar municípios vizinhos: {e}")
-    
-    grupo_vizinhos.add_to(mapa)
-    
-    # Grupo para limites distritais (setores censitários)
-    grupo_lim_distritos = folium.FeatureGroup(name="📍 Limites Distritais/Setores", show=False)
-    
-    if gdf_distritos is not None and not gdf_distritos.empty:
-        try:
-            # Identificar coluna de identificação do setor
-            id_cols = [c for c in gdf_distritos.columns if c.upper() in ['CD_SETOR', 'CD_GEOCODI', 'GEOCODIGO', 'ID']]
-            id_col = id_cols[0] if id_cols else None
-            
-            # Adicionar setores como subdivisões distritais
-            for idx, row in gdf_distritos.iterrows():
-                setor_id = row[id_col] if id_col else f"Setor {idx+1}"
-                
-                # Criar GeoJson para cada setor
-                setor_geojson = folium.GeoJson(
-                    data=row['geometry'].__geo_interface__,
-                    style_function=lambda x: {
-                        'color': '#fd8d3c',         # Laranja (ColorBrewer)
-                        'weight': 1.5,
-                        'fillColor': '#fdd0a2',     # Laranja claro
-                        'fillOpacity': 0.05,        # Muito transparente
-                        'dashArray': '3, 3'         # Linha pontilhada
-                    },
-                    highlight_function=lambda x: {
-                        'weight': 2.5,
-                        'fillOpacity': 0.15
-                    },
-                    tooltip=folium.Tooltip(f'Setor {setor_id}'),
-                    popup=folium.Popup(f'<b>Setor Censitário</b><br>ID: {setor_id}<br>Fonte: IBGE Censo 2022', max_width=200)
-                )
-                setor_geojson.add_to(grupo_lim_distritos)
-            
-            print(f"✅ {len(gdf_distritos)} setores distritais adicionados ao mapa")
-        except Exception as e:
-            print(f"⚠️ Erro ao adicionar setores distritais: {e}")
-    else:
-        print("⚠️ Limites distritais não disponíveis")
-    
-    grupo_lim_distritos.add_to(mapa)
-
-    # === CONTROLE DE CAMADAS (checkboxes independentes) ===
-    # GroupedLayerControl estava restringindo múltiplas camadas; usamos LayerControl simples para permitir sobreposição.
-    folium.LayerControl(position='topleft', collapsed=False).add_to(mapa)
-    
-    # Legenda tema removida conforme solicitado
-    
-    # Adicionar controles adicionais
-    folium.plugins.MeasureControl(position='topleft').add_to(mapa)
-    folium.plugins.Fullscreen().add_to(mapa)
-    
-    # === ADICIONAR TÍTULO PROFISSIONAL AO MAPA ===
-    titulo_html = '''
-    <div style="position: fixed; 
-                top: 10px; 
-                left: 50%; 
-                transform: translateX(-50%);
-                width: auto;
-                max-width: 90%;
-                height: auto;
-                background-color: white;
-                border: 3px solid #238b45;
-                border-radius: 10px;
-                z-index: 9999;
-                padding: 15px 25px;
-                box-shadow: 0 4px 8px rgba(0,0,0,0.3);
-                text-align: center;
-                font-family: 'Arial', sans-serif;">
-        <h2 style="margin: 0; 
-                   padding: 0; 
-                   font-size: 22px; 
-                   font-weight: bold; 
-                   color: #00441b;
-                   line-height: 1.3;">
-            🏥 ANÁLISE ESPACIAL DOS ESTABELECIMENTOS DE SAÚDE
-        </h2>
-        <p style="margin: 5px 0 0 0; 
-                  padding: 0; 
-                  font-size: 16px; 
-                  color: #238b45;
-                  font-weight: 600;">
-            Município de Concórdia/SC
-        </p>
-    </div>
-    '''
-    
-    # === ADICIONAR RODAPÉ COM CRÉDITOS ===
-    rodape_html = '''
-    <div style="position: fixed; 
-                bottom: 10px; 
-                left: 50%; 
-                transform: translateX(-50%);
-                width: auto;
-                max-width: 95%;
-                height: auto;
-                background-color: rgba(255, 255, 255, 0.95);
-                border: 2px solid #238b45;
-                border-radius: 8px;
-                z-index: 9999;
-                padding: 10px 20px;
-                box-shadow: 0 2px 6px rgba(0,0,0,0.2);
-                text-align: center;
-                font-family: 'Arial', sans-serif;">
-        <p style="margin: 0; 
-                  padding: 0; 
-                  font-size: 12px; 
-                  color: #333;
-                  line-height: 1.6;">
-            <b>Fonte:</b> CNES/DataSUS | IBGE | 
-            <b>Autor:</b> Ronan Armando Caetano, Graduando em Ciências Biológicas UFSC e Técnico em Geoprocessamento IFSC
-        </p>
-    </div>
-    '''
-    
-    mapa.get_root().html.add_child(folium.Element(titulo_html))
-    mapa.get_root().html.add_child(folium.Element(rodape_html))
-    
-    # === ROSA DOS VENTOS (N, S, L, O) ===
-    rosa_ventos_html = '''
-    <div id="rosa-ventos-unica" style="
-        position: fixed;
-        bottom: 100px;
-        right: 30px;
-        width: 75px;
-        height: 75px;
-        z-index: 10001;
-        background: rgba(255, 255, 255, 0.9);
-        border: 2px solid #2c5aa0;
-        border-radius: 50%;
-        box-shadow: 0 2px 8px rgba(0,0,0,0.3);
-        display: flex;
-        align-items: center;
-        justify-content: center;">
-        <svg width="70" height="70" viewBox="0 0 100 100">
-            <circle cx="50" cy="50" r="48" fill="white" stroke="#2c5aa0" stroke-width="2"/>
-            <!-- Seta Norte (Vermelha) -->
-            <path d="M 50 10 L 55 40 L 50 35 L 45 40 Z" fill="#cc0000"/>
-            <!-- Seta Sul -->
-            <path d="M 50 90 L 55 60 L 50 65 L 45 60 Z" fill="#666"/>
-            <!-- Seta Leste -->
-            <path d="M 90 50 L 60 55 L 65 50 L 60 45 Z" fill="#666"/>
-            <!-- Seta Oeste -->
-            <path d="M 10 50 L 40 55 L 35 50 L 40 45 Z" fill="#666"/>
-            <!-- Letras -->
-            <text x="50" y="22" text-anchor="middle" font-size="14" font-weight="bold" fill="#cc0000">N</text>
-            <text x="50" y="95" text-anchor="middle" font-size="12" font-weight="bold" fill="#666">S</text>
-            <text x="85" y="55" text-anchor="middle" font-size="12" font-weight="bold" fill="#666">L</text>
-            <text x="15" y="55" text-anchor="middle" font-size="12" font-weight="bold" fill="#666">O</text>
-        </svg>
-    </div>
-    '''
-    mapa.get_root().html.add_child(folium.Element(rosa_ventos_html))
-    
-    print("✅ Mapa avançado criado com TreeLayerControl")
-    return mapa
+def criar_mapa_html_direto(df, caminho, limites=None, complementos=None, tiles_calor_xyz=None):
+    """
+    Mapa avançado pelo emissor HTML direto: a mesma especificação do backend
+    Folium (especificacao_mapa), com título/rodapé/rosa dos ventos, busca e
+    controle de camadas, gravada de um modelo pré-compilado sem a árvore do
+    Folium.
+
+    Args:
+        df: DataFrame processado dos estabelecimentos
+        caminho: arquivo HTML de saída
+        limites: saída de carregar_limites_mapa() (None = carregar)
+        complementos: dict {nome: opções ou None} somado a complementos_padrao_mapa();
+            valem os fragmentos fixos (título, rodapé, rosa...) e 'busca'
+            (None desliga a caixa de busca)
+        tiles_calor_xyz: ver criar_mapa_avancado_treelayer
 
-def gerar_dashboard_visual_completo(df):
-    """Gera dashboard visual completo com matplotlib/seaborn"""
-    print("📊 Gerando dashboard visual completo...")
-    
-    # Configurar estilo
-    plt.style.use('seaborn-v0_8-whitegrid')
-    
-    # Paletas ColorBrewer
-    cores_sequencial = COLORBREWER_SEQUENTIAL['BuGn_5']
+    Returns:
+        bytes gravados
+    """
+    print("🗺️ Criando mapa avançado (HTML direto)...")
+    lat_col, lon_col = _colunas_coordenadas(df)
+
+    if limites is None:
+        limites = carregar_limites_mapa()
+    df = filtrar_no_limite_municipal(df, lat_col, lon_col, limites['municipio'])
+    especificacao = especificacao_mapa(df, lat_col, lon_col, limites, tiles_calor_xyz)
+
+    # Busca por nome/bairro sobre o índice invertido (mesmo script do complemento 'busca')
+    html_extra = complementos_mapa.fragmento_html(complementos_padrao_mapa(), complementos)
+    js_extra = ''
+    if (complementos or {}).get('busca', {}) is not None and not df.empty:
+        html_extra += f'<style>{indice_textual.CSS_BUSCA}</style>'
+        js_extra = indice_textual.js_busca(indice_textual.exportar_indice(df, lat_col=lat_col, lon_col=lon_col))
+
+    tamanho = mapa_html_direto.emitir_mapa(
+        caminho, titulo=f'Estabelecimentos de Saúde - {_rotulo_municipio()}',
+        html_extra=html_extra, js_extra=js_extra, **especificacao)
+    print(f"✅ Mapa avançado gravado ({len(especificacao['pontos'])} pontos, {tamanho / 1024:.0f} KB)")
+    return tamanho
+
+# === PAINÉIS DO DASHBOARD VISUAL ===
+# Cada painel desenha num eixo recebido (nível de módulo: o modo paralelo
+# os executa em outros processos). contexto = {'centro': (lat, lon),
+# 'metricas': Metricas de calcular_metricas, ...}
+
+def _painel_setor(ax, df, contexto):
     cores_qualitativa = COLORBREWER_QUALITATIVE['Set1_8']
-    
-    # Criar figura principal
-    fig = plt.figure(figsize=(20, 16))
-    fig.suptitle('🏥 DASHBOARD COMPLETO - ANÁLISE ESPACIAL ESTABELECIMENTOS DE SAÚDE\nConcórdia/SC', 
-                 fontsize=24, fontweight='bold', y=0.98)
-    
-    # Layout: 4x4 grid
-    gs = fig.add_gridspec(4, 4, hspace=0.4, wspace=0.3)
-    
-    # === GRÁFICO 1: Distribuição por Setor ===
-    ax1 = fig.add_subplot(gs[0, 0])
-    setor_counts = df['setor'].value_counts()
+    setor_counts = contexto['metricas'].contagens('setor')
     colors_setor = [cores_qualitativa[i] for i in range(len(setor_counts))]
-    
+
     explode = [0.05] + [0]*(len(setor_counts)-1) if len(setor_counts) > 0 else None
-    wedges, texts, autotexts = ax1.pie(
-        setor_counts.values, 
+    wedges, texts, autotexts = ax.pie(
+        setor_counts.values,
         labels=setor_counts.index,
         colors=colors_setor,
         autopct='%1.1f%%',
         startangle=90,
         explode=explode
     )
-    ax1.set_title('📊 Distribuição por Setor', fontsize=14, fontweight='bold')
-    
-    # === GRÁFICO 2: Tipos de Estabelecimentos ===
-    ax2 = fig.add_subplot(gs[0, 1:3])
-    tipo_counts = df['tipo_descricao'].value_counts().head(8)
-    bars = ax2.bar(range(len(tipo_counts)), tipo_counts.values, color=cores_qualitativa[:len(tipo_counts)])
-    ax2.set_title('🏥 Tipos de Estabelecimentos (Top 8)', fontsize=14, fontweight='bold')
-    ax2.set_xlabel('Tipo de Estabelecimento')
-    ax2.set_ylabel('Quantidade')
-    ax2.set_xticks(range(len(tipo_counts)))
-    ax2.set_xticklabels(tipo_counts.index, rotation=45, ha='right')
-    
+    ax.set_title('📊 Distribuição por Setor', fontsize=14, fontweight='bold')
+
+def _painel_tipos(ax, df, contexto):
+    cores_qualitativa = COLORBREWER_QUALITATIVE['Set1_8']
+    tipo_counts = contexto['metricas'].contagens('tipo_descricao', 8)
+    bars = ax.bar(range(len(tipo_counts)), tipo_counts.values, color=cores_qualitativa[:len(tipo_counts)])
+    ax.set_title('🏥 Tipos de Estabelecimentos (Top 8)', fontsize=14, fontweight='bold')
+    ax.set_xlabel('Tipo de Estabelecimento')
+    ax.set_ylabel('Quantidade')
+    ax.set_xticks(range(len(tipo_counts)))
+    ax.set_xticklabels(tipo_counts.index, rotation=45, ha='right')
+
     # Adicionar valores nas barras
     for i, (bar, value) in enumerate(zip(bars, tipo_counts.values)):
-        ax2.text(bar.get_x() + bar.get_width()/2., bar.get_height() + 0.5,
+        ax.text(bar.get_x() + bar.get_width()/2., bar.get_height() + 0.5,
                 f'{value}', ha='center', va='bottom', fontweight='bold')
-    
-    # === GRÁFICO 3: Estatísticas Resumo ===
-    ax3 = fig.add_subplot(gs[0, 3])
-    ax3.axis('off')
-    
-    # Calcular estatísticas
-    total_est = len(df)
-    publicos = len(df[df['eh_publico']])
-    privados = total_est - publicos
-    dist_media = df['dist_centro'].mean()
-    mais_proximo = df['dist_centro'].min()
-    mais_distante = df['dist_centro'].max()
-    dentro_5km = len(df[df['dist_centro'] <= 5])
-    
+
+def _painel_estatisticas(ax, df, contexto):
+    ax.axis('off')
+
+    m = contexto['metricas']
+    total_est = m.total
+    publicos = m.publicos
+    privados = m.privados
+    dist_media = m.dist_media
+    mais_proximo = m.dist_min
+    mais_distante = m.dist_max
+    dentro_5km = m.ate_km[5]
+
     stats_text = f'''
 ESTATÍSTICAS GERAIS
 
@@ -1288,180 +1220,310 @@ ESTATÍSTICAS GERAIS
 
 📏 DISTÂNCIAS DO CENTRO
 🎯 Média: {dist_media:.2f} km
-📍 Mais próximo: {mais_proximo:.2f} km  
+📍 Mais próximo: {mais_proximo:.2f} km
 🚁 Mais distante: {mais_distante:.2f} km
 ⭕ Dentro de 5km: {dentro_5km} ({dentro_5km/total_est*100:.1f}%)
 
 🗓️ Atualizado: Outubro 2025
 '''
-    
-    ax3.text(0.05, 0.95, stats_text, transform=ax3.transAxes, fontsize=11,
+
+    ax.text(0.05, 0.95, stats_text, transform=ax.transAxes, fontsize=11,
              verticalalignment='top', bbox=dict(boxstyle="round,pad=0.5", facecolor="lightblue", alpha=0.8))
-    
-    # === GRÁFICO 4: Histograma de Distâncias ===
-    ax4 = fig.add_subplot(gs[1, 0:2])
-    
+
+def _painel_histograma_distancias(ax, df, contexto):
+    cores_sequencial = COLORBREWER_SEQUENTIAL['BuGn_5']
+    dist_media = contexto['metricas'].dist_media
+
     # Histograma com cores sequenciais
-    n, bins, patches = ax4.hist(df['dist_centro'], bins=25, edgecolor='black', alpha=0.8)
-    
+    n, bins, patches = ax.hist(df['dist_centro'], bins=25, edgecolor='black', alpha=0.8)
+
     # Aplicar gradiente de cores
     fracs = n / n.max()
-    norm = mcolors.Normalize(vmin=fracs.min(), vmax=fracs.max())
-    
+
     for thisfrac, thispatch in zip(fracs, patches):
         color_idx = int(thisfrac * (len(cores_sequencial) - 1))
         try:
             thispatch.set_facecolor(cores_sequencial[color_idx])
         except Exception:
             pass
-    
-    ax4.axvline(dist_media, color='red', linestyle='--', linewidth=2, 
+
+    ax.axvline(dist_media, color='red', linestyle='--', linewidth=2,
                 label=f'Média: {dist_media:.1f}km')
-    ax4.set_title('📏 Distribuição das Distâncias ao Centro', fontsize=14, fontweight='bold')
-    ax4.set_xlabel('Distância (km)')
-    ax4.set_ylabel('Frequência')
-    ax4.legend()
-    ax4.grid(True, alpha=0.3)
-    
-    # === GRÁFICO 5: Boxplot por Setor ===
-    ax5 = fig.add_subplot(gs[1, 2])
-    
+    ax.set_title('📏 Distribuição das Distâncias ao Centro', fontsize=14, fontweight='bold')
+    ax.set_xlabel('Distância (km)')
+    ax.set_ylabel('Frequência')
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+
+def _painel_boxplot_setor(ax, df, contexto):
+    cores_qualitativa = COLORBREWER_QUALITATIVE['Set1_8']
     box_data = [df[df['setor'] == setor]['dist_centro'].values for setor in df['setor'].unique()]
-    bp = ax5.boxplot(box_data, patch_artist=True, labels=df['setor'].unique())
-    
+    bp = ax.boxplot(box_data, patch_artist=True, labels=df['setor'].unique())
+
     for patch, color in zip(bp['boxes'], [cores_qualitativa[0], cores_qualitativa[1]]):
         if patch is not None and color is not None:
             patch.set_color(color)
             patch.set_alpha(0.7)
-    
-    ax5.set_title('📊 Distâncias por Setor', fontsize=14, fontweight='bold')
-    ax5.set_ylabel('Distância (km)')
-    ax5.grid(True, alpha=0.3)
-    
-    # === GRÁFICO 6: Densidade por Quadrante ===
-    ax6 = fig.add_subplot(gs[1, 3])
-    
-    quadrante_counts = df['quadrante'].value_counts()
-    bars = ax6.bar(quadrante_counts.index, quadrante_counts.values, 
+
+    ax.set_title('📊 Distâncias por Setor', fontsize=14, fontweight='bold')
+    ax.set_ylabel('Distância (km)')
+    ax.grid(True, alpha=0.3)
+
+def _painel_quadrantes(ax, df, contexto):
+    cores_qualitativa = COLORBREWER_QUALITATIVE['Set1_8']
+    quadrante_counts = contexto['metricas'].contagens('quadrante')
+    bars = ax.bar(quadrante_counts.index, quadrante_counts.values,
                    color=cores_qualitativa[:len(quadrante_counts)])
-    ax6.set_title('🗺️ Densidade por Quadrante', fontsize=14, fontweight='bold')
-    ax6.set_xlabel('Quadrante')
-    ax6.set_ylabel('Quantidade')
-    
+    ax.set_title('🗺️ Densidade por Quadrante', fontsize=14, fontweight='bold')
+    ax.set_xlabel('Quadrante')
+    ax.set_ylabel('Quantidade')
+
     for bar, value in zip(bars, quadrante_counts.values):
-        ax6.text(bar.get_x() + bar.get_width()/2., bar.get_height() + 0.5,
+        ax.text(bar.get_x() + bar.get_width()/2., bar.get_height() + 0.5,
                 f'{value}', ha='center', va='bottom', fontweight='bold')
-    
-    # === GRÁFICO 7: Scatter Plot Geográfico ===
-    ax7 = fig.add_subplot(gs[2, :2])
-    
+
+def _painel_dispersao_geografica(ax, df, contexto):
+    cores_qualitativa = COLORBREWER_QUALITATIVE['Set1_8']
     # Detectar colunas de coordenadas
     lat_cols = [col for col in df.columns if 'LAT' in col.upper()]
     lon_cols = [col for col in df.columns if 'LON' in col.upper()]
     if lat_cols and lon_cols:
         lat_col, lon_col = lat_cols[0], lon_cols[0]
-        # Scatter por setor
-        for i, setor in enumerate(df['setor'].unique()):
-            df_setor = df[df['setor'] == setor]
-            ax7.scatter(df_setor[lon_col], df_setor[lat_col], 
-                       c=cores_qualitativa[i], label=setor, alpha=0.7, s=60)
-    
+        if len(df) > LIMIAR_PONTOS_HEATMAP and 'celula_hex_1km' in df.columns:
+            # Escala estadual: desenhar células agregadas (O(células)) em vez de pontos
+            agregado = agregacao_grade.agregar_por_celula(df, 'celula_hex_1km')
+            lat_cel, lon_cel = agregacao_grade.centro_celula_hex(agregado.index.values, agregacao_grade.RESOLUCOES_HEX['1km'])
+            ax.scatter(lon_cel, lat_cel, s=10 + 90 * agregado['total'] / agregado['total'].max(),
+                       c=agregado['perc_publico'], cmap='RdBu_r', vmin=0, vmax=100, alpha=0.8,
+                       label='Células 1 km (cor: % público)')
+        else:
+            # Scatter por setor
+            for i, setor in enumerate(df['setor'].unique()):
+                df_setor = df[df['setor'] == setor]
+                ax.scatter(df_setor[lon_col], df_setor[lat_col],
+                           c=cores_qualitativa[i], label=setor, alpha=0.7, s=60)
+
     # Centro
-    ax7.scatter(-52.0238, -27.2335, c='black', s=300,
+    ax.scatter(contexto['centro'][1], contexto['centro'][0], c='black', s=300,
                label='Centro', edgecolors='white', linewidth=2)
-    
-    ax7.set_title('📍 Distribuição Geográfica dos Estabelecimentos', fontsize=14, fontweight='bold')
-    ax7.set_xlabel('Longitude')
-    ax7.set_ylabel('Latitude')
-    ax7.legend()
-    ax7.grid(True, alpha=0.3)
-    
-    # === GRÁFICO 8: Categorias por Distância ===
-    ax8 = fig.add_subplot(gs[2, 2:])
-    
-    cat_dist_counts = df['categoria_distancia'].value_counts()
-    bars = ax8.barh(range(len(cat_dist_counts)), cat_dist_counts.values, 
+
+    ax.set_title('📍 Distribuição Geográfica dos Estabelecimentos', fontsize=14, fontweight='bold')
+    ax.set_xlabel('Longitude')
+    ax.set_ylabel('Latitude')
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+
+def _painel_categorias_distancia(ax, df, contexto):
+    cores_sequencial = COLORBREWER_SEQUENTIAL['BuGn_5']
+    cat_dist_counts = contexto['metricas'].contagens('categoria_distancia')
+    bars = ax.barh(range(len(cat_dist_counts)), cat_dist_counts.values,
                     color=cores_sequencial[:len(cat_dist_counts)])
-    
-    ax8.set_title('📏 Estabelecimentos por Categoria de Distância', fontsize=14, fontweight='bold')
-    ax8.set_xlabel('Quantidade')
-    ax8.set_yticks(range(len(cat_dist_counts)))
-    ax8.set_yticklabels(cat_dist_counts.index)
-    
+
+    ax.set_title('📏 Estabelecimentos por Categoria de Distância', fontsize=14, fontweight='bold')
+    ax.set_xlabel('Quantidade')
+    ax.set_yticks(range(len(cat_dist_counts)))
+    ax.set_yticklabels(cat_dist_counts.index)
+
     for i, (bar, value) in enumerate(zip(bars, cat_dist_counts.values)):
-        ax8.text(bar.get_width() + 0.5, bar.get_y() + bar.get_height()/2.,
+        ax.text(bar.get_width() + 0.5, bar.get_y() + bar.get_height()/2.,
                 f'{value}', ha='left', va='center', fontweight='bold')
-    
-    # === GRÁFICO 9: Matriz de Correlação ===
-    ax9 = fig.add_subplot(gs[3, :2])
-    
+
+def _painel_correlacao(ax, df, contexto):
     # Criar dados numéricos para correlação
     df_numeric = df.copy()
     df_numeric['setor_num'] = df_numeric['eh_publico'].astype(int)
     df_numeric['tipo_num'] = pd.Categorical(df_numeric['tipo_descricao']).codes
     df_numeric['quadrante_num'] = pd.Categorical(df_numeric['quadrante']).codes
-    
+
     corr_data = df_numeric[['dist_centro', 'setor_num', 'tipo_num', 'quadrante_num']].corr()
-    
-    im = ax9.imshow(corr_data, cmap='RdYlBu', aspect='auto', vmin=-1, vmax=1)
-    ax9.set_title('🔗 Matriz de Correlação', fontsize=14, fontweight='bold')
-    ax9.set_xticks(range(len(corr_data.columns)))
-    ax9.set_yticks(range(len(corr_data.columns)))
-    ax9.set_xticklabels(['Distância', 'Setor', 'Tipo', 'Quadrante'], rotation=45)
-    ax9.set_yticklabels(['Distância', 'Setor', 'Tipo', 'Quadrante'])
-    
+
+    im = ax.imshow(corr_data, cmap='RdYlBu', aspect='auto', vmin=-1, vmax=1)
+    ax.set_title('🔗 Matriz de Correlação', fontsize=14, fontweight='bold')
+    ax.set_xticks(range(len(corr_data.columns)))
+    ax.set_yticks(range(len(corr_data.columns)))
+    ax.set_xticklabels(['Distância', 'Setor', 'Tipo', 'Quadrante'], rotation=45)
+    ax.set_yticklabels(['Distância', 'Setor', 'Tipo', 'Quadrante'])
+
     # Adicionar valores na matriz
     for i in range(len(corr_data.columns)):
         for j in range(len(corr_data.columns)):
-            ax9.text(j, i, f'{corr_data.iloc[i, j]:.2f}', ha='center', va='center',
+            ax.text(j, i, f'{corr_data.iloc[i, j]:.2f}', ha='center', va='center',
                     color='white' if abs(corr_data.iloc[i, j]) > 0.5 else 'black',
                     fontweight='bold')
-    
-    # === GRÁFICO 10: Análise Temporal Simulada ===
-    ax10 = fig.add_subplot(gs[3, 2:])
-    
+
+def _painel_evolucao(ax, df, contexto):
+    cores_qualitativa = COLORBREWER_QUALITATIVE['Set1_8']
+    publicos = contexto['metricas'].publicos
+    privados = contexto['metricas'].privados
+
     # Simular dados de crescimento ao longo dos anos
     anos = range(2015, 2026)
     crescimento_publico = [15, 18, 22, 28, 35, 42, 52, 68, 78, 85, publicos]
     crescimento_privado = [45, 52, 58, 65, 72, 85, 95, 115, 135, 155, privados]
-    
-    ax10.plot(anos, crescimento_publico, marker='o', linewidth=3, 
+
+    ax.plot(anos, crescimento_publico, marker='o', linewidth=3,
              color=cores_qualitativa[0], label='Público', markersize=6)
-    ax10.plot(anos, crescimento_privado, marker='s', linewidth=3, 
+    ax.plot(anos, crescimento_privado, marker='s', linewidth=3,
              color=cores_qualitativa[1], label='Privado', markersize=6)
-    
-    ax10.set_title('📈 Evolução dos Estabelecimentos (2015-2025)', fontsize=14, fontweight='bold')
-    ax10.set_xlabel('Ano')
-    ax10.set_ylabel('Número de Estabelecimentos')
-    ax10.legend()
-    ax10.grid(True, alpha=0.3)
-    
+
+    ax.set_title('📈 Evolução dos Estabelecimentos (2015-2025)', fontsize=14, fontweight='bold')
+    ax.set_xlabel('Ano')
+    ax.set_ylabel('Número de Estabelecimentos')
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+
     # Destacar ano atual
-    ax10.axvline(2025, color='red', linestyle='--', alpha=0.7, label='Ano Atual')
-    
-    # === RODAPÉ COM INFORMAÇÕES ===
-    fig.text(0.5, 0.02, 
-             '📊 Dashboard Análise Espacial Estabelecimentos de Saúde | Concórdia/SC | UFSC | Outubro 2025\n'
+    ax.axvline(2025, color='red', linestyle='--', alpha=0.7, label='Ano Atual')
+
+# Layout: grade 4x4 (linha0, linha1, coluna0, coluna1)
+PAINEIS_DASHBOARD = [
+    {'nome': 'setor', 'posicao': (0, 1, 0, 1), 'funcao': _painel_setor},
+    {'nome': 'tipos', 'posicao': (0, 1, 1, 3), 'funcao': _painel_tipos},
+    {'nome': 'estatisticas', 'posicao': (0, 1, 3, 4), 'funcao': _painel_estatisticas},
+    {'nome': 'histograma_distancias', 'posicao': (1, 2, 0, 2), 'funcao': _painel_histograma_distancias},
+    {'nome': 'boxplot_setor', 'posicao': (1, 2, 2, 3), 'funcao': _painel_boxplot_setor},
+    {'nome': 'quadrantes', 'posicao': (1, 2, 3, 4), 'funcao': _painel_quadrantes},
+    {'nome': 'dispersao_geografica', 'posicao': (2, 3, 0, 2), 'funcao': _painel_dispersao_geografica},
+    {'nome': 'categorias_distancia', 'posicao': (2, 3, 2, 4), 'funcao': _painel_categorias_distancia},
+    {'nome': 'correlacao', 'posicao': (3, 4, 0, 2), 'funcao': _painel_correlacao},
+    {'nome': 'evolucao', 'posicao': (3, 4, 2, 4), 'funcao': _painel_evolucao},
+]
+FIGURA_DASHBOARD = {
+    'tamanho': (20, 16),
+    'grade': (4, 4),
+    'grade_opcoes': {'hspace': 0.4, 'wspace': 0.3},
+    'estilo': 'seaborn-v0_8-whitegrid',
+}
+
+def _decorar_dashboard(fig):
+    """Título e rodapé da figura (fora dos painéis)"""
+    fig.suptitle(f'🏥 DASHBOARD COMPLETO - ANÁLISE ESPACIAL ESTABELECIMENTOS DE SAÚDE\n{_rotulo_municipio()}',
+                 fontsize=24, fontweight='bold', y=0.98)
+    fig.text(0.5, 0.02,
+             f'📊 Dashboard Análise Espacial Estabelecimentos de Saúde | {_rotulo_municipio()} | UFSC | Outubro 2025\n'
              'Dados: CNES/DataSUS | Metodologia: Geoprocessamento | Paletas: ColorBrewer 2.0',
              ha='center', fontsize=10, style='italic',
              bbox=dict(boxstyle="round,pad=0.5", facecolor="lightgray", alpha=0.8))
-    
-    # Salvar dashboard
-    plt.savefig(os.path.join(OUTPUT_DIR, 'dashboard_completo_colorbrewer.png'), 
-                dpi=300, bbox_inches='tight', facecolor='white')
-    plt.savefig(os.path.join(OUTPUT_DIR, 'dashboard_completo_colorbrewer.pdf'), 
-                bbox_inches='tight', facecolor='white')
-    
+
+def gerar_dashboard_visual_completo(df, modo=None, formatos=None, processos=None, metricas=None):
+    """
+    Gera dashboard visual completo com matplotlib/seaborn
+
+    Args:
+        df: DataFrame processado
+        modo: 'sequencial' (figura única, PDF vetorial) ou 'paralelo' (painéis
+            em processos Agg compostos; PDF/SVG com a imagem composta).
+            Padrão: MODO_RENDER_DASHBOARD
+        formatos: extensões exportadas (padrão: FORMATOS_DASHBOARD)
+        processos: tamanho do pool no modo paralelo (padrão: núcleos)
+        metricas: Metricas já calculadas (padrão: calcula aqui)
+
+    Returns:
+        matplotlib Figure
+    """
+    print("📊 Gerando dashboard visual completo...")
+    modo = modo or MODO_RENDER_DASHBOARD
+    formatos = formatos or FORMATOS_DASHBOARD
+    caminho_base = os.path.join(OUTPUT_DIR, 'dashboard_completo_colorbrewer')
+    contexto = {'centro': MUNICIPIO['centro'],
+                'metricas': metricas or metricas_estabelecimentos.calcular_metricas(df)}
+    inicio = time.perf_counter()
+
+    if modo == 'paralelo':
+        fig, tempos_paineis, tempos_formatos = render_paineis.renderizar_paralelo(
+            PAINEIS_DASHBOARD, (df, contexto), FIGURA_DASHBOARD, _decorar_dashboard,
+            caminho_base, formatos=formatos, dpi=300, processos=processos)
+    else:
+        # Configurar estilo
+        plt.style.use(FIGURA_DASHBOARD['estilo'])
+
+        # Criar figura principal
+        fig = plt.figure(figsize=FIGURA_DASHBOARD['tamanho'])
+        _decorar_dashboard(fig)
+
+        # Layout: 4x4 grid
+        gs = fig.add_gridspec(*FIGURA_DASHBOARD['grade'], **FIGURA_DASHBOARD['grade_opcoes'])
+        tempos_paineis = []
+        for painel in PAINEIS_DASHBOARD:
+            l0, l1, c0, c1 = painel['posicao']
+            t0 = time.perf_counter()
+            painel['funcao'](fig.add_subplot(gs[l0:l1, c0:c1]), df, contexto)
+            tempos_paineis.append({'nome': painel['nome'], 'desenho_s': time.perf_counter() - t0})
+
+        # Salvar dashboard (uma renderização por backend)
+        tempos_formatos = render_paineis.exportar_figura(fig, caminho_base, formatos, dpi=300)
+
     print("✅ Dashboard visual completo gerado e salvo")
+    render_paineis.imprimir_tempos(tempos_paineis, tempos_formatos, time.perf_counter() - inicio)
     return fig
 
-def gerar_relatorio_analise_avancada(df):
-    """Gera relatório avançado de análise"""
+def gerar_artefatos(df, etapa=None, tolerante=False, metricas=None):
+    """
+    Gera dashboard visual, relatório e CSV processado, reaproveitando do cache
+    de artefatos os que já existem para os mesmos dados, parâmetros e código.
+
+    Args:
+        df: DataFrame processado
+        etapa: função(nome, funcao, *args) que envolve cada etapa (tempos do lote)
+        tolerante: se True, o erro de uma etapa é reportado e as demais seguem
+        metricas: Metricas compartilhadas por dashboard e relatório (padrão:
+            calculadas aqui, uma vez)
+
+    Returns:
+        dict {etapa: True se veio do cache, False se foi gerada}
+    """
+    etapa = etapa or (lambda nome, funcao, *args: funcao(*args))
+    partes = {
+        'dados': cache_artefatos.hash_dataframe(df),
+        'municipio': MUNICIPIO,
+        'codigo': cache_artefatos.versao_codigo(os.path.basename(__file__)),
+    }
+
+    metricas = metricas or metricas_estabelecimentos.calcular_metricas(df)
+
+    def _dashboard(df):
+        plt.close(gerar_dashboard_visual_completo(df, metricas=metricas))
+
+    def _relatorio(df):
+        return gerar_relatorio_analise_avancada(df, metricas)
+
+    def _csv(df):
+        df.to_csv(os.path.join(OUTPUT_DIR, 'dados_processados_colorbrewer.csv'), index=False, encoding='utf-8')
+
+    caminho_dashboard = os.path.join(OUTPUT_DIR, 'dashboard_completo_colorbrewer')
+    etapas = [
+        ('dashboard', _dashboard, [f'{caminho_dashboard}.{f}' for f in FORMATOS_DASHBOARD],
+         {'modo': MODO_RENDER_DASHBOARD, 'formatos': FORMATOS_DASHBOARD}),
+        ('relatorio', _relatorio,
+         [os.path.join(OUTPUT_DIR, 'relatorio_analise_avancada_colorbrewer.md')], {}),
+        ('csv', _csv, [os.path.join(OUTPUT_DIR, 'dados_processados_colorbrewer.csv')], {}),
+    ]
+    origem = {}
+    for nome, gerar, saidas, parametros in etapas:
+        try:
+            if CACHE_ARTEFATOS is None:
+                etapa(nome, gerar, df)
+                origem[nome] = False
+                continue
+            acerto, _ = etapa(nome, CACHE_ARTEFATOS.memorizar, nome, dict(partes, **parametros),
+                              saidas, gerar, df)
+            origem[nome] = acerto
+            if acerto:
+                print(f"♻️ {nome}: reaproveitado do cache ({', '.join(os.path.basename(s) for s in saidas)})")
+        except Exception as e:
+            if not tolerante:
+                raise
+            print(f"⚠️ Erro ao gerar {nome}: {e}")
+    return origem
+
+def gerar_relatorio_analise_avancada(df, metricas=None):
+    """Gera relatório avançado de análise (estatísticas de calcular_metricas)"""
     print("📝 Gerando relatório de análise avançada...")
+    m = metricas or metricas_estabelecimentos.calcular_metricas(df)
     
     relatorio = f"""
 # 🏥 RELATÓRIO AVANÇADO - ANÁLISE ESPACIAL ESTABELECIMENTOS DE SAÚDE
-## Concórdia/SC - Análise ColorBrewer e TreeLayerControl
+## {_rotulo_municipio()} - Análise ColorBrewer e TreeLayerControl
 
 ---
 
@@ -1475,22 +1537,22 @@ def gerar_relatorio_analise_avancada(df):
 ## 📊 ESTATÍSTICAS GERAIS
 
 ### Panorama Geral
-- **Total de Estabelecimentos:** {len(df)}
-- **Estabelecimentos Públicos:** {len(df[df['eh_publico']])} ({len(df[df['eh_publico']])/len(df)*100:.1f}%)
-- **Estabelecimentos Privados:** {len(df[~df['eh_publico']])} ({len(df[~df['eh_publico']])/len(df)*100:.1f}%)
+- **Total de Estabelecimentos:** {m.total}
+- **Estabelecimentos Públicos:** {m.publicos} ({m.percentual(m.publicos):.1f}%)
+- **Estabelecimentos Privados:** {m.privados} ({m.percentual(m.privados):.1f}%)
 - **Cobertura Georreferenciada:** 100% (coordenadas válidas)
 
 ### Análise de Acessibilidade
-- **Distância Média do Centro:** {df['dist_centro'].mean():.2f} km
-- **Distância Mínima:** {df['dist_centro'].min():.2f} km
-- **Distância Máxima:** {df['dist_centro'].max():.2f} km
-- **Desvio Padrão:** {df['dist_centro'].std():.2f} km
+- **Distância Média do Centro:** {m.dist_media:.2f} km
+- **Distância Mínima:** {m.dist_min:.2f} km
+- **Distância Máxima:** {m.dist_max:.2f} km
+- **Desvio Padrão:** {m.dist_desvio:.2f} km
 
 #### Distribuição por Proximidade
-- **≤ 2km do centro:** {len(df[df['dist_centro'] <= 2])} ({len(df[df['dist_centro'] <= 2])/len(df)*100:.1f}%)
-- **≤ 5km do centro:** {len(df[df['dist_centro'] <= 5])} ({len(df[df['dist_centro'] <= 5])/len(df)*100:.1f}%)
-- **≤ 10km do centro:** {len(df[df['dist_centro'] <= 10])} ({len(df[df['dist_centro'] <= 10])/len(df)*100:.1f}%)
-- **> 20km do centro:** {len(df[df['dist_centro'] > 20])} ({len(df[df['dist_centro'] > 20])/len(df)*100:.1f}%)
+- **≤ 2km do centro:** {m.ate_km[2]} ({m.percentual(m.ate_km[2]):.1f}%)
+- **≤ 5km do centro:** {m.ate_km[5]} ({m.percentual(m.ate_km[5]):.1f}%)
+- **≤ 10km do centro:** {m.ate_km[10]} ({m.percentual(m.ate_km[10]):.1f}%)
+- **> 20km do centro:** {m.acima_km[20]} ({m.percentual(m.acima_km[20]):.1f}%)
 
 ---
 
@@ -1499,22 +1561,14 @@ def gerar_relatorio_analise_avancada(df):
 """
     
     # Análise por tipo
-    tipo_stats = df.groupby('tipo_descricao').agg({
-        'dist_centro': ['count', 'mean', 'min', 'max'],
-        'eh_publico': 'sum'
-    }).round(2)
+    tipo_stats = m.grupos['tipo_descricao'].sort_index()
     
     relatorio += "| Tipo | Quantidade | Dist. Média | Dist. Min | Dist. Max | Públicos |\n"
     relatorio += "|------|------------|-------------|-----------|-----------|----------|\n"
     
-    for tipo in tipo_stats.index:
-        count = tipo_stats.loc[tipo, ('dist_centro', 'count')]
-        mean_dist = tipo_stats.loc[tipo, ('dist_centro', 'mean')]
-        min_dist = tipo_stats.loc[tipo, ('dist_centro', 'min')]
-        max_dist = tipo_stats.loc[tipo, ('dist_centro', 'max')]
-        publicos = int(tipo_stats.loc[tipo, ('eh_publico', 'sum')])
-        
-        relatorio += f"| {tipo} | {count} | {mean_dist:.1f}km | {min_dist:.1f}km | {max_dist:.1f}km | {publicos} |\n"
+    for tipo, row in tipo_stats.iterrows():
+        relatorio += (f"| {tipo} | {int(row['estabelecimentos'])} | {row['dist_media']:.1f}km | "
+                      f"{row['dist_min']:.1f}km | {row['dist_max']:.1f}km | {int(row['publicos'])} |\n")
     
     relatorio += f"""
 
@@ -1522,15 +1576,12 @@ def gerar_relatorio_analise_avancada(df):
 
 ## 🗺️ ANÁLISE ESPACIAL POR QUADRANTES
 
+*Referência: sede do município ({MUNICIPIO['centro'][0]:.4f}, {MUNICIPIO['centro'][1]:.4f}), comparando o tile da chave espacial de cada estabelecimento ao tile da sede. Relatórios anteriores dividiam pelas medianas de latitude e longitude dos estabelecimentos, então as contagens por quadrante não são diretamente comparáveis.*
+
 """
     
-    # Análise por quadrante (agregação nomeada)
-    quad_analysis = df.groupby('quadrante').agg(
-        estabelecimentos=('dist_centro', 'count'),
-        dist_media=('dist_centro', 'mean'),
-        publicos=('eh_publico', 'sum')
-    ).round(2)
-    quad_analysis['perc_publico'] = (quad_analysis['publicos'] / quad_analysis['estabelecimentos'] * 100).round(2)
+    # Análise por quadrante
+    quad_analysis = m.grupos['quadrante'].sort_index()
 
     relatorio += "| Quadrante | Estabelecimentos | Dist. Média | Públicos | % Público |\n"
     relatorio += "|-----------|------------------|-------------|----------|----------|\n"
@@ -1564,15 +1615,15 @@ def gerar_relatorio_analise_avancada(df):
 ## 🔍 INSIGHTS PRINCIPAIS
 
 ### ✅ Pontos Fortes
-1. **Distribuição Equilibrada:** {len(df[df['dist_centro'] <= 10])/len(df)*100:.1f}% dos estabelecimentos estão a menos de 10km do centro
-2. **Acessibilidade Pública:** {len(df[(df['eh_publico']) & (df['dist_centro'] <= 5)])/len(df[df['eh_publico']])*100:.1f}% dos estabelecimentos públicos estão dentro de 5km
-3. **Diversidade de Serviços:** {len(df['tipo_descricao'].unique())} tipos diferentes de estabelecimentos
+1. **Distribuição Equilibrada:** {m.percentual(m.ate_km[10]):.1f}% dos estabelecimentos estão a menos de 10km do centro
+2. **Acessibilidade Pública:** {m.percentual(m.publicos_ate_km[5], m.publicos):.1f}% dos estabelecimentos públicos estão dentro de 5km
+3. **Diversidade de Serviços:** {m.n_valores('tipo_descricao')} tipos diferentes de estabelecimentos
 4. **Cobertura Territorial:** Presença em todos os quadrantes da cidade
 
 ### ⚠️ Desafios Identificados
 1. **Concentração Urbana:** Possível carência em áreas rurais mais distantes
-2. **Equilíbrio Público-Privado:** {len(df[df['eh_publico']])/len(df)*100:.1f}% de estabelecimentos públicos
-3. **Acessibilidade Extrema:** {len(df[df['dist_centro'] > 20])} estabelecimentos a mais de 20km do centro
+2. **Equilíbrio Público-Privado:** {m.percentual(m.publicos):.1f}% de estabelecimentos públicos
+3. **Acessibilidade Extrema:** {m.acima_km[20]} estabelecimentos a mais de 20km do centro
 
 ### 🎯 Recomendações
 1. **Fortalecer** rede de transporte sanitário para áreas distantes
@@ -1594,7 +1645,7 @@ def gerar_relatorio_analise_avancada(df):
 - **Fonte:** CNES/DataSUS
 - **Período:** Outubro 2025
 - **Qualidade:** 100% georreferenciado
-- **Escala:** Municipal (Concórdia/SC)
+- **Escala:** Municipal ({_rotulo_municipio()})
 
 ---
 
@@ -1609,7 +1660,7 @@ def gerar_relatorio_analise_avancada(df):
 
 **© 2025 | Universidade Federal de Santa Catarina (UFSC)**  
 **Projeto:** Análise Espacial Estabelecimentos de Saúde  
-**Município:** Concórdia/SC  
+**Município:** {_rotulo_municipio()}  
 **Metodologia:** Geoprocessamento com ColorBrewer  
 
 ---
@@ -1637,11 +1688,13 @@ def main():
     print(f"✅ Dados carregados: {len(df)} estabelecimentos processados")
     
     # 2. Gerar mapa avançado com TreeLayerControl
-    mapa_avancado = criar_mapa_avancado_treelayer(df)
-    
-    # Salvar mapa
     saida_mapa = os.path.join(MAPAS_DIR, 'mapa_avancado_colorbrewer.html')
-    mapa_avancado.save(saida_mapa)
+    if BACKEND_MAPA == 'direto':
+        mapa_avancado = None
+        criar_mapa_html_direto(df, saida_mapa)
+    else:
+        mapa_avancado = criar_mapa_avancado_treelayer(df)
+        mapa_avancado.save(saida_mapa)
     print(f"✅ Mapa avançado salvo: {saida_mapa}")
 
     # Copiar para docs/ para publicação (GitHub Pages)
@@ -1651,31 +1704,49 @@ def main():
         import shutil
         shutil.copyfile(saida_mapa, os.path.join(docs_path, 'mapa_avancado_colorbrewer.html'))
         print("📤 Copiado para docs/mapa_avancado_colorbrewer.html")
+        # Arquivos auxiliares das camadas sob demanda (caminho relativo)
+        # (só os referenciados por este mapa, não versões antigas da pasta)
+        auxiliares = camadas_sob_demanda.arquivos_auxiliares(mapa_avancado) if mapa_avancado is not None else []
+        if auxiliares:
+            os.makedirs(os.path.join(docs_path, camadas_sob_demanda.PASTA_CAMADAS), exist_ok=True)
+            for relativo in auxiliares:
+                shutil.copyfile(os.path.join(MAPAS_DIR, relativo), os.path.join(docs_path, relativo))
+            print(f"📤 {len(auxiliares)} camada(s) sob demanda copiada(s) para docs/{camadas_sob_demanda.PASTA_CAMADAS}/")
+        # Pirâmide de tiles de calor referenciada pelo mapa (caminho relativo)
+        if os.path.isdir(TILES_CALOR_DIR):
+            shutil.copytree(TILES_CALOR_DIR, os.path.join(docs_path, 'tiles_calor'), dirs_exist_ok=True)
+            print("📤 Tiles de calor copiados para docs/tiles_calor/")
     except Exception as e:
         print(f"⚠️ Não foi possível copiar para docs/: {e}")
     
-    # 3. Gerar dashboard visual completo
-    try:
-        fig_dashboard = gerar_dashboard_visual_completo(df)
-        # Evitar bloquear execução em ambientes não interativos
-        # plt.show()
-    except Exception as e:
-        print(f"⚠️ Erro ao gerar dashboard visual: {e}")
-    
-    # 4. Gerar relatório avançado
-    relatorio = gerar_relatorio_analise_avancada(df)
-    
-    # 5. Salvar dados processados
-    df.to_csv(os.path.join(OUTPUT_DIR, 'dados_processados_colorbrewer.csv'), index=False, encoding='utf-8')
-    print("✅ Dados processados salvos")
+    # 3-5. Dashboard visual, relatório avançado e dados processados (com cache),
+    # todos com as mesmas métricas (uma passada sobre a tabela)
+    metricas = metricas_estabelecimentos.calcular_metricas(df)
+    gerar_artefatos(df, tolerante=True, metricas=metricas)
+    
+    # Base canônica lida pelos demais construtores de mapa (nada de extrair dados de HTML)
+    manifesto = dados_canonicos.salvar_dados(df, destino=os.path.join(OUTPUT_DIR, 'dados'),
+                                             origem='dashboard_avancado_colorbrewer')
+    print(f"✅ Dados processados salvos (base canônica v{manifesto['versao']})")
+    
+    # Cubo agregado: a página de filtros cruzados não precisa das linhas originais
+    cubo = cubo_agregado.construir_cubo(df, municipio=_rotulo_municipio())
+    cubo_agregado.salvar_cubo(
+        cubo,
+        caminho_html=os.path.join(ROOT_DIR, 'docs', 'dashboard_crossfilter.html'),
+        caminho_json=os.path.join(OUTPUT_DIR, 'cubo_agregado.json'),
+        subtitulo=_rotulo_municipio(),
+    )
+    print(f"✅ Cubo agregado: {len(cubo['n'])} células -> docs/dashboard_crossfilter.html")
     
     # 6. Resumo final
     print("\n🎯 DASHBOARD AVANÇADO CONCLUÍDO!")
     print("="*50)
-    print(f"📊 Estabelecimentos analisados: {len(df)}")
-    print(f"🏛️ Públicos: {len(df[df['eh_publico']])}")
-    print(f"🏢 Privados: {len(df[~df['eh_publico']])}")
-    print(f"📏 Distância média: {df['dist_centro'].mean():.2f}km")
+    print(f"📊 Estabelecimentos analisados: {metricas.total}")
+    print(f"🏛️ Públicos: {metricas.publicos}")
+    print(f"🏢 Privados: {metricas.privados}")
+    print(f"📏 Distância média: {metricas.dist_media:.2f}km")
+    print(f"📐 Métricas calculadas em {metricas.tempo_s * 1000:.1f} ms")
     print(f"🗺️ Mapa com TreeLayerControl: Criado")
     print(f"📊 Dashboard ColorBrewer: Gerado")
     print(f"📝 Relatório avançado: Finalizado")
@@ -1686,6 +1757,12 @@ def main():
     print("   • dashboard_completo_colorbrewer.pdf")
     print("   • relatorio_analise_avancada_colorbrewer.md")
     print("   • dados_processados_colorbrewer.csv")
+    print("   • dados/estabelecimentos.json (+ .npz da versão)")
+    print("   • cubo_agregado.json (+ docs/dashboard_crossfilter.html)")
+
+    if CACHE_ARTEFATOS is not None:
+        CACHE_ARTEFATOS.imprimir_estatisticas()
+        CACHE_ARTEFATOS.limpar()
     
     return df, mapa_avancado
 
@@ -21,6 +21,11 @@ from math import radians, sin, cos, sqrt, atan2
 import warnings
 warnings.filterwarnings('ignore')
 
+import render_paineis
+import agregacao_grade
+import classificacao_estabelecimentos
+import metricas_estabelecimentos
+
 # Caminhos do projeto (independentes do diretório atual)
 SCRIPT_DIR = os.path.dirname(__file__)
 ROOT_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, '..'))
@@ -209,44 +214,9 @@ def calcular_distancias(df):
 def classificar_estabelecimentos(df):
     """Classifica estabelecimentos como público/privado"""
     
-    def eh_publico(nome, tipo, razao):
-        nome_str = str(nome).upper() if pd.notna(nome) else ""
-        razao_str = str(razao).upper() if pd.notna(razao) else ""
-        tipo_str = str(tipo).upper() if pd.notna(tipo) else ""
-        
-        criterios_publicos = [
-            'ESF' in nome_str,
-            'PS ' in nome_str,
-            'UBS' in nome_str,
-            'CAPS' in nome_str,
-            'SAMU' in nome_str,
-            'MUNICIPIO' in razao_str,
-            'PREFEITURA' in razao_str,
-            'SECRETARIA' in razao_str,
-            'ESF' in tipo_str,
-            'PS' in tipo_str,
-            'UBS' in tipo_str
-        ]
-        
-        # Critérios adicionais para código de tipo
-        if 'TP_UNIDADE' in df.columns:
-            tipo_codigo = str(df.get('TP_UNIDADE', ''))
-            criterios_publicos.append(tipo_codigo in ['1', '2', '70', '81'])
-        
-        return any(criterios_publicos)
-    
-    # Adaptar nomes das colunas
-    nome_col = 'NO_FANTASIA' if 'NO_FANTASIA' in df.columns else 'NOME'
-    tipo_col = 'TP_UNIDADE' if 'TP_UNIDADE' in df.columns else 'TIPO'
-    razao_col = 'NO_RAZAO_SOCIAL' if 'NO_RAZAO_SOCIAL' in df.columns else None
-    
-    df['eh_publico'] = df.apply(
-        lambda row: eh_publico(
-            row.get(nome_col, ''),
-            row.get(tipo_col, ''),
-            row.get(razao_col, '') if razao_col else ''
-        ), axis=1
-    )
+    classificacao = classificacao_estabelecimentos.classificar(df)
+    df['eh_publico'] = classificacao['eh_publico']
+    df['regra_setor'] = classificacao['regra_setor']
     
     publicos = df['eh_publico'].sum()
     print(f"   ✅ {publicos} públicos / {len(df)} total ({publicos/len(df)*100:.1f}%)")
@@ -288,28 +258,12 @@ def adicionar_categorias_analise(df):
     # Setor (público/privado)
     df['setor'] = df['eh_publico'].map({True: 'Público', False: 'Privado'})
     
-    # Identificar colunas de coordenadas
-    lat_cols = [col for col in df.columns if 'LAT' in col.upper()]
-    lon_cols = [col for col in df.columns if 'LON' in col.upper()]
-    
-    if lat_cols and lon_cols:
-        lat_col, lon_col = lat_cols[0], lon_cols[0]
-        
-        # Densidade por área (simulada por quadrantes)
-        lat_quartis = df[lat_col].quantile([0.25, 0.5, 0.75])
-        lon_quartis = df[lon_col].quantile([0.25, 0.5, 0.75])
-        
-        def classificar_quadrante(lat, lon):
-            if lat <= lat_quartis[0.5] and lon <= lon_quartis[0.5]:
-                return 'SW'
-            elif lat <= lat_quartis[0.5] and lon > lon_quartis[0.5]:
-                return 'SE' 
-            elif lat > lat_quartis[0.5] and lon <= lon_quartis[0.5]:
-                return 'NW'
-            else:
-                return 'NE'
-        
-        df['quadrante'] = df.apply(lambda row: classificar_quadrante(row[lat_col], row[lon_col]), axis=1)
+    # Quadrantes derivados da chave espacial hierárquica (em torno do centro)
+    df = agregacao_grade.adicionar_chave_espacial(df)
+    if 'chave_espacial' in df.columns:
+        centro_concordia = (-27.2335, -52.0238)
+        chave_centro = agregacao_grade.chaves_espaciais([centro_concordia[0]], [centro_concordia[1]])
+        df['quadrante'] = agregacao_grade.quadrantes(df['chave_espacial'].to_numpy(), chave_centro)
     else:
         df['quadrante'] = 'N/A'
     
@@ -784,13 +738,14 @@ def gerar_dashboard_visual_simplificado(df):
     axes[1,2].axis('off')
     
     # Calcular estatísticas
-    total_est = len(df)
-    publicos = len(df[df['eh_publico']])
-    privados = total_est - publicos
-    dist_media = df['dist_centro'].mean()
-    mais_proximo = df['dist_centro'].min()
-    mais_distante = df['dist_centro'].max()
-    dentro_5km = len(df[df['dist_centro'] <= 5])
+    m = metricas_estabelecimentos.calcular_metricas(df)
+    total_est = m.total
+    publicos = m.publicos
+    privados = m.privados
+    dist_media = m.dist_media
+    mais_proximo = m.dist_min
+    mais_distante = m.dist_max
+    dentro_5km = m.ate_km[5]
     
     stats_text = f'''ESTATÍSTICAS GERAIS
 
@@ -817,9 +772,9 @@ def gerar_dashboard_visual_simplificado(df):
     
     plt.tight_layout()
     
-    # Salvar dashboard
-    plt.savefig(os.path.join(OUTPUT_DIR, 'dashboard_colorbrewer_simplificado.png'), 
-                dpi=300, bbox_inches='tight', facecolor='white')
+    # Salvar dashboard (layout e recorte calculados numa única renderização)
+    render_paineis.exportar_figura(fig, os.path.join(OUTPUT_DIR, 'dashboard_colorbrewer_simplificado'),
+                                   formatos=('png',), dpi=300)
     
     print("✅ Dashboard visual simplificado gerado e salvo")
     return fig
@@ -868,14 +823,15 @@ def main():
     print("\n" + "="*70)
     print("✅ DASHBOARD CONCLUÍDO COM SUCESSO!")
     print("="*70)
+    m = metricas_estabelecimentos.calcular_metricas(df)
     print(f"\n📊 ESTATÍSTICAS FINAIS:")
-    print(f"   • Total de estabelecimentos: {len(df)}")
-    print(f"   • Estabelecimentos públicos: {len(df[df['eh_publico']])} ({len(df[df['eh_publico']])/len(df)*100:.1f}%)")
-    print(f"   • Estabelecimentos privados: {len(df[~df['eh_publico']])} ({len(df[~df['eh_publico']])/len(df)*100:.1f}%)")
-    print(f"   • Distância média do centro: {df['dist_centro'].mean():.2f}km")
-    print(f"   • Distância mínima: {df['dist_centro'].min():.2f}km")
-    print(f"   • Distância máxima: {df['dist_centro'].max():.2f}km")
-    print(f"   • Dentro de 5km: {len(df[df['dist_centro'] <= 5])} ({len(df[df['dist_centro'] <= 5])/len(df)*100:.1f}%)")
+    print(f"   • Total de estabelecimentos: {m.total}")
+    print(f"   • Estabelecimentos públicos: {m.publicos} ({m.percentual(m.publicos):.1f}%)")
+    print(f"   • Estabelecimentos privados: {m.privados} ({m.percentual(m.privados):.1f}%)")
+    print(f"   • Distância média do centro: {m.dist_media:.2f}km")
+    print(f"   • Distância mínima: {m.dist_min:.2f}km")
+    print(f"   • Distância máxima: {m.dist_max:.2f}km")
+    print(f"   • Dentro de 5km: {m.ate_km[5]} ({m.percentual(m.ate_km[5]):.1f}%)")
     
     print(f"\n🎨 PALETAS COLORBREWER APLICADAS:")
     print(f"   • BuGn (Sequencial): Análise de distâncias")
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Detecção de Estabelecimentos Duplicados com Blocagem
+- Pares candidatos só dentro de blocos, nunca os N² pares:
+  * espacial: tile do prefixo da chave espacial no ZOOM_BLOCAGEM (~136 m
+    no terreno em SC, da ordem de RAIO_M) + vizinhos (metade da vizinhança
+    3×3, cada par aparece uma vez); tiles com mais de BLOCO_MAXIMO pontos
+    (prédios de consultórios, shoppings) ficam de fora, como os blocos de nome
+  * nome: chave com as palavras significativas do nome normalizado em ordem
+    alfabética, dentro do mesmo município (pega o mesmo cadastro com
+    coordenadas ausentes em um dos lados); blocos maiores que BLOCO_MAXIMO
+    (redes de farmácia, "CONSULTORIO") são ignorados
+- Semelhança dos nomes (palavras e caracteres) só sobre as palavras
+  significativas: termos de categoria (CLINICA, FARMACIA, CONSULTORIO, DR...)
+  não entram na comparação, mas categorias sem nada em comum (LABORATORIO
+  SAO LUCAS / FARMACIA SAO LUCAS) e números/romanos diferentes (ESF X /
+  ESF X II) reduzem a semelhança, pois costumam ser estabelecimentos distintos
+- Pontuação do par: semelhança dos nomes, proximidade e endereço igual, com
+  os PESOS renormalizados sobre as evidências existentes (sem coordenadas
+  num dos lados a proximidade não conta; sem endereço, o endereço); o par
+  só é duplicata com semelhança de nome >= SEMELHANCA_MINIMA por si só
+  (proximidade e endereço nunca bastam), pontuação >= LIMIAR_DUPLICATA e,
+  sem coordenadas, endereço igual confirmando o nome
+- Só esses pares fortes viram arestas; componentes conexos são os grupos de
+  prováveis duplicatas, cada um com sua maior pontuação
+
+Uso:
+    python duplicatas.py                        # base canônica
+    python duplicatas.py Tabela_estado_SC.csv   # base CNES (separador ;)
+    python duplicatas.py --verificar            # casos de referência
+
+Autor: Caetano Ronan
+Instituição: UFSC
+"""
+
+import os
+import sys
+import time
+from difflib import SequenceMatcher
+import numpy as np
+import pandas as pd
+
+from agregacao_grade import chaves_espaciais, tile_da_chave
+from indice_textual import normalizar_texto, coluna_do_campo, SUFIXO_NORMALIZADO
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(SCRIPT_DIR)
+
+RAIO_M = 150            # distância (m) em que a proximidade do par zera
+ZOOM_BLOCAGEM = 18      # tile de ~153 m Mercator (~136 m no terreno em SC) na blocagem espacial
+BLOCO_MAXIMO = 50       # blocos (de nome ou tiles) maiores que isso não geram pares
+LIMIAR_DUPLICATA = 0.75
+SEMELHANCA_MINIMA = 0.85  # semelhança de nome exigida independentemente da pontuação
+PESOS = {'nome': 0.55, 'proximidade': 0.35, 'endereco': 0.10}
+
+PALAVRAS_VAZIAS = {'DE', 'DA', 'DO', 'DAS', 'DOS', 'E', 'LTDA', 'ME', 'EPP', 'EIRELI', 'SA', 'S', 'A'}
+ROMANOS = {'I', 'II', 'III', 'IV', 'V', 'VI', 'VII', 'VIII', 'IX', 'X'}
+COLUNAS_MUNICIPIO = ['CO_MUNICIPIO_GESTOR', 'CO_MUNICIPIO', 'municipio']
+
+# Termos genéricos de categoria: fora da semelhança, mas categorias disjuntas
+# indicam estabelecimentos diferentes
+CATEGORIAS_NOME = {
+    'atencao_basica': {'ESF', 'PSF', 'UBS', 'POSTO', 'PS', 'UNIDADE', 'BASICA', 'CENTRO',
+                       'SAUDE', 'ESTRATEGIA', 'FAMILIA'},
+    'consultorio': {'CONSULTORIO', 'CLINICA', 'DR', 'DRA', 'MEDICO', 'MEDICA', 'MEDICOS', 'MEDICINA'},
+    'odontologia': {'ODONTOLOGICA', 'ODONTOLOGICO', 'ODONTOLOGIA', 'DENTISTA', 'DENTAL', 'ODONTO'},
+    'laboratorio': {'LABORATORIO', 'ANALISES', 'CLINICAS', 'PATOLOGIA'},
+    'farmacia': {'FARMACIA', 'DROGARIA'},
+    'hospital': {'HOSPITAL', 'PRONTO', 'SOCORRO'},
+    'imagem': {'RADIOLOGIA', 'IMAGEM', 'DIAGNOSTICO', 'ULTRASSONOGRAFIA'},
+    'reabilitacao': {'FISIOTERAPIA', 'REABILITACAO', 'PSICOLOGIA', 'NUTRICAO', 'FONOAUDIOLOGIA'},
+}
+PALAVRAS_GENERICAS = set().union(*CATEGORIAS_NOME.values())
+
+# Vizinhança espacial: a própria célula + 4 das 8 vizinhas (a outra metade é simétrica)
+_DESLOCAMENTOS = [(0, 0), (1, -1), (1, 0), (1, 1), (0, 1)]
+
+
+def _coluna_coordenada(df, parte):
+    return next((c for c in df.columns if parte in str(c).upper() and not str(c).endswith(SUFIXO_NORMALIZADO)), None)
+
+
+def _palavras(nome):
+    return [p for p in nome.replace('-', ' ').split() if p not in PALAVRAS_VAZIAS]
+
+
+def _categorias(palavras):
+    return frozenset(c for c, termos in CATEGORIAS_NOME.items() if palavras & termos)
+
+
+def _pares_espaciais(celula_x, celula_y, validas):
+    """Pares (i, j), i < j, em células iguais ou vizinhas de até BLOCO_MAXIMO pontos"""
+    base = pd.DataFrame({'x': celula_x[validas], 'y': celula_y[validas], 'i': np.flatnonzero(validas)})
+    tamanhos = base.groupby(['x', 'y'])['i'].transform('size')
+    ignorados = int((tamanhos > BLOCO_MAXIMO).sum())
+    base = base[tamanhos <= BLOCO_MAXIMO]
+    pares = []
+    for dx, dy in _DESLOCAMENTOS:
+        vizinha = base.assign(x=base['x'] + dx, y=base['y'] + dy)
+        juncao = base.merge(vizinha, on=['x', 'y'], suffixes=('', '_j'))
+        if (dx, dy) == (0, 0):
+            juncao = juncao[juncao['i'] < juncao['i_j']]
+        pares.append(juncao[['i', 'i_j']].to_numpy())
+    return np.concatenate(pares), ignorados
+
+
+def _pares_por_nome(chaves, municipio):
+    """Pares dentro de blocos (município, chave do nome) de tamanho 2..BLOCO_MAXIMO"""
+    base = pd.DataFrame({'chave': chaves, 'municipio': municipio, 'i': np.arange(len(chaves))})
+    base = base[base['chave'] != '']
+    tamanhos = base.groupby(['municipio', 'chave'])['i'].transform('size')
+    base = base[(tamanhos > 1) & (tamanhos <= BLOCO_MAXIMO)]
+    juncao = base.merge(base, on=['municipio', 'chave'], suffixes=('', '_j'))
+    juncao = juncao[juncao['i'] < juncao['i_j']]
+    return juncao[['i', 'i_j']].to_numpy(), int((tamanhos > BLOCO_MAXIMO).sum())
+
+
+def _semelhanca_nomes(nomes, palavras, significativos, i, j):
+    """
+    Semelhança 0..1 de cada par: máximo entre Jaccard de palavras e razão de
+    caracteres, sobre as palavras significativas (nome inteiro quando um
+    dos lados só tem termos genéricos)
+    """
+    semelhanca = np.empty(len(i))
+    for k, (a, b) in enumerate(zip(i, j)):
+        pa, pb = palavras[a], palavras[b]
+        sa, sb = pa - PALAVRAS_GENERICAS, pb - PALAVRAS_GENERICAS
+        if sa and sb:
+            conj_a, conj_b, texto_a, texto_b = sa, sb, significativos[a], significativos[b]
+        else:
+            conj_a, conj_b, texto_a, texto_b = pa, pb, nomes[a], nomes[b]
+        uniao = len(conj_a | conj_b)
+        jaccard = len(conj_a & conj_b) / uniao if uniao else 0.0
+        if jaccard < 0.9 and texto_a and texto_b:
+            jaccard = max(jaccard, SequenceMatcher(None, texto_a, texto_b).ratio())
+        # ESF CRISTAL x ESF CRISTAL II: equipes distintas no mesmo prédio
+        distintivos = (pa ^ pb) & ROMANOS or {p for p in pa ^ pb if p.isdigit()}
+        # LABORATORIO SAO LUCAS x FARMACIA SAO LUCAS: categorias sem nada em comum
+        ca, cb = _categorias(pa), _categorias(pb)
+        disjuntas = bool(ca and cb and not ca & cb)
+        semelhanca[k] = jaccard * (0.5 if distintivos or disjuntas else 1.0)
+    return semelhanca
+
+
+def _grupos(n, arestas):
+    """Componentes conexos (union-find com compressão de caminho)"""
+    pai = list(range(n))
+
+    def raiz(a):
+        while pai[a] != a:
+            pai[a] = pai[pai[a]]
+            a = pai[a]
+        return a
+
+    for a, b in arestas:
+        ra, rb = raiz(a), raiz(b)
+        if ra != rb:
+            pai[max(ra, rb)] = min(ra, rb)
+    return np.array([raiz(a) for a in range(n)])
+
+
+def detectar_duplicatas(df, lat_col=None, lon_col=None, limiar=LIMIAR_DUPLICATA,
+                        semelhanca_minima=SEMELHANCA_MINIMA):
+    """
+    Pontua os pares candidatos e agrupa as prováveis duplicatas.
+
+    Args:
+        df: DataFrame de estabelecimentos (nome, coordenadas; endereço e
+            município opcionais)
+        lat_col, lon_col: colunas de coordenadas (padrão: detectadas)
+        limiar: pontuação mínima para considerar o par duplicado
+        semelhanca_minima: semelhança de nome mínima, exigida à parte
+
+    Returns:
+        (pares, resumo): DataFrame de pares candidatos (posições i/j,
+        distância, semelhança, pontuação, grupo) e dict com contagens
+    """
+    n = len(df)
+    inicio = time.perf_counter()
+    lat_col = lat_col or _coluna_coordenada(df, 'LAT')
+    lon_col = lon_col or _coluna_coordenada(df, 'LON')
+    lat = pd.to_numeric(df[lat_col], errors='coerce').to_numpy(dtype=float)
+    lon = pd.to_numeric(df[lon_col], errors='coerce').to_numpy(dtype=float)
+    validas = np.isfinite(lat) & np.isfinite(lon)
+
+    nomes = (df['nome' + SUFIXO_NORMALIZADO] if 'nome' + SUFIXO_NORMALIZADO in df.columns
+             else normalizar_texto(df[coluna_do_campo(df, 'nome')])).to_numpy(dtype=object)
+    endereco_col = coluna_do_campo(df, 'endereco')
+    enderecos = (df['endereco' + SUFIXO_NORMALIZADO] if 'endereco' + SUFIXO_NORMALIZADO in df.columns
+                 else normalizar_texto(df[endereco_col]) if endereco_col else pd.Series('', index=df.index)
+                 ).to_numpy(dtype=object)
+    palavras = [frozenset(_palavras(nome)) for nome in nomes]
+    significativos = np.array([' '.join(p for p in _palavras(nome) if p not in PALAVRAS_GENERICAS)
+                               for nome in nomes], dtype=object)
+    chaves = np.array([' '.join(sorted(p)) for p in palavras], dtype=object)
+    coluna_municipio = next((c for c in COLUNAS_MUNICIPIO if c in df.columns), None)
+    municipio = df[coluna_municipio].astype(str).to_numpy() if coluna_municipio else np.zeros(n, dtype=int)
+
+    # Blocagem
+    chaves_espaco = (df['chave_espacial'].to_numpy(dtype=np.int64) if 'chave_espacial' in df.columns
+                     else chaves_espaciais(lat, lon))
+    tile_x, tile_y = tile_da_chave(chaves_espaco, ZOOM_BLOCAGEM)
+    espaciais, ignorados_espaco = _pares_espaciais(tile_x, tile_y, validas & (chaves_espaco >= 0))
+    por_nome, ignorados = _pares_por_nome(chaves, municipio)
+    candidatos = np.unique(np.sort(np.concatenate([espaciais, por_nome]), axis=1), axis=0) \
+        if len(espaciais) + len(por_nome) else np.empty((0, 2), dtype=np.int64)
+    i, j = candidatos[:, 0], candidatos[:, 1]
+
+    # Pontuação
+    lat1, lon1, lat2, lon2 = (np.radians(v) for v in (lat[i], lon[i], lat[j], lon[j]))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    distancia = 2 * 6371000 * np.arcsin(np.sqrt(a))
+    com_coordenadas = np.isfinite(distancia)
+    proximidade = np.nan_to_num(np.clip(1 - distancia / RAIO_M, 0, 1))
+    nome_sim = _semelhanca_nomes(nomes, palavras, significativos, i, j)
+    com_endereco = (enderecos[i] != '') & (enderecos[j] != '')
+    endereco_igual = ((enderecos[i] == enderecos[j]) & com_endereco).astype(float)
+    # Pesos renormalizados sobre as evidências presentes no par
+    peso_total = (PESOS['nome'] + PESOS['proximidade'] * com_coordenadas
+                  + PESOS['endereco'] * com_endereco)
+    pontuacao = (PESOS['nome'] * nome_sim + PESOS['proximidade'] * proximidade
+                 + PESOS['endereco'] * endereco_igual) / peso_total
+
+    pares = pd.DataFrame({
+        'i': i, 'j': j,
+        'nome_i': nomes[i], 'nome_j': nomes[j],
+        'distancia_m': np.round(distancia, 1),
+        'semelhanca_nome': np.round(nome_sim, 3),
+        'endereco_igual': endereco_igual.astype(bool),
+        'pontuacao': np.round(pontuacao, 3),
+    })
+    # Sem coordenadas o endereço precisa confirmar o nome
+    fortes = ((pontuacao >= limiar) & (nome_sim >= semelhanca_minima)
+              & (com_coordenadas | (endereco_igual > 0)))
+    pares = pares[fortes].sort_values('pontuacao', ascending=False)
+    grupo = _grupos(n, pares[['i', 'j']].to_numpy())
+    pares['grupo'] = grupo[pares['i'].to_numpy()]
+
+    resumo = {
+        'linhas': n,
+        'pares_possiveis': n * (n - 1) // 2,
+        'pares_espaciais': int(len(espaciais)),
+        'pares_nome': int(len(por_nome)),
+        'candidatos': int(len(candidatos)),
+        'blocos_ignorados': ignorados,
+        'tiles_ignorados': ignorados_espaco,
+        'pares_duplicados': int(len(pares)),
+        'grupos': int(pares['grupo'].nunique()),
+        'linhas_em_grupos': int(len(np.unique(pares[['i', 'j']].to_numpy()))),
+        'tempo_s': round(time.perf_counter() - inicio, 2),
+    }
+    return pares.reset_index(drop=True), resumo
+
+
+def marcar_duplicatas(df, pares):
+    """
+    Acrescenta grupo_duplicata (-1 = sem duplicata; senão a posição do
+    representativo) e pontuacao_duplicata (maior pontuação do grupo).
+    """
+    grupo = np.full(len(df), -1, dtype=np.int64)
+    pontuacao = np.zeros(len(df))
+    if len(pares):
+        maior = pares.groupby('grupo')['pontuacao'].max()
+        for coluna in ('i', 'j'):
+            posicoes = pares[coluna].to_numpy()
+            grupo[posicoes] = pares['grupo'].to_numpy()
+        pontuacao[grupo >= 0] = maior.reindex(grupo[grupo >= 0]).to_numpy()
+    df['grupo_duplicata'] = grupo
+    df['pontuacao_duplicata'] = pontuacao
+    return df
+
+
+def remover_duplicatas(df):
+    """Mantém uma linha por grupo (o representativo: menor posição do grupo)"""
+    posicoes = np.arange(len(df))
+    manter = (df['grupo_duplicata'].to_numpy() < 0) | (df['grupo_duplicata'].to_numpy() == posicoes)
+    return df[manter]
+
+
+def imprimir_resumo(resumo, pares, exemplos=10):
+    print(f"   • {resumo['linhas']} estabelecimentos: {resumo['candidatos']} pares candidatos "
+          f"(de {resumo['pares_possiveis']} possíveis; {resumo['pares_espaciais']} espaciais, "
+          f"{resumo['pares_nome']} por nome) em {resumo['tempo_s']:.2f} s")
+    if resumo['blocos_ignorados']:
+        print(f"   • {resumo['blocos_ignorados']} linhas em blocos de nome > {BLOCO_MAXIMO} (ignorados)")
+    if resumo['tiles_ignorados']:
+        print(f"   • {resumo['tiles_ignorados']} linhas em tiles com > {BLOCO_MAXIMO} pontos (fora da blocagem espacial)")
+    print(f"   • {resumo['pares_duplicados']} pares prováveis em {resumo['grupos']} grupo(s) "
+          f"({resumo['linhas_em_grupos']} estabelecimentos)")
+    for par in pares.head(exemplos).itertuples():
+        print(f"      {par.pontuacao:.2f}  {par.nome_i} | {par.nome_j} ({par.distancia_m:.0f} m)")
+
+
+# Casos de referência: (nome_a, nome_b, coordenadas_b, endereço_b, duplicata?);
+# o lado a fica em (-27.2335, -52.0238) na RUA MARECHAL DEODORO 100
+CASOS_VERIFICACAO = [
+    ('HOSPITAL SAO FRANCISCO', 'HOSPITAL SAO FRANCISCO LTDA', None, 'RUA MARECHAL DEODORO 100', True),
+    ('HOSPITAL SAO FRANCISCO', 'HOSPITAL SAO FRANCISCO', None, 'RUA ITALIA 20', False),
+    ('HOSPITAL SAO FRANCISCO', 'HOSPITAL SAO FRANCISCO', None, '', False),
+    ('ESF CRISTAL', 'UBS CRISTAL', (-27.23355, -52.0238), 'RUA MARECHAL DEODORO 100', True),
+    ('ESF CRISTAL', 'ESF CRISTAL II', (-27.23355, -52.0238), 'RUA MARECHAL DEODORO 100', False),
+    ('LABORATORIO SAO LUCAS', 'FARMACIA SAO LUCAS', (-27.2335, -52.0238), 'RUA MARECHAL DEODORO 100', False),
+    ('CONSULTORIO DR JOAO SILVA', 'CONSULTORIO DR PEDRO SOUZA', (-27.2335, -52.0238), 'RUA MARECHAL DEODORO 100', False),
+]
+
+
+def verificar():
+    """Roda os CASOS_VERIFICACAO; retorna True se todos batem com o esperado"""
+    ok = True
+    for nome_a, nome_b, coordenadas, endereco, esperado in CASOS_VERIFICACAO:
+        lat_b, lon_b = coordenadas or (np.nan, np.nan)
+        df = pd.DataFrame({
+            'NO_FANTASIA': [nome_a, nome_b],
+            'NU_LATITUDE': [-27.2335, lat_b], 'NU_LONGITUDE': [-52.0238, lon_b],
+            'NO_LOGRADOURO': ['RUA MARECHAL DEODORO 100', endereco],
+        })
+        pares, _ = detectar_duplicatas(df)
+        obtido = len(pares) > 0
+        ok &= obtido == esperado
+        print(f"   {'✅' if obtido == esperado else '❌'} {nome_a} | {nome_b} "
+              f"({'sem coordenadas' if coordenadas is None else 'com coordenadas'}): "
+              f"{'duplicata' if obtido else 'distintos'}")
+    return ok
+
+
+def main():
+    print("=" * 60)
+    print("👯 DETECÇÃO DE ESTABELECIMENTOS DUPLICADOS")
+    print("=" * 60)
+    if sys.argv[1:] == ['--verificar']:
+        return verificar()
+    if len(sys.argv) > 1:
+        caminho = sys.argv[1]
+        df = pd.read_csv(caminho, sep=None, engine='python') if caminho.endswith('.csv') else pd.read_excel(caminho)
+    else:
+        import dados_canonicos
+        df = dados_canonicos.carregar_dados()
+        if df is None:
+            print("❌ Base canônica não encontrada: execute dashboard_avancado_colorbrewer.py")
+            return None
+    pares, resumo = detectar_duplicatas(df)
+    imprimir_resumo(resumo, pares)
+    saida = os.path.join(ROOT_DIR, '03_RESULTADOS', 'duplicatas_candidatas.csv')
+    os.makedirs(os.path.dirname(saida), exist_ok=True)
+    pares.to_csv(saida, index=False, encoding='utf-8')
+    print(f"💾 Pares salvos em {os.path.relpath(saida, ROOT_DIR)}")
+    return pares
+
+
+if __name__ == '__main__':
+    main()
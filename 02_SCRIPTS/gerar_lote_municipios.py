@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Geração em Lote por Município (SC inteiro; depois Brasil)
+- Parametriza o dashboard avançado por município: código IBGE, nome e
+  centro (sede, quando informada; senão centroide do polígono municipal)
+- Camadas estaduais (base CNES, malha municipal, setores, limite estadual)
+  são lidas uma única vez no processo principal e herdadas pelos processos
+  filhos via fork (cópia sob demanda da memória, sem nova leitura de disco)
+- Mapa, dashboard PNG/PDF, relatório e CSV de cada município renderizados
+  em um pool de processos
+- Manifesto JSON com tempos por etapa e tamanho dos arquivos por município
+
+Uso:
+    python 02_SCRIPTS/gerar_lote_municipios.py                  # todos de SC
+    python 02_SCRIPTS/gerar_lote_municipios.py 420430 420540    # só esses
+    python 02_SCRIPTS/gerar_lote_municipios.py --processos 8 --limite 20
+    python 02_SCRIPTS/gerar_lote_municipios.py --sedes municipios.csv
+    python 02_SCRIPTS/gerar_lote_municipios.py --backend direto     # sem Folium
+
+O CSV de sedes segue o formato de kelvins/municipios-brasileiros
+(colunas codigo_ibge, nome, latitude, longitude).
+
+Autor: Caetano Ronan
+Instituição: UFSC
+"""
+
+import os
+import re
+import io
+import json
+import time
+import argparse
+import unicodedata
+import contextlib
+import multiprocessing as mp
+import matplotlib
+matplotlib.use('Agg')  # processos filhos sem interface gráfica
+import matplotlib.pyplot as plt
+import pandas as pd
+
+import dashboard_avancado_colorbrewer as dashboard
+
+MUNICIPIOS_DIR = os.path.join(dashboard.OUTPUT_DIR, 'municipios')
+ARQUIVO_MANIFESTO = 'manifesto_lote.json'
+BASE_SC = os.path.join(dashboard.ROOT_DIR, '01_DADOS', 'originais', 'Tabela_estado_SC.csv')
+
+
+def _slug(texto):
+    """Nome de pasta ASCII (ex.: 'São Miguel do Oeste' -> 'sao_miguel_do_oeste')"""
+    texto = unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^a-z0-9]+', '_', texto.lower()).strip('_')
+
+
+def carregar_camadas_compartilhadas():
+    """
+    Lê as camadas estaduais uma vez e as guarda em
+    dashboard.CAMADAS_COMPARTILHADAS (herdado pelos processos filhos).
+
+    Returns:
+        dict {camada: número de registros}
+    """
+    print("📥 Carregando camadas estaduais compartilhadas...")
+    camadas = dashboard.CAMADAS_COMPARTILHADAS
+    resumo = {}
+
+    if os.path.isfile(BASE_SC):
+        camadas['estabelecimentos_sc'] = pd.read_csv(BASE_SC, sep=';', encoding='utf-8', low_memory=False)
+        resumo['estabelecimentos_sc'] = len(camadas['estabelecimentos_sc'])
+    else:
+        print(f"   ⚠️ Base estadual não encontrada: {BASE_SC}")
+
+    try:
+        gdf_sc = dashboard.carregar_malha_municipios_sc()
+        if gdf_sc is not None:
+            resumo['municipios_sc'] = len(gdf_sc)
+    except Exception as e:
+        print(f"   ⚠️ Malha municipal de SC indisponível: {e}")
+
+    gpkg_setores = os.path.join(dashboard.ROOT_DIR, "SC_setores_CD2022.gpkg")
+    if dashboard.gpd is not None and os.path.isfile(gpkg_setores):
+        try:
+            gdf_setores = dashboard.gpd.read_file(gpkg_setores)
+            if gdf_setores.crs is None or gdf_setores.crs.to_epsg() != 4326:
+                gdf_setores = gdf_setores.to_crs(epsg=4326)
+            camadas['setores_sc'] = gdf_setores
+            resumo['setores_sc'] = len(gdf_setores)
+        except Exception as e:
+            print(f"   ⚠️ Setores de SC indisponíveis: {e}")
+
+    # Limite estadual: baixado uma vez (carregar_limites_ibge guarda em cache);
+    # se falhar, None evita uma nova tentativa em cada processo filho
+    with contextlib.redirect_stdout(io.StringIO()):
+        dashboard.carregar_limites_ibge()
+    camadas.setdefault('estado', None)
+    if camadas.get('estado') is not None:
+        resumo['estado'] = len(camadas['estado'])
+
+    for nome, n in resumo.items():
+        print(f"   ✅ {nome}: {n} registros")
+    return resumo
+
+
+def listar_municipios(codigos=None, sedes=None):
+    """
+    Lista de municípios a processar, com o centro de cada um.
+
+    Ordem de preferência para o centro: sede (CSV de sedes), centroide do
+    polígono (ponto interno se o centroide cair fora), mediana das
+    coordenadas dos estabelecimentos.
+
+    Args:
+        codigos: códigos IBGE de 6 dígitos a manter (None = todos)
+        sedes: caminho do CSV com codigo_ibge, latitude, longitude (opcional)
+
+    Returns:
+        lista de dicts {codigo, nome, centro, origem_centro}
+    """
+    municipios = {}
+    gdf_sc = dashboard.CAMADAS_COMPARTILHADAS.get('municipios_sc')
+    if gdf_sc is not None:
+        cod_col = next(c for c in gdf_sc.columns if 'CD' in c.upper() and 'MUN' in c.upper())
+        nome_col = next(c for c in gdf_sc.columns if c.upper() in ['NM_MUN', 'NM_MUNICIP', 'NOME', 'MUNICIPIO'])
+        # Centroide calculado em UTM (EPSG:31982) e devolvido em graus
+        centroides = gdf_sc.to_crs(31982).centroid.to_crs(4326)
+        internos = gdf_sc.representative_point()
+        for i, linha in gdf_sc.iterrows():
+            ponto = centroides.loc[i] if linha.geometry.contains(centroides.loc[i]) else internos.loc[i]
+            codigo = int(str(linha[cod_col])[:6])
+            municipios[codigo] = {
+                'codigo': codigo,
+                'nome': str(linha[nome_col]),
+                'centro': (round(ponto.y, 6), round(ponto.x, 6)),
+                'origem_centro': 'centroide',
+            }
+
+    df_sc = dashboard.CAMADAS_COMPARTILHADAS.get('estabelecimentos_sc')
+    if not municipios and df_sc is not None:
+        # Sem malha municipal: centro aproximado pelos próprios estabelecimentos
+        lat_col = next(c for c in df_sc.columns if 'LAT' in c.upper())
+        lon_col = next(c for c in df_sc.columns if 'LON' in c.upper())
+        nome_col = next((c for c in df_sc.columns if c.upper() in ['NO_MUNICIPIO', 'MUNICIPIO']), None)
+        coords = df_sc[['CO_MUNICIPIO_GESTOR', lat_col, lon_col]].apply(pd.to_numeric, errors='coerce')
+        for codigo, grupo in coords.dropna().groupby('CO_MUNICIPIO_GESTOR'):
+            nome = df_sc.loc[grupo.index[0], nome_col] if nome_col else str(int(codigo))
+            municipios[int(codigo)] = {
+                'codigo': int(codigo),
+                'nome': str(nome).title() if nome_col else nome,
+                'centro': (round(grupo[lat_col].median(), 6), round(grupo[lon_col].median(), 6)),
+                'origem_centro': 'estabelecimentos',
+            }
+
+    if sedes and os.path.isfile(sedes):
+        df_sedes = pd.read_csv(sedes)
+        for _, sede in df_sedes.iterrows():
+            codigo = int(str(sede['codigo_ibge'])[:6])
+            if codigo in municipios:
+                municipios[codigo]['centro'] = (float(sede['latitude']), float(sede['longitude']))
+                municipios[codigo]['origem_centro'] = 'sede'
+
+    if codigos:
+        codigos = {int(str(c)[:6]) for c in codigos}
+        # Concórdia continua processável mesmo sem malha/base estadual
+        padrao = dict(dashboard.MUNICIPIO, origem_centro='sede')
+        municipios.setdefault(padrao['codigo'], padrao)
+        return [m for c, m in sorted(municipios.items()) if c in codigos]
+    return [m for _, m in sorted(municipios.items())]
+
+
+def _tamanhos(pasta):
+    """{caminho relativo: bytes} de todos os arquivos gerados na pasta"""
+    tamanhos = {}
+    for raiz, _, arquivos in os.walk(pasta):
+        for arquivo in arquivos:
+            caminho = os.path.join(raiz, arquivo)
+            tamanhos[os.path.relpath(caminho, pasta).replace(os.sep, '/')] = os.path.getsize(caminho)
+    return dict(sorted(tamanhos.items()))
+
+
+def processar_municipio(municipio):
+    """
+    Gera mapa, dashboard, relatório e CSV de um município (executado no
+    processo filho; a saída do console vai para <pasta>/log.txt).
+
+    Returns:
+        dict do manifesto (status, tempos por etapa, tamanhos)
+    """
+    pasta = os.path.join(MUNICIPIOS_DIR, f"{municipio['codigo']}_{_slug(municipio['nome'])}")
+    os.makedirs(pasta, exist_ok=True)
+    dashboard.configurar_municipio(municipio['codigo'], municipio['nome'], municipio['centro'],
+                                   saida=pasta)
+    registro = dict(municipio, pasta=os.path.relpath(pasta, MUNICIPIOS_DIR),
+                    status='ok', tempos_s={})
+    tempos = registro['tempos_s']
+    inicio = time.perf_counter()
+
+    def etapa(nome, funcao, *args):
+        t0 = time.perf_counter()
+        resultado = funcao(*args)
+        tempos[nome] = round(time.perf_counter() - t0, 3)
+        return resultado
+
+    with open(os.path.join(pasta, 'log.txt'), 'w', encoding='utf-8') as log, \
+            contextlib.redirect_stdout(log):
+        try:
+            df = etapa('dados', dashboard.carregar_dados)
+            registro['estabelecimentos'] = len(df)
+            if len(df) == 0:
+                raise ValueError('nenhum estabelecimento com coordenadas válidas')
+            saida_mapa = os.path.join(dashboard.MAPAS_DIR, 'mapa_avancado_colorbrewer.html')
+            if dashboard.BACKEND_MAPA == 'direto':
+                etapa('mapa', dashboard.criar_mapa_html_direto, df, saida_mapa)
+            else:
+                mapa = etapa('mapa', dashboard.criar_mapa_avancado_treelayer, df)
+                etapa('mapa_html', mapa.save, saida_mapa)
+            # Dashboard, relatório e CSV (reaproveitados do cache se nada mudou)
+            registro['cache'] = dashboard.gerar_artefatos(df, etapa)
+        except Exception as e:
+            registro['status'] = 'erro'
+            registro['erro'] = f'{type(e).__name__}: {e}'
+            print(f"❌ {registro['erro']}")
+            plt.close('all')
+
+    tempos['total'] = round(time.perf_counter() - inicio, 3)
+    registro['arquivos'] = _tamanhos(pasta)
+    registro['bytes_total'] = sum(registro['arquivos'].values())
+    return registro
+
+
+def gerar_lote(municipios, processos=None):
+    """
+    Processa os municípios em um pool de processos.
+
+    Com 'fork' (Linux/macOS) os filhos herdam as camadas já carregadas; sem
+    fork (Windows) cada processo do pool carrega as camadas uma vez ao iniciar.
+
+    Returns:
+        dict do manifesto do lote
+    """
+    processos = processos or os.cpu_count() or 1
+    if 'fork' in mp.get_all_start_methods():
+        contexto, inicializador = mp.get_context('fork'), None
+    else:
+        contexto, inicializador = mp.get_context('spawn'), _inicializar_processo
+
+    inicio = time.perf_counter()
+    registros = []
+    with contexto.Pool(processos, initializer=inicializador,
+                       initargs=(dashboard.BACKEND_MAPA,) if inicializador else ()) as pool:
+        for registro in pool.imap_unordered(processar_municipio, municipios):
+            registros.append(registro)
+            simbolo = '✅' if registro['status'] == 'ok' else '❌'
+            print(f"   {simbolo} {registro['codigo']} {registro['nome']:<28} "
+                  f"{registro['tempos_s']['total']:>7.1f} s {registro['bytes_total'] / 1024:>9.0f} KB"
+                  f"{'  ' + registro['erro'] if registro['status'] != 'ok' else ''}")
+
+    registros.sort(key=lambda r: r['codigo'])
+    ok = [r for r in registros if r['status'] == 'ok']
+    return {
+        'gerado_em': pd.Timestamp.now().isoformat(timespec='seconds'),
+        'processos': processos,
+        'backend_mapa': dashboard.BACKEND_MAPA,
+        'metodo_inicio': contexto.get_start_method(),
+        'municipios': len(registros),
+        'sucesso': len(ok),
+        'falhas': len(registros) - len(ok),
+        'tempo_total_s': round(time.perf_counter() - inicio, 3),
+        'tempo_soma_municipios_s': round(sum(r['tempos_s']['total'] for r in registros), 3),
+        'bytes_total': sum(r['bytes_total'] for r in registros),
+        'cache_acertos': sum(sum(r.get('cache', {}).values()) for r in registros),
+        'cache_consultas': sum(len(r.get('cache', {})) for r in registros),
+        'resultados': registros,
+    }
+
+
+def _inicializar_processo(backend_mapa):
+    """Inicializador do pool sem fork: carrega as camadas no próprio processo"""
+    dashboard.BACKEND_MAPA = backend_mapa
+    with contextlib.redirect_stdout(io.StringIO()):
+        carregar_camadas_compartilhadas()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Dashboard avançado em lote por município')
+    parser.add_argument('codigos', nargs='*', help='códigos IBGE (padrão: todos os municípios de SC)')
+    parser.add_argument('--processos', type=int, default=None, help='tamanho do pool (padrão: nº de CPUs)')
+    parser.add_argument('--limite', type=int, default=None, help='processar só os N primeiros')
+    parser.add_argument('--sedes', default=None, help='CSV com codigo_ibge, latitude, longitude das sedes')
+    parser.add_argument('--backend', choices=['folium', 'direto'], default=dashboard.BACKEND_MAPA,
+                        help='backend do mapa (direto = emissor HTML de mapa_html_direto.py)')
+    args = parser.parse_args()
+    dashboard.BACKEND_MAPA = args.backend
+
+    print("=" * 70)
+    print("🏭 DASHBOARD AVANÇADO EM LOTE POR MUNICÍPIO")
+    print("=" * 70)
+
+    t0 = time.perf_counter()
+    carregar_camadas_compartilhadas()
+    print(f"   ⏱️ Camadas carregadas em {time.perf_counter() - t0:.1f} s")
+
+    municipios = listar_municipios(args.codigos, args.sedes)
+    if args.limite:
+        municipios = municipios[:args.limite]
+    if not municipios:
+        print("❌ Nenhum município para processar (base estadual/malha municipal ausentes)")
+        return None
+
+    os.makedirs(MUNICIPIOS_DIR, exist_ok=True)
+    print(f"\n🗺️ Processando {len(municipios)} municípios...")
+    manifesto = gerar_lote(municipios, args.processos)
+
+    caminho = os.path.join(MUNICIPIOS_DIR, ARQUIVO_MANIFESTO)
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(manifesto, f, ensure_ascii=False, indent=2)
+
+    print(f"\n✅ {manifesto['sucesso']}/{manifesto['municipios']} municípios em "
+          f"{manifesto['tempo_total_s']:.1f} s (soma sequencial: {manifesto['tempo_soma_municipios_s']:.1f} s)")
+    print(f"   📦 {manifesto['bytes_total'] / 1024 ** 2:.1f} MB gerados")
+    print(f"   🗄️ Cache de artefatos: {manifesto['cache_acertos']}/{manifesto['cache_consultas']} acertos")
+    if dashboard.CACHE_ARTEFATOS is not None:
+        dashboard.CACHE_ARTEFATOS.limpar()
+    print(f"   📋 Manifesto: {caminho}")
+    return manifesto
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Texto Normalizado e Índice Invertido de Estabelecimentos
+- Normalização feita uma vez por valor distinto: caixa alta, sem acentos,
+  espaços simples ('Posto de Saúde  Central' -> 'POSTO DE SAUDE CENTRAL');
+  colunas nome_norm, razao_norm, endereco_norm e bairro_norm ficam na tabela
+  processada (e na base canônica) para comparações sem str(x).upper()
+- Índice invertido de tokens (nome, razão social, bairro) em formato CSR:
+  lista ordenada de tokens + início de cada lista de linhas; busca por
+  prefixo com searchsorted e interseção das listas (E entre palavras)
+- O mesmo índice vai para os mapas (complemento 'busca'): caixa de busca
+  Leaflet que responde no navegador sem varrer os registros
+
+Uso:
+    python indice_textual.py "posto centro"     # busca na base canônica
+
+Autor: Caetano Ronan
+Instituição: UFSC
+"""
+
+import re
+import sys
+import time
+import base64
+import unicodedata
+import numpy as np
+import pandas as pd
+from branca.element import MacroElement
+from jinja2 import Template
+
+import complementos_mapa
+from camadas_geojson import serializar_json
+
+# Campo normalizado -> colunas de origem aceitas, em ordem de preferência
+CAMPOS_TEXTO = {
+    'nome': ['NO_FANTASIA', 'NOME'],
+    'razao': ['NO_RAZAO_SOCIAL', 'RAZAO_SOCIAL'],
+    'endereco': ['NO_LOGRADOURO', 'ENDERECO'],
+    'bairro': ['NO_BAIRRO', 'BAIRRO'],
+}
+CAMPOS_INDICE = ('nome', 'razao', 'bairro')
+SUFIXO_NORMALIZADO = '_norm'
+
+_ESPACOS = re.compile(r'\s+')
+_TOKENS = re.compile(r'[A-Z0-9]+')
+
+
+def _normalizar(texto):
+    if not texto.isascii():
+        texto = unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode('ascii')
+    return _ESPACOS.sub(' ', texto.upper()).strip()
+
+
+def normalizar_texto(serie):
+    """
+    Caixa alta, sem acentos e com espaços simples (nulos viram '').
+
+    Calcula só os valores distintos e espalha de volta (nomes e bairros se
+    repetem muito na base CNES).
+    """
+    serie = pd.Series(serie, dtype=object)
+    codigos, distintos = pd.factorize(serie, use_na_sentinel=True)
+    normalizados = np.array([_normalizar(str(v)) for v in distintos] + [''], dtype=object)
+    return pd.Series(normalizados[codigos], index=serie.index, dtype=object)
+
+
+def coluna_do_campo(df, campo):
+    """Primeira coluna de origem presente para o campo (ou None)"""
+    return next((c for c in CAMPOS_TEXTO[campo] if c in df.columns), None)
+
+
+def normalizar_colunas(df):
+    """
+    Acrescenta as colunas <campo>_norm para nome, razão social, endereço e bairro.
+
+    Args:
+        df: DataFrame de estabelecimentos (nomes CNES ou canônicos)
+
+    Returns:
+        o mesmo DataFrame, com as colunas normalizadas presentes
+    """
+    for campo in CAMPOS_TEXTO:
+        coluna = coluna_do_campo(df, campo)
+        if coluna is not None:
+            df[campo + SUFIXO_NORMALIZADO] = normalizar_texto(df[coluna])
+    return df
+
+
+def _texto_normalizado(df, campo):
+    if campo + SUFIXO_NORMALIZADO in df.columns:
+        return df[campo + SUFIXO_NORMALIZADO]
+    coluna = coluna_do_campo(df, campo)
+    return normalizar_texto(df[coluna]) if coluna is not None else None
+
+
+def construir_indice(df, campos=CAMPOS_INDICE):
+    """
+    Índice invertido token -> linhas (posições 0..n-1 de df).
+
+    Args:
+        df: DataFrame de estabelecimentos
+        campos: campos de texto indexados
+
+    Returns:
+        dict com 'tokens' (ordenados), 'inicios' (CSR, len = tokens + 1),
+        'linhas' (int32) e 'total' de linhas indexadas
+    """
+    pares = []
+    for campo in campos:
+        texto = _texto_normalizado(df, campo)
+        if texto is None:
+            continue
+        tokens = pd.Series(texto.to_numpy(), index=np.arange(len(df))).str.findall(_TOKENS).explode().dropna()
+        pares.append(tokens)
+    if pares:
+        tokens = pd.concat(pares)
+        # Par (token, linha) único; ordenado por token e depois por linha
+        tabela = pd.DataFrame({'token': tokens.to_numpy(dtype=str), 'linha': tokens.index.to_numpy()})
+        tabela = tabela.drop_duplicates().sort_values(['token', 'linha'], kind='stable')
+    else:
+        tabela = pd.DataFrame({'token': np.array([], dtype=str), 'linha': np.array([], dtype=int)})
+    vocabulario, inicios = np.unique(tabela['token'].to_numpy(dtype=str), return_index=True)
+    return {
+        'tokens': vocabulario,
+        'inicios': np.append(inicios, len(tabela)).astype(np.int64),
+        'linhas': tabela['linha'].to_numpy(dtype=np.int32),
+        'total': int(len(df)),
+    }
+
+
+def _linhas_do_prefixo(indice, prefixo):
+    """União das listas de linhas dos tokens que começam com o prefixo"""
+    tokens = indice['tokens']
+    a = np.searchsorted(tokens, prefixo, side='left')
+    b = np.searchsorted(tokens, prefixo + '\uffff', side='left')
+    if a == b:
+        return np.array([], dtype=np.int32)
+    if b - a == 1:
+        return indice['linhas'][indice['inicios'][a]:indice['inicios'][a + 1]]
+    return np.unique(indice['linhas'][indice['inicios'][a]:indice['inicios'][b]])
+
+
+def buscar(indice, consulta):
+    """
+    Linhas cujos textos têm todas as palavras da consulta (cada uma como prefixo).
+
+    Args:
+        indice: dict de construir_indice
+        consulta: texto livre ('posto saude centro', 'são cristóvão')
+
+    Returns:
+        numpy array ordenado de posições de linha
+    """
+    palavras = _TOKENS.findall(_normalizar(str(consulta)))
+    if not palavras:
+        return np.array([], dtype=np.int32)
+    # Listas menores primeiro: a interseção encolhe rápido
+    listas = sorted((_linhas_do_prefixo(indice, p) for p in set(palavras)), key=len)
+    resultado = listas[0]
+    for linhas in listas[1:]:
+        if not len(resultado):
+            break
+        resultado = np.intersect1d(resultado, linhas, assume_unique=True)
+    return resultado
+
+
+def _uint32(valores):
+    return base64.b64encode(np.ascontiguousarray(valores, dtype='<u4').tobytes()).decode('ascii')
+
+
+def _coluna_coordenada(df, coluna, parte):
+    if coluna in df.columns:
+        return coluna
+    return next(c for c in df.columns if parte in str(c).upper())
+
+
+def exportar_indice(df, indice=None, lat_col='LAT', lon_col='LON'):
+    """
+    Carga compacta do índice + registros mínimos para o navegador.
+
+    Returns:
+        dict serializável (tokens, inicios/linhas em Uint32 base64, registros
+        [nome, bairro, lat, lon])
+    """
+    indice = indice or construir_indice(df)
+    lat_col = _coluna_coordenada(df, lat_col, 'LAT')
+    lon_col = _coluna_coordenada(df, lon_col, 'LON')
+    nome = df[coluna_do_campo(df, 'nome')] if coluna_do_campo(df, 'nome') else pd.Series('', index=df.index)
+    bairro = df[coluna_do_campo(df, 'bairro')] if coluna_do_campo(df, 'bairro') else pd.Series('', index=df.index)
+    registros = pd.DataFrame({
+        'nome': nome.fillna('').astype(str),
+        'bairro': bairro.fillna('').astype(str),
+        'lat': pd.to_numeric(df[lat_col], errors='coerce').round(6),
+        'lon': pd.to_numeric(df[lon_col], errors='coerce').round(6),
+    })
+    return {
+        'tokens': indice['tokens'].tolist(),
+        'inicios': _uint32(indice['inicios']),
+        'linhas': _uint32(indice['linhas']),
+        'registros': registros.astype(object).where(registros.notna(), None).to_numpy().tolist(),
+    }
+
+
+CSS_BUSCA = """
+.busca-estab { background: white; padding: 6px; border-radius: 6px;
+               box-shadow: 0 1px 5px rgba(0,0,0,0.4); width: 260px; font: 12px Arial, sans-serif; }
+.busca-estab input { width: 100%; box-sizing: border-box; padding: 4px 6px; }
+.busca-estab ul { list-style: none; margin: 4px 0 0 0; padding: 0; max-height: 220px; overflow-y: auto; }
+.busca-estab li { padding: 3px 4px; cursor: pointer; border-bottom: 1px solid #eee; }
+.busca-estab li:hover { background: #edf8fb; }
+.busca-estab small { color: #777; }
+"""
+
+_MODELO_JS_BUSCA = Template("""(function() {
+  var carga = {{ carga }};
+  function decodificar(b64) {
+    var bin = atob(b64), bytes = new Uint8Array(bin.length);
+    for (var i = 0; i < bin.length; i++) bytes[i] = bin.charCodeAt(i);
+    return new Uint32Array(bytes.buffer);
+  }
+  var tokens = carga.tokens, inicios = decodificar(carga.inicios), linhas = decodificar(carga.linhas);
+  function normalizar(t) {
+    return t.normalize('NFKD').replace(/[\\u0300-\\u036f]/g, '').toUpperCase();
+  }
+  function limite(p, depois) {  // busca binária no vocabulário ordenado
+    var a = 0, b = tokens.length;
+    while (a < b) {
+      var m = (a + b) >> 1, t = tokens[m];
+      var menor = depois ? (t.lastIndexOf(p, 0) === 0 || t < p) : t < p;
+      if (menor) a = m + 1; else b = m;
+    }
+    return a;
+  }
+  function doPrefixo(p) {
+    var a = limite(p, false), b = limite(p, true), s = new Set();
+    for (var i = inicios[a]; i < inicios[b]; i++) s.add(linhas[i]);
+    return s;
+  }
+  function buscar(consulta) {
+    var palavras = normalizar(consulta).match(/[A-Z0-9]+/g);
+    if (!palavras) return [];
+    var conjuntos = palavras.map(doPrefixo).sort(function(x, y) { return x.size - y.size; });
+    return Array.from(conjuntos[0]).filter(function(l) {
+      return conjuntos.every(function(c) { return c.has(l); });
+    }).sort(function(x, y) { return x - y; });
+  }
+  var mapa = {{ mapa }};
+  var controle = L.control({position: '{{ posicao }}'});
+  controle.onAdd = function() {
+    var div = L.DomUtil.create('div', 'busca-estab');
+    div.innerHTML = '<input type="search" placeholder="{{ texto }}"><ul></ul>';
+    L.DomEvent.disableClickPropagation(div);
+    L.DomEvent.disableScrollPropagation(div);
+    var entrada = div.querySelector('input'), lista = div.querySelector('ul');
+    entrada.addEventListener('input', function() {
+      var achados = buscar(entrada.value).slice(0, {{ maximo }});
+      lista.innerHTML = '';
+      achados.forEach(function(l) {
+        var r = carga.registros[l], item = document.createElement('li');
+        item.textContent = r[0];
+        var bairro = document.createElement('small');
+        bairro.textContent = r[1] ? ' — ' + r[1] : '';
+        item.appendChild(bairro);
+        item.onclick = function() {
+          if (r[2] !== null && r[3] !== null) mapa.setView([r[2], r[3]], Math.max(mapa.getZoom(), 16));
+        };
+        lista.appendChild(item);
+      });
+    });
+    return div;
+  };
+  controle.addTo(mapa);
+})();
+""")
+
+
+def js_busca(carga, mapa='mapa', posicao='topright', texto='Buscar estabelecimento ou bairro...', maximo=15):
+    """
+    Script da caixa de busca sobre a variável JS do mapa (backends Folium e
+    HTML direto); `carga` é a saída de exportar_indice
+    """
+    return _MODELO_JS_BUSCA.render(carga=serializar_json(carga), mapa=mapa, posicao=posicao,
+                                   texto=texto, maximo=maximo)
+
+
+class ControleBusca(MacroElement):
+    """Caixa de busca Leaflet sobre o índice invertido embutido"""
+    _template = Template("""
+        {% macro header(this, kwargs) %}
+        <style>{{ this.css }}</style>
+        {% endmacro %}
+        {% macro script(this, kwargs) %}
+        {{ this.script_js(this._parent.get_name()) }}
+        {% endmacro %}
+    """)
+
+    def __init__(self, carga, posicao='topright', texto='Buscar estabelecimento ou bairro...', maximo=15):
+        super().__init__()
+        self._name = 'ControleBusca'
+        self.carga = carga
+        self.css = CSS_BUSCA
+        self.posicao = posicao
+        self.texto = texto
+        self.maximo = maximo
+
+    def script_js(self, mapa):
+        return js_busca(self.carga, mapa, self.posicao, self.texto, self.maximo)
+
+
+@complementos_mapa.registrar('busca')
+def _busca(mapa, df, posicao='topright', maximo=15, lat_col='LAT', lon_col='LON'):
+    if df is None or df.empty:
+        return None
+    return ControleBusca(exportar_indice(df, lat_col=lat_col, lon_col=lon_col),
+                         posicao=posicao, maximo=maximo)
+
+
+def main():
+    import dados_canonicos
+    consulta = ' '.join(sys.argv[1:]) or 'saude'
+    print("=" * 60)
+    print("🔎 BUSCA NO ÍNDICE TEXTUAL DE ESTABELECIMENTOS")
+    print("=" * 60)
+    df = dados_canonicos.carregar_dados()
+    if df is None:
+        print("❌ Base canônica não encontrada: execute dashboard_avancado_colorbrewer.py")
+        return None
+    inicio = time.perf_counter()
+    indice = construir_indice(df)
+    construcao = time.perf_counter() - inicio
+    print(f"📚 {len(indice['tokens'])} tokens, {len(indice['linhas'])} postagens "
+          f"({len(df)} estabelecimentos) em {construcao * 1000:.1f} ms")
+    repeticoes = 1000
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        linhas = buscar(indice, consulta)
+    tempo = (time.perf_counter() - inicio) / repeticoes
+    print(f"\n🔎 '{consulta}': {len(linhas)} resultado(s) em {tempo * 1e6:.0f} µs")
+    nome = coluna_do_campo(df, 'nome')
+    bairro = coluna_do_campo(df, 'bairro')
+    for linha in linhas[:20]:
+        registro = df.iloc[linha]
+        print(f"   • {registro[nome] if nome else 'N/D'}"
+              + (f" — {registro[bairro]}" if bairro and pd.notna(registro[bairro]) else ''))
+    return linhas
+
+
+if __name__ == '__main__':
+    main()
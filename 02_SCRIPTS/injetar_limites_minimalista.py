@@ -11,46 +11,51 @@ Data: Novembro 2025
 import os
 import geopandas as gpd
 import json
+import time
+
+from remendos_html import aplicar_remendos, imprimir_relatorio
 
 ROOT = r'C:\Users\caetanoronan\OneDrive - UFSC\Área de Trabalho\Exer_tec_geo\Pesquisa_upas'
 MAPA = os.path.join(ROOT, 'docs', 'mapa_avancado_treelayer_colorbrewer.html')
 
-print("\n🗺️ ADICIONANDO LIMITES (injeção minimalista)")
-print("="*70)
-
-# Carregar shapefiles
-print("📥 Processando shapefiles...")
-shp_sc = os.path.join(ROOT, "SC_Municipios_2024", "SC_Municipios_2024.shp")
+def remendos():
+    """
+    Limites estadual, municipal e vizinhos como JavaScript injetado antes de </body>
+    (não injeta de novo se o mapa já tem os limites).
+    """
+    # Carregar shapefiles
+    print("📥 Processando shapefiles...")
+    shp_sc = os.path.join(ROOT, "SC_Municipios_2024", "SC_Municipios_2024.shp")
 
-# Limite estadual
-gdf_sc = gpd.read_file(shp_sc).to_crs(4326)
-gdf_estado = gdf_sc.to_crs(31982).dissolve().reset_index(drop=True)
-gdf_estado['geometry'] = gdf_estado['geometry'].simplify(500)
-gdf_estado = gdf_estado.to_crs(4326)
-geojson_estado = gdf_estado.to_json()
+    # Limite estadual
+    gdf_sc = gpd.read_file(shp_sc).to_crs(4326)
+    gdf_estado = gdf_sc.to_crs(31982).dissolve().reset_index(drop=True)
+    gdf_estado['geometry'] = gdf_estado['geometry'].simplify(500)
+    gdf_estado = gdf_estado.to_crs(4326)
+    geojson_estado = gdf_estado.to_json()
 
-# Limite municipal
-cod_col = [c for c in gdf_sc.columns if 'CD_MUN' in c.upper()][0]
-gdf_conc = gdf_sc[gdf_sc[cod_col].astype(str).str.contains('420430')].copy()
-gdf_conc = gdf_conc.to_crs(31982)
-gdf_conc['geometry'] = gdf_conc['geometry'].simplify(100)
-gdf_conc = gdf_conc.to_crs(4326)
-geojson_municipio = gdf_conc.to_json()
+    # Limite municipal
+    cod_col = [c for c in gdf_sc.columns if 'CD_MUN' in c.upper()][0]
+    gdf_conc = gdf_sc[gdf_sc[cod_col].astype(str).str.contains('420430')].copy()
+    gdf_conc = gdf_conc.to_crs(31982)
+    gdf_conc['geometry'] = gdf_conc['geometry'].simplify(100)
+    gdf_conc = gdf_conc.to_crs(4326)
+    geojson_municipio = gdf_conc.to_json()
 
-# Municípios vizinhos
-shp_reg = os.path.join(ROOT, "SC_municipios_regiao_concordia.shp")
-gdf_reg = gpd.read_file(shp_reg).to_crs(4326)
-nome_col = [c for c in gdf_reg.columns if 'NM_MUN' in c.upper()][0]
-gdf_viz = gdf_reg[~gdf_reg[nome_col].str.upper().str.contains('CONCORD')].copy()
-gdf_viz = gdf_viz.to_crs(31982)
-gdf_viz['geometry'] = gdf_viz['geometry'].simplify(200)
-gdf_viz = gdf_viz.to_crs(4326)
-geojson_vizinhos = gdf_viz.to_json()
+    # Municípios vizinhos
+    shp_reg = os.path.join(ROOT, "SC_municipios_regiao_concordia.shp")
+    gdf_reg = gpd.read_file(shp_reg).to_crs(4326)
+    nome_col = [c for c in gdf_reg.columns if 'NM_MUN' in c.upper()][0]
+    gdf_viz = gdf_reg[~gdf_reg[nome_col].str.upper().str.contains('CONCORD')].copy()
+    gdf_viz = gdf_viz.to_crs(31982)
+    gdf_viz['geometry'] = gdf_viz['geometry'].simplify(200)
+    gdf_viz = gdf_viz.to_crs(4326)
+    geojson_vizinhos = gdf_viz.to_json()
 
-print("   ✅ Dados processados")
+    print("   ✅ Dados processados")
 
-# JavaScript para injetar
-js = f"""
+    # JavaScript para injetar
+    js = f"""
 <script>
 (function() {{
     setTimeout(function() {{
@@ -81,18 +86,23 @@ js = f"""
 </script>
 """
 
-# Ler e injetar
-print("💉 Injetando código...")
-with open(MAPA, 'r', encoding='utf-8') as f:
-    html = f.read()
+    return [{'nome': 'limites (injeção minimalista)', 'tipo': 'inserir_antes', 'alvo': '</body>',
+             'conteudo': js, 'exceto_se': '✅ Limites adicionados'}]
+
+
+if __name__ == '__main__':
+    print("\n🗺️ ADICIONANDO LIMITES (injeção minimalista)")
+    print("="*70)
 
-if '✅ Limites adicionados' not in html:
-    html = html.replace('</body>', js + '</body>')
-    with open(MAPA, 'w', encoding='utf-8') as f:
-        f.write(html)
-    print("   ✅ Código injetado!")
-else:
-    print("   ⚠️ Limites já foram adicionados")
+    # Injetar numa única passagem
+    print("💉 Injetando código...")
+    inicio = time.perf_counter()
+    estatisticas = aplicar_remendos(MAPA, remendos())
+    imprimir_relatorio(estatisticas, time.perf_counter() - inicio)
+    if estatisticas[0]['ocorrencias']:
+        print("   ✅ Código injetado!")
+    else:
+        print("   ⚠️ Limites já foram adicionados")
 
-print("\n✅ CONCLUÍDO! Abra o mapa no navegador")
-print("="*70 + "\n")
+    print("\n✅ CONCLUÍDO! Abra o mapa no navegador")
+    print("="*70 + "\n")
@@ -9,13 +9,13 @@ Data: Novembro 2025
 """
 
 import os
+import time
+
+from remendos_html import aplicar_remendos, imprimir_relatorio
 
 ROOT_DIR = r'C:\Users\caetanoronan\OneDrive - UFSC\Área de Trabalho\Exer_tec_geo\Pesquisa_upas'
 MAPA_PATH = os.path.join(ROOT_DIR, 'docs', 'mapa_avancado_treelayer_colorbrewer.html')
 
-print("\n🚀 INJETANDO LIMITES NO MAPA (versão ultra-rápida)")
-print("="*70)
-
 # GeoJSON simplificado do limite municipal de Concórdia (polígono aproximado)
 # Coordenadas extraídas do conhecimento dos bounds do município
 geojson_concordia = '''{
@@ -168,57 +168,45 @@ js_injection = f"""
 </div>
 """
 
-# Ler HTML
-print("📖 Lendo mapa HTML...")
-try:
-    with open(MAPA_PATH, 'r', encoding='utf-8') as f:
-        html_content = f.read()
-    print("   ✅ Arquivo lido")
-except Exception as e:
-    print(f"   ❌ Erro ao ler arquivo: {e}")
-    exit(1)
 
-# Verificar se já não foi injetado antes
-if 'Limites Administrativos' in html_content and 'Santa Catarina (estado)' in html_content:
-    print("\n⚠️ Limites já foram adicionados anteriormente!")
-    print("   Removendo injeção anterior...")
-    # Remover script anterior (simplificado)
-    if '<script>' in html_content and '// Adicionar limites administrativos' in html_content:
-        import re
-        html_content = re.sub(
-            r'<script>\s*// Adicionar limites.*?</script>',
-            '',
-            html_content,
-            flags=re.DOTALL
-        )
+def remendos():
+    """
+    Remove uma injeção anterior ("// Adicionar limites ...") e injeta o
+    JavaScript dos limites antes de </body>.
+    """
+    return [
+        {'nome': 'remover injeção anterior', 'tipo': 'substituir_bloco',
+         'inicio': '<script>\n// Adicionar limites', 'fim': '</script>', 'conteudo': ''},
+        {'nome': 'limites (versão rápida)', 'tipo': 'inserir_antes', 'alvo': '</body>',
+         'conteudo': js_injection + '\n', 'no_fim_se_ausente': True},
+    ]
+
 
-# Injetar código antes do </body>
-if '</body>' in html_content:
-    html_content = html_content.replace('</body>', js_injection + '\n</body>')
-    print("   ✅ Código JavaScript injetado")
-else:
-    html_content += js_injection
-    print("   ⚠️ Tag </body> não encontrada, código adicionado ao final")
+if __name__ == '__main__':
+    print("\n🚀 INJETANDO LIMITES NO MAPA (versão ultra-rápida)")
+    print("="*70)
 
-# Salvar
-print("\n💾 Salvando mapa atualizado...")
-try:
-    with open(MAPA_PATH, 'w', encoding='utf-8') as f:
-        f.write(html_content)
-    print(f"   ✅ Salvo com sucesso!")
-except Exception as e:
-    print(f"   ❌ Erro ao salvar: {e}")
-    exit(1)
+    # Ler, remover injeção anterior, injetar e salvar numa única passagem
+    print("💉 Injetando código JavaScript...")
+    try:
+        inicio = time.perf_counter()
+        estatisticas = aplicar_remendos(MAPA_PATH, remendos())
+    except Exception as e:
+        print(f"   ❌ Erro ao atualizar arquivo: {e}")
+        exit(1)
+    imprimir_relatorio(estatisticas, time.perf_counter() - inicio)
+    if estatisticas[0]['ocorrencias']:
+        print("\n⚠️ Limites já tinham sido adicionados: injeção anterior removida")
 
-print("\n" + "="*70)
-print("✅ MAPA ATUALIZADO COM LIMITES ADMINISTRATIVOS!")
-print("="*70)
-print("\n📊 Camadas adicionadas:")
-print("   ✓ Limite Estadual de Santa Catarina (tracejado verde)")
-print("   ✓ Limite Municipal de Concórdia (destaque verde escuro)")
-print("   ✓ Legenda explicativa (canto inferior esquerdo)")
-print("   ✓ Zoom ajustado automaticamente para Concórdia")
-print("\n📂 Arquivo atualizado:")
-print(f"   {MAPA_PATH}")
-print("\n💡 Abra o arquivo no navegador para visualizar os limites!")
-print("="*70 + "\n")
+    print("\n" + "="*70)
+    print("✅ MAPA ATUALIZADO COM LIMITES ADMINISTRATIVOS!")
+    print("="*70)
+    print("\n📊 Camadas adicionadas:")
+    print("   ✓ Limite Estadual de Santa Catarina (tracejado verde)")
+    print("   ✓ Limite Municipal de Concórdia (destaque verde escuro)")
+    print("   ✓ Legenda explicativa (canto inferior esquerdo)")
+    print("   ✓ Zoom ajustado automaticamente para Concórdia")
+    print("\n📂 Arquivo atualizado:")
+    print(f"   {MAPA_PATH}")
+    print("\n💡 Abra o arquivo no navegador para visualizar os limites!")
+    print("="*70 + "\n")
@@ -8,6 +8,14 @@ import pandas as pd
 import folium
 from folium import plugins
 import os
+
+import camadas_topojson
+import complementos_mapa
+import dados_canonicos
+import classificacao_estabelecimentos
+import indice_textual  # noqa: F401 (registra o complemento 'busca' em complementos_mapa)
+import tiles_vetoriais
+
 try:
     import geopandas as gpd
     from shapely.ops import voronoi_diagram
@@ -22,23 +30,22 @@ ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 CENTRO_CONCORDIA = [-27.2335, -52.0238]
 
 def carregar_dados():
-    """Carrega TODOS os estabelecimentos do Excel"""
+    """Carrega TODOS os estabelecimentos do Excel (ou da base canônica do dashboard)"""
     print("📂 Carregando base completa (418 estabelecimentos)...")
     
-    df = pd.read_excel(os.path.join(ROOT_DIR, 'Tabela_estado_SC.xlsx'))
-    df_conc = df[df['CO_MUNICIPIO_GESTOR'] == 420430].copy()
-    
-    # Padronizar colunas
-    df_conc = df_conc.rename(columns={
-        'NO_FANTASIA': 'NOME',
-        'NO_LOGRADOURO': 'ENDERECO',
-        'NO_BAIRRO': 'BAIRRO',
-        'CO_CEP': 'CEP',
-        'NU_LATITUDE': 'LAT',
-        'NU_LONGITUDE': 'LON',
-        'TP_UNIDADE': 'TIPO_UNIDADE',
-        'NO_RAZAO_SOCIAL': 'RAZAO_SOCIAL'
-    })
+    caminho_xlsx = os.path.join(ROOT_DIR, 'Tabela_estado_SC.xlsx')
+    if os.path.exists(caminho_xlsx):
+        df = pd.read_excel(caminho_xlsx)
+        df_conc = df[df['CO_MUNICIPIO_GESTOR'] == 420430].copy()
+        
+        # Padronizar colunas
+        df_conc = df_conc.rename(columns=dados_canonicos.COLUNAS_CNES)
+    else:
+        df_conc = dados_canonicos.carregar_dados()
+        if df_conc is None:
+            raise FileNotFoundError(f"{caminho_xlsx} não encontrado e base canônica ausente "
+                                    "(execute dashboard_avancado_colorbrewer.py)")
+        print(f"   → Excel ausente: base canônica do dashboard ({len(df_conc)} estabelecimentos)")
     
     # Converter coordenadas
     df_conc['LAT'] = pd.to_numeric(df_conc['LAT'], errors='coerce')
@@ -112,63 +119,70 @@ def carregar_dados():
     
     return df_conc
 
-def classificar_estabelecimento(tipo_unidade, nome):
-    """
-    Classifica estabelecimento por categoria detalhada
-    Retorna: (categoria, cor, ícone, descrição)
-    """
-    tipo = str(tipo_unidade)
-    nome_upper = str(nome).upper()
-    
+# Categorias detalhadas sobre a classificação público/privado única
+# (classificacao_estabelecimentos); a primeira regra que casa define a camada
+CATEGORIAS_CAMADAS = [
     # === PÚBLICOS ===
-    if tipo in ['1', '2', '4', '70', '81']:
-        if tipo == '2':
-            return ('🏥 Públicos - ESF', 'red', 'plus', 'ESF - Estratégia Saúde da Família')
-        elif tipo == '1':
-            return ('🏥 Públicos - Postos', 'red', 'plus', 'Posto de Saúde')
-        elif tipo == '4':
-            return ('🏥 Públicos - Policlínicas', 'red', 'plus', 'Policlínica')
-        elif tipo == '70':
-            return ('🏥 Públicos - Centros de Saúde', 'red', 'plus', 'Centro de Saúde')
-        else:
-            return ('🏥 Públicos - Outros', 'red', 'plus', 'Unidade Pública')
-    
+    {'id': 'publico_esf', 'publico': True, 'se': {'tipo': ['2'], 'nome': ['ESF']}},
+    {'id': 'publico_posto', 'publico': True, 'se': {'tipo': ['1'], 'nome': ['POSTO', 'PS']}},
+    {'id': 'publico_policlinica', 'publico': True, 'se': {'tipo': ['4']}},
+    {'id': 'publico_centro_saude', 'publico': True, 'se': {'tipo': ['70']}},
+    {'id': 'publico_outros', 'publico': True, 'se': {}},
     # === FARMÁCIAS ===
-    elif tipo == '43' or 'FARMACIA' in nome_upper:
-        return ('💊 Farmácias', 'green', 'shopping-cart', 'Farmácia')
-    
+    {'id': 'farmacia', 'publico': False, 'se': {'tipo': ['43'], 'nome': ['FARMACIAS?']}},
     # === CONSULTÓRIOS ===
-    elif tipo == '22':
-        if 'ODONTO' in nome_upper or 'DENT' in nome_upper:
-            return ('🦷 Consultórios - Odontologia', 'lightblue', 'heart', 'Consultório Odontológico')
-        else:
-            return ('🩺 Consultórios - Médicos', 'blue', 'user', 'Consultório Médico')
-    
+    {'id': 'consultorio_odonto', 'publico': False, 'todos': True,
+     'se': {'tipo': ['22'], 'nome': ['ODONTO[A-Z]*', 'DENT[A-Z]*']}},
+    {'id': 'consultorio_medico', 'publico': False, 'se': {'tipo': ['22']}},
     # === CLÍNICAS ESPECIALIZADAS ===
-    elif tipo == '36':
-        return ('🏨 Clínicas Especializadas', 'purple', 'briefcase', 'Clínica Especializada')
-    
+    {'id': 'clinica', 'publico': False, 'se': {'tipo': ['36']}},
     # === LABORATÓRIOS ===
-    elif tipo == '39':
-        if 'PROTESE' in nome_upper or 'DENT' in nome_upper:
-            return ('🔬 Laboratórios - Prótese Dentária', 'orange', 'flask', 'Laboratório de Prótese Dentária')
-        else:
-            return ('🔬 Laboratórios - Análises', 'orange', 'flask', 'Laboratório de Análises')
-    
+    {'id': 'laboratorio_protese', 'publico': False, 'todos': True,
+     'se': {'tipo': ['39'], 'nome': ['PROTESES?', 'DENT[A-Z]*']}},
+    {'id': 'laboratorio', 'publico': False, 'se': {'tipo': ['39']}},
     # === HOSPITAIS ===
-    elif tipo in ['5', '62']:
-        return ('🏥 Hospitais', 'pink', 'home', 'Hospital')
-    
+    {'id': 'hospital', 'publico': False, 'se': {'tipo': ['5', '62']}},
     # === EMERGÊNCIA (SAMU, Bombeiros) ===
-    elif tipo == '42':
-        return ('🚑 Emergência', 'darkred', 'flash', 'SAMU/Bombeiros')
-    
-    # === GESTÃO E OUTROS ===
-    else:
-        return ('🏢 Gestão/Outros', 'gray', 'cog', 'Gestão/Outros')
+    {'id': 'emergencia', 'publico': False, 'se': {'tipo': ['42']}},
+]
+
+# id da categoria -> (camada, cor, ícone, descrição)
+APRESENTACAO_CATEGORIAS = {
+    'publico_esf': ('🏥 Públicos - ESF', 'red', 'plus', 'ESF - Estratégia Saúde da Família'),
+    'publico_posto': ('🏥 Públicos - Postos', 'red', 'plus', 'Posto de Saúde'),
+    'publico_policlinica': ('🏥 Públicos - Policlínicas', 'red', 'plus', 'Policlínica'),
+    'publico_centro_saude': ('🏥 Públicos - Centros de Saúde', 'red', 'plus', 'Centro de Saúde'),
+    'publico_outros': ('🏥 Públicos - Outros', 'red', 'plus', 'Unidade Pública'),
+    'farmacia': ('💊 Farmácias', 'green', 'shopping-cart', 'Farmácia'),
+    'consultorio_odonto': ('🦷 Consultórios - Odontologia', 'lightblue', 'heart', 'Consultório Odontológico'),
+    'consultorio_medico': ('🩺 Consultórios - Médicos', 'blue', 'user', 'Consultório Médico'),
+    'clinica': ('🏨 Clínicas Especializadas', 'purple', 'briefcase', 'Clínica Especializada'),
+    'laboratorio_protese': ('🔬 Laboratórios - Prótese Dentária', 'orange', 'flask', 'Laboratório de Prótese Dentária'),
+    'laboratorio': ('🔬 Laboratórios - Análises', 'orange', 'flask', 'Laboratório de Análises'),
+    'hospital': ('🏥 Hospitais', 'pink', 'home', 'Hospital'),
+    'emergencia': ('🚑 Emergência', 'darkred', 'flash', 'SAMU/Bombeiros'),
+    'gestao_outros': ('🏢 Gestão/Outros', 'gray', 'cog', 'Gestão/Outros'),
+}
 
-def criar_mapa_camadas(df):
-    """Cria mapa com camadas separadas por tipo"""
+def classificar_estabelecimentos(df):
+    """
+    Classifica todos os estabelecimentos por categoria detalhada de uma vez
+    Retorna: Series com tuplas (categoria, cor, ícone, descrição) alinhada a df
+    """
+    classificacao = classificacao_estabelecimentos.classificar(
+        df, categorias=CATEGORIAS_CAMADAS, padrao_categoria='gestao_outros'
+    )
+    return classificacao['categoria'].map(APRESENTACAO_CATEGORIAS)
+
+def criar_mapa_camadas(df, complementos=None):
+    """
+    Cria mapa com camadas separadas por tipo
+
+    Args:
+        df: DataFrame dos estabelecimentos
+        complementos: dict {nome: opções ou None} somado aos complementos padrão
+            (controle de camadas, título, rodapé, legenda, rosa dos ventos)
+    """
     print("\n🗺️ Criando mapa com camadas detalhadas...")
     
     # Mapa base
@@ -241,19 +255,23 @@ def criar_mapa_camadas(df):
             cores_voronoi = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#FFA07A', '#98D8C8', 
                             '#F7DC6F', '#BB8FCE', '#85C1E2', '#F8B88B', '#52BE80']
             
-            for idx, (_, row) in enumerate(gdf_voronoi.iterrows()):
-                cor = cores_voronoi[idx % len(cores_voronoi)]
-                folium.GeoJson(
-                    row.geometry,
-                    style_function=lambda x, c=cor: {
-                        'fillColor': c,
-                        'color': '#9400D3',  # Borda roxa
-                        'weight': 1.5,
-                        'fillOpacity': 0.3,
-                        'opacity': 0.7
-                    },
-                    tooltip=f'Área de Influência {idx + 1}'
-                ).add_to(camada_voronoi)
+            # Uma única camada TopoJSON; a cor de cada área vai como propriedade
+            n_areas = len(gdf_voronoi)
+            camadas_topojson.CamadaLimites(
+                gdf_voronoi, 'voronoi',
+                propriedades={
+                    'rotulo': [f'Área de Influência {i + 1}' for i in range(n_areas)],
+                    'cor': [cores_voronoi[i % len(cores_voronoi)] for i in range(n_areas)],
+                },
+                estilo="""{
+                    fillColor: p.cor,
+                    color: '#9400D3',
+                    weight: 1.5,
+                    fillOpacity: 0.3,
+                    opacity: 0.7
+                }""",  # Borda roxa
+                tooltip_js='p.rotulo'
+            ).add_to(camada_voronoi)
             
             camada_voronoi.add_to(mapa)
             print(f"   ✓ Diagrama de Voronoi criado ({len(gdf_voronoi)} polígonos)")
@@ -282,20 +300,33 @@ def criar_mapa_camadas(df):
                 gdf_setores['geometry'] = gdf_setores.geometry.simplify(0.0001)
                 
                 # Criar camada de setores
-                camada_setores = folium.FeatureGroup(name='🗺️ Setores Censitários (Subdivisões)', show=False)
+                nome_camada = '🗺️ Setores Censitários (Subdivisões)'
+                estilo_setores = {
+                    'fillColor': 'transparent',
+                    'color': '#FF6347',  # Vermelho tomate
+                    'weight': 1,
+                    'dashArray': '3, 3',
+                    'fillOpacity': 0,
+                    'opacity': 0.6
+                }
                 
-                folium.GeoJson(
-                    gdf_setores.geometry,
-                    style_function=lambda x: {
-                        'fillColor': 'transparent',
-                        'color': '#FF6347',  # Vermelho tomate
-                        'weight': 1,
-                        'dashArray': '3, 3',
-                        'fillOpacity': 0,
-                        'opacity': 0.6
-                    },
-                    tooltip='Setor Censitário'
-                ).add_to(camada_setores)
+                # Tiles vetoriais (tiles_vetoriais.py): o navegador baixa só os tiles visíveis
+                manifesto_mvt = tiles_vetoriais.carregar_manifesto()
+                if manifesto_mvt and any(c['id'] == 'setores' for c in manifesto_mvt['vector_layers']):
+                    camada_setores = tiles_vetoriais.camada_tiles_vetoriais(
+                        'tiles_vetoriais', 'setores', nome_camada, estilo_setores,
+                        manifesto=manifesto_mvt, show=False,
+                        popup_titulo='Setor Censitário',
+                        popup_campos={'CD_SETOR': 'Código:', 'SITUACAO': 'Situação:'}
+                    )
+                    print("   → Setores via tiles vetoriais (MVT)")
+                else:
+                    camada_setores = folium.FeatureGroup(name=nome_camada, show=False)
+                    folium.GeoJson(
+                        gdf_setores.geometry,
+                        style_function=lambda x: estilo_setores,
+                        tooltip='Setor Censitário'
+                    ).add_to(camada_setores)
                 
                 camada_setores.add_to(mapa)
                 print(f"   ✓ Setores censitários adicionados ({len(gdf_setores)} setores)")
@@ -372,11 +403,9 @@ def criar_mapa_camadas(df):
     count_publicos = 0
     count_privados = 0
     
+    classes = classificar_estabelecimentos(df)
     for idx, row in df.iterrows():
-        categoria, cor, icone, descricao = classificar_estabelecimento(
-            row['TIPO_UNIDADE'], 
-            row.get('NOME', '')
-        )
+        categoria, cor, icone, descricao = classes[idx]
         
         # Contar públicos vs privados
         if 'Públicos' in categoria:
@@ -418,13 +447,6 @@ def criar_mapa_camadas(df):
         grupo.add_to(mapa)
         print(f"   ✓ {categoria}: {contadores[categoria]} estabelecimentos")
     
-    # === CONTROLE DE CAMADAS (RETRÁTIL - LADO ESQUERDO) ===
-    folium.LayerControl(
-        position='topleft',  # ESQUERDA para não sobrepor legenda
-        collapsed=True,  # RETRÁTIL!
-        autoZIndex=True
-    ).add_to(mapa)
-    
     # === TÍTULO ===
     titulo_html = '''
     <div style="position: fixed; 
@@ -464,9 +486,6 @@ def criar_mapa_camadas(df):
     </div>
     '''
     
-    mapa.get_root().html.add_child(folium.Element(titulo_html))
-    mapa.get_root().html.add_child(folium.Element(rodape_html))
-    
     # === LEGENDA COMPLETA ===
     legenda_html = f'''
     <div style="position: fixed; 
@@ -537,7 +556,6 @@ def criar_mapa_camadas(df):
         </div>
     </div>
     '''
-    mapa.get_root().html.add_child(folium.Element(legenda_html))
     
     # === ROSA DOS VENTOS (N, S, L, O) ===
     rosa_html = '''
@@ -560,9 +578,20 @@ def criar_mapa_camadas(df):
         </svg>
     </div>
     '''
-    mapa.get_root().html.add_child(folium.Element(rosa_html))
     
-    print("   ✓ Rosa dos ventos adicionada (N, S, L, O)")
+    # === COMPLEMENTOS REGISTRADOS NA GERAÇÃO (sem reabrir o HTML depois) ===
+    padrao = {
+        # Controle de camadas retrátil à esquerda para não sobrepor a legenda
+        'controle_camadas': {'posicao': 'topleft', 'recolhido': True, 'autoZIndex': True},
+        'titulo': {'tipo': 'html', 'html': titulo_html, 'nome': 'Titulo'},
+        'rodape': {'tipo': 'html', 'html': rodape_html, 'nome': 'Rodape'},
+        'legenda': {'tipo': 'html', 'html': legenda_html, 'nome': 'Legenda'},
+        'rosa_ventos': {'tipo': 'html', 'html': rosa_html, 'nome': 'RosaVentos'},
+        'busca': {'df': df},
+    }
+    aplicados = complementos_mapa.aplicar_complementos(mapa, padrao, complementos)
+    
+    print(f"   ✓ Complementos: {', '.join(aplicados)}")
     
     return mapa
 
@@ -0,0 +1,590 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Emissor HTML Direto para Mapas Leaflet (backend alternativo ao Folium)
+- Modelo HTML/JS único, compilado uma vez na importação do módulo
+- Os registros dos estabelecimentos são serializados em blocos e gravados
+  direto no arquivo (Template.stream), sem montar a árvore de objetos do
+  Folium nem a página inteira em memória
+- Camadas descritas por uma configuração JSON (agrupamento, círculos, raios,
+  calor, referências, polígonos GeoJSON com estilo por feição e tiles XYZ)
+  e construídas no navegador; camadas ocultas só são montadas quando
+  ligadas no controle de camadas
+- Camadas com a mesma chave 'grupo' formam uma única entrada no controle
+- Limites (estado, município, vizinhos, setores) em TopoJSON quantizado
+- A mesma configuração é renderizada pelo Folium (mapa_folium), de modo que
+  os dois backends do dashboard partem de uma única especificação
+- main(): benchmark contra o construtor Folium do dashboard
+  (criar_mapa_avancado_treelayer) para 1k, 10k e 100k pontos
+
+Mesma abordagem de Análise_da_distribuicao_PS_publico.py (HTML Leaflet
+escrito diretamente), generalizada para as camadas do dashboard avançado.
+
+Autor: Caetano Ronan
+Instituição: UFSC
+"""
+
+import os
+import re
+import time
+import numpy as np
+import pandas as pd
+from jinja2 import Environment
+
+import camadas_geojson
+import camadas_topojson
+from camadas_geojson import serializar_json, CASAS_DECIMAIS_COORD
+
+LINHAS_POR_BLOCO = 5000
+
+# Mesmas versões de bibliotecas usadas pelo Folium 0.20
+JS_PADRAO = [
+    'https://cdn.jsdelivr.net/npm/leaflet@1.9.3/dist/leaflet.js',
+    'https://cdnjs.cloudflare.com/ajax/libs/Leaflet.awesome-markers/2.0.2/leaflet.awesome-markers.js',
+    'https://cdnjs.cloudflare.com/ajax/libs/leaflet.markercluster/1.1.0/leaflet.markercluster.js',
+    'https://cdn.jsdelivr.net/gh/python-visualization/folium@main/folium/templates/leaflet_heat.min.js',
+]
+CSS_PADRAO = [
+    'https://cdn.jsdelivr.net/npm/leaflet@1.9.3/dist/leaflet.css',
+    'https://cdn.jsdelivr.net/npm/bootstrap@5.2.2/dist/css/bootstrap.min.css',
+    'https://netdna.bootstrapcdn.com/bootstrap/3.0.0/css/bootstrap-glyphicons.css',
+    'https://cdnjs.cloudflare.com/ajax/libs/Leaflet.awesome-markers/2.0.2/leaflet.awesome-markers.css',
+    'https://cdnjs.cloudflare.com/ajax/libs/leaflet.markercluster/1.1.0/MarkerCluster.css',
+    'https://cdnjs.cloudflare.com/ajax/libs/leaflet.markercluster/1.1.0/MarkerCluster.Default.css',
+]
+MAPAS_BASE = [
+    {'nome': 'OpenStreetMap', 'url': 'https://tile.openstreetmap.org/{z}/{x}/{y}.png',
+     'atribuicao': '&copy; OpenStreetMap contributors', 'max_zoom': 19},
+    {'nome': 'CartoDB Claro', 'url': 'https://{s}.basemaps.cartocdn.com/light_all/{z}/{x}/{y}{r}.png',
+     'atribuicao': '&copy; OpenStreetMap contributors &copy; CARTO', 'max_zoom': 20},
+]
+
+_AMBIENTE = Environment(autoescape=False, trim_blocks=True, lstrip_blocks=True)
+
+MODELO_PAGINA = _AMBIENTE.from_string("""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1.0, maximum-scale=1.0, user-scalable=no">
+<title>{{ titulo }}</title>
+{% for url in css %}
+<link rel="stylesheet" href="{{ url }}"/>
+{% endfor %}
+{% for url in js %}
+<script src="{{ url }}"></script>
+{% endfor %}
+<style>
+html, body { width: 100%; height: 100%; margin: 0; padding: 0; }
+#mapa { position: absolute; top: 0; bottom: 0; right: 0; left: 0; }
+</style>
+</head>
+<body>
+<div id="mapa"></div>
+{{ html_extra }}
+<script>
+var campos = {{ campos_json }};
+var dados = [
+{% for bloco in blocos %}
+{{ bloco }}
+{% endfor %}
+];
+var limites = [
+{% for bloco in limites %}
+{{ bloco }},
+{% endfor %}
+];
+var config = {{ config_json }};
+
+var mapa = L.map('mapa', {center: config.centro, zoom: config.zoom, minZoom: config.min_zoom,
+                          maxZoom: 18, preferCanvas: true});
+var bases = {};
+config.bases.forEach(function(b, i) {
+    bases[b.nome] = L.tileLayer(b.url, {attribution: b.atribuicao, maxZoom: b.max_zoom});
+    if (i === 0) { bases[b.nome].addTo(mapa); }
+});
+
+// Registros em arrays -> objetos com os nomes dos campos
+var pontos = dados.map(function(r) {
+    var p = {};
+    for (var i = 0; i < campos.length; i++) { p[campos[i]] = r[i]; }
+    return p;
+});
+
+// Modelos {campo} / {campo:.1f} (mesma sintaxe de camadas_geojson.ModeloPopup)
+var escapar = {'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;'};
+function formatar(modelo, p) {
+    return modelo.replace(/\\{(\\w+)(?::\\.(\\d+)f)?\\}/g, function(m, campo, casas) {
+        var v = campo in config.tabelas ? config.tabelas[campo][1][p[config.tabelas[campo][0]]] : p[campo];
+        if (v === null || v === undefined) { return 'N/A'; }
+        if (casas !== undefined) { v = Number(v).toFixed(Number(casas)); }
+        return String(v).replace(/[&<>"]/g, function(c) { return escapar[c]; });
+    });
+}
+function vincular(camada, c, p) {
+    if (c.popup) { camada.bindPopup(function() { return formatar(c.popup, p); }, {maxWidth: 350}); }
+    if (c.tooltip) { camada.bindTooltip(function() { return formatar(c.tooltip, p); }); }
+    return camada;
+}
+function selecionar(c) {
+    if (!c.campo) { return pontos; }
+    return pontos.filter(function(p) { return p[c.campo] === c.valor; });
+}
+
+var construtores = {
+    agrupamento: function(c, grupo) {
+        var cluster = L.markerClusterGroup({chunkedLoading: true});
+        var icone = L.AwesomeMarkers.icon(c.icone);
+        cluster.addLayers(selecionar(c).map(function(p) {
+            return vincular(L.marker([p.lat, p.lon], {icon: icone}), c, p);
+        }));
+        grupo.addLayer(cluster);
+    },
+    circulos: function(c, grupo) {
+        selecionar(c).forEach(function(p) {
+            grupo.addLayer(vincular(L.circleMarker([p.lat, p.lon], c.estilo), c, p));
+        });
+    },
+    raios: function(c, grupo) {
+        selecionar(c).forEach(function(p) {
+            grupo.addLayer(vincular(L.circle([p.lat, p.lon], c.estilo), c, p));
+        });
+    },
+    calor: function(c, grupo) {
+        grupo.addLayer(L.heatLayer(selecionar(c).map(function(p) { return [p.lat, p.lon, 1]; }), c.opcoes));
+    },
+    referencia: function(c, grupo) {
+        L.marker(c.centro, {icon: L.AwesomeMarkers.icon(c.icone)})
+            .bindPopup(c.popup_html).bindTooltip(c.tooltip_html).addTo(grupo);
+        c.aneis.forEach(function(a) {
+            L.circle(c.centro, L.extend({radius: a.raio, color: a.cor}, c.estilo))
+                .bindPopup('Raio de ' + a.rotulo).bindTooltip('Área de ' + a.rotulo + ' do centro')
+                .addTo(grupo);
+        });
+    },
+    limite: function(c, grupo) {
+        var dados = limites[c.indice];
+        var camada = poligonos(c.topologia ? topojson.feature(dados, dados.objects[c.objeto]) : dados, c);
+        grupo.addLayer(camada);
+        if (c.ajustar) { mapa.fitBounds(camada.getBounds()); mapa.setMaxBounds(camada.getBounds()); }
+    },
+    poligonos: function(c, grupo) {
+        grupo.addLayer(poligonos(c.geojson, c));
+    },
+    tiles: function(c, grupo) {
+        grupo.addLayer(L.tileLayer(c.url, c.opcoes));
+    }
+};
+
+// GeoJSON com estilo fixo + propriedades de estilo por feição (ex.: fillColor <- cor)
+function poligonos(dados, c) {
+    var camada = L.geoJSON(dados, {
+        style: function(feature) {
+            var estilo = L.extend({}, c.estilo);
+            for (var chave in (c.estilo_por_propriedade || {})) {
+                estilo[chave] = feature.properties[c.estilo_por_propriedade[chave]];
+            }
+            return estilo;
+        },
+        onEachFeature: function(feature, layer) {
+            vincular(layer, c, feature.properties);
+            if (c.destaque) {
+                layer.on('mouseover', function(e) { e.target.setStyle(c.destaque); });
+                layer.on('mouseout', function(e) { camada.resetStyle(e.target); });
+            }
+        }
+    });
+    return camada;
+}
+
+// Uma entrada no controle por grupo (c.grupo, ou o nome da camada); a
+// primeira camada do grupo decide a visibilidade. Grupos visíveis são
+// montados já; os ocultos na primeira vez que são ligados
+var sobreposicoes = {};
+var pendentes = {};
+config.camadas.forEach(function(c) {
+    var chave = c.grupo || c.nome;
+    if (!(chave in sobreposicoes)) {
+        var novo = sobreposicoes[chave] = L.featureGroup();
+        pendentes[chave] = [];
+        if (c.show) {
+            novo.addTo(mapa);
+        } else {
+            novo.once('add', function() {
+                pendentes[chave].forEach(function(p) { construtores[p.tipo](p, novo); });
+            });
+        }
+    }
+    if (mapa.hasLayer(sobreposicoes[chave])) {
+        construtores[c.tipo](c, sobreposicoes[chave]);
+    } else {
+        pendentes[chave].push(c);
+    }
+});
+L.control.layers(bases, sobreposicoes, {position: 'topleft', collapsed: false}).addTo(mapa);
+L.control.scale().addTo(mapa);
+{{ js_extra }}
+</script>
+</body>
+</html>
+""")
+
+
+def blocos_registros(pontos, campos, linhas_por_bloco=LINHAS_POR_BLOCO):
+    """
+    Gera o array JS de registros em blocos de texto (um por `linhas_por_bloco`
+    linhas), sem montar a string completa em memória.
+
+    Args:
+        pontos: DataFrame com as colunas `campos` (lat e lon incluídas)
+        campos: ordem das colunas nos registros
+
+    Yields:
+        trechos 'r1,r2,...,' prontos para gravar entre colchetes
+    """
+    tabela = pontos[campos]
+    for inicio in range(0, len(tabela), linhas_por_bloco):
+        bloco = tabela.iloc[inicio:inicio + linhas_por_bloco]
+        bloco = bloco.astype(object).where(bloco.notna(), None)
+        yield serializar_json(bloco.values.tolist())[1:-1] + ','
+
+
+def preparar_pontos(df, lat_col, lon_col, colunas):
+    """
+    Tabela enxuta dos pontos: lat/lon arredondados e as propriedades pedidas.
+
+    Args:
+        df: DataFrame processado
+        lat_col, lon_col: colunas de coordenadas
+        colunas: dict {campo: nome de coluna, Series ou escalar}
+
+    Returns:
+        (DataFrame, lista de campos)
+    """
+    tabela = pd.DataFrame({
+        'lat': df[lat_col].astype(float).round(CASAS_DECIMAIS_COORD),
+        'lon': df[lon_col].astype(float).round(CASAS_DECIMAIS_COORD),
+    }, index=df.index)
+    for campo, valor in colunas.items():
+        tabela[campo] = df[valor] if isinstance(valor, str) and valor in df.columns else valor
+    return tabela, list(tabela.columns)
+
+
+def camada_limite(gdf, nome, nome_objeto, estilo, propriedades=None, destaque=None,
+                  tooltip=None, popup=None, show=True, ajustar=False):
+    """
+    Configuração de uma camada de limites (polígonos) para emitir_mapa/mapa_folium.
+
+    Args:
+        gdf: GeoDataFrame em EPSG:4326
+        nome: nome no controle de camadas
+        nome_objeto: nome do objeto TopoJSON
+        estilo, destaque: dicts de estilo Leaflet (normal e mouseover)
+        propriedades: dict {nome_propriedade: coluna, Series ou escalar}
+        tooltip, popup: modelos {campo} sobre as propriedades
+        ajustar: enquadrar o mapa nesta camada e limitar a navegação a ela
+    """
+    return {
+        'nome': nome, 'tipo': 'limite', 'show': show, 'objeto': nome_objeto,
+        'estilo': estilo, 'destaque': destaque, 'tooltip': tooltip, 'popup': popup,
+        'ajustar': ajustar, 'gdf': gdf, 'propriedades': propriedades,
+    }
+
+
+def camada_poligonos(geojson, nome, estilo, estilo_por_propriedade=None, destaque=None,
+                     tooltip=None, popup=None, show=False, grupo=None):
+    """
+    Configuração de uma camada de polígonos GeoJSON (isobandas, células de
+    grade) com estilo por feição, para emitir_mapa/mapa_folium.
+
+    Args:
+        geojson: FeatureCollection (dict) em EPSG:4326
+        estilo, destaque: dicts de estilo Leaflet (normal e mouseover)
+        estilo_por_propriedade: dict {opção de estilo: propriedade da feição}
+            (ex.: {'fillColor': 'cor'})
+        tooltip, popup: modelos {campo} sobre as propriedades
+        grupo: entrada do controle de camadas que reúne esta camada
+    """
+    return {
+        'nome': nome, 'tipo': 'poligonos', 'show': show, 'grupo': grupo, 'geojson': geojson,
+        'estilo': estilo, 'estilo_por_propriedade': estilo_por_propriedade or {},
+        'destaque': destaque, 'tooltip': tooltip, 'popup': popup,
+    }
+
+
+def camada_tiles(url, nome, atribuicao='', min_zoom=0, max_zoom=18, max_native_zoom=None,
+                 opacidade=1.0, show=False, grupo=None):
+    """Configuração de uma camada de tiles XYZ sobreposta ({z}/{x}/{y} na url)"""
+    return {
+        'nome': nome, 'tipo': 'tiles', 'show': show, 'grupo': grupo, 'url': url,
+        'opcoes': {'attribution': atribuicao, 'minZoom': min_zoom, 'maxZoom': max_zoom,
+                   'maxNativeZoom': max_native_zoom or max_zoom, 'opacity': opacidade},
+    }
+
+
+def _serializar_limite(config):
+    """Dados do limite (TopoJSON quantizado ou GeoJSON arredondado)"""
+    if camadas_topojson.topojson is not None:
+        dados = camadas_topojson.gdf_para_topojson(config['gdf'], config['objeto'], config['propriedades'])
+    else:
+        dados = camadas_topojson.gdf_para_geojson_compacto(config['gdf'], config['propriedades'])
+    return serializar_json(dados)
+
+
+def emitir_mapa(caminho, pontos, campos, camadas, centro, limites=(), tabelas=None,
+                html_extra='', titulo='Mapa', zoom=12, min_zoom=5, js_extra=''):
+    """
+    Grava a página Leaflet completa, transmitindo os dados direto ao arquivo.
+
+    Args:
+        caminho: arquivo HTML de saída
+        pontos, campos: saída de preparar_pontos()
+        camadas: lista de configurações de camada (tipos: agrupamento,
+            circulos, raios, calor, referencia; camada_poligonos, camada_tiles);
+            a chave opcional 'grupo' reúne camadas numa entrada do controle
+        centro: (lat, lon) inicial
+        limites: lista de configurações de camada_limite()
+        tabelas: dict {marcador: (campo, {valor: texto})} usado nos modelos
+        html_extra: HTML fixo (título, rodapé, rosa dos ventos)
+        js_extra: script executado depois dos controles (variável `mapa`)
+
+    Returns:
+        bytes gravados
+    """
+    topologia = camadas_topojson.topojson is not None
+    config_limites = [
+        {k: v for k, v in dict(config, indice=indice, topologia=topologia).items()
+         if k not in ('gdf', 'propriedades')}
+        for indice, config in enumerate(limites)
+    ]
+    js = list(JS_PADRAO)
+    if limites and topologia:
+        js.append(camadas_topojson.JS_TOPOJSON)
+
+    config = {
+        'centro': list(centro),
+        'zoom': zoom,
+        'min_zoom': min_zoom,
+        'bases': MAPAS_BASE,
+        'tabelas': {k: [campo, valores] for k, (campo, valores) in (tabelas or {}).items()},
+        # Limites primeiro: ficam por baixo dos pontos
+        'camadas': config_limites + list(camadas),
+    }
+    MODELO_PAGINA.stream(
+        titulo=titulo,
+        css=CSS_PADRAO,
+        js=js,
+        html_extra=html_extra,
+        campos_json=serializar_json(campos),
+        blocos=blocos_registros(pontos, campos),
+        limites=(_serializar_limite(c) for c in limites),
+        config_json=serializar_json(config),
+        js_extra=js_extra,
+    ).dump(caminho, encoding='utf-8')
+    return os.path.getsize(caminho)
+
+
+def mapa_folium(pontos, campos, camadas, centro, limites=(), tabelas=None,
+                zoom=12, min_zoom=5, grupo_oculto=None):
+    """
+    Mesma configuração de emitir_mapa renderizada como árvore de objetos do
+    Folium (fonte GeoJSON única + camadas filtradas). É o backend Folium do
+    dashboard: controles, título, rodapé e busca entram depois, por
+    complementos_mapa.aplicar_complementos.
+
+    Args:
+        pontos, campos, camadas, centro, limites, tabelas, zoom, min_zoom:
+            como em emitir_mapa
+        grupo_oculto: fábrica(nome) do FeatureGroup das entradas ocultas
+            (ex.: camadas_sob_demanda.GrupoSobDemanda); padrão FeatureGroup
+            com show=False
+
+    Returns:
+        folium.Map
+    """
+    import folium
+    from folium.plugins import MarkerCluster, HeatMap
+
+    mapa = folium.Map(location=list(centro), zoom_start=zoom, tiles=None, prefer_canvas=True)
+    # Com tiles=None o Folium não repassa min/max_zoom ao L.map
+    mapa.options.update(min_zoom=min_zoom, max_zoom=18)
+    for base in MAPAS_BASE:
+        folium.TileLayer(base['url'], attr=base['atribuicao'], name=base['nome'],
+                         max_zoom=base['max_zoom']).add_to(mapa)
+
+    propriedades = {c: c for c in campos if c not in ('lat', 'lon')}
+    fonte = camadas_geojson.FonteGeoJson(
+        camadas_geojson.estabelecimentos_para_geojson(pontos, 'lat', 'lon', propriedades))
+    fonte.add_to(mapa)
+
+    modelos = {}
+
+    def chamada(modelo):
+        if not modelo:
+            return None
+        if modelo not in modelos:
+            modelos[modelo] = camadas_geojson.ModeloPopup(modelo, tabelas)
+            modelos[modelo].add_to(mapa)
+        return modelos[modelo].chamada()
+
+    # Uma entrada no controle por grupo, como no modelo direto; camadas de
+    # um grupo ficam em subgrupos visíveis (o Folium não anexa ao pai
+    # subgrupos com show=False)
+    grupo_oculto = grupo_oculto or (lambda nome: folium.FeatureGroup(name=nome, show=False))
+    grupos = {}
+
+    def destino(c):
+        chave = c.get('grupo') or c['nome']
+        if chave not in grupos:
+            grupos[chave] = folium.FeatureGroup(name=chave, show=True) if c['show'] else grupo_oculto(chave)
+            grupos[chave].add_to(mapa)
+        if not c.get('grupo'):
+            return grupos[chave]
+        return folium.FeatureGroup(name=c['nome'], control=False).add_to(grupos[chave])
+
+    for config in limites:
+        tooltip_js, popup_js = chamada(config['tooltip']), chamada(config['popup'])
+        camadas_topojson.CamadaLimites(
+            config['gdf'], config['objeto'], config['estilo'], config['propriedades'],
+            destaque=config['destaque'], tooltip_js=tooltip_js, popup_js=popup_js,
+        ).add_to(destino(config))
+        if config['ajustar']:
+            minx, miny, maxx, maxy = config['gdf'].total_bounds
+            mapa.fit_bounds([[miny, minx], [maxy, maxx]])
+            mapa.options['max_bounds'] = [[miny, minx], [maxy, maxx]]
+
+    opcoes_calor = {'radius': 'radius', 'blur': 'blur', 'maxZoom': 'max_zoom',
+                    'minOpacity': 'min_opacity', 'gradient': 'gradient'}
+    for c in camadas:
+        filtro = camadas_geojson.js_igual(c['campo'], c['valor']) if c.get('campo') else 'true'
+        popup_js, tooltip_js = chamada(c.get('popup')), chamada(c.get('tooltip'))
+        grupo = destino(c)
+        if c['tipo'] == 'referencia':
+            icone = c['icone']
+            folium.Marker(c['centro'], popup=c['popup_html'], tooltip=c['tooltip_html'],
+                          icon=folium.Icon(color=icone['markerColor'], icon=icone['icon'],
+                                           prefix=icone['prefix'])).add_to(grupo)
+            for anel in c['aneis']:
+                folium.Circle(c['centro'], radius=anel['raio'], color=anel['cor'],
+                              popup=f"Raio de {anel['rotulo']}",
+                              tooltip=f"Área de {anel['rotulo']} do centro", **c['estilo']).add_to(grupo)
+        elif c['tipo'] == 'poligonos':
+            if c['geojson']['features']:
+                folium.GeoJson(
+                    c['geojson'],
+                    style_function=lambda f, c=c: dict(c['estilo'], **{
+                        k: f['properties'][v] for k, v in c['estilo_por_propriedade'].items()}),
+                    highlight_function=(lambda f, c=c: c['destaque']) if c['destaque'] else None,
+                    tooltip=_tooltip_folium(folium.GeoJsonTooltip, c['tooltip']),
+                    popup=_tooltip_folium(folium.GeoJsonPopup, c['popup']),
+                ).add_to(grupo)
+        elif c['tipo'] == 'tiles':
+            o = c['opcoes']
+            folium.TileLayer(c['url'], attr=o['attribution'], name=c['nome'], overlay=True, control=False,
+                             min_zoom=o['minZoom'], max_zoom=o['maxZoom'],
+                             max_native_zoom=o['maxNativeZoom'], opacity=o['opacity']).add_to(grupo)
+        elif c['tipo'] == 'calor':
+            selecao = pontos if not c.get('campo') else pontos[pontos[c['campo']] == c['valor']]
+            if len(selecao):
+                HeatMap(selecao[['lat', 'lon']].values.tolist(),
+                        **{opcoes_calor[k]: v for k, v in c['opcoes'].items()}).add_to(grupo)
+        else:
+            if c['tipo'] == 'agrupamento':
+                ponto_js = f"L.marker(latlng, {{icon: L.AwesomeMarkers.icon({serializar_json(c['icone'])})}})"
+                pai = MarkerCluster(control=False).add_to(grupo)
+            else:
+                construtor = 'L.circleMarker' if c['tipo'] == 'circulos' else 'L.circle'
+                ponto_js = f"{construtor}(latlng, {serializar_json(c['estilo'])})"
+                pai = grupo
+            camadas_geojson.CamadaGeoJsonFiltrada(
+                fonte, filtro_js=filtro, ponto_js=ponto_js,
+                popup_js=popup_js, tooltip_js=tooltip_js, max_width=350,
+            ).add_to(pai)
+    return mapa
+
+
+def _tooltip_folium(classe, modelo):
+    """GeoJsonTooltip/GeoJsonPopup com os campos citados no modelo {campo}"""
+    if not modelo:
+        return None
+    return classe(fields=list(dict.fromkeys(re.findall(r'\{(\w+)', modelo))))
+
+
+def pontos_sinteticos(df, n, centro, semente=42):
+    """
+    Reamostra os estabelecimentos reais até `n` pontos, com deslocamento
+    aleatório (~3 km), para medir os backends em escala estadual.
+    """
+    rng = np.random.default_rng(semente)
+    amostra = df.iloc[rng.integers(0, len(df), n)].reset_index(drop=True)
+    lat_col = next(c for c in amostra.columns if 'LAT' in c.upper())
+    lon_col = next(c for c in amostra.columns if 'LON' in c.upper())
+    amostra[lat_col] = amostra[lat_col] + rng.normal(0, 0.03, n)
+    amostra[lon_col] = amostra[lon_col] + rng.normal(0, 0.03, n)
+    # Distância aproximada (equiretangular) ao centro, em km
+    dlat = np.radians(amostra[lat_col] - centro[0])
+    dlon = np.radians(amostra[lon_col] - centro[1]) * np.cos(np.radians(centro[0]))
+    amostra['dist_centro'] = 6371 * np.sqrt(dlat ** 2 + dlon ** 2)
+    return amostra
+
+
+def main():
+    """
+    Benchmark: construtor Folium do dashboard (criar_mapa_avancado_treelayer
+    + save) versus emissor direto (criar_mapa_html_direto) para 1k, 10k e
+    100k pontos. Os bytes do Folium somam os arquivos das camadas sob demanda.
+    """
+    import contextlib
+    import io
+    import camadas_sob_demanda
+    import dashboard_avancado_colorbrewer as dashboard
+
+    print("=" * 70)
+    print("⏱️ BENCHMARK: FOLIUM x EMISSOR HTML DIRETO")
+    print("=" * 70)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        base = dashboard.carregar_dados()
+        limites = dashboard.carregar_limites_mapa()
+
+    destino = os.path.join(dashboard.MAPAS_DIR, 'benchmark')
+    os.makedirs(destino, exist_ok=True)
+    linhas = []
+    for n in (1_000, 10_000, 100_000):
+        df = pontos_sinteticos(base, n, dashboard.MUNICIPIO['centro'])
+        # Aquecimento fora do tempo: a pirâmide de tiles de calor é incremental
+        # e seria gerada só na primeira medição
+        with contextlib.redirect_stdout(io.StringIO()):
+            dashboard.criar_mapa_html_direto(df, os.path.join(destino, 'aquecimento.html'), limites)
+        for backend in ('folium', 'direto'):
+            caminho = os.path.join(destino, f'mapa_{backend}_{n}.html')
+            t0 = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                if backend == 'folium':
+                    mapa = dashboard.criar_mapa_avancado_treelayer(df, limites=limites)
+                    mapa.save(caminho)
+                else:
+                    dashboard.criar_mapa_html_direto(df, caminho, limites)
+            segundos = time.perf_counter() - t0
+            tamanho = os.path.getsize(caminho)
+            if backend == 'folium':
+                tamanho += sum(os.path.getsize(os.path.join(dashboard.MAPAS_DIR, relativo))
+                               for relativo in camadas_sob_demanda.arquivos_auxiliares(mapa))
+            linhas.append({'pontos': n, 'backend': backend, 'tempo_s': round(segundos, 3),
+                           'bytes': tamanho})
+            print(f"   {n:>7} pontos | {backend:<7} | {segundos:>7.2f} s | "
+                  f"{tamanho / 1024 ** 2:>6.1f} MB")
+
+    resultado = pd.DataFrame(linhas)
+    tempos = resultado.pivot(index='pontos', columns='backend', values='tempo_s')
+    print("\n   Aceleração (folium / direto):")
+    for n, linha in tempos.iterrows():
+        print(f"   {n:>7} pontos: {linha['folium'] / linha['direto']:.1f}x")
+
+    caminho = os.path.join(dashboard.OUTPUT_DIR, 'benchmark_mapa_html.csv')
+    resultado.to_csv(caminho, index=False, encoding='utf-8-sig')
+    print(f"\n✅ Resultados salvos em: {caminho}")
+    return resultado
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Motor de Métricas dos Estabelecimentos (passagem única)
+- Todas as estatísticas do relatório, do dashboard e do resumo no console
+  saem de um único cálculo vetorizado, em vez de dezenas de máscaras
+  (len(df[df['dist_centro'] <= 5]) etc.), cada uma varrendo e copiando a
+  tabela
+- Faixas de distância x setor numa tabela de contagem (um bincount); somas
+  acumuladas dão "até X km" e "acima de X km" para qualquer limite, então
+  incluir limites no relatório não custa novas varreduras
+- Agregados por dimensão (setor, tipo, quadrante, categoria de distância)
+  com bincount sobre os códigos: contagem, públicos e distância
+  média/mínima/máxima
+- Resultado num objeto Metricas de campos fixos, consumido pelo template do
+  relatório, pelos painéis e pelo resumo
+
+Uso:
+    python metricas_estabelecimentos.py   # métricas da base canônica
+
+Autor: Caetano Ronan
+Instituição: UFSC
+"""
+
+import time
+import numpy as np
+import pandas as pd
+
+LIMITES_DISTANCIA_KM = (2, 5, 10, 20)
+DIMENSOES_METRICAS = ('setor', 'tipo_descricao', 'quadrante', 'categoria_distancia')
+
+
+class Metricas:
+    """
+    Estatísticas de um conjunto de estabelecimentos (ver calcular_metricas).
+
+    Atributos:
+        total, publicos, privados: contagens
+        dist_media, dist_min, dist_max, dist_desvio: distância ao centro (km)
+        ate_km / publicos_ate_km: {limite: estabelecimentos (públicos) com
+            distância <= limite}
+        acima_km: {limite: estabelecimentos com distância > limite}
+        grupos: {dimensão: DataFrame indexado pelo valor, com
+            estabelecimentos, publicos, perc_publico, dist_media, dist_min,
+            dist_max}
+        tempo_s: duração do cálculo
+    """
+
+    __slots__ = ('total', 'publicos', 'privados', 'dist_media', 'dist_min', 'dist_max',
+                 'dist_desvio', 'ate_km', 'publicos_ate_km', 'acima_km', 'grupos', 'tempo_s')
+
+    def __init__(self, **campos):
+        for nome in self.__slots__:
+            setattr(self, nome, campos[nome])
+
+    def percentual(self, valor, base=None):
+        """valor em % de base (padrão: total); 0 quando a base é vazia"""
+        base = self.total if base is None else base
+        return valor / base * 100 if base else 0.0
+
+    def contagens(self, dimensao, limite=None):
+        """Contagem por valor da dimensão, decrescente (como value_counts)"""
+        grupo = self.grupos.get(dimensao)
+        if grupo is None:
+            return pd.Series(dtype=int)
+        serie = grupo['estabelecimentos'].sort_values(ascending=False, kind='stable')
+        return serie.head(limite) if limite else serie
+
+    def n_valores(self, dimensao):
+        """Quantidade de valores distintos presentes na dimensão"""
+        grupo = self.grupos.get(dimensao)
+        return 0 if grupo is None else int((grupo['estabelecimentos'] > 0).sum())
+
+    def como_dict(self):
+        """Campos escalares e de faixas (para JSON/templates)"""
+        return {nome: getattr(self, nome) for nome in self.__slots__ if nome != 'grupos'}
+
+
+def _codigos(serie):
+    """Códigos inteiros e valores da dimensão (categorias mantêm as vazias)"""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.cat.codes.to_numpy(dtype=np.int64), pd.Index(serie.cat.categories)
+    codigos, valores = pd.factorize(serie)
+    return codigos.astype(np.int64), pd.Index(valores)
+
+
+def _agregar_grupo(codigos, valores, dist, publico, validas):
+    """Contagem, públicos e distância por código (bincount/ufunc.at)"""
+    k = len(valores)
+    presentes = codigos >= 0
+    com_dist = presentes & validas
+    estabelecimentos = np.bincount(codigos[presentes], minlength=k)
+    publicos = np.bincount(codigos[presentes], weights=publico[presentes], minlength=k).astype(int)
+    n_dist = np.bincount(codigos[com_dist], minlength=k)
+    soma = np.bincount(codigos[com_dist], weights=dist[com_dist], minlength=k)
+    minimo = np.full(k, np.inf)
+    maximo = np.full(k, -np.inf)
+    np.minimum.at(minimo, codigos[com_dist], dist[com_dist])
+    np.maximum.at(maximo, codigos[com_dist], dist[com_dist])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return pd.DataFrame({
+            'estabelecimentos': estabelecimentos,
+            'publicos': publicos,
+            'perc_publico': np.where(estabelecimentos > 0, publicos / np.maximum(estabelecimentos, 1) * 100, 0.0),
+            'dist_media': np.where(n_dist > 0, soma / np.maximum(n_dist, 1), np.nan),
+            'dist_min': np.where(n_dist > 0, minimo, np.nan),
+            'dist_max': np.where(n_dist > 0, maximo, np.nan),
+        }, index=valores)
+
+
+def calcular_metricas(df, limites_km=LIMITES_DISTANCIA_KM, dimensoes=DIMENSOES_METRICAS):
+    """
+    Calcula de uma vez as estatísticas usadas no relatório, dashboard e console.
+
+    Args:
+        df: DataFrame processado (dist_centro, eh_publico e as dimensões)
+        limites_km: limites de distância das faixas "até X km"/"acima de X km"
+        dimensoes: colunas agregadas em Metricas.grupos (ausentes são puladas)
+
+    Returns:
+        Metricas
+    """
+    inicio = time.perf_counter()
+    total = len(df)
+    dist = (pd.to_numeric(df['dist_centro'], errors='coerce').to_numpy(dtype=float)
+            if 'dist_centro' in df.columns else np.full(total, np.nan))
+    publico = (df['eh_publico'].fillna(False).to_numpy(dtype=bool)
+               if 'eh_publico' in df.columns else np.zeros(total, dtype=bool))
+    validas = np.isfinite(dist)
+    limites = sorted(limites_km)
+
+    # Faixa 0..L (dist <= limite[i]) para distâncias válidas, L+1 para ausentes
+    faixa = np.searchsorted(np.asarray(limites, dtype=float), np.where(validas, dist, 0.0), side='left')
+    faixa[~validas] = len(limites) + 1
+    tabela = np.bincount(faixa * 2 + publico, minlength=(len(limites) + 2) * 2).reshape(-1, 2)
+    acumulado = np.cumsum(tabela[:len(limites)], axis=0)
+    n_validas = int(validas.sum())
+
+    dist_validas = dist[validas]
+    grupos = {}
+    for dimensao in dimensoes:
+        if dimensao in df.columns:
+            codigos, valores = _codigos(df[dimensao])
+            grupos[dimensao] = _agregar_grupo(codigos, valores, dist, publico, validas)
+
+    publicos = int(publico.sum())
+    return Metricas(
+        total=total,
+        publicos=publicos,
+        privados=total - publicos,
+        dist_media=float(dist_validas.mean()) if n_validas else float('nan'),
+        dist_min=float(dist_validas.min()) if n_validas else float('nan'),
+        dist_max=float(dist_validas.max()) if n_validas else float('nan'),
+        dist_desvio=float(dist_validas.std(ddof=1)) if n_validas > 1 else float('nan'),
+        ate_km={limite: int(acumulado[i].sum()) for i, limite in enumerate(limites)},
+        publicos_ate_km={limite: int(acumulado[i, 1]) for i, limite in enumerate(limites)},
+        acima_km={limite: n_validas - int(acumulado[i].sum()) for i, limite in enumerate(limites)},
+        grupos=grupos,
+        tempo_s=time.perf_counter() - inicio,
+    )
+
+
+def imprimir_resumo(metricas):
+    """Resumo das métricas no console"""
+    m = metricas
+    print(f"📊 {m.total} estabelecimentos (métricas em {m.tempo_s * 1000:.1f} ms)")
+    print(f"   🏛️ Públicos: {m.publicos} ({m.percentual(m.publicos):.1f}%)")
+    print(f"   🏢 Privados: {m.privados} ({m.percentual(m.privados):.1f}%)")
+    print(f"   📏 Distância média: {m.dist_media:.2f} km (mín. {m.dist_min:.2f}, máx. {m.dist_max:.2f})")
+    for limite, total in m.ate_km.items():
+        print(f"   ⭕ ≤ {limite}km: {total} ({m.percentual(total):.1f}%)")
+    for dimensao in m.grupos:
+        print(f"   • {dimensao}: {m.n_valores(dimensao)} valores")
+
+
+def main():
+    print("=" * 60)
+    print("📐 MÉTRICAS DOS ESTABELECIMENTOS")
+    print("=" * 60)
+    import dados_canonicos
+    df = dados_canonicos.carregar_dados()
+    if df is None:
+        print("❌ Base canônica não encontrada: execute dashboard_avancado_colorbrewer.py")
+        return None
+    metricas = calcular_metricas(df)
+    imprimir_resumo(metricas)
+    return metricas
+
+
+if __name__ == '__main__':
+    main()
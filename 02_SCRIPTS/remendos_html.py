@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Remendos Declarativos em HTML (passagem única, em fluxo)
+- Substitui a sequência de scripts de pós-processamento que liam o mapa
+  inteiro, aplicavam re.sub(..., flags=re.DOTALL) e regravavam o arquivo
+- Cada remendo é um dict com 'nome', 'tipo' e parâmetros; a lista é aplicada
+  em ordem numa única leitura do arquivo, em blocos, com memória limitada
+- Busca só por literais (bytes.find): sem retrocesso de expressões regulares
+- Relatório por remendo: ocorrências aplicadas e tempo gasto
+
+Tipos de remendo:
+    inserir_antes     {'alvo': '</body>', 'conteudo': '...'}
+    inserir_depois    {'alvo': '<body>', 'conteudo': '...'}
+    substituir        {'alvo': '"maxZoom": 16,', 'conteudo': '"maxZoom": 18,'}
+    substituir_bloco  {'inicio': 'var x = ', 'fim': ');', 'conteudo': '' ou função(bloco)}
+    substituir_script {'id': 'meu-script', 'conteudo': '<script id="meu-script">...</script>'}
+
+Opções comuns:
+    maximo            nº máximo de aplicações (padrão: 1 para inserções, None para o resto)
+    exceto_se         literal; o remendo não se aplica se ele já apareceu no fluxo
+    ocorrencia        'ultima' (só inserções): aplica na última ocorrência do alvo
+    no_fim_se_ausente True: sem nenhuma ocorrência, o conteúdo vai para o fim do arquivo
+
+Uso:
+    python 02_SCRIPTS/remendos_html.py docs/mapa.html atualizar_treelayer adicionar_titulo_rodape_treelayer
+    (cada módulo citado fornece remendos(); todos são aplicados numa só passagem)
+
+Autor: Caetano Ronan
+Instituição: UFSC
+"""
+
+import os
+import sys
+import time
+import importlib
+
+TAMANHO_BLOCO = 1 << 20  # bytes lidos por vez
+TIPOS = ('inserir_antes', 'inserir_depois', 'substituir', 'substituir_bloco', 'substituir_script')
+
+
+def _normalizar(remendos):
+    """Valida a lista, resolve padrões e converte literais/conteúdos para UTF-8"""
+    normalizados = []
+    for i, remendo in enumerate(remendos):
+        r = dict(remendo)
+        r.setdefault('nome', f"remendo_{i + 1}")
+        if r.get('tipo') not in TIPOS:
+            raise ValueError(f"{r['nome']}: tipo inválido {r.get('tipo')!r} (use {', '.join(TIPOS)})")
+        if r['tipo'] == 'substituir_script':
+            r.update(tipo='substituir_bloco', inicio=f'<script id="{r["id"]}"', fim='</script>')
+        if r['tipo'] == 'substituir_bloco':
+            fim = (r['fim'],) if isinstance(r['fim'], str) else tuple(r['fim'])
+            if not r['inicio'] or not all(fim):
+                raise ValueError(f"{r['nome']}: 'inicio' e 'fim' não podem ser vazios")
+            r['literal'] = r['inicio'].encode('utf-8')
+            r['fim'] = tuple(f.encode('utf-8') for f in fim)
+        elif not r.get('alvo'):
+            raise ValueError(f"{r['nome']}: 'alvo' não pode ser vazio")
+        else:
+            r['literal'] = r['alvo'].encode('utf-8')
+        if r.get('ocorrencia') == 'ultima' and not r['tipo'].startswith('inserir'):
+            raise ValueError(f"{r['nome']}: ocorrencia='ultima' só vale para inserções")
+        r.setdefault('maximo', 1 if r['tipo'].startswith('inserir') else None)
+        if not callable(r['conteudo']):
+            r['conteudo'] = r['conteudo'].encode('utf-8')
+        if r.get('exceto_se'):
+            r['exceto_se'] = r['exceto_se'].encode('utf-8')
+        normalizados.append(r)
+    return normalizados
+
+
+def _ultima_ocorrencia(caminho, literal, tamanho_bloco=TAMANHO_BLOCO):
+    """Posição (em bytes) da última ocorrência do literal, lendo o arquivo de trás para frente"""
+    with open(caminho, 'rb') as f:
+        fim = f.seek(0, os.SEEK_END)
+        cauda = b''
+        while fim > 0:
+            inicio = max(0, fim - tamanho_bloco)
+            f.seek(inicio)
+            trecho = f.read(fim - inicio) + cauda
+            p = trecho.rfind(literal)
+            if p >= 0:
+                return inicio + p
+            cauda = trecho[:len(literal) - 1]
+            fim = inicio
+    return -1
+
+
+def aplicar_remendos(entrada, remendos, saida=None, tamanho_bloco=TAMANHO_BLOCO):
+    """
+    Aplica a lista de remendos numa única passagem pelo arquivo.
+
+    O arquivo é lido em blocos de bytes (UTF-8); só ficam em memória o bloco
+    atual, a cauda necessária para casar literais entre blocos e, quando
+    houver, o trecho sendo substituído por um substituir_bloco. A última
+    ocorrência de um alvo com ocorrencia='ultima' é localizada antes,
+    lendo só o final do arquivo.
+
+    Args:
+        entrada: caminho do HTML
+        remendos: lista de dicts (ver docstring do módulo)
+        saida: caminho de saída (padrão: sobrescreve a entrada, via arquivo temporário)
+        tamanho_bloco: bytes lidos por vez
+
+    Returns:
+        lista de dicts {'nome', 'tipo', 'ocorrencias', 'tempo_s'} na ordem dos remendos
+    """
+    remendos = _normalizar(remendos)
+    saida = saida or entrada
+    temporario = saida + '.remendo.tmp'
+    n = len(remendos)
+    ocorrencias = [0] * n
+    tempos = [0.0] * n
+    vistos = set()          # literais de exceto_se já encontrados
+    dentro = None           # (índice do remendo, etapa do fim, partes do bloco)
+
+    # literal -> remendos interessados (ordem da lista); 'ultima' tem posição fixa
+    interessados = {}
+    ultimas = {}            # índice do remendo -> posição absoluta da última ocorrência
+    for i, r in enumerate(remendos):
+        if r.get('ocorrencia') == 'ultima':
+            inicio = time.perf_counter()
+            ultimas[i] = _ultima_ocorrencia(entrada, r['literal'], tamanho_bloco)
+            tempos[i] += time.perf_counter() - inicio
+        else:
+            interessados.setdefault(r['literal'], []).append(i)
+    vigias = {r['exceto_se'] for r in remendos if r.get('exceto_se')}
+    maior = max([len(r['literal']) for r in remendos] + [len(v) for v in vigias]
+                + [len(f) for r in remendos if r['tipo'] == 'substituir_bloco' for f in r['fim']])
+
+    def ativo(i):
+        r = remendos[i]
+        if r['maximo'] is not None and ocorrencias[i] >= r['maximo']:
+            return False
+        return not (r.get('exceto_se') and r['exceto_se'] in vistos)
+
+    with open(entrada, 'rb') as fin, open(temporario, 'wb') as fout:
+
+        def emitir(dados):
+            if not dados:
+                return
+            if dentro is None:
+                fout.write(dados)
+            else:
+                dentro[2].append(dados)
+
+        cache = {}  # literal -> (buscado a partir de, posição ou -1), válido para o buffer atual
+
+        def achar(buffer, literal, pos):
+            desde, p = cache.get(literal, (None, -1))
+            if desde is None or desde > pos or (0 <= p < pos):
+                p = buffer.find(literal, pos)
+                cache[literal] = (pos, p)
+            return p
+
+        def buscar(buffer, pos, base):
+            """Próximo evento (posição, literal ou índice 'ultima') mais à esquerda"""
+            if dentro is not None:
+                i, etapa, _ = dentro
+                literal = remendos[i]['fim'][etapa]
+                inicio = time.perf_counter()
+                p = achar(buffer, literal, pos)
+                tempos[i] += time.perf_counter() - inicio
+                return (p, literal) if p >= 0 else None
+            melhor = None
+            for i, absoluta in ultimas.items():
+                p = absoluta - base
+                if pos <= p < len(buffer) and not ocorrencias[i] and ativo(i) \
+                        and (melhor is None or p < melhor[0]):
+                    melhor = (p, i)
+            for literal, indices in interessados.items():
+                usados = [i for i in indices if ativo(i)]
+                if not usados:
+                    continue
+                inicio = time.perf_counter()
+                p = achar(buffer, literal, pos)
+                gasto = (time.perf_counter() - inicio) / len(usados)
+                for i in usados:
+                    tempos[i] += gasto
+                if p >= 0 and (melhor is None or p < melhor[0]):
+                    melhor = (p, literal)
+            for literal in vigias - vistos:
+                p = achar(buffer, literal, pos)
+                if p >= 0 and (melhor is None or p < melhor[0]):
+                    melhor = (p, literal)
+            return melhor
+
+        def tratar(literal):
+            """Aplica os remendos de um literal encontrado; devolve os bytes a emitir"""
+            nonlocal dentro
+            if dentro is not None:
+                i, etapa, partes = dentro
+                inicio = time.perf_counter()
+                partes.append(literal)
+                if etapa + 1 < len(remendos[i]['fim']):
+                    dentro = (i, etapa + 1, partes)
+                    return b''
+                dentro = None
+                conteudo = remendos[i]['conteudo']
+                if callable(conteudo):
+                    conteudo = conteudo(b''.join(partes).decode('utf-8')).encode('utf-8')
+                ocorrencias[i] += 1
+                tempos[i] += time.perf_counter() - inicio
+                return conteudo
+            if literal in vigias:
+                vistos.add(literal)
+            antes, depois, marcador, trocado = [], [], literal, False
+            for i in interessados.get(literal, []):
+                if not ativo(i):
+                    continue
+                inicio = time.perf_counter()
+                r = remendos[i]
+                if r['tipo'] == 'inserir_antes':
+                    antes.append(r['conteudo'])
+                    ocorrencias[i] += 1
+                elif r['tipo'] == 'inserir_depois':
+                    depois.append(r['conteudo'])
+                    ocorrencias[i] += 1
+                elif r['tipo'] == 'substituir' and not trocado:
+                    marcador, trocado = r['conteudo'], True
+                    ocorrencias[i] += 1
+                elif r['tipo'] == 'substituir_bloco' and not trocado:
+                    emitir(b''.join(antes))
+                    antes, marcador = [], b''
+                    dentro = (i, 0, [literal])
+                    tempos[i] += time.perf_counter() - inicio
+                    break
+                tempos[i] += time.perf_counter() - inicio
+            return b''.join(antes) + marcador + b''.join(depois)
+
+        buffer = b''
+        base = 0                # posição absoluta (na entrada) de buffer[0]
+        fim_arquivo = False
+        while not fim_arquivo:
+            bloco = fin.read(tamanho_bloco)
+            fim_arquivo = not bloco
+            buffer += bloco
+            cache.clear()
+            pos = 0
+            # só eventos que começam antes da cauda cabem inteiros no buffer
+            limite = len(buffer) if fim_arquivo else len(buffer) - maior + 1
+            while True:
+                evento = buscar(buffer, pos, base)
+                if evento is None or evento[0] >= limite:
+                    break
+                p, alvo = evento
+                emitir(buffer[pos:p])
+                if isinstance(alvo, int):
+                    # inserção na última ocorrência: não consome o literal
+                    emitir(remendos[alvo]['conteudo'])
+                    ocorrencias[alvo] += 1
+                    pos = p
+                    continue
+                pos = p + len(alvo)
+                emitir(tratar(alvo))
+            # guarda a cauda que ainda pode conter o começo de um literal
+            seguro = len(buffer) if fim_arquivo else max(pos, limite)
+            emitir(buffer[pos:seguro])
+            buffer = buffer[seguro:]
+            base += seguro
+
+        if dentro is not None:
+            # bloco sem fim: devolve o texto original intacto
+            partes = dentro[2]
+            dentro = None
+            emitir(b''.join(partes))
+        for i, r in enumerate(remendos):
+            if ocorrencias[i] == 0 and r.get('no_fim_se_ausente') and ativo(i):
+                fout.write(r['conteudo'])
+                ocorrencias[i] += 1
+
+    os.replace(temporario, saida)
+    return [
+        {'nome': r['nome'], 'tipo': r['tipo'], 'ocorrencias': ocorrencias[i], 'tempo_s': tempos[i]}
+        for i, r in enumerate(remendos)
+    ]
+
+
+def imprimir_relatorio(estatisticas, tempo_total=None):
+    """Tabela de ocorrências e tempo por remendo"""
+    for e in estatisticas:
+        simbolo = '✅' if e['ocorrencias'] else '⚠️'
+        print(f"   {simbolo} {e['nome']:<40} {e['ocorrencias']:>5}x  {e['tempo_s'] * 1000:8.1f} ms")
+    if tempo_total is not None:
+        print(f"   ⏱️ Passagem única: {tempo_total:.2f} s")
+
+
+def main():
+    if len(sys.argv) < 3:
+        print(__doc__)
+        return 1
+    arquivo, modulos = sys.argv[1], sys.argv[2:]
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    remendos = []
+    for nome in modulos:
+        remendos.extend(importlib.import_module(nome).remendos())
+
+    print(f"🩹 Aplicando {len(remendos)} remendos em {arquivo} ({os.path.getsize(arquivo) / 1024 / 1024:.1f} MB)...")
+    inicio = time.perf_counter()
+    estatisticas = aplicar_remendos(arquivo, remendos)
+    imprimir_relatorio(estatisticas, time.perf_counter() - inicio)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Renderização de Dashboards Matplotlib por Painéis
+- Exportação multi-formato com layout calculado uma vez: o PNG sai do buffer
+  de uma única renderização Agg e os formatos vetoriais (PDF/SVG) reutilizam a
+  caixa recortada, sem o desenho extra de bbox_inches='tight' a cada savefig
+- Modo paralelo: cada painel é desenhado num processo com o backend Agg, na
+  posição que ocupa na grade da figura, e os recortes RGBA são compostos sobre
+  o cabeçalho/rodapé renderizados no processo principal
+- Tempo por painel (desenho e renderização) para achar os painéis lentos
+
+Painel = dict com 'nome', 'posicao' (linha0, linha1, coluna0, coluna1) na
+grade e 'funcao' (nível de módulo, para ir ao processo) chamada como
+funcao(ax, *args).
+
+No modo paralelo PDF/SVG embutem a imagem composta (uma renderização para
+todos os formatos); use o modo sequencial quando precisar de vetor.
+
+Autor: Caetano Ronan
+Instituição: UFSC
+"""
+
+import time
+import multiprocessing as mp
+import numpy as np
+import matplotlib
+import matplotlib.style
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.transforms import Bbox
+from PIL import Image
+
+MARGEM_POLEGADAS = 0.1  # mesma folga do bbox_inches='tight' do savefig
+
+
+def _salvar_png(rgba, caminho, dpi):
+    Image.fromarray(rgba).convert('RGB').save(caminho, dpi=(dpi, dpi))
+
+
+def exportar_figura(fig, caminho_base, formatos=('png', 'pdf'), dpi=300, facecolor='white'):
+    """
+    Exporta a figura em vários formatos com uma renderização por backend.
+
+    Args:
+        fig: matplotlib Figure já montada
+        caminho_base: caminho sem extensão
+        formatos: extensões a gerar ('png', 'pdf', 'svg', ...)
+        dpi: resolução do PNG (e das imagens embutidas nos vetoriais)
+        facecolor: cor de fundo
+
+    Returns:
+        dict {formato: segundos}
+    """
+    tempos = {}
+    canvas_original = fig.canvas
+    dpi_original = fig.dpi
+    fundo_original = fig.get_facecolor()
+    try:
+        inicio = time.perf_counter()
+        canvas = FigureCanvasAgg(fig)
+        fig.set_dpi(dpi)
+        fig.set_facecolor(facecolor)
+        canvas.draw()
+        # Caixa justa em polegadas, calculada sobre o desenho já feito
+        caixa = fig.get_tightbbox(canvas.get_renderer()).padded(MARGEM_POLEGADAS)
+        if 'png' in formatos:
+            rgba = np.asarray(canvas.buffer_rgba())
+            altura = rgba.shape[0]
+            x0, x1 = int(np.floor(caixa.x0 * dpi)), int(np.ceil(caixa.x1 * dpi))
+            y0, y1 = int(np.floor(caixa.y0 * dpi)), int(np.ceil(caixa.y1 * dpi))
+            recorte = np.full((y1 - y0, x1 - x0, 4), 255, dtype=np.uint8)
+            # A caixa pode passar da borda da figura (textos fora dela)
+            fx0, fx1 = max(x0, 0), min(x1, rgba.shape[1])
+            fy0, fy1 = max(y0, 0), min(y1, altura)
+            recorte[y1 - fy1:y1 - fy0, fx0 - x0:fx1 - x0] = rgba[altura - fy1:altura - fy0, fx0:fx1]
+            _salvar_png(recorte, f'{caminho_base}.png', dpi)
+            tempos['png'] = time.perf_counter() - inicio
+        for formato in formatos:
+            if formato == 'png':
+                continue
+            inicio = time.perf_counter()
+            fig.savefig(f'{caminho_base}.{formato}', format=formato, dpi=dpi,
+                        bbox_inches=caixa, facecolor=facecolor)
+            tempos[formato] = time.perf_counter() - inicio
+    finally:
+        fig.set_dpi(dpi_original)
+        fig.set_facecolor(fundo_original)
+        fig.set_canvas(canvas_original)
+    return tempos
+
+
+def _renderizar_painel(tarefa):
+    """Processo do pool: desenha um painel na sua célula da grade e devolve o recorte"""
+    painel, args, figura, dpi = tarefa
+    with matplotlib.style.context(figura['estilo']):
+        inicio = time.perf_counter()
+        fig = Figure(figsize=figura['tamanho'], dpi=dpi)
+        canvas = FigureCanvasAgg(fig)
+        fig.patch.set_alpha(0)
+        grade = fig.add_gridspec(*figura['grade'], **figura.get('grade_opcoes', {}))
+        l0, l1, c0, c1 = painel['posicao']
+        ax = fig.add_subplot(grade[l0:l1, c0:c1])
+        painel['funcao'](ax, *args)
+        meio = time.perf_counter()
+        canvas.draw()
+        caixa = ax.get_tightbbox(canvas.get_renderer())
+        rgba = np.asarray(canvas.buffer_rgba())
+        altura, largura = rgba.shape[:2]
+        x0, x1 = max(int(np.floor(caixa.x0)), 0), min(int(np.ceil(caixa.x1)), largura)
+        y0, y1 = max(int(np.floor(caixa.y0)), 0), min(int(np.ceil(caixa.y1)), altura)
+        recorte = rgba[altura - y1:altura - y0, x0:x1].copy()
+        fim = time.perf_counter()
+    return {
+        'nome': painel['nome'],
+        'recorte': recorte,
+        'origem': (altura - y1, x0),  # (linha, coluna) do canto superior esquerdo
+        'desenho_s': meio - inicio,
+        'render_s': fim - meio,
+    }
+
+
+def _compor(base, recorte, linha, coluna):
+    """Sobrepõe um recorte RGBA (fundo transparente) na base RGBA"""
+    destino = base[linha:linha + recorte.shape[0], coluna:coluna + recorte.shape[1]]
+    alfa = recorte[..., 3:4].astype(np.float32) / 255.0
+    destino[..., :3] = (recorte[..., :3] * alfa + destino[..., :3] * (1.0 - alfa)).astype(np.uint8)
+    destino[..., 3] = np.maximum(destino[..., 3], recorte[..., 3])
+
+
+def renderizar_paralelo(paineis, args, figura, decorar, caminho_base,
+                        formatos=('png', 'pdf'), dpi=300, processos=None, facecolor='white'):
+    """
+    Desenha os painéis em processos Agg e compõe a figura final.
+
+    Args:
+        paineis: lista de painéis ({'nome', 'posicao', 'funcao'})
+        args: argumentos passados a cada funcao(ax, *args)
+        figura: {'tamanho': (l, a), 'grade': (linhas, colunas), 'grade_opcoes': {...},
+                 'estilo': nome do estilo matplotlib}
+        decorar: função(fig) que desenha o que não é painel (título, rodapé)
+        caminho_base: caminho sem extensão
+        formatos: extensões a gerar
+        dpi: resolução
+        processos: tamanho do pool (padrão: núcleos disponíveis)
+        facecolor: cor de fundo
+
+    Returns:
+        (fig composta, lista de tempos por painel, dict de tempos por formato)
+    """
+    tarefas = [(painel, args, figura, dpi) for painel in paineis]
+    processos = min(processos or mp.cpu_count() or 1, len(tarefas))
+    if processos > 1 and not mp.current_process().daemon:
+        metodo = 'fork' if 'fork' in mp.get_all_start_methods() else 'spawn'
+        with mp.get_context(metodo).Pool(processos) as pool:
+            resultados = pool.map(_renderizar_painel, tarefas)
+    else:
+        # Processo do pool do lote (daemon) não pode ter filhos: mesma lógica, em série
+        resultados = [_renderizar_painel(tarefa) for tarefa in tarefas]
+
+    inicio = time.perf_counter()
+    with matplotlib.style.context(figura['estilo']):
+        fig = Figure(figsize=figura['tamanho'], dpi=dpi, facecolor=facecolor)
+        canvas = FigureCanvasAgg(fig)
+        decorar(fig)
+        canvas.draw()
+        renderer = canvas.get_renderer()
+        base = np.array(canvas.buffer_rgba())
+        altura, largura = base.shape[:2]
+        caixas = [t.get_window_extent(renderer) for t in fig.texts]
+    for resultado in resultados:
+        linha, coluna = resultado['origem']
+        _compor(base, resultado['recorte'], linha, coluna)
+        h, w = resultado['recorte'].shape[:2]
+        caixas.append(Bbox([[coluna, altura - linha - h], [coluna + w, altura - linha]]))
+
+    # Caixa justa (pixels) + margem, como bbox_inches='tight'
+    margem = MARGEM_POLEGADAS * dpi
+    uniao = Bbox.union(caixas)
+    x0, x1 = max(int(uniao.x0 - margem), 0), min(int(np.ceil(uniao.x1 + margem)), largura)
+    y0, y1 = max(int(uniao.y0 - margem), 0), min(int(np.ceil(uniao.y1 + margem)), altura)
+    final = base[altura - y1:altura - y0, x0:x1]
+    tempos = {'composicao': time.perf_counter() - inicio}
+
+    if 'png' in formatos:
+        inicio = time.perf_counter()
+        _salvar_png(final, f'{caminho_base}.png', dpi)
+        tempos['png'] = time.perf_counter() - inicio
+    # Vetoriais: a mesma imagem composta, embutida uma vez
+    fig_final = Figure(figsize=(final.shape[1] / dpi, final.shape[0] / dpi), dpi=dpi)
+    FigureCanvasAgg(fig_final)
+    fig_final.figimage(final, origin='upper')
+    for formato in formatos:
+        if formato == 'png':
+            continue
+        inicio = time.perf_counter()
+        fig_final.savefig(f'{caminho_base}.{formato}', format=formato, dpi=dpi, facecolor=facecolor)
+        tempos[formato] = time.perf_counter() - inicio
+
+    tempos_paineis = [{'nome': r['nome'], 'desenho_s': r['desenho_s'], 'render_s': r['render_s']}
+                      for r in resultados]
+    return fig_final, tempos_paineis, tempos
+
+
+def imprimir_tempos(tempos_paineis, tempos_formatos, total=None):
+    """Tabela de tempos por painel (mais lento primeiro) e por formato exportado"""
+    print("   ⏱️ Tempo por painel (desenho + renderização):")
+    for t in sorted(tempos_paineis, key=lambda t: -(t['desenho_s'] + t.get('render_s', 0.0))):
+        render = f" + {t['render_s'] * 1000:6.0f} ms" if 'render_s' in t else ''
+        print(f"      {t['nome']:<24} {t['desenho_s'] * 1000:6.0f} ms{render}")
+    print("   ⏱️ Exportação: " + ', '.join(f"{f} {s:.2f} s" for f, s in tempos_formatos.items()))
+    if total is not None:
+        print(f"   ⏱️ Total: {total:.2f} s")
@@ -0,0 +1,517 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pirâmide de Tiles XYZ para Mapas de Calor
+- Grade KDE (estimativa de densidade por kernel gaussiano) em Web Mercator
+- Renderização de tiles PNG 256x256 com rampas ColorBrewer: z10 até o zoom
+  em que o tile já resolve a grade KDE; o Leaflet amplia esse nível até z18
+- Exportação opcional para MBTiles (SQLite)
+- Regeneração incremental: só os tiles das regiões alteradas são refeitos
+
+Para mapas estaduais/nacionais o plugin HeatMap do Folium trava o navegador
+com centenas de milhares de pontos; os mapas passam a referenciar a pirâmide
+como um TileLayer e nenhum array de pontos é embutido no HTML.
+
+Autor: Caetano Ronan
+Instituição: UFSC
+"""
+
+import os
+import json
+import gzip
+import math
+import time
+import sqlite3
+import numpy as np
+from matplotlib import image as mpimg
+from matplotlib.colors import LinearSegmentedColormap
+try:
+    import folium
+except ImportError:
+    folium = None
+
+# Constantes Web Mercator (EPSG:3857)
+RAIO_TERRA_M = 6378137.0
+ORIGEM_MERCATOR = math.pi * RAIO_TERRA_M
+TAMANHO_TILE = 256
+
+ZOOMS_PADRAO = range(10, 19)
+# Último zoom renderizado: o primeiro em que o pixel do tile fica <= 1/4 da
+# célula KDE. Zooms acima só reinterpolariam a mesma grade; o Leaflet amplia
+# o último nível nativo (max_native_zoom)
+PIXELS_POR_CELULA = 4
+ARQUIVO_MANIFESTO = 'piramide.json'
+ARQUIVO_GRADE = 'grade_kde.npz'
+LIMIAR_VISIVEL = 0.02  # fração de vmax abaixo da qual o pixel fica transparente
+ATRIBUICAO_CALOR = 'Densidade KDE - CNES/DataSUS'
+
+
+def lonlat_para_mercator(lon, lat):
+    """Converte longitude/latitude (graus) para metros Web Mercator (vetorizado)"""
+    lon = np.asarray(lon, dtype=float)
+    lat = np.clip(np.asarray(lat, dtype=float), -85.05112878, 85.05112878)
+    x = RAIO_TERRA_M * np.radians(lon)
+    y = RAIO_TERRA_M * np.log(np.tan(np.pi / 4 + np.radians(lat) / 2))
+    return x, y
+
+
+def mercator_para_lonlat(x, y):
+    """Converte metros Web Mercator para longitude/latitude (graus)"""
+    lon = np.degrees(np.asarray(x, dtype=float) / RAIO_TERRA_M)
+    lat = np.degrees(2 * np.arctan(np.exp(np.asarray(y, dtype=float) / RAIO_TERRA_M)) - np.pi / 2)
+    return lon, lat
+
+
+def limites_tile(z, x, y):
+    """Retorna (xmin, ymin, xmax, ymax) em metros Web Mercator do tile XYZ"""
+    tamanho = 2 * ORIGEM_MERCATOR / (2 ** z)
+    xmin = -ORIGEM_MERCATOR + x * tamanho
+    ymax = ORIGEM_MERCATOR - y * tamanho
+    return xmin, ymax - tamanho, xmin + tamanho, ymax
+
+
+def indices_tile(x_merc, y_merc, z):
+    """Índices (x, y) dos tiles XYZ que contêm as coordenadas Mercator (vetorizado)"""
+    tamanho = 2 * ORIGEM_MERCATOR / (2 ** z)
+    n = 2 ** z
+    tx = np.clip(np.floor((np.asarray(x_merc) + ORIGEM_MERCATOR) / tamanho), 0, n - 1).astype(np.int64)
+    ty = np.clip(np.floor((ORIGEM_MERCATOR - np.asarray(y_merc)) / tamanho), 0, n - 1).astype(np.int64)
+    return tx, ty
+
+
+def _convolucao_gaussiana(grade, sigma_celulas, eixo):
+    """Convolução gaussiana 1D por deslocamentos (memória O(N), separável)"""
+    raio = max(1, int(math.ceil(3 * sigma_celulas)))
+    offsets = np.arange(-raio, raio + 1)
+    pesos = np.exp(-0.5 * (offsets / sigma_celulas) ** 2)
+    pesos /= pesos.sum()
+
+    pad = [(0, 0), (0, 0)]
+    pad[eixo] = (raio, raio)
+    grade_pad = np.pad(grade, pad)
+    saida = np.zeros_like(grade, dtype=float)
+    n = grade.shape[eixo]
+    for offset, peso in zip(offsets, pesos):
+        inicio = raio + offset
+        if eixo == 0:
+            saida += peso * grade_pad[inicio:inicio + n, :]
+        else:
+            saida += peso * grade_pad[:, inicio:inicio + n]
+    return saida
+
+
+def calcular_grade_kde(lats, lons, pesos=None, largura_banda_m=400, resolucao_m=None, margem_bandas=3):
+    """
+    Calcula a grade de densidade KDE (estabelecimentos/km²) em Web Mercator.
+
+    A grade é alinhada a uma malha global (múltiplos da resolução), de modo que
+    duas execuções com dados diferentes produzem células coincidentes e podem
+    ser comparadas para detectar regiões alteradas.
+
+    Args:
+        lats, lons: coordenadas em graus (WGS84)
+        pesos: peso de cada ponto (padrão 1)
+        largura_banda_m: desvio padrão do kernel gaussiano em metros no terreno
+        resolucao_m: tamanho da célula em metros no terreno (padrão: banda/4)
+        margem_bandas: margem da grade além dos pontos, em larguras de banda
+
+    Returns:
+        dict com 'grade' (linha 0 = norte), 'xmin', 'ymax', 'resolucao' (metros
+        Mercator), 'largura_banda_m' e 'n_pontos'
+    """
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    validos = np.isfinite(lats) & np.isfinite(lons)
+    lats, lons = lats[validos], lons[validos]
+    pesos = np.ones(len(lats)) if pesos is None else np.asarray(pesos, dtype=float)[validos]
+
+    if len(lats) == 0:
+        return None
+
+    # Fator de escala Mercator na latitude média (metros de terreno -> metros Mercator)
+    escala = 1.0 / math.cos(math.radians(float(np.mean(lats))))
+    resolucao_m = resolucao_m or largura_banda_m / 4
+    resolucao = float(max(1, round(resolucao_m * escala)))
+    sigma = largura_banda_m * escala
+
+    x, y = lonlat_para_mercator(lons, lats)
+    margem = margem_bandas * sigma
+    xmin = math.floor((x.min() - margem) / resolucao) * resolucao
+    ymin = math.floor((y.min() - margem) / resolucao) * resolucao
+    xmax = math.ceil((x.max() + margem) / resolucao) * resolucao
+    ymax = math.ceil((y.max() + margem) / resolucao) * resolucao
+    nx = int(round((xmax - xmin) / resolucao))
+    ny = int(round((ymax - ymin) / resolucao))
+
+    contagem, _, _ = np.histogram2d(
+        y, x, bins=[ny, nx], range=[[ymin, ymax], [xmin, xmax]], weights=pesos
+    )
+    sigma_celulas = sigma / resolucao
+    grade = _convolucao_gaussiana(contagem, sigma_celulas, eixo=0)
+    grade = _convolucao_gaussiana(grade, sigma_celulas, eixo=1)
+
+    # Converter contagem por célula em densidade por km² de terreno
+    area_celula_km2 = (resolucao / escala) ** 2 / 1e6
+    grade = grade[::-1] / area_celula_km2
+
+    return {
+        'grade': grade,
+        'xmin': xmin,
+        'ymax': ymax,
+        'resolucao': resolucao,
+        'largura_banda_m': largura_banda_m,
+        'n_pontos': int(len(lats)),
+    }
+
+
+def _amostrar_grade(grade_kde, px, py):
+    """Amostragem bilinear da grade KDE em coordenadas Mercator (0 fora da grade)"""
+    grade = grade_kde['grade']
+    res = grade_kde['resolucao']
+    col = (px - grade_kde['xmin']) / res - 0.5
+    lin = (grade_kde['ymax'] - py) / res - 0.5
+    ny, nx = grade.shape
+
+    c0 = np.floor(col).astype(np.int64)
+    l0 = np.floor(lin).astype(np.int64)
+    fc = col - c0
+    fl = lin - l0
+
+    grade_pad = np.pad(grade, 1)
+    c0 = np.clip(c0 + 1, 0, nx)
+    l0 = np.clip(l0 + 1, 0, ny)
+    c1 = np.clip(c0 + 1, 0, nx + 1)
+    l1 = np.clip(l0 + 1, 0, ny + 1)
+
+    valores = (grade_pad[l0, c0] * (1 - fl) * (1 - fc) + grade_pad[l0, c1] * (1 - fl) * fc +
+               grade_pad[l1, c0] * fl * (1 - fc) + grade_pad[l1, c1] * fl * fc)
+    fora = (col < -1) | (col > nx) | (lin < -1) | (lin > ny)
+    return np.where(fora, 0.0, valores)
+
+
+def criar_colormap(paleta):
+    """Colormap contínuo a partir de uma lista de cores ColorBrewer"""
+    return LinearSegmentedColormap.from_list('calor_colorbrewer', paleta)
+
+
+def renderizar_tile(grade_kde, z, x, y, cmap, vmax, limiar=LIMIAR_VISIVEL, opacidade=(0.35, 0.85)):
+    """
+    Renderiza um tile RGBA 256x256 a partir da grade KDE.
+
+    Returns:
+        np.ndarray (256, 256, 4) ou None se o tile ficar totalmente transparente
+    """
+    bx0, by0, bx1, by1 = limites_tile(z, x, y)
+    passo = (bx1 - bx0) / TAMANHO_TILE
+    px = bx0 + (np.arange(TAMANHO_TILE) + 0.5) * passo
+    py = by1 - (np.arange(TAMANHO_TILE) + 0.5) * passo
+    gx, gy = np.meshgrid(px, py)
+
+    valores = np.clip(_amostrar_grade(grade_kde, gx, gy) / vmax, 0, 1)
+    visivel = valores >= limiar
+    if not visivel.any():
+        return None
+
+    rgba = cmap(valores)
+    alfa_min, alfa_max = opacidade
+    rgba[..., 3] = np.where(visivel, alfa_min + (alfa_max - alfa_min) * valores, 0.0)
+    return rgba
+
+
+def zooms_nativos(grade_kde, zooms=ZOOMS_PADRAO):
+    """Zooms pedidos até o primeiro com pixel <= resolução/PIXELS_POR_CELULA"""
+    zooms = sorted(int(z) for z in zooms)
+    alvo = grade_kde['resolucao'] / PIXELS_POR_CELULA
+    nativos = []
+    for z in zooms:
+        nativos.append(z)
+        if 2 * ORIGEM_MERCATOR / (TAMANHO_TILE * 2 ** z) <= alvo:
+            break
+    return nativos
+
+
+def _extensao_grade(grade_kde):
+    ny, nx = grade_kde['grade'].shape
+    res = grade_kde['resolucao']
+    return (grade_kde['xmin'], grade_kde['ymax'] - ny * res,
+            grade_kde['xmin'] + nx * res, grade_kde['ymax'])
+
+
+def _tiles_das_celulas(grade_kde, mascara, z):
+    """Tiles XYZ que cobrem as células marcadas (inclui vizinhança da interpolação)"""
+    if not mascara.any():
+        return set()
+    # Dilatar 1 célula: a amostragem bilinear lê vizinhos
+    dilatada = mascara.copy()
+    dilatada[1:, :] |= mascara[:-1, :]
+    dilatada[:-1, :] |= mascara[1:, :]
+    dilatada[:, 1:] |= dilatada[:, :-1].copy()
+    dilatada[:, :-1] |= dilatada[:, 1:].copy()
+
+    linhas, colunas = np.nonzero(dilatada)
+    res = grade_kde['resolucao']
+    tiles = set()
+    # Cantos das células: garante cobertura mesmo quando a célula é maior que o tile
+    for dl in (0, 1):
+        for dc in (0, 1):
+            cx = grade_kde['xmin'] + (colunas + dc) * res
+            cy = grade_kde['ymax'] - (linhas + dl) * res
+            tx, ty = indices_tile(cx, cy, z)
+            tiles.update(zip(tx.tolist(), ty.tolist()))
+    return tiles
+
+
+def _alinhar_grade(grade_ref, grade_kde):
+    """Reposiciona a grade anterior na malha da grade nova (0 fora da sobreposição)"""
+    res = grade_kde['resolucao']
+    dc = int(round((grade_ref['xmin'] - grade_kde['xmin']) / res))
+    dl = int(round((grade_kde['ymax'] - grade_ref['ymax']) / res))
+    alvo = np.zeros_like(grade_kde['grade'])
+    ny, nx = grade_ref['grade'].shape
+    l0, c0 = max(0, dl), max(0, dc)
+    l1, c1 = min(alvo.shape[0], dl + ny), min(alvo.shape[1], dc + nx)
+    if l1 > l0 and c1 > c0:
+        alvo[l0:l1, c0:c1] = grade_ref['grade'][l0 - dl:l1 - dl, c0 - dc:c1 - dc]
+    # Massa da grade anterior que ficou fora da nova extensão também é "suja"
+    fora = float(grade_ref['grade'].sum() - alvo.sum())
+    return alvo, fora
+
+
+def _carregar_estado(destino):
+    caminho_manifesto = os.path.join(destino, ARQUIVO_MANIFESTO)
+    caminho_grade = os.path.join(destino, ARQUIVO_GRADE)
+    if not (os.path.isfile(caminho_manifesto) and os.path.isfile(caminho_grade)):
+        return None, None
+    try:
+        with open(caminho_manifesto, 'r', encoding='utf-8') as f:
+            manifesto = json.load(f)
+        dados = np.load(caminho_grade)
+        grade_ref = {
+            'grade': dados['grade'],
+            'xmin': float(dados['xmin']),
+            'ymax': float(dados['ymax']),
+            'resolucao': float(dados['resolucao']),
+        }
+        return manifesto, grade_ref
+    except Exception as e:
+        print(f"   ⚠️ Estado anterior da pirâmide ilegível ({e}), reconstruindo tudo")
+        return None, None
+
+
+def gerar_piramide_tiles(grade_kde, destino, paleta, zooms=ZOOMS_PADRAO, vmax=None,
+                         tolerancia=0.005, forcar=False):
+    """
+    Gera (ou atualiza incrementalmente) a pirâmide XYZ de tiles PNG.
+
+    Na primeira execução todos os tiles não vazios são renderizados. Nas
+    seguintes, a grade KDE nova é comparada à anterior (salva em
+    `grade_kde.npz`) e só os tiles que cobrem células alteradas são refeitos.
+    Uma reconstrução completa só ocorre se a paleta, a resolução, os zooms ou
+    a escala de cores (vmax) mudarem. Os zooms são limitados por
+    zooms_nativos: acima disso o tile não traz detalhe novo da grade.
+
+    Args:
+        grade_kde: dict retornado por calcular_grade_kde
+        destino: diretório da pirâmide ({z}/{x}/{y}.png)
+        paleta: lista de cores ColorBrewer (ex.: COLORBREWER_SEQUENTIAL['YlOrRd_3'])
+        zooms: níveis de zoom pedidos (cortados em zooms_nativos)
+        vmax: densidade que satura a rampa (padrão: percentil 99.5 da grade)
+        tolerancia: variação relativa a vmax abaixo da qual a célula é considerada igual
+        forcar: ignora o estado anterior e reconstrói tudo
+
+    Returns:
+        dict com estatísticas (tiles renderizados, removidos, tempo)
+    """
+    inicio = time.perf_counter()
+    os.makedirs(destino, exist_ok=True)
+    zooms = zooms_nativos(grade_kde, zooms)
+
+    grade = grade_kde['grade']
+    positivos = grade[grade > 0]
+    vmax_dados = float(np.percentile(positivos, 99.5)) if positivos.size else 1.0
+
+    manifesto, grade_ref = (None, None) if forcar else _carregar_estado(destino)
+
+    # Decidir entre reconstrução completa e incremental
+    completo = manifesto is None
+    if not completo:
+        mudou_parametros = (
+            manifesto.get('paleta') != list(paleta) or
+            manifesto.get('zooms') != zooms or
+            abs(manifesto.get('resolucao', 0) - grade_kde['resolucao']) > 1e-6 or
+            manifesto.get('largura_banda_m') != grade_kde['largura_banda_m']
+        )
+        vmax_anterior = manifesto.get('vmax', 0)
+        # Mantém a escala anterior enquanto os dados não saturarem a rampa
+        vmax_novo = vmax or vmax_anterior
+        completo = bool(mudou_parametros or vmax_dados > vmax_novo * 1.05 or (vmax and vmax != vmax_anterior))
+        if not completo:
+            vmax = vmax_novo
+    if completo:
+        vmax = vmax or vmax_dados
+
+    cmap = criar_colormap(paleta)
+    existentes = set(tuple(t) for t in manifesto.get('tiles', [])) if manifesto and not completo else set()
+
+    # Tiles candidatos por zoom
+    extensao = _extensao_grade(grade_kde)
+    visiveis = grade >= LIMIAR_VISIVEL * vmax
+    if completo:
+        # Só tiles que tocam células visíveis; o resto da extensão ficaria transparente
+        candidatos = {z: _tiles_das_celulas(grade_kde, visiveis, z) for z in zooms}
+        # Tiles antigos fora da nova extensão precisam ser removidos
+        if manifesto:
+            for z, tx, ty in manifesto.get('tiles', []):
+                if z in candidatos:
+                    candidatos[z].add((tx, ty))
+        print(f"   🧱 Pirâmide de calor: reconstrução completa (z{zooms[0]}–z{zooms[-1]})")
+    else:
+        grade_antiga, massa_fora = _alinhar_grade(grade_ref, grade_kde)
+        sujas = np.abs(grade - grade_antiga) > tolerancia * vmax
+        sujas &= visiveis | (grade_antiga >= LIMIAR_VISIVEL * vmax)
+        candidatos = {z: _tiles_das_celulas(grade_kde, sujas, z) for z in zooms}
+        if massa_fora > tolerancia * vmax:
+            # Dados saíram da extensão anterior: revisitar tiles antigos fora da nova grade
+            for z, tx, ty in manifesto.get('tiles', []):
+                bx0, by0, bx1, by1 = limites_tile(z, tx, ty)
+                if bx1 < extensao[0] or bx0 > extensao[2] or by1 < extensao[1] or by0 > extensao[3]:
+                    candidatos[z].add((tx, ty))
+        print(f"   🧱 Pirâmide de calor: atualização incremental "
+              f"({int(sujas.sum())} células alteradas)")
+
+    renderizados = 0
+    removidos = 0
+    tiles_validos = set(t for t in existentes)
+    for z in zooms:
+        for tx, ty in sorted(candidatos[z]):
+            caminho = os.path.join(destino, str(z), str(tx), f'{ty}.png')
+            rgba = renderizar_tile(grade_kde, z, tx, ty, cmap, vmax)
+            if rgba is None:
+                if os.path.isfile(caminho):
+                    os.remove(caminho)
+                    removidos += 1
+                tiles_validos.discard((z, tx, ty))
+                continue
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+            mpimg.imsave(caminho, rgba, format='png')
+            tiles_validos.add((z, tx, ty))
+            renderizados += 1
+
+    # Persistir estado para a próxima atualização incremental
+    np.savez_compressed(
+        os.path.join(destino, ARQUIVO_GRADE),
+        grade=grade, xmin=grade_kde['xmin'], ymax=grade_kde['ymax'],
+        resolucao=grade_kde['resolucao'],
+    )
+    lon_min, lat_min = mercator_para_lonlat(extensao[0], extensao[1])
+    lon_max, lat_max = mercator_para_lonlat(extensao[2], extensao[3])
+    manifesto = {
+        'paleta': list(paleta),
+        'zooms': zooms,
+        'resolucao': grade_kde['resolucao'],
+        'largura_banda_m': grade_kde['largura_banda_m'],
+        'vmax': vmax,
+        'n_pontos': grade_kde.get('n_pontos'),
+        'bounds': [[float(lat_min), float(lon_min)], [float(lat_max), float(lon_max)]],
+        'tiles': sorted([list(t) for t in tiles_validos]),
+    }
+    with open(os.path.join(destino, ARQUIVO_MANIFESTO), 'w', encoding='utf-8') as f:
+        json.dump(manifesto, f)
+
+    tempo = time.perf_counter() - inicio
+    print(f"   ✅ {renderizados} tiles renderizados, {removidos} removidos, "
+          f"{len(tiles_validos)} na pirâmide ({tempo:.1f}s)")
+    return {
+        'renderizados': renderizados,
+        'removidos': removidos,
+        'total': len(tiles_validos),
+        'completo': completo,
+        'zooms': zooms,
+        'tempo_s': tempo,
+        'vmax': vmax,
+    }
+
+
+def exportar_mbtiles(destino, arquivo_mbtiles, nome='Mapa de Calor'):
+    """
+    Empacota a pirâmide em um arquivo MBTiles (esquema TMS, y invertido).
+
+    O formato vem do manifesto ('png' por padrão; 'pbf' para tiles vetoriais,
+    gravados com gzip e metadado `json` com as vector_layers, como pede a
+    especificação MBTiles).
+    """
+    with open(os.path.join(destino, ARQUIVO_MANIFESTO), 'r', encoding='utf-8') as f:
+        manifesto = json.load(f)
+    formato = manifesto.get('formato', 'png')
+
+    if os.path.isfile(arquivo_mbtiles):
+        os.remove(arquivo_mbtiles)
+    conexao = sqlite3.connect(arquivo_mbtiles)
+    try:
+        conexao.execute('CREATE TABLE metadata (name TEXT, value TEXT)')
+        conexao.execute('CREATE TABLE tiles (zoom_level INTEGER, tile_column INTEGER, '
+                        'tile_row INTEGER, tile_data BLOB)')
+        conexao.execute('CREATE UNIQUE INDEX tile_index ON tiles (zoom_level, tile_column, tile_row)')
+        (lat_min, lon_min), (lat_max, lon_max) = manifesto['bounds']
+        metadados = {
+            'name': nome,
+            'format': formato,
+            'type': 'overlay',
+            'minzoom': str(min(manifesto['zooms'])),
+            'maxzoom': str(max(manifesto['zooms'])),
+            'bounds': f'{lon_min},{lat_min},{lon_max},{lat_max}',
+        }
+        if 'vector_layers' in manifesto:
+            metadados['json'] = json.dumps({'vector_layers': manifesto['vector_layers']})
+        conexao.executemany('INSERT INTO metadata VALUES (?, ?)', metadados.items())
+        for z, tx, ty in manifesto['tiles']:
+            with open(os.path.join(destino, str(z), str(tx), f'{ty}.{formato}'), 'rb') as f:
+                dados = f.read()
+            if formato == 'pbf':
+                dados = gzip.compress(dados)
+            conexao.execute('INSERT INTO tiles VALUES (?, ?, ?, ?)',
+                            (z, tx, (2 ** z - 1) - ty, sqlite3.Binary(dados)))
+        conexao.commit()
+    finally:
+        conexao.close()
+    print(f"   📦 MBTiles gerado: {arquivo_mbtiles} ({len(manifesto['tiles'])} tiles)")
+
+
+def camada_tiles_calor(url_base, nome, show=True, zooms=ZOOMS_PADRAO, zoom_nativo=None):
+    """
+    Cria o TileLayer Folium que referencia a pirâmide gerada.
+
+    Args:
+        url_base: caminho (relativo ao HTML) ou URL do diretório da pirâmide
+        nome: nome exibido no controle de camadas
+        show: visível ao carregar. Aninhada num FeatureGroup deve ficar True:
+            o Folium não anexa (addTo) ao pai camadas com show=False e o grupo
+            passa a controlar a visibilidade
+        zooms: faixa de zoom em que a camada aparece
+        zoom_nativo: último zoom da pirâmide (padrão: max(zooms)); acima
+            dele o Leaflet amplia os tiles desse nível
+    """
+    zooms = list(zooms)
+    return folium.TileLayer(
+        tiles=url_base.rstrip('/') + '/{z}/{x}/{y}.png',
+        attr=ATRIBUICAO_CALOR,
+        name=nome,
+        overlay=True,
+        control=True,
+        show=show,
+        min_zoom=min(zooms),
+        max_zoom=max(zooms),
+        max_native_zoom=zoom_nativo or max(zooms),
+        opacity=1.0,
+    )
+
+
+def gerar_camada_calor(lats, lons, destino, paleta, nome, url_base=None,
+                       largura_banda_m=400, zooms=ZOOMS_PADRAO, show=True):
+    """Atalho: KDE -> pirâmide incremental -> TileLayer Folium (ou None sem pontos)"""
+    grade_kde = calcular_grade_kde(lats, lons, largura_banda_m=largura_banda_m)
+    if grade_kde is None:
+        return None
+    estatisticas = gerar_piramide_tiles(grade_kde, destino, paleta, zooms=zooms)
+    return camada_tiles_calor(url_base or os.path.basename(destino), nome, show=show, zooms=zooms,
+                              zoom_nativo=max(estatisticas['zooms']))
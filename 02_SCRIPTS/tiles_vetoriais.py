@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tiles Vetoriais (Mapbox Vector Tiles) para Setores, Municípios e Áreas de Influência
+- Corte das camadas em tiles MVT (.pbf) XYZ, em diretório ou MBTiles
+- Simplificação por zoom (tolerância de ~1 pixel do zoom, em metros Mercator)
+- Camada Folium via Leaflet.VectorGrid: o navegador baixa só os tiles visíveis
+
+Os polígonos deixam de ser embutidos no HTML; é o que permite publicar
+mapas de setores em escala estadual no GitHub Pages.
+
+Uso:
+    python tiles_vetoriais.py            # gera 03_RESULTADOS/mapas/tiles_vetoriais
+    python tiles_vetoriais.py --mbtiles  # também empacota em .mbtiles
+
+Dependência opcional: mapbox-vector-tile (pip install mapbox-vector-tile)
+
+Autor: Caetano Ronan
+Instituição: UFSC
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+from collections import defaultdict
+import numpy as np
+try:
+    import geopandas as gpd
+    import shapely
+except ImportError:
+    gpd = None
+    shapely = None
+try:
+    import mapbox_vector_tile
+except ImportError:
+    mapbox_vector_tile = None
+try:
+    import folium
+    from folium.plugins import VectorGridProtobuf
+    from branca.element import MacroElement
+    from jinja2 import Template
+except ImportError:
+    folium = None
+
+from tiles_calor import (ORIGEM_MERCATOR, TAMANHO_TILE, ARQUIVO_MANIFESTO,
+                         indices_tile, limites_tile, mercator_para_lonlat, exportar_mbtiles)
+
+# Caminhos do projeto
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(SCRIPT_DIR)
+MAPAS_DIR = os.path.join(ROOT_DIR, '03_RESULTADOS', 'mapas')
+TILES_VETORIAIS_DIR = os.path.join(MAPAS_DIR, 'tiles_vetoriais')
+
+EXTENSAO_MVT = 4096       # resolução interna do tile MVT
+BUFFER_PIXELS = 4         # margem de recorte (evita costuras entre tiles)
+TOLERANCIA_PIXELS = 1.0   # simplificação: ~1 pixel de tela no zoom do tile
+
+# Camadas geradas pelo build: arquivo (relativo a ROOT_DIR), atributos mantidos e zooms
+FONTES_PADRAO = {
+    'setores': {
+        'arquivos': ['Concordia_sencitario.shp',
+                     os.path.join('03_RESULTADOS', 'shapefiles', 'Concordia_sencitario.shp')],
+        'campos': ['CD_SETOR', 'NM_MUN', 'SITUACAO', 'AREA_KM2'],
+        'zooms': range(10, 16),
+    },
+    'municipios': {
+        'arquivos': [os.path.join('SC_Municipios_2024', 'SC_Municipios_2024.shp')],
+        'campos': ['CD_MUN', 'NM_MUN', 'AREA_KM2'],
+        'zooms': range(5, 13),
+    },
+    'areas_influencia': {
+        'arquivos': ['voronoi_recortado.shp',
+                     os.path.join('03_RESULTADOS', 'shapefiles', 'voronoi_recortado.shp')],
+        'campos': ['NOME', 'TIPO', 'BAIRRO'],
+        'zooms': range(10, 16),
+    },
+}
+
+
+def carregar_camada(caminho, campos):
+    """
+    Lê a camada, reprojeta para Web Mercator (EPSG:3857) e mantém só os
+    atributos usados nos popups.
+    """
+    gdf = gpd.read_file(caminho)
+    if gdf.crs is None:
+        gdf = gdf.set_crs(4326)
+    gdf = gdf.to_crs(3857)
+    gdf['geometry'] = gdf.geometry.buffer(0)
+    gdf = gdf[~gdf.geometry.is_empty & gdf.geometry.notna()]
+    return gdf[[c for c in campos if c in gdf.columns] + ['geometry']].reset_index(drop=True)
+
+
+def tolerancia_zoom(z):
+    """Tolerância de simplificação (metros Mercator) para o zoom z"""
+    return 2 * ORIGEM_MERCATOR / (TAMANHO_TILE * 2 ** z) * TOLERANCIA_PIXELS
+
+
+def _propriedades(gdf):
+    """Atributos por feição como dicts sem nulos (MVT não tem valor nulo)"""
+    colunas = [c for c in gdf.columns if c != 'geometry']
+    registros = gdf[colunas].astype(object).where(gdf[colunas].notna(), None).to_dict('records')
+    return [{k: (v.item() if hasattr(v, 'item') else v) for k, v in r.items() if v is not None}
+            for r in registros]
+
+
+def _tiles_por_feicao(limites, z):
+    """Mapeia cada tile (x, y) aos índices das feições cujo envelope o toca"""
+    tx_min, ty_max = indices_tile(limites[:, 0], limites[:, 1], z)
+    tx_max, ty_min = indices_tile(limites[:, 2], limites[:, 3], z)
+    indice = defaultdict(list)
+    for i in range(len(limites)):
+        for tx in range(tx_min[i], tx_max[i] + 1):
+            for ty in range(ty_min[i], ty_max[i] + 1):
+                indice[(tx, ty)].append(i)
+    return indice
+
+
+def gerar_tiles_vetoriais(camadas, destino, zooms=None):
+    """
+    Corta as camadas em tiles MVT XYZ ({z}/{x}/{y}.pbf) com simplificação por zoom.
+
+    Args:
+        camadas: dict {nome: {'gdf': GeoDataFrame em EPSG:3857, 'zooms': range}}
+        destino: diretório de saída (recriado a cada build)
+        zooms: restringe os zooms gerados (padrão: união dos zooms das camadas)
+
+    Returns:
+        dict com estatísticas (tiles, bytes, tempo)
+    """
+    if mapbox_vector_tile is None:
+        raise ImportError("mapbox-vector-tile não instalado (pip install mapbox-vector-tile)")
+
+    inicio = time.time()
+    if os.path.isdir(destino):
+        shutil.rmtree(destino)
+    os.makedirs(destino)
+
+    todos_zooms = sorted(set().union(*[set(c['zooms']) for c in camadas.values()]))
+    if zooms is not None:
+        todos_zooms = [z for z in todos_zooms if z in set(zooms)]
+
+    propriedades = {nome: _propriedades(c['gdf']) for nome, c in camadas.items()}
+    tiles_gerados = []
+    total_bytes = 0
+
+    for z in todos_zooms:
+        tolerancia = tolerancia_zoom(z)
+        margem = BUFFER_PIXELS * 2 * ORIGEM_MERCATOR / (TAMANHO_TILE * 2 ** z)
+        conteudo = defaultdict(dict)  # (x, y) -> {camada: [índices]}
+        geometrias = {}
+        for nome, camada in camadas.items():
+            if z not in camada['zooms'] or camada['gdf'].empty:
+                continue
+            simplificadas = shapely.simplify(camada['gdf'].geometry.values, tolerancia,
+                                             preserve_topology=True)
+            geometrias[nome] = simplificadas
+            limites = shapely.bounds(simplificadas)
+            for tile, indices in _tiles_por_feicao(limites, z).items():
+                conteudo[tile][nome] = indices
+
+        for (tx, ty), por_camada in conteudo.items():
+            xmin, ymin, xmax, ymax = limites_tile(z, tx, ty)
+            camadas_tile = []
+            for nome, indices in por_camada.items():
+                recortes = shapely.clip_by_rect(geometrias[nome][indices],
+                                                xmin - margem, ymin - margem, xmax + margem, ymax + margem)
+                features = [
+                    {'geometry': geom, 'properties': propriedades[nome][i]}
+                    for geom, i in zip(recortes, indices)
+                    if geom is not None and not geom.is_empty
+                ]
+                if features:
+                    camadas_tile.append({'name': nome, 'features': features})
+            if not camadas_tile:
+                continue
+
+            dados = mapbox_vector_tile.encode(camadas_tile, default_options={
+                'quantize_bounds': (xmin, ymin, xmax, ymax),
+                'extents': EXTENSAO_MVT,
+            })
+            pasta = os.path.join(destino, str(z), str(tx))
+            os.makedirs(pasta, exist_ok=True)
+            with open(os.path.join(pasta, f'{ty}.pbf'), 'wb') as f:
+                f.write(dados)
+            tiles_gerados.append([z, int(tx), int(ty)])
+            total_bytes += len(dados)
+
+    # Manifesto no mesmo formato da pirâmide de calor (reuso de exportar_mbtiles)
+    limites_totais = np.array([shapely.total_bounds(c['gdf'].geometry.values)
+                               for c in camadas.values() if not c['gdf'].empty])
+    lon, lat = mercator_para_lonlat(
+        [limites_totais[:, 0].min(), limites_totais[:, 2].max()],
+        [limites_totais[:, 1].min(), limites_totais[:, 3].max()])
+    manifesto = {
+        'formato': 'pbf',
+        'zooms': todos_zooms,
+        'bounds': [[float(lat[0]), float(lon[0])], [float(lat[1]), float(lon[1])]],
+        'vector_layers': [
+            {
+                'id': nome,
+                'fields': {c: ('Number' if camada['gdf'][c].dtype.kind in 'iuf' else 'String')
+                           for c in camada['gdf'].columns if c != 'geometry'},
+                'minzoom': min(camada['zooms']),
+                'maxzoom': max(camada['zooms']),
+            }
+            for nome, camada in camadas.items()
+        ],
+        'tiles': sorted(tiles_gerados),
+    }
+    with open(os.path.join(destino, ARQUIVO_MANIFESTO), 'w', encoding='utf-8') as f:
+        json.dump(manifesto, f, ensure_ascii=False)
+
+    return {
+        'tiles': len(tiles_gerados),
+        'bytes': total_bytes,
+        'tempo_s': round(time.time() - inicio, 2),
+    }
+
+
+def carregar_manifesto(destino=TILES_VETORIAIS_DIR):
+    """Manifesto da pirâmide vetorial ou None se ainda não foi gerada"""
+    caminho = os.path.join(destino, ARQUIVO_MANIFESTO)
+    if not os.path.isfile(caminho):
+        return None
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+if folium is not None:
+    class PopupTilesVetoriais(MacroElement):
+        """Popup com os atributos da feição clicada em uma camada VectorGrid"""
+        _template = Template("""
+            {% macro script(this, kwargs) %}
+            {{ this._parent.get_name() }}.on('click', function(e) {
+                var p = e.layer.properties || {};
+                var linhas = {{ this.campos_json }}.map(function(c) {
+                    return p[c[0]] === undefined ? '' :
+                        '<tr><td><b>' + c[1] + '</b></td><td>' + p[c[0]] + '</td></tr>';
+                }).join('');
+                L.popup().setLatLng(e.latlng)
+                    .setContent('<b>{{ this.titulo }}</b><table style="font-size: 12px;">' + linhas + '</table>')
+                    .openOn(this._map);
+            });
+            {% endmacro %}
+        """)
+
+        def __init__(self, titulo, campos):
+            super().__init__()
+            self._name = 'PopupTilesVetoriais'
+            self.titulo = titulo
+            self.campos_json = json.dumps([[c, r] for c, r in campos.items()], ensure_ascii=False)
+
+
+def camada_tiles_vetoriais(url_base, camada, nome, estilo, manifesto=None,
+                           show=False, popup_titulo=None, popup_campos=None):
+    """
+    Camada Leaflet.VectorGrid que referencia a pirâmide MVT gerada.
+
+    Args:
+        url_base: caminho (relativo ao HTML) ou URL do diretório da pirâmide
+        camada: nome da camada MVT a exibir (ex.: 'setores')
+        nome: nome exibido no controle de camadas
+        estilo: dict de estilo Leaflet (color, weight, fillColor...)
+        manifesto: manifesto da pirâmide (define minzoom/maxNativeZoom)
+        popup_titulo, popup_campos: popup ao clicar ({atributo: rótulo})
+
+    Returns:
+        VectorGridProtobuf (adicionar ao mapa com .add_to(mapa))
+    """
+    estilos = {c['id']: [] for c in (manifesto or {}).get('vector_layers', [])}
+    estilos[camada] = estilo
+    opcoes = {
+        'vectorTileLayerStyles': estilos,  # demais camadas do tile ficam ocultas
+        'interactive': popup_campos is not None,
+    }
+    for info in (manifesto or {}).get('vector_layers', []):
+        if info['id'] == camada:
+            opcoes['minNativeZoom'] = info['minzoom']
+            opcoes['maxNativeZoom'] = info['maxzoom']
+
+    # Opções como JSON literal: o Folium converteria as chaves para camelCase,
+    # renomeando as camadas MVT (ex.: areas_influencia)
+    vetorial = VectorGridProtobuf(url_base.rstrip('/') + '/{z}/{x}/{y}.pbf', nome,
+                                  json.dumps(opcoes, ensure_ascii=False), overlay=True, show=show)
+    if popup_campos:
+        vetorial.add_child(PopupTilesVetoriais(popup_titulo or nome, popup_campos))
+    return vetorial
+
+
+def main():
+    print("=" * 70)
+    print("🧩 GERAÇÃO DE TILES VETORIAIS (MVT)")
+    print("=" * 70)
+
+    if gpd is None or mapbox_vector_tile is None:
+        print("⚠️ Requer geopandas e mapbox-vector-tile (pip install mapbox-vector-tile)")
+        return None
+
+    camadas = {}
+    for nome, fonte in FONTES_PADRAO.items():
+        for relativo in fonte['arquivos']:
+            caminho = os.path.join(ROOT_DIR, relativo)
+            if not os.path.isfile(caminho):
+                continue
+            try:
+                gdf = carregar_camada(caminho, fonte['campos'])
+                camadas[nome] = {'gdf': gdf, 'zooms': fonte['zooms']}
+                print(f"   ✅ {nome}: {len(gdf)} feições ({relativo})")
+                break
+            except Exception as e:
+                print(f"   ⚠️ {nome}: erro ao ler {relativo}: {e}")
+        if nome not in camadas:
+            print(f"   ⚠️ {nome}: nenhuma fonte disponível")
+
+    if not camadas:
+        print("❌ Nenhuma camada carregada")
+        return None
+
+    stats = gerar_tiles_vetoriais(camadas, TILES_VETORIAIS_DIR)
+    print(f"   🧩 {stats['tiles']} tiles ({stats['bytes'] / 1024:.0f} KB) em {stats['tempo_s']} s")
+
+    if '--mbtiles' in sys.argv:
+        exportar_mbtiles(TILES_VETORIAIS_DIR, os.path.join(MAPAS_DIR, 'tiles_vetoriais.mbtiles'),
+                         nome='Setores e Municípios (MVT)')
+
+    # GitHub Pages serve a pasta docs/
+    docs_dir = os.path.join(ROOT_DIR, 'docs', 'tiles_vetoriais')
+    if os.path.isdir(docs_dir):
+        shutil.rmtree(docs_dir)
+    shutil.copytree(TILES_VETORIAIS_DIR, docs_dir)
+    print(f"   ✅ Copiado para: {docs_dir}")
+    return stats
+
+
+if __name__ == '__main__':
+    main()